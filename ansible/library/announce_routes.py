@@ -12,11 +12,14 @@ import sys
 import socket
 import random
 import logging
+import threading
 import time
+from collections import OrderedDict
 from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.debug_utils import config_module_logging
 from ansible.module_utils.multi_servers_utils import MultiServersUtils
+from ansible.module_utils.route_set_utils import RouteSetArtifact, code_fingerprint, route_set_key
 
 if sys.version_info.major == 3:
     UNICODE_TYPE = str
@@ -45,6 +48,12 @@ Options:
     - option-name: path
       description: to figure out the path of topo_{}.yml
       required: False
+
+    - option-name: route_cache_dir
+      description: folder of the precomputed route sets, disabled by default. The routes of a topology are generated
+                   once and replayed from the cache until the topology file or the route generation code changes.
+                   The folder must be private to the user running the module, it is created with mode 0700.
+      required: False
 '''
 
 EXAMPLES = '''
@@ -84,6 +93,13 @@ BGP_SCALE_T1S = [
     't1-isolated-d510u2', 't1-isolated-d510u2s2'
 ]
 ROUTES_BATCH_SIZE = 200
+# The batch size is adapted to the time ExaBGP takes to ingest a batch, between these limits
+MIN_ROUTES_BATCH_SIZE = 50
+MAX_ROUTES_BATCH_SIZE = 2000
+# Grow the batch while a batch takes less than half of this time, shrink it when it takes longer, in seconds
+ROUTES_BATCH_TARGET_LATENCY = 1.0
+# Max number of ExaBGP ports routes are sent to at the same time
+MAX_ANNOUNCE_WORKERS = 16
 
 # Describe default number of COLOs
 COLO_NUMBER = 30
@@ -175,35 +191,104 @@ def read_topo(topo_name, path):
         return {}
 
 
-def change_routes(action, ptf_ip, port, routes, routes_batch_size=ROUTES_BATCH_SIZE):
-    logging.debug("action = {}, ptf_ip = {}, port = {}, routes_batch_size = {}, routes = {}"
-                  .format(action, ptf_ip, port, routes_batch_size, routes))
-    messages = []
+# Keep-alive HTTP sessions, one per ExaBGP url
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+# Throughput of every change_routes call
+_announce_stats = []
+_announce_stats_lock = threading.Lock()
+# Routes of every port are recorded here instead of being sent while the route set artifact is compiled
+_route_recorder = None
+_route_recorder_lock = threading.Lock()
+
+
+def get_http_session(url):
+    with _http_sessions_lock:
+        session = _http_sessions.get(url)
+        if session is None:
+            session = requests.Session()
+            session.trust_env = False
+            _http_sessions[url] = session
+        return session
+
+
+def get_announce_stats():
+    with _announce_stats_lock:
+        return list(_announce_stats)
+
+
+def generate_route_messages(action, routes):
     for prefix, nexthop, aspath in routes:
         if aspath:
-            messages.append(
-                "{} route {} next-hop {} as-path [ {} ]".format(action, prefix, nexthop, aspath))
+            yield "{} route {} next-hop {} as-path [ {} ]".format(action, prefix, nexthop, aspath)
         else:
-            messages.append(
-                "{} route {} next-hop {}".format(action, prefix, nexthop))
+            yield "{} route {} next-hop {}".format(action, prefix, nexthop)
+
+
+def adapt_routes_batch_size(batch_size, latency):
+    """
+    Grow the batch while ExaBGP ingests batches quickly, shrink it when ExaBGP slows down.
+    """
+    if latency < ROUTES_BATCH_TARGET_LATENCY / 2:
+        return min(batch_size * 2, MAX_ROUTES_BATCH_SIZE)
+    if latency > ROUTES_BATCH_TARGET_LATENCY:
+        return max(batch_size // 2, MIN_ROUTES_BATCH_SIZE)
+    return batch_size
+
+
+def change_routes(action, ptf_ip, port, routes, routes_batch_size=ROUTES_BATCH_SIZE):
+    if _route_recorder is not None:
+        with _route_recorder_lock:
+            _route_recorder.setdefault(port, []).extend(routes)
+        return None
+
+    logging.debug("action = {}, ptf_ip = {}, port = {}, routes_batch_size = {}, routes count = {}"
+                  .format(action, ptf_ip, port, routes_batch_size,
+                          len(routes) if hasattr(routes, '__len__') else 'streamed'))
     wait_for_http(ptf_ip, port, timeout=60)
     url = "http://%s:%d" % (ptf_ip, port)
-    for i in range(0, len(messages), routes_batch_size):
-        batch_messages = messages[i:i+routes_batch_size]
+    session = get_http_session(url)
+    messages = generate_route_messages(action, routes)
+    batch_size = routes_batch_size
+    routes_sent = 0
+    start = time.time()
+    while True:
+        batch_messages = list(itertools.islice(messages, batch_size))
+        if not batch_messages:
+            break
         data = {"commands": ";".join(batch_messages)}
-        logging.debug("Posting to url={} data={}".format(url, json.dumps(data)))
-        post_data_to_url(url, data)
-
-
-def post_data_to_url(url, data):
+        logging.debug("Posting to url={} routes={} first={}".format(url, len(batch_messages), batch_messages[0]))
+        batch_start = time.time()
+        post_data_to_url(url, data, session=session)
+        routes_sent += len(batch_messages)
+        batch_size = adapt_routes_batch_size(batch_size, time.time() - batch_start)
+
+    elapsed = time.time() - start
+    stats = {
+        "ptf_ip": ptf_ip,
+        "port": port,
+        "action": action,
+        "routes": routes_sent,
+        "seconds": round(elapsed, 3),
+        "routes_per_sec": round(routes_sent / elapsed, 1) if elapsed > 0 else None
+    }
+    logging.info("{} {} routes to {} in {:.3f}s, {} routes/sec".format(
+        action, routes_sent, url, elapsed, stats["routes_per_sec"]))
+    with _announce_stats_lock:
+        _announce_stats.append(stats)
+    return stats
+
+
+def post_data_to_url(url, data, session=None):
     # nosemgrep-next-line
     # Flaky error `ConnectionResetError(104, 'Connection reset by peer')` may happen while using `requests.post`
     # To avoid this error, we add sleep time before sending request.
     # We use a "backoff" algorithm here, the maximum retry times is five.
     # If one retry fails, we increase the waiting time.
+    poster = session if session is not None else requests
     for i in range(0, 5):
         try:
-            r = requests.post(url, data=data, timeout=360, proxies={"http": None, "https": None})
+            r = poster.post(url, data=data, timeout=360, proxies={"http": None, "https": None})
             break
         except Exception as e:
             logging.debug("Got exception {}, will try to connect again".format(e))
@@ -229,30 +314,31 @@ def send_routes_for_each_set(args):
     change_routes(action, ptf_ip, port, routes)
 
 
-def send_routes_in_parallel(route_set):
+def send_routes_in_parallel(route_set, max_workers=MAX_ANNOUNCE_WORKERS):
     """
     Sends the given set of routes in parallel using a thread pool.
 
     Args:
         route_set (list): A list of route sets to send.
+        max_workers (int): Max number of route sets sent at the same time.
 
     Returns:
         None
     """
-    # Create a pool of worker processes
-    pool = ThreadPool(processes=len(route_set))
+    if not route_set:
+        return
 
-    # Use the ThreadPool.map function to apply the function to each set of routes
-    results = pool.map(send_routes_for_each_set, route_set)
+    # Create a pool of worker threads, bounded so that the PTF container is not flooded with connections
+    pool = ThreadPool(processes=min(len(route_set), max_workers))
 
-    # Optionally, process the results
-    for result in results:
-        # Process individual results here
-        pass
-
-    # Close the pool and wait for all processes to complete
-    pool.close()
-    pool.join()
+    try:
+        # Use the ThreadPool.map function to apply the function to each set of routes.
+        # Exceptions raised by any of the workers are re-raised here.
+        pool.map(send_routes_for_each_set, route_set)
+    finally:
+        # Close the pool and wait for all threads to complete
+        pool.close()
+        pool.join()
 
 
 # AS path from Leaf router for T0 topology
@@ -571,6 +657,7 @@ def fib_t0(topo, ptf_ip, no_default_route=False, action="announce", upstream_nei
     vms_len = len(vms)
     current_routes_offset = 0
     last_suffix = 0
+    route_set = []
     for index, vm_name in enumerate(sorted(vms.keys())):
         router_type = "leaf"
         tor_default_route = False
@@ -596,8 +683,7 @@ def fib_t0(topo, ptf_ip, no_default_route=False, action="announce", upstream_nei
                 filterout_subnet_ipv4(aggregate_routes, routes_v4)
                 routes_v4.extend(aggregate_routes_v4)
             topo_routes[vm_name][IPV4] = routes_v4
-            if action != GENERATE_WITHOUT_APPLY:
-                change_routes(action, ptf_ip, port, routes_v4)
+            route_set.append((routes_v4, port, action, ptf_ip))
         if enable_ipv6_routes_generation:
             routes_v6, last_suffix = generate_routes("v6", podset_number, tor_number, tor_subnet_number,
                                                      spine_asn, leaf_asn_start, tor_asn_start,
@@ -611,13 +697,15 @@ def fib_t0(topo, ptf_ip, no_default_route=False, action="announce", upstream_nei
                 filterout_subnet_ipv6(aggregate_routes, routes_v6)
                 routes_v6.extend(aggregate_routes_v6)
             topo_routes[vm_name][IPV6] = routes_v6
-            if action != GENERATE_WITHOUT_APPLY:
-                change_routes(action, ptf_ip, port6, routes_v6)
+            route_set.append((routes_v6, port6, action, ptf_ip))
         group_index = index * upstream_neighbor_groups // vms_len
         next_group_index = (index + 1) * upstream_neighbor_groups // vms_len
         if group_index != next_group_index:
             current_routes_offset += last_suffix
 
+    if action != GENERATE_WITHOUT_APPLY:
+        send_routes_in_parallel(route_set)
+
 
 def fib_t1_lag(topo, ptf_ip, topo_name, no_default_route=False, action="announce", tor_default_route=False,
                downstream_neighbor_groups=0, topo_routes={}):
@@ -766,10 +854,8 @@ def fib_t1_lag(topo, ptf_ip, topo_name, no_default_route=False, action="announce
             routes_to_change[port] += routes_vips
 
     if action != GENERATE_WITHOUT_APPLY:
-        for port, routes in routes_to_change.items():
-            if len(routes) <= 0:
-                continue
-            change_routes(action, ptf_ip, port, routes)
+        send_routes_in_parallel([(routes, port, action, ptf_ip) for port, routes in routes_to_change.items()
+                                 if len(routes) > 0])
 
 
 def get_new_ip(curr_ip, skip_count):
@@ -1763,6 +1849,22 @@ def filterout_subnet(aggregate_routes, candidate_routes):
     return list(set(candidate_routes) - set(subnets))
 
 
+FIB_GENERATORS = {
+    "t0": fib_t0,
+    "t1": fib_t1_lag,
+    "smartswitch-t1": fib_t1_lag,
+    "t2": fib_t2_lag,
+    "t0-mclag": fib_t0_mclag,
+    "m1": fib_m1,
+    "m0": fib_m0,
+    "mx": fib_mx,
+    "c0": fib_c0,
+    "dpu": fib_dpu,
+    "lt2": fib_lt2_routes,
+    "ft2": fib_ft2_routes
+}
+
+
 def convert_routes_to_str(topo_routes):
     for vm in topo_routes.keys():
         for ip_version in topo_routes[vm].keys():
@@ -1772,6 +1874,50 @@ def convert_routes_to_str(topo_routes):
     return topo_routes
 
 
+def generate_topo_routes(topo, topo_name, topo_type, ptf_ip, action, topo_routes,
+                         upstream_neighbor_groups=0, downstream_neighbor_groups=0):
+    """
+    Generates the routes of the topology into topo_routes, announces or withdraws them unless action is generate.
+    """
+    is_storage_backend = "backend" in topo_name
+    tor_default_route = topo_name in ["t1-isolated-d128", "t1-isolated-d32"]
+
+    if topo_type == "t0":
+        fib_t0(topo, ptf_ip, no_default_route=is_storage_backend, action=action,
+               upstream_neighbor_groups=upstream_neighbor_groups, topo_routes=topo_routes)
+    elif topo_type == "t1" or topo_type == "smartswitch-t1":
+        fib_t1_lag(
+            topo, ptf_ip, topo_name, no_default_route=is_storage_backend, action=action,
+            tor_default_route=tor_default_route, downstream_neighbor_groups=downstream_neighbor_groups,
+            topo_routes=topo_routes)
+    else:
+        FIB_GENERATORS[topo_type](topo, ptf_ip, action=action, topo_routes=topo_routes)
+
+
+def compile_route_set(key, topo, topo_name, topo_type, ptf_ip, **fib_params):
+    """
+    Generates the routes of the topology once and records, instead of sending, the routes of every ExaBGP port.
+
+    Returns:
+        RouteSetArtifact: routes of every port and the topo_routes of the topology.
+    """
+    global _route_recorder
+
+    topo_routes = {}
+    _route_recorder = OrderedDict()
+    try:
+        generate_topo_routes(topo, topo_name, topo_type, ptf_ip, "announce", topo_routes, **fib_params)
+        recorded = _route_recorder
+    finally:
+        _route_recorder = None
+
+    artifact = RouteSetArtifact(key)
+    for port, routes in recorded.items():
+        artifact.add_route_set(port, routes)
+    artifact.set_topo_routes(topo_routes)
+    return artifact
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -1785,7 +1931,8 @@ def main():
             peers_routes_to_change=dict(required=False, type='dict', default={}),
             log_path=dict(required=False, type='str', default='/tmp'),
             upstream_neighbor_groups=dict(required=False, type='int', default=0),
-            downstream_neighbor_groups=dict(required=False, type='int', default=0)
+            downstream_neighbor_groups=dict(required=False, type='int', default=0),
+            route_cache_dir=dict(required=False, type='str', default=None)
         ),
         supports_check_mode=False)
 
@@ -1801,6 +1948,7 @@ def main():
     peers_routes_to_change = module.params['peers_routes_to_change']
     upstream_neighbor_groups = module.params['upstream_neighbor_groups']
     downstream_neighbor_groups = module.params['downstream_neighbor_groups']
+    route_cache_dir = module.params['route_cache_dir']
 
     topo = read_topo(topo_name, path)
     if not topo:
@@ -1817,55 +1965,42 @@ def main():
             if vm_name not in topo['topology']['VMs']:
                 topo['configuration'].pop(vm_name)
 
-    is_storage_backend = "backend" in topo_name
-    tor_default_route = topo_name in ["t1-isolated-d128", "t1-isolated-d32"]
-
     topo_type = get_topo_type(topo_name)
-    topo_routes = {}
     try:
         if adhoc:
             adhoc_routes(topo, ptf_ip, peers_routes_to_change, action)
-            module.exit_json(change=True)
-        elif topo_type == "t0":
-            fib_t0(topo, ptf_ip, no_default_route=is_storage_backend, action=action,
-                   upstream_neighbor_groups=upstream_neighbor_groups, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "t1" or topo_type == "smartswitch-t1":
-            fib_t1_lag(
-                topo, ptf_ip, topo_name, no_default_route=is_storage_backend, action=action,
-                tor_default_route=tor_default_route, downstream_neighbor_groups=downstream_neighbor_groups,
-                topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "t2":
-            fib_t2_lag(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "t0-mclag":
-            fib_t0_mclag(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "m1":
-            fib_m1(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "m0":
-            fib_m0(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "mx":
-            fib_mx(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "c0":
-            fib_c0(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(changed=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "dpu":
-            fib_dpu(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(change=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "lt2":
-            fib_lt2_routes(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(change=True, topo_routes=convert_routes_to_str(topo_routes))
-        elif topo_type == "ft2":
-            fib_ft2_routes(topo, ptf_ip, action=action, topo_routes=topo_routes)
-            module.exit_json(change=True, topo_routes=convert_routes_to_str(topo_routes))
-        else:
+            module.exit_json(change=True, announce_stats=get_announce_stats())
+        elif topo_type not in FIB_GENERATORS:
             module.exit_json(
                 msg='Unsupported topology "{}" - skipping announcing routes'.format(topo_name))
+
+        fib_params = dict(upstream_neighbor_groups=upstream_neighbor_groups,
+                          downstream_neighbor_groups=downstream_neighbor_groups)
+        if route_cache_dir:
+            topo_file = os.path.join(path, TOPO_FILE_FOLDER, TOPO_FILENAME_TEMPLATE.format(topo_name))
+            key = route_set_key(topo_file, code_fingerprint(globals()), topo_name=topo_name,
+                                dut_interfaces=dut_interfaces, **fib_params)
+            artifact = RouteSetArtifact.load(route_cache_dir, key)
+            cache_hit = artifact is not None
+            if not cache_hit:
+                artifact = compile_route_set(key, topo, topo_name, topo_type, ptf_ip, **fib_params)
+                try:
+                    artifact.save(route_cache_dir)
+                except (IOError, OSError) as e:
+                    logging.warning("Failed to save route set {} to {}: {}".format(key, route_cache_dir, repr(e)))
+            logging.info("Route set {} of {} {}".format(
+                key, topo_name, "loaded from cache" if cache_hit else "compiled"))
+
+            if action != GENERATE_WITHOUT_APPLY:
+                send_routes_in_parallel([(routes, port, action, ptf_ip)
+                                         for port, routes in artifact.iter_route_sets()])
+            topo_routes = artifact.get_topo_routes()
+        else:
+            topo_routes = {}
+            generate_topo_routes(topo, topo_name, topo_type, ptf_ip, action, topo_routes, **fib_params)
+            topo_routes = convert_routes_to_str(topo_routes)
+
+        module.exit_json(changed=True, topo_routes=topo_routes, announce_stats=get_announce_stats())
     except Exception as e:
         module.fail_json(msg='Announcing routes failed, topo_name={}, topo_type={}, exception={}'
                          .format(topo_name, topo_type, repr(e)))
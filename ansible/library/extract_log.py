@@ -3,6 +3,8 @@
 from ansible.module_utils.basic import AnsibleModule
 from functools import cmp_to_key
 import datetime
+import json
+import shutil
 import traceback
 import logging.handlers
 import logging
@@ -20,6 +22,9 @@ description: The module scans the 'directory' in search of files which filenames
 The found files are ungzipped and combined together in the rotation order. After that all lines after
 'start_string' are copied into a file with name 'target_filename'. All input strings with 'nsible' in it
 aren't considered as 'start_string' to avoid clashing with ansible output.
+When LogAnalyzer placed 'start_string' as its start marker, it recorded the byte offset and inode of the log file
+beforehand. In this case the module seeks directly to the marker and copies only the newer bytes. The rotated
+files are scanned only when the recorded position can't be used.
 
 Options:
     - option-name: directory
@@ -42,6 +47,11 @@ Options:
       required: True
       Default: None
 
+    - option-name: use_marker_index
+      description: use the log position recorded by LogAnalyzer when placing 'start_string' if it is available
+      required: False
+      Default: True
+
 '''
 
 EXAMPLES = '''
@@ -88,6 +98,9 @@ EXAMPLES = '''
 
 logger = logging.getLogger('ExtractLog')
 
+# Keep in sync with marker_index_dir in ansible/roles/test/files/tools/loganalyzer/loganalyzer.py
+MARKER_INDEX_DIR = '/tmp/loganalyzer_markers'
+
 
 def extract_lines(directory, filename, target_string):
     path = os.path.join(directory, filename)
@@ -285,11 +298,99 @@ def combine_logs_and_save(directory, filenames, start_string, target_string, tar
                 path, line_processed, line_copied))
 
 
-def extract_log(directory, prefixname, target_string, target_filename):
+def marker_index_file(marker):
+    """Path of the file recording the log positions of a marker.
+    Keep in sync with AnsibleLogAnalyzer.marker_index_file()"""
+    return os.path.join(MARKER_INDEX_DIR, re.sub(r'[^\w.-]', '_', marker) + '.json')
+
+
+def load_marker_position(log_file, start_string):
+    """Returns (inode, offset) of @log_file recorded before @start_string was placed, None if not recorded"""
+    try:
+        with open(marker_index_file(start_string)) as fp:
+            index = json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if index.get('marker') != start_string:
+        return None
+    position = index.get('files', {}).get(log_file)
+    if not position:
+        return None
+    return position['inode'], position['offset']
+
+
+def find_file_by_inode(directory, filenames, inode):
+    """Returns the uncompressed file in @filenames with inode @inode, None if not found.
+    logrotate renames the current file, so the recorded inode follows the file after rotation"""
+    for filename in filenames:
+        path = os.path.join(directory, filename)
+        if 'gz' in path:
+            continue
+        try:
+            if os.stat(path).st_ino == inode:
+                return filename
+        except OSError:
+            continue
+    return None
+
+
+def copy_from_offset(directory, filenames, filename, offset, target_string, target_filename):
+    """Copies the log starting from the line with @target_string found after @offset in @filename,
+    followed by all the files newer than @filename. Returns False if the line was not found"""
+    path = os.path.join(directory, filename)
+    target = target_string.encode('utf-8')
+    line_copied = 0
+    with open(path, 'rb') as src:
+        if offset > os.fstat(src.fileno()).st_size:
+            return False
+        src.seek(offset)
+        while True:
+            line = src.readline()
+            if not line:
+                logger.debug("extract_log start string not found after offset {} in {}".format(offset, path))
+                return False
+            if target in line and b'extract_log' not in line:
+                break
+
+        with open(target_filename, 'wb') as fp:
+            fp.write(line)
+            shutil.copyfileobj(src, fp)
+            line_copied = fp.tell()
+            for newer in reversed(filenames[:filenames.index(filename)]):
+                newer_path = os.path.join(directory, newer)
+                with (gzip.open(newer_path, 'rb') if 'gz' in newer_path else open(newer_path, 'rb')) as f:
+                    shutil.copyfileobj(f, fp)
+            logger.debug("extract_log copied {} bytes from {} offset {}, then {} bytes from newer files".format(
+                line_copied, path, offset, fp.tell() - line_copied))
+    return True
+
+
+def extract_log_from_marker_index(directory, filenames, prefixname, target_string, target_filename):
+    """Extracts the log using the position recorded by LogAnalyzer when it placed @target_string.
+    Returns False if no usable position was recorded, the caller should scan the files then"""
+    position = load_marker_position(os.path.join(directory, prefixname), target_string)
+    if position is None:
+        return False
+
+    inode, offset = position
+    filename = find_file_by_inode(directory, filenames, inode)
+    if filename is None:
+        logger.debug("extract_log file with inode {} not found, fall back to scan".format(inode))
+        return False
+
+    logger.debug("extract_log seek to offset {} of {}".format(offset, filename))
+    return copy_from_offset(directory, filenames, filename, offset, target_string, target_filename)
+
+
+def extract_log(directory, prefixname, target_string, target_filename, use_marker_index=True):
     logger.debug("extract_log for start string {}".format(
         target_string.replace("start-", "")))
     filenames = list_files(directory, prefixname)
     logger.debug("extract_log from files {}".format(filenames))
+    if use_marker_index and extract_log_from_marker_index(directory, filenames, prefixname, target_string,
+                                                          target_filename):
+        return
     file_with_latest_line, file_create_time, latest_line, file_size = extract_latest_line_with_string(
         directory, filenames, target_string)
     m = hashlib.md5()
@@ -311,6 +412,7 @@ def main():
             file_prefix=dict(required=True, type='str'),
             start_string=dict(required=True, type='str'),
             target_filename=dict(required=True, type='str'),
+            use_marker_index=dict(required=False, type='bool', default=True),
         ),
         supports_check_mode=False)
 
@@ -322,7 +424,7 @@ def main():
 
     try:
         extract_log(p['directory'], p['file_prefix'],
-                    p['start_string'], p['target_filename'])
+                    p['start_string'], p['target_filename'], p['use_marker_index'])
     except Exception:
         tb = traceback.format_exc()
         module.fail_json(msg=tb)
@@ -0,0 +1,287 @@
+import array
+import base64
+import hashlib
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+import time
+import types
+
+# Bump the version when the format of the artifact changes
+ROUTE_SET_VERSION = 2
+
+# Artifacts not used for longer are removed from the cache folder
+ROUTE_CACHE_MAX_AGE = 7 * 24 * 3600
+# When the artifacts take more space, the least recently used are removed
+ROUTE_CACHE_MAX_SIZE = 1 << 30
+
+_ENCODED_BYTES_FIELDS = ('families', 'prefixlens', 'addresses', 'nexthops', 'aspaths')
+
+FAMILY_RAW = 0
+FAMILY_V4 = 4
+FAMILY_V6 = 6
+
+
+def _update_code_fingerprint(m, code):
+    m.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _update_code_fingerprint(m, const)
+        elif isinstance(const, frozenset):
+            m.update(repr(sorted(const, key=repr)).encode('utf-8'))
+        else:
+            m.update(repr(const).encode('utf-8'))
+
+
+def code_fingerprint(namespace):
+    """Fingerprint of the functions and upper case constants in a module namespace.
+
+    Only the byte code and constants are used, not the file name, so the fingerprint is the same wherever the module
+    is executed from, and it changes when the route generation code changes.
+    """
+    m = hashlib.sha256()
+    for name in sorted(namespace):
+        obj = namespace[name]
+        if isinstance(obj, types.FunctionType):
+            m.update(name.encode('utf-8'))
+            _update_code_fingerprint(m, obj.__code__)
+        elif name.isupper() and isinstance(obj, (str, int, float, list, tuple)):
+            m.update(name.encode('utf-8'))
+            m.update(repr(obj).encode('utf-8'))
+    return m.hexdigest()
+
+
+def route_set_key(topo_file, fingerprint, **params):
+    """Key of the route set artifact, changes when the topo file, the generation code or the parameters change."""
+    m = hashlib.sha256()
+    m.update('{}:{}:{}'.format(ROUTE_SET_VERSION, sys.version_info[:2], fingerprint).encode('utf-8'))
+    with open(topo_file, 'rb') as f:
+        m.update(f.read())
+    m.update(repr(sorted(params.items())).encode('utf-8'))
+    return m.hexdigest()
+
+
+def _pack_prefix(prefix):
+    """Returns (family, prefix length, packed address), family is FAMILY_RAW if the prefix can't be packed exactly."""
+    address, _, prefixlen = prefix.partition('/')
+    try:
+        prefixlen = int(prefixlen)
+        if ':' in address:
+            family, packed = FAMILY_V6, socket.inet_pton(socket.AF_INET6, address)
+        else:
+            family, packed = FAMILY_V4, socket.inet_pton(socket.AF_INET, address)
+    except (ValueError, socket.error, OSError):
+        return FAMILY_RAW, 0, b''
+    if _unpack_prefix(family, prefixlen, packed) != prefix:
+        return FAMILY_RAW, 0, b''
+    return family, prefixlen, packed
+
+
+def private_cache_dir(cache_dir):
+    """Create cache_dir readable and writable only by the current user, or check that it already is.
+
+    Raises:
+        OSError: cache_dir is a symlink, is not a folder, is not owned by the current user or can be written or read
+            by other users.
+    """
+    if not os.path.lexists(cache_dir):
+        os.makedirs(cache_dir, 0o700)
+    st = os.lstat(cache_dir)
+    if not stat.S_ISDIR(st.st_mode):
+        raise OSError('Route cache {} is not a folder'.format(cache_dir))
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise OSError('Route cache {} is not a private folder of the current user'.format(cache_dir))
+    return cache_dir
+
+
+def prune_cache(cache_dir, max_age=ROUTE_CACHE_MAX_AGE, max_size=ROUTE_CACHE_MAX_SIZE):
+    """Remove the artifacts not used for max_age seconds, then the least recently used ones above max_size bytes."""
+    now = time.time()
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(('.routes', '.tmp')):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.lstat(path)
+        except OSError:
+            continue
+        if now - st.st_mtime > max_age:
+            os.remove(path)
+        elif name.endswith('.routes'):
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        os.remove(path)
+        total -= size
+
+
+def _encoded_to_json(encoded):
+    data = dict((field, base64.b64encode(encoded[field]).decode('ascii')) for field in _ENCODED_BYTES_FIELDS)
+    data['raw'] = [[i, prefix] for i, prefix in sorted(encoded['raw'].items())]
+    return data
+
+
+def _encoded_from_json(data):
+    encoded = dict((field, base64.b64decode(data[field])) for field in _ENCODED_BYTES_FIELDS)
+    encoded['raw'] = dict((i, prefix) for i, prefix in data['raw'])
+    return encoded
+
+
+def _unpack_prefix(family, prefixlen, packed):
+    if family == FAMILY_V4:
+        return '{}/{}'.format(socket.inet_ntop(socket.AF_INET, packed), prefixlen)
+    return '{}/{}'.format(socket.inet_ntop(socket.AF_INET6, packed), prefixlen)
+
+
+class RouteSetArtifact(object):
+    """Compact on disk representation of the routes generated for a topology.
+
+    Prefixes are stored as packed addresses plus prefix lengths. Next hops and AS paths are interned into shared
+    tables and every route refers to them by index. Prefixes which can't be restored exactly from the packed form
+    are kept as strings.
+
+    The artifact holds:
+        route_sets: list of (port, routes) which are sent to the ExaBGP processes
+        topo_routes: {vm: {ip_version: routes}} returned by the announce_routes module
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.nexthops = [None]
+        self.aspaths = [None]
+        self._nexthop_index = {None: 0}
+        self._aspath_index = {None: 0}
+        self.route_sets = []
+        self.topo_routes = {}
+
+    @staticmethod
+    def _intern(value, table, index):
+        value = str(value) if value else None
+        if value not in index:
+            index[value] = len(table)
+            table.append(value)
+        return index[value]
+
+    def encode(self, routes):
+        families = array.array('B')
+        prefixlens = array.array('B')
+        addresses = []
+        nexthops = array.array('I')
+        aspaths = array.array('I')
+        raw = {}
+        for i, (prefix, nexthop, aspath) in enumerate(routes):
+            family, prefixlen, packed = _pack_prefix(str(prefix))
+            if family == FAMILY_RAW:
+                raw[i] = str(prefix) if prefix else None
+            families.append(family)
+            prefixlens.append(prefixlen)
+            addresses.append(packed)
+            nexthops.append(self._intern(nexthop, self.nexthops, self._nexthop_index))
+            aspaths.append(self._intern(aspath, self.aspaths, self._aspath_index))
+        return {
+            'families': families.tobytes(),
+            'prefixlens': prefixlens.tobytes(),
+            'addresses': b''.join(addresses),
+            'nexthops': nexthops.tobytes(),
+            'aspaths': aspaths.tobytes(),
+            'raw': raw
+        }
+
+    def decode(self, encoded):
+        """Generator of the (prefix, nexthop, aspath) routes of an encoded route list."""
+        families = array.array('B')
+        families.frombytes(encoded['families'])
+        prefixlens = array.array('B')
+        prefixlens.frombytes(encoded['prefixlens'])
+        nexthops = array.array('I')
+        nexthops.frombytes(encoded['nexthops'])
+        aspaths = array.array('I')
+        aspaths.frombytes(encoded['aspaths'])
+        addresses = encoded['addresses']
+        raw = encoded['raw']
+
+        offset = 0
+        for i, family in enumerate(families):
+            if family == FAMILY_RAW:
+                prefix = raw[i]
+            else:
+                size = 4 if family == FAMILY_V4 else 16
+                prefix = _unpack_prefix(family, prefixlens[i], addresses[offset:offset + size])
+                offset += size
+            yield prefix, self.nexthops[nexthops[i]], self.aspaths[aspaths[i]]
+
+    def add_route_set(self, port, routes):
+        self.route_sets.append((port, self.encode(routes)))
+
+    def iter_route_sets(self):
+        """Generator of (port, routes generator)."""
+        for port, encoded in self.route_sets:
+            yield port, self.decode(encoded)
+
+    def set_topo_routes(self, topo_routes):
+        self.topo_routes = dict(
+            (vm, dict((ip_version, self.encode(routes)) for ip_version, routes in vm_routes.items()))
+            for vm, vm_routes in topo_routes.items())
+
+    def get_topo_routes(self):
+        return dict(
+            (vm, dict((ip_version, list(self.decode(encoded))) for ip_version, encoded in vm_routes.items()))
+            for vm, vm_routes in self.topo_routes.items())
+
+    def save(self, cache_dir):
+        """Atomically write the artifact as JSON into the private folder cache_dir, named by its key.
+
+        The artifacts not used for a while are pruned from cache_dir.
+        """
+        private_cache_dir(cache_dir)
+        data = {
+            'version': ROUTE_SET_VERSION,
+            'key': self.key,
+            'nexthops': self.nexthops,
+            'aspaths': self.aspaths,
+            'route_sets': [[port, _encoded_to_json(encoded)] for port, encoded in self.route_sets],
+            'topo_routes': dict(
+                (vm, dict((ip_version, _encoded_to_json(encoded)) for ip_version, encoded in vm_routes.items()))
+                for vm, vm_routes in self.topo_routes.items())
+        }
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.rename(tmp_file, os.path.join(cache_dir, '{}.routes'.format(self.key)))
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        prune_cache(cache_dir)
+
+    @classmethod
+    def load(cls, cache_dir, key):
+        """Load the artifact with the key from cache_dir, returns None if it doesn't exist or can't be used."""
+        try:
+            private_cache_dir(cache_dir)
+            path = os.path.join(cache_dir, '{}.routes'.format(key))
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != ROUTE_SET_VERSION or data.get('key') != key:
+                return None
+            artifact = cls(key)
+            artifact.nexthops = data['nexthops']
+            artifact.aspaths = data['aspaths']
+            artifact.route_sets = [(port, _encoded_from_json(encoded)) for port, encoded in data['route_sets']]
+            artifact.topo_routes = dict(
+                (vm, dict((ip_version, _encoded_from_json(encoded)) for ip_version, encoded in vm_routes.items()))
+                for vm, vm_routes in data['topo_routes'].items())
+            # The modification time tells how recently the artifact was used, for prune_cache()
+            os.utime(path, None)
+        except Exception:
+            return None
+
+        artifact._nexthop_index = dict((v, i) for i, v in enumerate(artifact.nexthops))
+        artifact._aspath_index = dict((v, i) for i, v in enumerate(artifact.aspaths))
+        return artifact
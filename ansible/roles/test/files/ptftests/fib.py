@@ -1,8 +1,8 @@
 import re
 import six
 
-from ipaddress import ip_address, ip_network
-from lpm import LpmDict
+from ipaddress import ip_address
+from lpm import LpmTable, parse_prefix
 
 # These subnets are excluded from FIB test
 # reference: RFC 5735 Special Use IPv4 Addresses
@@ -46,28 +46,30 @@ class Fib():
 
     # Initialize FIB with FIB file
     def __init__(self, file_path):
-        self._ipv4_lpm_dict = LpmDict()
+        self._ipv4_lpm_dict = LpmTable()
         for ip in EXCLUDE_IPV4_PREFIXES:
             self._ipv4_lpm_dict[ip] = self.NextHop()
 
-        self._ipv6_lpm_dict = LpmDict(ipv4=False)
+        self._ipv6_lpm_dict = LpmTable(ipv4=False)
         for ip in EXCLUDE_IPV6_PREFIXES:
             self._ipv6_lpm_dict[ip] = self.NextHop()
 
-        # filter out empty lines and lines starting with '#'
-        pattern = re.compile("^#.*$|^[ \t]*$")
-
+        # Routes of a FIB share a few next hop groups, parse each group once
+        next_hops = {}
         with open(file_path, 'r') as f:
-            for line in f.readlines():
-                if pattern.match(line):
+            for line in f:
+                # filter out empty lines and lines starting with '#'
+                if line.startswith('#') or not line.rstrip('\n').strip(' \t'):
                     continue
                 entry = line.split(' ', 1)
-                prefix = ip_network(six.text_type(entry[0]))
-                next_hop = self.NextHop(entry[1])
-                if prefix.version == 4:
-                    self._ipv4_lpm_dict[str(prefix)] = next_hop
-                elif prefix.version == 6:
-                    self._ipv6_lpm_dict[str(prefix)] = next_hop
+                version, network, prefixlen = parse_prefix(entry[0])
+                next_hop = next_hops.get(entry[1])
+                if next_hop is None:
+                    next_hop = next_hops[entry[1]] = self.NextHop(entry[1])
+                if version == 4:
+                    self._ipv4_lpm_dict.add(network, prefixlen, next_hop)
+                elif version == 6:
+                    self._ipv6_lpm_dict.add(network, prefixlen, next_hop)
 
     def __getitem__(self, ip):
         ip = ip_address(six.text_type(ip))
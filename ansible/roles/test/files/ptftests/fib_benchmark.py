@@ -0,0 +1,155 @@
+'''
+Description:    Benchmark of loading a FIB file and segmenting the IP space.
+
+                Loads a FIB file with the legacy loader, which inserts every prefix into a
+                LpmDict, and with Fib, which bulk loads the prefixes into LpmTables. Verifies
+                both give the same ranges and the same next hops and prints the time spent by
+                each of them. Without --fib_file, a FIB file with --prefixes random prefixes is
+                generated first.
+
+Usage:          python fib_benchmark.py [--fib_file /tmp/fib_info.txt] [--prefixes 1000000] \
+                    [--lookups 10000] [--seed 0]
+'''
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import six
+from ipaddress import ip_network, IPv6Address
+
+import fib
+from lpm import LpmDict
+
+
+def generate_fib_file(path, prefixes, seed):
+    '''
+    @summary: Generate a FIB file of IPv4 and IPv6 prefixes, nested in each other, with the next hop groups
+              of a T1 topology.
+    '''
+    rng = random.Random(seed)
+    groups = ['[{}]'.format(' '.join(str(port) for port in range(start, start + width)))
+              for start, width in ((0, 1), (4, 2), (8, 4), (16, 4), (24, 8))]
+    groups += [' '.join(rng.sample(groups, 2)) for _ in range(8)]
+    with open(path, 'w') as f:
+        f.write('# generated by fib_benchmark.py\n')
+        f.write('0.0.0.0/0 {}\n'.format(groups[-1]))
+        f.write('::/0 {}\n'.format(groups[-1]))
+        for index in range(prefixes):
+            if index % 4:
+                prefixlen = rng.choice((16, 20, 24, 24, 24, 28, 32))
+                network = (rng.randint(11, 223) << 24 | rng.getrandbits(24)) >> (32 - prefixlen) << (32 - prefixlen)
+                prefix = '{}/{}'.format('.'.join(str(network >> shift & 0xff) for shift in (24, 16, 8, 0)),
+                                        prefixlen)
+            else:
+                prefixlen = rng.choice((48, 56, 64, 64, 128))
+                network = (0x2001 << 112 | rng.getrandbits(80) << 32) >> (128 - prefixlen) << (128 - prefixlen)
+                prefix = '{}/{}'.format(IPv6Address(network), prefixlen)
+            f.write('{} {}\n'.format(prefix, rng.choice(groups)))
+
+
+def load_legacy(path):
+    '''
+    @summary: Load a FIB file the way Fib loaded it before LpmTable.
+    @return: the LpmDicts of IPv4 and IPv6
+    '''
+    ipv4_lpm_dict = LpmDict()
+    for ip in fib.EXCLUDE_IPV4_PREFIXES:
+        ipv4_lpm_dict[ip] = fib.Fib.NextHop()
+    ipv6_lpm_dict = LpmDict(ipv4=False)
+    for ip in fib.EXCLUDE_IPV6_PREFIXES:
+        ipv6_lpm_dict[ip] = fib.Fib.NextHop()
+
+    pattern = re.compile("^#.*$|^[ \t]*$")
+    with open(path, 'r') as f:
+        for line in f.readlines():
+            if pattern.match(line):
+                continue
+            entry = line.split(' ', 1)
+            prefix = ip_network(six.text_type(entry[0]))
+            next_hop = fib.Fib.NextHop(entry[1])
+            if prefix.version == 4:
+                ipv4_lpm_dict[str(prefix)] = next_hop
+            elif prefix.version == 6:
+                ipv6_lpm_dict[str(prefix)] = next_hop
+    return ipv4_lpm_dict, ipv6_lpm_dict
+
+
+def measure(func, *args):
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+
+def compare(legacy_lpm_dict, lpm_table, lookups, rng):
+    '''
+    @summary: Compare the ranges and the next hops of random IPs of a LpmDict and a LpmTable.
+    @return: list of differences, time spent by ranges() of the LpmDict and of the LpmTable
+    '''
+    errors = []
+    legacy_time, legacy_ranges = measure(legacy_lpm_dict.ranges)
+    table_time, table_ranges = measure(lpm_table.ranges)
+    print("    ranges: %d, legacy %.3fs, LpmTable %.3fs" % (len(legacy_ranges), legacy_time, table_time))
+    if len(legacy_ranges) != len(table_ranges):
+        return ["%d ranges instead of %d" % (len(table_ranges), len(legacy_ranges))], legacy_time, table_time
+
+    for index in range(len(legacy_ranges)):
+        if str(legacy_ranges[index]) != str(table_ranges[index]):
+            errors.append("range %s instead of %s" % (table_ranges[index], legacy_ranges[index]))
+            break
+
+    for index in rng.sample(range(len(legacy_ranges)), min(lookups, len(legacy_ranges))):
+        for ip in (legacy_ranges[index].get_first_ip(), legacy_ranges[index].get_last_ip()):
+            legacy = str(legacy_lpm_dict[ip]) if legacy_lpm_dict.contains(ip) else None
+            table = str(lpm_table[ip]) if lpm_table.contains(ip) else None
+            if legacy != table:
+                errors.append("next hop of %s is %s instead of %s" % (ip, table, legacy))
+    return errors, legacy_time, table_time
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark loading a FIB file")
+    parser.add_argument("--fib_file", help="FIB file to load, a generated one if not specified")
+    parser.add_argument("--prefixes", type=int, default=1000000, help="Number of prefixes of the generated FIB")
+    parser.add_argument("--lookups", type=int, default=10000, help="Number of ranges to compare the next hops of")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fib_file = args.fib_file
+    if not fib_file:
+        fd, fib_file = tempfile.mkstemp(prefix='fib_benchmark_', suffix='.txt')
+        os.close(fd)
+        generate_fib_file(fib_file, args.prefixes, args.seed)
+    try:
+        legacy_time, (legacy_ipv4, legacy_ipv6) = measure(load_legacy, fib_file)
+        fib_time, dut_fib = measure(fib.Fib, fib_file)
+        print("load: legacy LpmDict %.3fs, Fib LpmTable %.3fs" % (legacy_time, fib_time))
+
+        rng = random.Random(args.seed)
+        errors = []
+        for name, legacy_lpm_dict, lpm_table in (('IPv4', legacy_ipv4, dut_fib._ipv4_lpm_dict),
+                                                 ('IPv6', legacy_ipv6, dut_fib._ipv6_lpm_dict)):
+            print("%s:" % name)
+            version_errors, legacy_ranges_time, table_ranges_time = compare(
+                legacy_lpm_dict, lpm_table, args.lookups, rng)
+            errors.extend(version_errors)
+            legacy_time += legacy_ranges_time
+            fib_time += table_ranges_time
+        print("load and ranges: legacy LpmDict %.3fs, Fib LpmTable %.3fs" % (legacy_time, fib_time))
+        if fib_time:
+            print("speedup: %.1fx" % (legacy_time / fib_time))
+    finally:
+        if not args.fib_file:
+            os.remove(fib_file)
+
+    for error in errors[:20]:
+        print("ERROR: %s" % error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -24,6 +24,7 @@ import random
 import time
 import json
 import itertools
+import functools
 import fib
 
 import ptf
@@ -41,6 +42,13 @@ from ptf.testutils import verify_no_packet_any
 from collections.abc import Iterable
 from collections import defaultdict
 
+from pipelined_traffic import DEFAULT_PIPELINE_WINDOW
+from pipelined_traffic import PipelinedTraffic
+from pipelined_traffic import Probe
+from pipelined_traffic import format_failures
+from pipelined_traffic import summarize_results
+from pipelined_traffic import tag_probe
+
 
 class FibTest(BaseTest):
     '''
@@ -116,6 +124,8 @@ class FibTest(BaseTest):
          - dst_vid                vlan tag id of dst pkts. Default: None(untag)
          - ignore_ttl:            mask the ttl field in the expected packet
          - single_fib_for_duts:   have a single fib file for all DUTs in multi-dut case. Default: False
+         - pipeline_window:       max number of packets in flight when verifying the routes, 1 to send a packet
+                                  after the previous packet is received. Default: 32
         '''
         self.dataplane = ptf.dataplane_instance
         self.asic_type = self.test_params.get('asic_type')
@@ -180,6 +190,12 @@ class FibTest(BaseTest):
             'single_fib_for_duts', "multiple-fib")
         self.topo_type = self.test_params.get('topo_type', None)
 
+        self.pipeline_window = self.test_params.get('pipeline_window', DEFAULT_PIPELINE_WINDOW)
+        self.traffic = PipelinedTraffic(self, window=self.pipeline_window, timeout=self.PTF_TIMEOUT, retry_count=5)
+
+    def use_pipeline(self):
+        return self.pipeline_window > 1 and self.pkt_action == self.ACTION_FWD
+
     def check_ip_ranges(self, ipv4=True):
         for dut_index, dut_fib in enumerate(self.fibs):
             if ipv4:
@@ -194,9 +210,14 @@ class FibTest(BaseTest):
             else:
                 covered_ip_ranges = ip_ranges[:]
 
-            for ip_range in covered_ip_ranges:
-                if ip_range.get_first_ip() in dut_fib:
-                    self.check_ip_range(ip_range, dut_index, ipv4)
+            if self.use_pipeline():
+                self.check_ip_ranges_pipelined(
+                    [ip_range for ip_range in covered_ip_ranges if ip_range.get_first_ip() in dut_fib],
+                    dut_index, ipv4)
+            else:
+                for ip_range in covered_ip_ranges:
+                    if ip_range.get_first_ip() in dut_fib:
+                        self.check_ip_range(ip_range, dut_index, ipv4)
 
             random.shuffle(covered_ip_ranges)
             self.check_balancing(covered_ip_ranges, dut_index, ipv4)
@@ -239,14 +260,18 @@ class FibTest(BaseTest):
                 break
         return src_port, exp_port_lists, next_hops
 
-    def check_ip_range(self, ip_range, dut_index, ipv4=True):
-
+    def get_ip_range_dst_ips(self, ip_range):
         dst_ips = []
         dst_ips.append(ip_range.get_first_ip())
         if ip_range.length() > 1:
             dst_ips.append(ip_range.get_last_ip())
         if ip_range.length() > 2:
             dst_ips.append(ip_range.get_random_ip())
+        return dst_ips
+
+    def check_ip_range(self, ip_range, dut_index, ipv4=True):
+
+        dst_ips = self.get_ip_range_dst_ips(ip_range)
 
         for dst_ip in dst_ips:
             src_port, exp_port_lists, _ = self.get_src_and_exp_ports(dst_ip)
@@ -265,6 +290,29 @@ class FibTest(BaseTest):
                          .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
             self.check_ip_route(src_port, dst_ip, exp_port_lists, ipv4)
 
+    def generate_ip_range_probes(self, ip_ranges, dut_index, ipv4=True):
+        for ip_range in ip_ranges:
+            for dst_ip in self.get_ip_range_dst_ips(ip_range):
+                src_port, exp_port_lists, _ = self.get_src_and_exp_ports(dst_ip)
+                # skip checking this IP range if any sub-list is empty, see check_ip_range
+                if not all(exp_port_lists):
+                    logging.info('Skip checking ip range {} with exp_ports {}'.format(
+                        ip_range, exp_port_lists))
+                    break
+                logging.info('Checking ip range {}, src_port={}, exp_port_lists={}, dst_ip={}, dut_index={}'
+                             .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
+                yield self.create_probe(src_port, dst_ip, exp_port_lists, ipv4, context=str(ip_range))
+
+    def check_ip_ranges_pipelined(self, ip_ranges, dut_index, ipv4=True):
+        '''
+        @summary: Check the IP ranges like check_ip_range, with up to pipeline_window packets in flight
+        '''
+        results = self.traffic.run(self.generate_ip_range_probes(ip_ranges, dut_index, ipv4))
+        hit_counts, failures = summarize_results(results)
+        for ip_range, hit_count in hit_counts.items():
+            logging.info('Checked ip range {}, hit count {}'.format(ip_range, dict(hit_count)))
+        assert not failures, format_failures(failures)
+
     def check_balancing(self, ip_ranges, dut_index, ipv4=True):
         # Test traffic balancing across ECMP/LAG members
         if self.test_balancing and self.pkt_action == self.ACTION_FWD:
@@ -297,11 +345,20 @@ class FibTest(BaseTest):
                 # Change balancing_test_times according to number of next hop groups
                 logging.info('Checking ip range balancing {}, src_port={}, exp_ports={}, dst_ip={}, dut_index={}'
                              .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
-                for i in range(0, self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))):
-                    (matched_port, _) = self.check_ip_route(
-                        src_port, dst_ip, exp_port_lists, ipv4)
-                    hit_count_map[matched_port] = hit_count_map.get(
-                        matched_port, 0) + 1
+                test_times = self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))
+                if self.use_pipeline():
+                    results = self.traffic.run(self.create_probe(src_port, dst_ip, exp_port_lists, ipv4,
+                                                                 context=str(ip_range))
+                                               for _ in range(test_times))
+                    hit_counts, failures = summarize_results(results)
+                    assert not failures, format_failures(failures)
+                    hit_count_map = dict(hit_counts.get(str(ip_range), {}))
+                else:
+                    for i in range(0, test_times):
+                        (matched_port, _) = self.check_ip_route(
+                            src_port, dst_ip, exp_port_lists, ipv4)
+                        hit_count_map[matched_port] = hit_count_map.get(
+                            matched_port, 0) + 1
                 for next_hop in next_hops:
                     # only check balance on a DUT
                     self.check_hit_count_map(
@@ -328,12 +385,48 @@ class FibTest(BaseTest):
 
         return (matched_port, received)
 
-    def check_ipv4_route(self, src_port, dst_ip_addr, dst_port_lists):
+    def create_probe(self, src_port, dst_ip_addr, dst_port_lists, ipv4=True, context=None):
         '''
-        @summary: Check IPv4 route works.
-        @param src_port: index of port to use for sending packet to switch
-        @param dest_ip_addr: destination IP to build packet with.
-        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        @summary: Create a probe of the pipelined traffic for the route of dst_ip_addr
+        '''
+        probe_id = self.traffic.next_probe_id()
+        if ipv4:
+            pkt, masked_exp_pkt = self.create_ipv4_pkts(src_port, dst_ip_addr, probe_id)
+            ip_src = pkt['IP'].src
+        else:
+            pkt, masked_exp_pkt = self.create_ipv6_pkts(src_port, dst_ip_addr, probe_id)
+            ip_src = pkt['IPv6'].src
+        validate = functools.partial(self.check_rcvd_src_mac, ip_src, dst_ip_addr, src_port, dst_port_lists)
+        return Probe(probe_id, src_port, pkt, masked_exp_pkt, list(itertools.chain(*dst_port_lists)),
+                     context=context, validate=validate)
+
+    def check_rcvd_src_mac(self, ip_src, ip_dst, src_port, dst_port_lists, rcvd_port, rcvd_pkt):
+        '''
+        @summary: Check the src mac of the received packet is the mac of the DUT it is received from
+        @return: error message if the src mac doesn't match, else None
+        '''
+        exp_src_mac = None
+        if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
+            # active-active dualtor, the packet could be received from either ToR, so use the received
+            # port to find the corresponding ToR
+            for dut_index, port_list in enumerate(dst_port_lists):
+                if rcvd_port in port_list:
+                    exp_src_mac = self.ptf_test_port_map[str(
+                        rcvd_port)]["target_src_mac"][dut_index]
+        else:
+            exp_src_mac = self.ptf_test_port_map[str(
+                rcvd_port)]["target_src_mac"][0]
+        actual_src_mac = scapy.Ether(rcvd_pkt).src
+        if str(exp_src_mac).lower() != str(actual_src_mac).lower():
+            return ("Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
+                    "but the src mac doesn't match, expected {}, got {}".
+                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
+        return None
+
+    def create_ipv4_pkts(self, src_port, dst_ip_addr, probe_id=None):
+        '''
+        @summary: Create the IPv4 packet to send and the masked expected packet
+        @param probe_id: probe ID of the pipelined traffic to tag the packets with
         '''
         sport = random.randint(0, 65535)
         dport = random.randint(0, 65535)
@@ -365,6 +458,8 @@ class FibTest(BaseTest):
             ip_options=self.ip_options,
             dl_vlan_enable=self.dst_vid is not None,
             vlan_vid=self.dst_vid or 0)
+        if probe_id is not None:
+            tag_probe(probe_id, pkt, exp_pkt)
         masked_exp_pkt = Mask(exp_pkt)
         masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "dst")
         masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "src")
@@ -374,6 +469,20 @@ class FibTest(BaseTest):
             masked_exp_pkt.set_do_not_care_scapy(scapy.IP, "ttl")
             masked_exp_pkt.set_do_not_care_scapy(scapy.IP, "chksum")
             masked_exp_pkt.set_do_not_care_scapy(scapy.TCP, "chksum")
+        return pkt, masked_exp_pkt
+
+    def check_ipv4_route(self, src_port, dst_ip_addr, dst_port_lists):
+        '''
+        @summary: Check IPv4 route works.
+        @param src_port: index of port to use for sending packet to switch
+        @param dest_ip_addr: destination IP to build packet with.
+        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        '''
+        pkt, masked_exp_pkt = self.create_ipv4_pkts(src_port, dst_ip_addr)
+        sport = pkt['TCP'].sport
+        dport = pkt['TCP'].dport
+        ip_src = pkt['IP'].src
+        ip_dst = dst_ip_addr
 
         send_packet(self, src_port, pkt)
         logging.info('Sent Ether(src={}, dst={})/IP(src={}, dst={})/TCP(sport={}, dport={}) on port {}'
@@ -414,36 +523,19 @@ class FibTest(BaseTest):
                 rcvd_port, len_rcvd_pkt))
             logging.info(
                 'Recieved packet with length of {}'.format(len_rcvd_pkt))
-            exp_src_mac = None
-            if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
-                # active-active dualtor, the packet could be received from either ToR, so use the received
-                # port to find the corresponding ToR
-                for dut_index, port_list in enumerate(dst_port_lists):
-                    if rcvd_port in port_list:
-                        exp_src_mac = self.ptf_test_port_map[str(
-                            rcvd_port)]["target_src_mac"][dut_index]
-            else:
-                exp_src_mac = self.ptf_test_port_map[str(
-                    rcvd_port)]["target_src_mac"][0]
-            actual_src_mac = scapy.Ether(rcvd_pkt).src
-            if str(exp_src_mac).lower() != str(actual_src_mac).lower():
-                raise Exception(
-                    "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
-                    "but the src mac doesn't match, expected {}, got {}".
-                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
+            error = self.check_rcvd_src_mac(ip_src, ip_dst, src_port, dst_port_lists, rcvd_port, rcvd_pkt)
+            if error:
+                raise Exception(error)
             return (rcvd_port, rcvd_pkt)
         elif self.pkt_action == self.ACTION_DROP:
             verify_no_packet_any(self, masked_exp_pkt, dst_ports)
             return (None, None)
     # ---------------------------------------------------------------------
 
-    def check_ipv6_route(self, src_port, dst_ip_addr, dst_port_lists):
+    def create_ipv6_pkts(self, src_port, dst_ip_addr, probe_id=None):
         '''
-        @summary: Check IPv6 route works.
-        @param source_port_index: index of port to use for sending packet to switch
-        @param dest_ip_addr: destination IP to build packet with.
-        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
-        @return Boolean
+        @summary: Create the IPv6 packet to send and the masked expected packet
+        @param probe_id: probe ID of the pipelined traffic to tag the packets with
         '''
         sport = random.randint(0, 65535)
         dport = random.randint(0, 65535)
@@ -473,6 +565,8 @@ class FibTest(BaseTest):
             ipv6_hlim=max(self.ttl-1, 0),
             dl_vlan_enable=self.dst_vid is not None,
             vlan_vid=self.dst_vid or 0)
+        if probe_id is not None:
+            tag_probe(probe_id, pkt, exp_pkt)
         masked_exp_pkt = Mask(exp_pkt)
         masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "dst")
         masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "src")
@@ -481,6 +575,21 @@ class FibTest(BaseTest):
         if self.ignore_ttl:
             masked_exp_pkt.set_do_not_care_scapy(scapy.IPv6, "hlim")
             masked_exp_pkt.set_do_not_care_scapy(scapy.TCP, "chksum")
+        return pkt, masked_exp_pkt
+
+    def check_ipv6_route(self, src_port, dst_ip_addr, dst_port_lists):
+        '''
+        @summary: Check IPv6 route works.
+        @param source_port_index: index of port to use for sending packet to switch
+        @param dest_ip_addr: destination IP to build packet with.
+        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        @return Boolean
+        '''
+        pkt, masked_exp_pkt = self.create_ipv6_pkts(src_port, dst_ip_addr)
+        sport = pkt['TCP'].sport
+        dport = pkt['TCP'].dport
+        ip_src = pkt['IPv6'].src
+        ip_dst = dst_ip_addr
 
         send_packet(self, src_port, pkt)
         logging.info('Sent Ether(src={}, dst={})/IPv6(src={}, dst={})/TCP(sport={}, dport={}) on port {}'
@@ -522,23 +631,9 @@ class FibTest(BaseTest):
                 rcvd_port, len_rcvd_pkt))
             logging.info(
                 'Recieved packet with length of {}'.format(len_rcvd_pkt))
-            exp_src_mac = None
-            if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
-                # active-active dualtor, the packet could be received from either ToR, so use the received
-                # port to find the corresponding ToR
-                for dut_index, port_list in enumerate(dst_port_lists):
-                    if rcvd_port in port_list:
-                        exp_src_mac = self.ptf_test_port_map[str(
-                            rcvd_port)]["target_src_mac"][dut_index]
-            else:
-                exp_src_mac = self.ptf_test_port_map[str(
-                    rcvd_port)]["target_src_mac"][0]
-            actual_src_mac = scapy.Ether(rcvd_pkt).src
-            if str(exp_src_mac).lower() != str(actual_src_mac).lower():
-                raise Exception(
-                    "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
-                    "but the src mac doesn't match, expected {}, got {}".
-                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
+            error = self.check_rcvd_src_mac(ip_src, ip_dst, src_port, dst_port_lists, rcvd_port, rcvd_pkt)
+            if error:
+                raise Exception(error)
             return (rcvd_port, rcvd_pkt)
         elif self.pkt_action == self.ACTION_DROP:
             verify_no_packet_any(self, masked_exp_pkt, dst_ports)
@@ -1,7 +1,11 @@
+import bisect
 import random
 import six
+import socket
 
-from ipaddress import ip_address, ip_network
+from array import array
+from collections.abc import Sequence
+from ipaddress import ip_address, ip_network, IPv4Address, IPv6Address
 from SubnetTree import SubnetTree
 
 '''
@@ -112,3 +116,218 @@ class LpmDict():
 
     def contains(self, key):
         return key in self._subnet_tree
+
+
+'''
+LpmTable is a compact LPM table for loading a whole FIB at once.
+
+LpmDict creates ip_network/ip_address objects for every prefix and keeps the
+boundaries in a dict, which is slow and takes a lot of memory for FIBs with
+hundreds of thousands of prefixes. LpmTable stores the prefixes in packed
+integer arrays, the values are interned so that prefixes with the same value
+share one entry of the value table. When the table is looked up the first
+time, the prefixes are sorted and swept once to segment the IP space. The
+segments are the same as the ranges of LpmDict, and because the longest
+matching prefix can't change inside a segment, the LPM lookup is a binary
+search of the segment holding the IP.
+
+LpmTable has the same [] operator, contains() and ranges() as LpmDict.
+Prefixes can't be deleted.
+'''
+
+NO_VALUE = -1
+
+
+def parse_prefix(prefix):
+    '''
+    Parse a prefix the same way as ip_network() does, without creating the
+    ip_network object.
+
+    @return: tuple of the IP version, the network address as an int and the
+             prefix length
+    '''
+    address, _, prefixlen = prefix.partition('/')
+    if ':' in address:
+        version, family, bits = 6, socket.AF_INET6, 128
+    else:
+        version, family, bits = 4, socket.AF_INET, 32
+    try:
+        network = int.from_bytes(socket.inet_pton(family, address), 'big')
+    except (OSError, ValueError):
+        network = None
+    if network is not None and (prefixlen.isdigit() or not prefixlen):
+        length = int(prefixlen) if prefixlen else bits
+        if length <= bits and not network & ((1 << (bits - length)) - 1):
+            return version, network, length
+    # Anything else, e.g. a netmask instead of the prefix length or host bits
+    # set, is parsed or rejected by ip_network()
+    net = ip_network(six.text_type(prefix))
+    return net.version, int(net.network_address), net.prefixlen
+
+
+class _Uint128Array(object):
+    '''Array of 128 bits ints, stored as the high and the low 64 bits.'''
+
+    def __init__(self):
+        self._high = array('Q')
+        self._low = array('Q')
+
+    def append(self, value):
+        self._high.append(value >> 64)
+        self._low.append(value & 0xffffffffffffffff)
+
+    def __len__(self):
+        return len(self._high)
+
+    def __getitem__(self, index):
+        return (self._high[index] << 64) | self._low[index]
+
+
+class IpRanges(Sequence):
+    '''
+    Ranges of a LpmTable, the IpIntervals are only created when they are
+    accessed. Slices are lists of IpIntervals.
+    '''
+
+    def __init__(self, starts, max_ip, ip_class):
+        self._starts = starts
+        self._max_ip = max_ip
+        self._ip_class = ip_class
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('IpRanges index out of range')
+        end = self._starts[index + 1] - 1 if index + 1 < len(self) else self._max_ip
+        return LpmDict.IpInterval(self._ip_class(self._starts[index]), self._ip_class(end))
+
+
+class LpmTable():
+    def __init__(self, ipv4=True):
+        self._ipv4 = ipv4
+        self._max_ip = 0xffffffff if ipv4 else (1 << 128) - 1
+        self._ip_class = IPv4Address if ipv4 else IPv6Address
+        self._networks = array('L') if ipv4 else _Uint128Array()
+        self._prefixlens = array('B')
+        self._value_ids = array('l')
+        self._values = []
+        self._value_index = {}
+        self._starts = None
+        self._groups = None
+
+    def __len__(self):
+        return len(self._prefixlens)
+
+    def add(self, network, prefixlen, value):
+        '''
+        Add a prefix. A prefix added again replaces the value of the prefix.
+
+        @param network: network address of the prefix as an int
+        @param prefixlen: prefix length
+        @param value: value of the prefix, values are compared by identity
+        '''
+        value_id = self._value_index.get(id(value))
+        if value_id is None:
+            value_id = self._value_index[id(value)] = len(self._values)
+            self._values.append(value)
+        self._networks.append(network)
+        self._prefixlens.append(prefixlen)
+        self._value_ids.append(value_id)
+        self._starts = None
+
+    def __setitem__(self, key, value):
+        version, network, prefixlen = parse_prefix(key)
+        if version != (4 if self._ipv4 else 6):
+            raise ValueError('{} is not an IPv{} prefix'.format(key, 4 if self._ipv4 else 6))
+        self.add(network, prefixlen, value)
+
+    def _segment(self):
+        '''
+        Sort the prefixes by network address, shorter prefixes first, and
+        sweep them with a stack of the prefixes covering the current IP.
+
+        A segment starts at every prefix and after the end of every prefix,
+        except the default route. The value of a segment is the value of the
+        longest prefix covering it.
+        '''
+        networks = self._networks
+        prefixlens = self._prefixlens
+        value_ids = self._value_ids
+        bits = 32 if self._ipv4 else 128
+        max_ip = self._max_ip
+
+        keys = [(networks[i] << 8) | prefixlens[i] for i in range(len(prefixlens))]
+        # sorted() is stable, the last added one of the same prefixes is the last of them
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+
+        starts = array('L') if self._ipv4 else _Uint128Array()
+        groups = array('l')
+        # 0.0.0.0 and :: always start a segment, like the meta-address boundary of LpmDict
+        starts.append(0)
+        groups.append(NO_VALUE)
+        last_start = 0
+
+        stack = []
+        for position, i in enumerate(order):
+            if position + 1 < len(order) and keys[order[position + 1]] == keys[i]:
+                continue
+            start = networks[i]
+            end = start | ((1 << (bits - prefixlens[i])) - 1)
+            while stack and stack[-1][0] < start:
+                next_start = stack.pop()[0] + 1
+                group = stack[-1][1] if stack else NO_VALUE
+                if next_start == last_start:
+                    groups[-1] = group
+                else:
+                    starts.append(next_start)
+                    groups.append(group)
+                    last_start = next_start
+            if start == last_start:
+                groups[-1] = value_ids[i]
+            else:
+                starts.append(start)
+                groups.append(value_ids[i])
+                last_start = start
+            stack.append((end, value_ids[i]))
+        while stack:
+            end = stack.pop()[0]
+            if end == max_ip:
+                continue
+            group = stack[-1][1] if stack else NO_VALUE
+            if end + 1 == last_start:
+                groups[-1] = group
+            else:
+                starts.append(end + 1)
+                groups.append(group)
+                last_start = end + 1
+
+        self._starts = starts
+        self._groups = groups
+
+    def _lookup(self, key):
+        if self._starts is None:
+            self._segment()
+        address = ip_address(six.text_type(key))
+        if address.version != (4 if self._ipv4 else 6):
+            return NO_VALUE
+        return self._groups[bisect.bisect_right(self._starts, int(address)) - 1]
+
+    def __getitem__(self, key):
+        group = self._lookup(key)
+        if group == NO_VALUE:
+            raise KeyError(key)
+        return self._values[group]
+
+    def contains(self, key):
+        return self._lookup(key) != NO_VALUE
+
+    def ranges(self):
+        if self._starts is None:
+            self._segment()
+        return IpRanges(self._starts, self._max_ip, self._ip_class)
@@ -0,0 +1,235 @@
+"""
+Windowed send/verify engine for PTF tests sending a lot of probe packets.
+
+Tests like fib_test and hash_test send one packet, wait for it with verify_packet_any_port and sleep a while before
+sending the next packet, so most of the test time is spent waiting. PipelinedTraffic keeps up to `window` probes in
+flight instead. Every probe carries a unique probe ID at the end of its payload, the packets received on any port are
+taken from the dataplane queues as they arrive and matched back to the probes by the probe ID.
+
+Usage:
+    traffic = PipelinedTraffic(self, window=32, timeout=30)
+
+    def probes():
+        for dst_ip in dst_ips:
+            probe_id = traffic.next_probe_id()
+            pkt, exp_pkt = build_packets(dst_ip)
+            tag_probe(probe_id, pkt, exp_pkt)
+            yield Probe(probe_id, src_port, pkt, Mask(exp_pkt), dst_ports, context=dst_ip)
+
+    hit_counts, failures = summarize_results(traffic.run(probes()))
+"""
+import itertools
+import logging
+import struct
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+from ptf.testutils import send_packet
+from scapy.all import Raw
+
+DEFAULT_PIPELINE_WINDOW = 32
+DEFAULT_PROBE_TIMEOUT = 30
+POLL_TIMEOUT = 0.1
+
+PROBE_ID_MAGIC = b'PPID'
+PROBE_ID = struct.Struct('!4sI')
+
+ProbeResult = namedtuple('ProbeResult', ['probe_id', 'src_port', 'context', 'rcvd_port', 'error'])
+
+
+def tag_probe(probe_id, *pkts):
+    """
+    Write the probe ID at the end of the payload of scapy packets.
+
+    The packets must not be built yet, so that the checksums are calculated with the probe ID. Tag the sent packet
+    and the expected packet before creating the Mask of the expected packet.
+    """
+    tag = PROBE_ID.pack(PROBE_ID_MAGIC, probe_id)
+    for pkt in pkts:
+        payload = pkt.lastlayer()
+        if not isinstance(payload, Raw) or len(payload.load) < PROBE_ID.size:
+            raise ValueError("Packet {} has no payload for the probe ID".format(pkt.summary()))
+        payload.load = bytes(payload.load[:-PROBE_ID.size]) + tag
+
+
+def read_probe_id(data):
+    """Get the probe ID of a received packet, None if the packet is not a probe."""
+    if len(data) < PROBE_ID.size:
+        return None
+    magic, probe_id = PROBE_ID.unpack(bytes(data[-PROBE_ID.size:]))
+    if magic != PROBE_ID_MAGIC:
+        return None
+    return probe_id
+
+
+class Probe(object):
+    """A probe packet and the ports it is expected to be received on."""
+
+    __slots__ = ('probe_id', 'src_port', 'pkt', 'masked_exp_pkt', 'dst_ports', 'context', 'validate',
+                 'sent_time', 'tries', 'other_ports')
+
+    def __init__(self, probe_id, src_port, pkt, masked_exp_pkt, dst_ports, context=None, validate=None):
+        """
+        Args:
+            probe_id (int): Probe ID written in the packets by tag_probe().
+            src_port (int): Port to send the packet on.
+            pkt: The packet to send.
+            masked_exp_pkt (Mask): The expected packet.
+            dst_ports (list): The packet is expected to be received on one of these ports.
+            context: Anything identifying the probe in the results, e.g. the IP range the probe belongs to.
+            validate (function): Optional check of the received packet, it is called with the received port and the
+                received packet and returns an error message if the packet is not correct.
+        """
+        self.probe_id = probe_id
+        self.src_port = src_port
+        self.pkt = pkt
+        self.masked_exp_pkt = masked_exp_pkt
+        self.dst_ports = dst_ports
+        self.context = context
+        self.validate = validate
+        self.sent_time = None
+        self.tries = 0
+        self.other_ports = set()
+
+
+class PipelinedTraffic(object):
+    """Send probes and verify them with up to `window` probes in flight."""
+
+    def __init__(self, test, window=DEFAULT_PIPELINE_WINDOW, timeout=DEFAULT_PROBE_TIMEOUT, retries=1,
+                 retry_count=1, device_number=0):
+        """
+        Args:
+            test: The PTF test, its dataplane is used to send and receive the packets.
+            window (int): Max number of probes sent but not received yet.
+            timeout (int): Seconds to wait for a probe before sending it again or failing it.
+            retries (int): Times a probe is sent again before it fails.
+            retry_count (int): Number of packets sent when a probe is sent again.
+            device_number (int): The dataplane device of the ports.
+        """
+        self.test = test
+        self.dataplane = test.dataplane
+        self.window = max(1, window)
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_count = retry_count
+        self.device_number = device_number
+        self.stray_packets = 0
+        self._probe_ids = itertools.count(1)
+
+    def next_probe_id(self):
+        return next(self._probe_ids) & 0xffffffff
+
+    def _send(self, probe, count=1):
+        send_packet(self.test, probe.src_port, probe.pkt, count=count)
+        probe.sent_time = time.time()
+        probe.tries += 1
+        logging.debug('Sent probe {} on port {}, expect it on ports {}'.format(
+            probe.probe_id, probe.src_port, probe.dst_ports))
+
+    def _complete(self, probe, rcvd_port, error, results):
+        results.append(ProbeResult(probe.probe_id, probe.src_port, probe.context, rcvd_port, error))
+        if error:
+            logging.warning('Probe {} from port {} failed: {}'.format(probe.probe_id, probe.src_port, error))
+
+    def _receive(self, inflight, results):
+        timeout = POLL_TIMEOUT
+        while inflight:
+            result = self.dataplane.poll(device_number=self.device_number, timeout=timeout)
+            if not isinstance(result, self.dataplane.PollSuccess):
+                return
+            # Take the packets already in the queues without waiting
+            timeout = 0
+
+            probe = inflight.get(read_probe_id(result.packet))
+            if probe is None:
+                # Not a probe, or a copy of a probe which has been received
+                self.stray_packets += 1
+                continue
+            if result.port not in probe.dst_ports or not probe.masked_exp_pkt.pkt_match(result.packet):
+                probe.other_ports.add(result.port)
+                continue
+
+            del inflight[probe.probe_id]
+            error = probe.validate(result.port, result.packet) if probe.validate else None
+            self._complete(probe, result.port, error, results)
+
+    def _expire(self, inflight, results):
+        now = time.time()
+        # The probes are ordered by the time they were sent
+        while inflight:
+            probe = next(iter(inflight.values()))
+            if now - probe.sent_time < self.timeout:
+                return
+            del inflight[probe.probe_id]
+            if probe.tries <= self.retries:
+                logging.warning("Probe {} wasn't received, sending it again".format(probe.probe_id))
+                self._send(probe, count=self.retry_count)
+                inflight[probe.probe_id] = probe
+                continue
+            error = 'not received on any of ports {} in {} tries'.format(probe.dst_ports, probe.tries)
+            if probe.other_ports:
+                error += ', received on ports {}'.format(sorted(probe.other_ports))
+            self._complete(probe, None, error, results)
+
+    def run(self, probes):
+        """
+        Send the probes and match the received packets to them.
+
+        Args:
+            probes (iterable): Probes to send. The probes are only taken when there is room in the window, so a
+                generator creating the probes keeps only the probes in flight in memory.
+
+        Returns:
+            list: ProbeResult of every probe in the order the probes completed. rcvd_port is None and error is set
+                for the probes which were not received.
+        """
+        probes = iter(probes)
+        inflight = OrderedDict()
+        results = []
+        start = time.time()
+        self.stray_packets = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(inflight) < self.window:
+                probe = next(probes, None)
+                if probe is None:
+                    exhausted = True
+                    break
+                self._send(probe)
+                inflight[probe.probe_id] = probe
+            if not inflight:
+                break
+            self._receive(inflight, results)
+            self._expire(inflight, results)
+
+        logging.info('Verified {} probes in {:.2f}s with window {}, {} other packets received'.format(
+            len(results), time.time() - start, self.window, self.stray_packets))
+        return results
+
+
+def summarize_results(results):
+    """
+    Summarize probe results.
+
+    Returns:
+        tuple: Dict of the hit count of each received port by the probe context, and the failed results.
+    """
+    hit_counts = OrderedDict()
+    failures = []
+    for result in results:
+        hit_count = hit_counts.setdefault(result.context, Counter())
+        if result.error:
+            failures.append(result)
+        else:
+            hit_count[result.rcvd_port] += 1
+    return hit_counts, failures
+
+
+def format_failures(failures, limit=20):
+    lines = ['{} probes failed'.format(len(failures))]
+    for result in failures[:limit]:
+        lines.append('  probe {} ({}) from port {}: {}'.format(
+            result.probe_id, result.context, result.src_port, result.error))
+    if len(failures) > limit:
+        lines.append('  ...')
+    return '\n'.join(lines)
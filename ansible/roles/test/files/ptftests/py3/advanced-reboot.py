@@ -73,6 +73,7 @@ import scapy.all as scapyall
 from scapy.arch.linux import attach_filter as attach_filter
 
 import sad_path as sp
+from probe_flow import ProbeFlow, UnsupportedCapture
 
 from ptf import config
 from ptf.base_tests import BaseTest
@@ -232,6 +233,7 @@ class ReloadTest(BaseTest):
         self.log_fp = open(self.log_file_name, 'w')
 
         self.packets_list = []
+        self.packets = None
         self.vnet = self.test_params['vnet']
         if (self.vnet):
             self.packets_list = json.load(open(self.test_params['vnet_pkts']))
@@ -1988,8 +1990,14 @@ class ReloadTest(BaseTest):
             else:
                 self.start_sniffer_on_ptf(self.capture_pcap, sniff_filter, wait)
 
-            self.packets = scapyall.rdpcap(self.capture_pcap)
-            self.log("Number of all packets captured: {}".format(len(self.packets)))
+            if self.vnet:
+                # VXLAN encapsulated probe packets are only examined with scapy
+                self.packets = scapyall.rdpcap(self.capture_pcap)
+                self.log("Number of all packets captured: {}".format(len(self.packets)))
+            else:
+                # The probe packets are streamed from the capture file by examine_flow()
+                self.packets = None
+                self.log("Capture file size: {} bytes".format(os.path.getsize(self.capture_pcap)))
         except Exception:
             traceback_msg = traceback.format_exc()
             self.log("Error in tcpdump_sniff: {}".format(traceback_msg))
@@ -2120,13 +2128,11 @@ class ReloadTest(BaseTest):
         else:
             return False
 
-    def examine_flow(self, filename=None):
+    def filter_probe_packets(self, filename=None):
         """
-        This method examines pcap file (if given), or self.packets scapy file.
-        The method compares TCP payloads of the packets one by one (assuming all payloads are consecutive integers),
-        and the losses if found - are treated as disruptions in Dataplane forwarding.
-        All disruptions are saved to self.lost_packets dictionary, in format:
-        disrupt_start_id = (missing_packets_count, disrupt_time, disrupt_start_timestamp, disrupt_stop_timestamp)
+        This method is used by examine_flow() method when the capture can't be streamed.
+        It loads pcap file (if given), or uses self.packets scapy packets, and returns the probe packets
+        without floods, sorted by Payload ID and Timestamp.
         """
         if filename:
             all_packets = scapyall.rdpcap(filename)
@@ -2164,18 +2170,45 @@ class ReloadTest(BaseTest):
             filtered_packets = filtered_packets + filtered_decap_packets
 
         # Re-arrange packets, if delayed, by Payload ID and Timestamp:
-        packets = sorted(filtered_packets, key=lambda packet: (
+        return sorted(filtered_packets, key=lambda packet: (
             int(bytes(packet[scapyall.TCP].payload)), float(packet.time)))
+
+    def examine_flow(self, filename=None):
+        """
+        This method examines pcap file (if given), or self.packets scapy file.
+        The method compares TCP payloads of the packets one by one (assuming all payloads are consecutive integers),
+        and the losses if found - are treated as disruptions in Dataplane forwarding.
+        All disruptions are saved to self.lost_packets dictionary, in format:
+        disrupt_start_id = (missing_packets_count, disrupt_time, disrupt_start_timestamp, disrupt_stop_timestamp)
+        """
+        if not filename and not self.packets and not self.vnet and os.path.exists(self.capture_pcap):
+            filename = self.capture_pcap
+        flow = None
+        if filename and not self.vnet:
+            # Stream the probe packets from the capture without loading all packets with scapy
+            try:
+                flow = ProbeFlow(filename, [self.dut_mac, self.vlan_mac])
+                self.log("Number of all packets captured: {}".format(flow.total_packets))
+            except UnsupportedCapture as e:
+                self.log("Unable to stream {}: {}, load it with scapy".format(filename, repr(e)))
+        if flow is None:
+            packets = self.filter_probe_packets(filename)
+            if packets is None:
+                return None
+            flow = [(int(bytes(packet[scapyall.TCP].payload)), float(packet.time),
+                     packet[scapyall.Ether].dst == self.dut_mac or packet[scapyall.Ether].dst == self.vlan_mac)
+                    for packet in packets]
+
         self.lost_packets = dict()
         self.max_disrupt, self.total_disruption = 0, 0
         sent_packets = dict()
         # Track packet id's that were neither sent or received
         missing_sent_and_received_packet_id_sequences = []
         self.fails['dut'].add("Sniffer failed to capture any traffic")
-        self.assertTrue(packets, "Sniffer failed to capture any traffic")
+        self.assertTrue(flow, "Sniffer failed to capture any traffic")
         self.fails['dut'].clear()
         prev_payload = None
-        if packets:
+        if flow:
             prev_payload, prev_time = -1, 0
             sent_payload = 0
             received_counter = 0    # Counts packets from dut.
@@ -2187,30 +2220,29 @@ class ReloadTest(BaseTest):
             missed_t1_to_vlan = 0
             flooded_pkts = []
             self.disruption_start, self.disruption_stop = None, None
-            for packet in packets:
-                if packet[scapyall.Ether].dst == self.dut_mac or packet[scapyall.Ether].dst == self.vlan_mac:
+            for payload_id, packet_time, is_sent in flow:
+                if is_sent:
                     # This is a sent packet - keep track of it as payload_id:timestamp.
                     # for dualtor both MACs are needed:
                     #   t1->server sent pkt will have dst MAC as dut_mac,
                     #   and server->t1 sent pkt will have dst MAC as vlan_mac
-                    sent_payload = int(bytes(packet[scapyall.TCP].payload))
+                    sent_payload = payload_id
                     if sent_payload in sent_packets:
                         flooded_pkts.append(sent_payload)
-                    sent_packets[sent_payload] = float(packet.time)
+                    sent_packets[sent_payload] = packet_time
                     sent_counter += 1
                     continue
-                if packet[scapyall.Ether].src == self.dut_mac or packet[scapyall.Ether].src == self.vlan_mac:
-                    # This is a received packet.
-                    # for dualtor both MACs are needed:
-                    #   t1->server rcvd pkt will have src MAC as vlan_mac,
-                    #   and server->t1 rcvd pkt will have src MAC as dut_mac
-                    received_time = float(packet.time)
-                    received_payload = int(bytes(packet[scapyall.TCP].payload))
-                    if (received_payload % 5) == 0:   # From vlan to T1.
-                        received_vlan_to_t1 += 1
-                    else:
-                        received_t1_to_vlan += 1
-                    received_counter += 1
+                # This is a received packet.
+                # for dualtor both MACs are needed:
+                #   t1->server rcvd pkt will have src MAC as vlan_mac,
+                #   and server->t1 rcvd pkt will have src MAC as dut_mac
+                received_time = packet_time
+                received_payload = payload_id
+                if (received_payload % 5) == 0:   # From vlan to T1.
+                    received_vlan_to_t1 += 1
+                else:
+                    received_t1_to_vlan += 1
+                received_counter += 1
                 if not (received_payload and received_time):
                     # This is the first valid received packet.
                     prev_payload = received_payload
@@ -2358,10 +2390,13 @@ class ReloadTest(BaseTest):
             self.fails["dut"].add(message)
 
         self.log("Total incoming packets captured %d" % received_counter)
-        if packets:
+        if flow:
             filename = ('/tmp/capture_filtered.pcap' if self.logfile_suffix is None
                         else "/tmp/capture_filtered_%s.pcap" % self.logfile_suffix)
-            scapyall.wrpcap(filename, packets)
+            if isinstance(flow, ProbeFlow):
+                flow.dump(filename)
+            else:
+                scapyall.wrpcap(filename, packets)
             self.log("Filtered pcap dumped to %s" % filename)
 
     def check_forwarding_stop(self, signal):
@@ -32,6 +32,12 @@ from ptf.testutils import simple_nvgre_packet
 import fib
 import lpm
 import macsec  # noqa F401
+from pipelined_traffic import DEFAULT_PIPELINE_WINDOW
+from pipelined_traffic import PipelinedTraffic
+from pipelined_traffic import Probe
+from pipelined_traffic import format_failures
+from pipelined_traffic import summarize_results
+from pipelined_traffic import tag_probe
 
 
 class HashTest(BaseTest):
@@ -114,6 +120,10 @@ class HashTest(BaseTest):
         self.base_mac = self.dataplane.get_mac(
             *random.choice(list(self.dataplane.ports.keys())))
         self.vxlan_dest_port = int(self.test_params.get('vxlan_dest_port', 0))
+        # max number of packets in flight when checking the balancing, 1 to send a packet after the previous
+        # packet is received
+        self.pipeline_window = self.test_params.get('pipeline_window', DEFAULT_PIPELINE_WINDOW)
+        self.traffic = PipelinedTraffic(self, window=self.pipeline_window, timeout=10)
 
     def _get_nexthops(self, src_port, dst_ip):
         active_dut_indexes = [0]
@@ -218,13 +228,24 @@ class HashTest(BaseTest):
             assert len(hit_count_map.keys()) == len(
                 self.ptf_test_port_map[str(ingress_port)]["target_dut"])
         else:
-            for _ in range(0, self.balancing_test_times * len(list(itertools.chain(*exp_port_lists)))):
-                logging.info('Checking hash key {}, src_port={}, exp_ports={}, dst_ip={}'
-                             .format(hash_key, src_port, exp_port_lists, dst_ip))
-                (matched_port, _) = self.check_ip_route(
-                    hash_key, src_port, dst_ip, exp_port_lists)
-                hit_count_map[matched_port] = hit_count_map.get(
-                    matched_port, 0) + 1
+            test_times = self.balancing_test_times * len(list(itertools.chain(*exp_port_lists)))
+            if self.pipeline_window > 1:
+                logging.info('Checking hash key {}, src_port={}, exp_ports={}, dst_ip={}, {} packets'
+                             .format(hash_key, src_port, exp_port_lists, dst_ip, test_times))
+                self.dataplane.flush()
+                results = self.traffic.run(self.create_route_probe(hash_key, src_port, dst_ip, exp_port_lists)
+                                           for _ in range(test_times))
+                hit_counts, failures = summarize_results(results)
+                assert not failures, format_failures(failures)
+                hit_count_map = dict(hit_counts.get(hash_key, {}))
+            else:
+                for _ in range(0, test_times):
+                    logging.info('Checking hash key {}, src_port={}, exp_ports={}, dst_ip={}'
+                                 .format(hash_key, src_port, exp_port_lists, dst_ip))
+                    (matched_port, _) = self.check_ip_route(
+                        hash_key, src_port, dst_ip, exp_port_lists)
+                    hit_count_map[matched_port] = hit_count_map.get(
+                        matched_port, 0) + 1
             logging.info("hash_key={}, hit count map: {}".format(
                 hash_key, hit_count_map))
             for next_hop in next_hops:
@@ -243,6 +264,25 @@ class HashTest(BaseTest):
         time.sleep(0.02)
         return (matched_port, received)
 
+    def create_route_probe(self, hash_key, src_port, dst_ip, dst_port_lists):
+        '''
+        @summary: Create a probe of the pipelined traffic with the packets check_ip_route sends
+        '''
+        version = 'IP' if ip_network(six.text_type(dst_ip)).version == 4 else 'IPv6'
+        probe_id = self.traffic.next_probe_id()
+        pkt, masked_exp_pkt, _, ip_src, ip_dst = self.create_route_pkts(
+            hash_key, src_port, version, probe_id=probe_id)
+
+        def validate(rcvd_port, rcvd_pkt):
+            try:
+                self.get_validated_packet(rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
+            except Exception as e:
+                return str(e)
+            return None
+
+        return Probe(probe_id, src_port, pkt, masked_exp_pkt, list(itertools.chain(*dst_port_lists)),
+                     context=hash_key, validate=validate)
+
     def _get_ip_proto(self, ipv6=False):
         # ip_proto 2 is IGMP, should not be forwarded by router
         # ip_proto 4, 41 and 47 are encapsulation protocol, ip payload will be malformat
@@ -397,10 +437,12 @@ class HashTest(BaseTest):
                 pkt['IPv6'].nh = ip_proto
                 exp_pkt['IPv6'].nh = ip_proto
 
-    def check_ipv4_route(self, hash_key, src_port, dst_port_lists, outer_sport=None, outer_dst_ip=None,
-                         outer_src_ip=None):
+    def create_route_pkts(self, hash_key, src_port, version, outer_src_ip=None, outer_dst_ip=None, probe_id=None):
         '''
-        @summary: Check IPv4 route works.
+        @summary: Create the packet to send and the masked expected packet for checking hash_key
+        @param version: 'IP' or 'IPv6'
+        @param probe_id: probe ID of the pipelined traffic to tag the packets with
+        @return: the packet, the masked expected packet, the logs of the packets and the src/dst IP
         '''
         ip_src = self.src_ip_interval.get_random_ip(
         ) if hash_key == 'src-ip' else self.src_ip_interval.get_first_ip()
@@ -415,7 +457,8 @@ class HashTest(BaseTest):
             if hash_key == 'dst-mac' else self.base_mac
         router_mac = self.ptf_test_port_map[str(src_port)]['target_dest_mac']
         vlan_id = random.choice(self.vlan_ids) if hash_key == 'vlan-id' else 0
-        ip_proto = self._get_ip_proto() if hash_key == 'ip-proto' else None
+        ip_proto = self._get_ip_proto(
+            ipv6=(version == 'IPv6')) if hash_key == 'ip-proto' else None
         pkt, exp_pkt, inner_pkt = self.create_pkt(
             vlan_id=vlan_id,
             router_mac=router_mac,
@@ -430,26 +473,32 @@ class HashTest(BaseTest):
             outer_src_ipv6=outer_src_ip,
             outer_dst_ipv6=outer_dst_ip,
             outer_sport=outer_sport,
-            version='IP',
+            version=version,
             hash_key=hash_key
         )
-        self.set_packet_parameter(pkt, exp_pkt, hash_key, ip_proto, version='IP')
+        self.set_packet_parameter(pkt, exp_pkt, hash_key, ip_proto, version=version)
+        if probe_id is not None:
+            tag_probe(probe_id, pkt, exp_pkt)
         masked_exp_pkt = Mask(exp_pkt)
-        masked_exp_pkt = self.apply_mask_to_exp_pkt(masked_exp_pkt, version='IP')
+        masked_exp_pkt = self.apply_mask_to_exp_pkt(masked_exp_pkt, version=version)
         logs = self.create_packets_logs(
             src_port=src_port,
             pkt=pkt,
+            ipinip_pkt=pkt,
             vxlan_pkt=pkt,
             nvgre_pkt=pkt,
-            ipinip_pkt=pkt,
             inner_pkt=inner_pkt,
             outer_sport=outer_sport,
             sport=sport,
             dport=dport,
             ip_src=ip_src,
             ip_dst=ip_dst,
-            ip_proto=ip_proto
+            ip_proto=ip_proto,
+            version=version
         )
+        return pkt, masked_exp_pkt, logs, ip_src, ip_dst
+
+    def verify_route_pkts(self, src_port, pkt, masked_exp_pkt, dst_port_lists, logs, ip_src, ip_dst):
         if isinstance(self, HashTest):
             rcvd_port, rcvd_pkt = retry_call(
                 self.send_and_verify_packets,
@@ -461,70 +510,22 @@ class HashTest(BaseTest):
             rcvd_port, rcvd_pkt = self.send_and_verify_packets(src_port, pkt, masked_exp_pkt, dst_port_lists, logs=logs)
         return self.get_validated_packet(rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
 
+    def check_ipv4_route(self, hash_key, src_port, dst_port_lists, outer_sport=None, outer_dst_ip=None,
+                         outer_src_ip=None):
+        '''
+        @summary: Check IPv4 route works.
+        '''
+        pkt, masked_exp_pkt, logs, ip_src, ip_dst = self.create_route_pkts(
+            hash_key, src_port, 'IP', outer_src_ip=outer_src_ip, outer_dst_ip=outer_dst_ip)
+        return self.verify_route_pkts(src_port, pkt, masked_exp_pkt, dst_port_lists, logs, ip_src, ip_dst)
+
     def check_ipv6_route(self, hash_key, src_port, dst_port_lists, outer_src_ip=None, outer_dst_ip=None):
         '''
         @summary: Check IPv6 route works.
         '''
-        ip_src = self.src_ip_interval.get_random_ip(
-        ) if hash_key == 'src-ip' else self.src_ip_interval.get_first_ip()
-        ip_dst = self.dst_ip_interval.get_random_ip(
-        ) if hash_key == 'dst-ip' else self.dst_ip_interval.get_first_ip()
-        sport = random.randint(0, 65535) if hash_key == 'src-port' else 1234
-        dport = random.randint(0, 65535) if hash_key == 'dst-port' else 80
-        outer_sport = self.generate_random_sport() if hash_key == 'outer-src-port' else 1234
-        src_mac = (self.base_mac[:-5] + "%02x" % random.randint(0, 255) + ":" + "%02x" % random.randint(0, 255)) \
-            if hash_key == 'src-mac' else self.base_mac
-        dst_mac = (self.base_mac[:-5] + "%02x" % random.randint(0, 255) + ":" + "%02x" % random.randint(0, 255)) \
-            if hash_key == 'dst-mac' else self.base_mac
-        router_mac = self.ptf_test_port_map[str(src_port)]['target_dest_mac']
-        vlan_id = random.choice(self.vlan_ids) if hash_key == 'vlan-id' else 0
-        ip_proto = self._get_ip_proto(
-            ipv6=True) if hash_key == "ip-proto" else None
-        pkt, exp_pkt, inner_pkt = self.create_pkt(
-            vlan_id=vlan_id,
-            router_mac=router_mac,
-            src_mac=src_mac,
-            dst_mac=dst_mac,
-            ip_src=ip_src,
-            ip_dst=ip_dst,
-            sport=sport,
-            dport=dport,
-            outer_src_ip=outer_src_ip,
-            outer_dst_ip=outer_dst_ip,
-            outer_src_ipv6=outer_src_ip,
-            outer_dst_ipv6=outer_dst_ip,
-            outer_sport=outer_sport,
-            version='IPv6',
-            hash_key=hash_key
-        )
-        self.set_packet_parameter(pkt, exp_pkt, hash_key, ip_proto, version='IPv6')
-        masked_exp_pkt = Mask(exp_pkt)
-        masked_exp_pkt = self.apply_mask_to_exp_pkt(masked_exp_pkt, version='IPv6')
-        logs = self.create_packets_logs(
-            src_port=src_port,
-            pkt=pkt,
-            ipinip_pkt=pkt,
-            vxlan_pkt=pkt,
-            nvgre_pkt=pkt,
-            inner_pkt=inner_pkt,
-            outer_sport=outer_sport,
-            sport=sport,
-            dport=dport,
-            ip_src=ip_src,
-            ip_dst=ip_dst,
-            ip_proto=ip_proto,
-            version='IPv6'
-        )
-        if isinstance(self, HashTest):
-            rcvd_port, rcvd_pkt = retry_call(
-                self.send_and_verify_packets,
-                fargs=[src_port, pkt, masked_exp_pkt, dst_port_lists, logs],
-                tries=2,
-                delay=2
-            )
-        else:
-            rcvd_port, rcvd_pkt = self.send_and_verify_packets(src_port, pkt, masked_exp_pkt, dst_port_lists, logs=logs)
-        return self.get_validated_packet(rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
+        pkt, masked_exp_pkt, logs, ip_src, ip_dst = self.create_route_pkts(
+            hash_key, src_port, 'IPv6', outer_src_ip=outer_src_ip, outer_dst_ip=outer_dst_ip)
+        return self.verify_route_pkts(src_port, pkt, masked_exp_pkt, dst_port_lists, logs, ip_src, ip_dst)
 
     def check_within_expected_range(self, actual, expected, hash_key):
         '''
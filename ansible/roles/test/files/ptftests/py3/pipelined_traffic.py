@@ -0,0 +1 @@
+../pipelined_traffic.py
\ No newline at end of file
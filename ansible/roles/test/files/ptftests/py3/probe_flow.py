@@ -0,0 +1,265 @@
+"""
+Streaming reader of the data plane probe packets captured by advanced-reboot.
+
+Loading a capture of a warm/fast reboot with scapy.rdpcap builds a scapy object for every packet, which takes gigabytes
+of memory for captures with millions of packets. ProbeFlow reads the pcap/pcapng records one by one, only decodes the
+fixed Ethernet/IP/TCP header fields of each packet and keeps the payload ID, timestamp and direction of the probe
+packets in compact arrays.
+
+The probe packets are selected the same way as advanced-reboot selected them from the scapy packets:
+    - TCP packets from port 1234 to port 5000 with an integer payload,
+    - sent packets, with the DUT MAC or the VLAN MAC as destination,
+    - received packets, with the DUT MAC or the VLAN MAC as source, only the first packet of each payload ID.
+"""
+import struct
+from array import array
+
+PCAP_MAGIC_USEC = 0xa1b2c3d4
+PCAP_MAGIC_NSEC = 0xa1b23c4d
+PCAPNG_SHB = 0x0a0d0d0a
+PCAPNG_IDB = 0x00000001
+PCAPNG_PB = 0x00000002
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1a2b3c4d
+PCAPNG_OPT_TSRESOL = 9
+LINKTYPE_ETHERNET = 1
+
+ETH_TYPE_IPV4 = 0x0800
+ETH_TYPE_IPV6 = 0x86dd
+IP_PROTO_TCP = 6
+
+PROBE_SPORT = 1234
+PROBE_DPORT = 5000
+
+
+class UnsupportedCapture(Exception):
+    """The capture file is not a pcap/pcapng file of Ethernet packets."""
+
+
+def _mac_to_bytes(mac):
+    # scapy formats MAC addresses as lower case 'xx:xx:xx:xx:xx:xx', other formats never matched a scapy packet
+    if not isinstance(mac, str) or mac != mac.lower() or len(mac) != 17:
+        return None
+    try:
+        return bytes.fromhex(mac.replace(':', ''))
+    except ValueError:
+        return None
+
+
+def _iter_pcap(f, magic_bytes):
+    """Yield (timestamp, data offset, data) of the packets in a pcap file."""
+    header = magic_bytes + f.read(20)
+    if len(header) < 24:
+        raise UnsupportedCapture("Truncated pcap header")
+    for endian in ('<', '>'):
+        magic = struct.unpack(endian + 'I', magic_bytes)[0]
+        if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+            break
+    resolution = 1000000000 if magic == PCAP_MAGIC_NSEC else 1000000
+    linktype = struct.unpack(endian + 'I', header[20:24])[0] & 0x0fffffff
+    if linktype != LINKTYPE_ETHERNET:
+        raise UnsupportedCapture("Unsupported pcap link type {}".format(linktype))
+
+    record_header = struct.Struct(endian + 'IIII')
+    offset = 24
+    while True:
+        hdr = f.read(16)
+        if len(hdr) < 16:
+            return
+        sec, frac, caplen, _ = record_header.unpack(hdr)
+        data = f.read(caplen)
+        if len(data) < caplen:
+            return
+        yield (sec * resolution + frac) / resolution, offset + 16, data
+        offset += 16 + caplen
+
+
+def _iter_pcapng(f, magic_bytes):
+    """Yield (timestamp, data offset, data) of the packets in a pcapng file."""
+    endian = '<'
+    interfaces = []
+    offset = 0
+    block_header = magic_bytes + f.read(4)
+    while len(block_header) == 8:
+        block_type = struct.unpack(endian + 'I', block_header[:4])[0]
+        if block_type == PCAPNG_SHB:
+            body_start = f.read(4)
+            if len(body_start) < 4:
+                return
+            endian = '<' if struct.unpack('<I', body_start)[0] == PCAPNG_BYTE_ORDER_MAGIC else '>'
+            block_len = struct.unpack(endian + 'I', block_header[4:8])[0]
+            body = body_start + f.read(block_len - 12)
+            # Interface IDs are numbered per section
+            interfaces = []
+        else:
+            block_len = struct.unpack(endian + 'I', block_header[4:8])[0]
+            body = f.read(block_len - 8)
+        if block_len < 12 or len(body) < block_len - 8:
+            return
+
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack(endian + 'H', body[:2])[0]
+            resolution = 1000000
+            opt_offset = 8
+            while opt_offset + 4 <= len(body) - 4:
+                code, length = struct.unpack(endian + 'HH', body[opt_offset:opt_offset + 4])
+                if code == 0:
+                    break
+                if code == PCAPNG_OPT_TSRESOL and length == 1:
+                    tsresol = body[opt_offset + 4]
+                    resolution = (2 if tsresol & 128 else 10) ** (tsresol & 127)
+                opt_offset += 4 + length + (-length) % 4
+            interfaces.append((linktype, resolution))
+        elif block_type in (PCAPNG_EPB, PCAPNG_PB):
+            if block_type == PCAPNG_EPB:
+                intid, tshigh, tslow, caplen = struct.unpack(endian + 'IIII', body[:16])
+            else:
+                intid, _, tshigh, tslow, caplen = struct.unpack(endian + 'HHIII', body[:16])
+            if intid >= len(interfaces):
+                raise UnsupportedCapture("Packet of undefined interface {}".format(intid))
+            linktype, resolution = interfaces[intid]
+            if linktype != LINKTYPE_ETHERNET:
+                raise UnsupportedCapture("Unsupported pcapng link type {}".format(linktype))
+            yield ((tshigh << 32) + tslow) / resolution, offset + 28, body[20:20 + caplen]
+        # Other blocks, e.g. interface statistics, name resolution, don't have packets
+
+        offset += block_len
+        block_header = f.read(8)
+
+
+def iter_capture(filename):
+    """
+    Iterate the packets in a pcap or pcapng file of Ethernet packets.
+
+    Yields:
+        tuple: Timestamp of the packet, offset of the packet data in the file, the packet data.
+
+    Raises:
+        UnsupportedCapture: The file is neither a pcap nor a pcapng file of Ethernet packets.
+    """
+    with open(filename, 'rb') as f:
+        magic_bytes = f.read(4)
+        if len(magic_bytes) < 4:
+            return
+        if struct.unpack('<I', magic_bytes)[0] == PCAPNG_SHB:
+            reader = _iter_pcapng(f, magic_bytes)
+        elif (struct.unpack('<I', magic_bytes)[0] in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC) or
+              struct.unpack('>I', magic_bytes)[0] in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC)):
+            reader = _iter_pcap(f, magic_bytes)
+        else:
+            raise UnsupportedCapture("Unknown capture file format of {}".format(filename))
+        for packet in reader:
+            yield packet
+
+
+def decode_tcp_payload(data, sport=PROBE_SPORT, dport=PROBE_DPORT):
+    """
+    Get the TCP payload of an untagged Ethernet/IPv4/TCP or Ethernet/IPv6/TCP packet between the given ports.
+
+    Same as bytes(packet[TCP].payload) of scapy, the payload includes the Ethernet padding.
+
+    Returns:
+        bytes: The TCP payload or None if the packet is not a TCP packet between the given ports.
+    """
+    if len(data) < 14:
+        return None
+    eth_type = (data[12] << 8) | data[13]
+    if eth_type == ETH_TYPE_IPV4:
+        if len(data) < 34:
+            return None
+        flags_frag = (data[20] << 8) | data[21]
+        # Like scapy, the payload of a non-first fragment is not decoded as TCP
+        if data[23] != IP_PROTO_TCP or flags_frag & 0x1fff:
+            return None
+        tcp_offset = 14 + (data[14] & 0x0f) * 4
+    elif eth_type == ETH_TYPE_IPV6:
+        if len(data) < 54 or data[20] != IP_PROTO_TCP:
+            return None
+        tcp_offset = 54
+    else:
+        return None
+
+    if len(data) < tcp_offset + 20:
+        return None
+    if ((data[tcp_offset] << 8) | data[tcp_offset + 1]) != sport or \
+            ((data[tcp_offset + 2] << 8) | data[tcp_offset + 3]) != dport:
+        return None
+    return data[tcp_offset + (data[tcp_offset + 12] >> 4) * 4:]
+
+
+class ProbeFlow(object):
+    """
+    Probe packets of a capture file sorted by payload ID and timestamp.
+
+    Iterating a ProbeFlow gives (payload ID, timestamp, is sent) of the probe packets, where is sent is False for the
+    packets received from the DUT.
+    """
+
+    def __init__(self, filename, dut_macs):
+        """
+        Args:
+            filename (str): Path of the pcap or pcapng capture file.
+            dut_macs (list): MAC addresses of the DUT, i.e. the DUT MAC and the VLAN MAC.
+
+        Raises:
+            UnsupportedCapture: The capture file is neither a pcap nor a pcapng file of Ethernet packets.
+        """
+        self.filename = filename
+        macs = set(mac for mac in (_mac_to_bytes(mac) for mac in dut_macs) if mac is not None)
+        self.total_packets = 0
+
+        payloads = array('q')
+        times = array('d')
+        sent = array('b')
+        offsets = array('q')
+        lengths = array('l')
+        received_ids = set()
+        for timestamp, offset, data in iter_capture(filename):
+            self.total_packets += 1
+            payload = decode_tcp_payload(data)
+            if payload is None:
+                continue
+            try:
+                payload_id = int(payload)
+            except ValueError:
+                continue
+
+            to_dut = data[0:6] in macs
+            if payload_id not in received_ids and data[6:12] in macs:
+                # This is a unique (no flooded) received packet.
+                received_ids.add(payload_id)
+            elif not to_dut:
+                continue
+            payloads.append(payload_id)
+            times.append(timestamp)
+            # A packet to the DUT is a sent packet, even if it is also from the DUT
+            sent.append(1 if to_dut else 0)
+            offsets.append(offset)
+            lengths.append(len(data))
+
+        # Sort by payload ID and timestamp, packets with the same payload ID and timestamp keep the capture order.
+        order = sorted(range(len(payloads)), key=lambda i: (payloads[i], times[i]))
+        self.payloads = array('q', (payloads[i] for i in order))
+        self.times = array('d', (times[i] for i in order))
+        self.sent = array('b', (sent[i] for i in order))
+        self.offsets = array('q', (offsets[i] for i in order))
+        self.lengths = array('l', (lengths[i] for i in order))
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def __iter__(self):
+        for payload_id, timestamp, is_sent in zip(self.payloads, self.times, self.sent):
+            yield payload_id, timestamp, bool(is_sent)
+
+    def dump(self, filename):
+        """Write the probe packets, sorted by payload ID and timestamp, to a pcap file."""
+        with open(self.filename, 'rb') as src, open(filename, 'wb') as dst:
+            dst.write(struct.pack('<IHHiIII', PCAP_MAGIC_USEC, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+            for timestamp, offset, length in zip(self.times, self.offsets, self.lengths):
+                src.seek(offset)
+                data = src.read(length)
+                sec = int(timestamp)
+                usec = int(round((timestamp - sec) * 1000000))
+                dst.write(struct.pack('<IIII', sec, usec, length, length))
+                dst.write(data)
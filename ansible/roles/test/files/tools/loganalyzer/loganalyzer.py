@@ -29,11 +29,17 @@ import re
 import os
 import os.path
 import csv
+import json
 import time
 import logging
 import logging.handlers
 from datetime import datetime
 
+try:
+    from re import _parser as sre_parse     # Python 3.11+
+except ImportError:
+    import sre_parse
+
 # ---------------------------------------------------------------------
 # Global variables
 # ---------------------------------------------------------------------
@@ -41,6 +47,13 @@ tokenizer = ','
 comment_key = '#'
 system_log_file = '/var/log/syslog'
 
+# -- Directory holding the byte offset and inode of the log files at the time a start marker was placed.
+# The extract_log module looks up this index to seek directly to the marker instead of scanning
+# all the rotated log files. Keep in sync with MARKER_INDEX_DIR in ansible/library/extract_log.py
+marker_index_dir = '/tmp/loganalyzer_markers'
+# -- Index files older than this (in seconds) are removed when a new start marker is placed.
+marker_index_max_age = 24 * 60 * 60
+
 # -- List of ERROR codes to be returned by AnsibleLogAnalyzer
 err_duplicate_start_marker = -1
 err_duplicate_end_marker = -2
@@ -57,6 +70,132 @@ err_start_ignore_marker = -8
 MAX_LOG_MESSAGE_LENGTH = 1000
 
 
+class MessageMatcher:
+    '''
+    @summary: Matches a line against a set of regular expressions in one pass.
+
+    Every regular expression is compiled on its own. The longest literal string which
+    must appear in any line matched by an expression is extracted from the expression,
+    expressions sharing the same literal are grouped. A line is only searched with the
+    expressions whose literal is found in the line, most lines are rejected by a few
+    substring checks without running any regular expression.
+
+    Unlike a single alternation of all the expressions, the matcher reports which
+    expression matched, the analyzer counts the reported lines per expression.
+
+    The class keeps the 'pattern', 'findall' and 'match' interface of a compiled regular
+    expression, so it can be passed wherever a compiled alternation was used.
+    '''
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.pattern = '|'.join(self.patterns)
+        self.regexes = [re.compile(p) for p in self.patterns]
+        self.hits = [0] * len(self.patterns)
+
+        # -- literal -> indexes of the expressions requiring the literal
+        literal_groups = {}
+        self.unfiltered = []
+        for index, regex in enumerate(self.regexes):
+            literal = self.required_literal(regex)
+            if literal:
+                literal_groups.setdefault(literal, []).append(index)
+            else:
+                self.unfiltered.append(index)
+        self.literal_groups = list(literal_groups.items())
+
+    @staticmethod
+    def required_literal(regex):
+        '''
+        @summary: Get the longest literal string which must appear in a string matched by regex.
+        @return: The literal string, empty string if no literal could be extracted.
+        '''
+        if regex.flags & re.IGNORECASE:
+            return ''
+        try:
+            parsed = sre_parse.parse(regex.pattern, regex.flags)
+        except Exception:
+            return ''
+
+        longest = ''
+        current = []
+        for op, av in list(parsed) + [(None, None)]:
+            if op == sre_parse.LITERAL:
+                current.append(chr(av))
+                continue
+            if len(current) > len(longest):
+                longest = ''.join(current)
+            current = []
+        return longest
+
+    def candidates(self, line):
+        '''
+        @summary: Indexes of the expressions which may match the line, in the order of the expressions.
+        '''
+        indexes = []
+        for literal, group in self.literal_groups:
+            if literal in line:
+                indexes.extend(group)
+        if not indexes:
+            return self.unfiltered
+        indexes.extend(self.unfiltered)
+        indexes.sort()
+        return indexes
+
+    def search(self, line, anchored=False):
+        '''
+        @summary: Find the first expression matching the line.
+        @param anchored: Match at the beginning of the line only, like re.match().
+        @return: Index of the matching expression, None if no expression matches.
+        '''
+        for index in self.candidates(line):
+            regex = self.regexes[index]
+            if (regex.match(line) if anchored else regex.search(line)) is not None:
+                return index
+        return None
+
+    def search_all(self, line):
+        '''
+        @summary: Find all the expressions matching the line.
+        @return: List of indexes of the matching expressions.
+        '''
+        return [index for index in self.candidates(line) if self.regexes[index].search(line) is not None]
+
+    def count(self, indexes):
+        '''
+        @summary: Count a hit for each of the expressions.
+        '''
+        for index in indexes:
+            self.hits[index] += 1
+
+    def findall(self, line):
+        '''
+        @summary: Compatible with re.findall() for truth testing, returns the matching expressions.
+        '''
+        return [self.patterns[index] for index in self.search_all(line)]
+
+    def match(self, line):
+        '''
+        @summary: Compatible with re.match() for truth testing, returns the first expression matching
+                  at the beginning of the line.
+        '''
+        index = self.search(line, anchored=True)
+        return None if index is None else self.patterns[index]
+
+    def hit_counts(self):
+        '''
+        @return: map <expression, number of lines matched> for the expressions which matched any line.
+        '''
+        return dict((self.patterns[index], hits) for index, hits in enumerate(self.hits) if hits)
+
+    def unused_patterns(self):
+        '''
+        @return: List of the expressions which did not match any line.
+        '''
+        return [pattern for pattern, hits in zip(self.patterns, self.hits) if not hits]
+# ---------------------------------------------------------------------
+
+
 class AnsibleLogAnalyzer:
     '''
     @summary: Overview of functionality
@@ -248,17 +387,67 @@ class AnsibleLogAnalyzer:
 
         return False
 
-    def place_marker(self, log_file_list, marker, wait_for_marker=False):
+    def get_log_position(self, log_file):
+        '''
+        @summary: Get the current end of the log file.
+        @param log_file: File path.
+        @return: dict with 'inode' and 'offset' of the file, None if the file can't be accessed.
+        '''
+        try:
+            st = os.stat(log_file)
+        except OSError:
+            return None
+        return {'inode': st.st_ino, 'offset': st.st_size}
+
+    def marker_index_file(self, marker):
+        '''
+        @summary: Path of the file recording the log positions of a marker.
+            Keep in sync with marker_index_file() in ansible/library/extract_log.py
+        '''
+        return os.path.join(marker_index_dir, re.sub(r'[^\w.-]', '_', marker) + '.json')
+
+    def save_marker_index(self, marker, positions):
+        '''
+        @summary: Save the log positions recorded before placing a marker, remove outdated index files.
+        @param marker:    Marker placed into log files.
+        @param positions: map <log_file, {'inode': inode, 'offset': offset}>
+        '''
+        try:
+            if not os.path.isdir(marker_index_dir):
+                os.makedirs(marker_index_dir)
+            now = time.time()
+            for filename in os.listdir(marker_index_dir):
+                path = os.path.join(marker_index_dir, filename)
+                if now - os.path.getmtime(path) > marker_index_max_age:
+                    os.remove(path)
+
+            index_file = self.marker_index_file(marker)
+            with open(index_file + '.tmp', 'w') as fp:
+                json.dump({'marker': marker, 'files': positions}, fp)
+            os.rename(index_file + '.tmp', index_file)
+        except (IOError, OSError) as e:
+            # The index is only an optimization, extract_log falls back to scanning the log files
+            self.print_diagnostic_message('failed to save marker index: %s' % repr(e))
+
+    def place_marker(self, log_file_list, marker, wait_for_marker=False, record_position=False):
         '''
         @summary: Place marker into '/dev/log' and each log file specified.
         @param log_file_list : List of file paths, to be applied with marker.
         @param marker:         Marker to be placed into log files.
+        @param record_position: Record offset and inode of the log files before placing the marker,
+                                so that extract_log can seek directly to the marker.
         '''
-
+        positions = {}
         for log_file in log_file_list:
+            if record_position:
+                positions[log_file] = self.get_log_position(log_file)
             self.place_marker_to_file(log_file, marker)
 
+        if record_position:
+            positions[system_log_file] = self.get_log_position(system_log_file)
         self.place_marker_to_syslog(marker)
+        if record_position:
+            self.save_marker_index(marker, dict((k, v) for k, v in positions.items() if v is not None))
         if wait_for_marker:
             if self.wait_for_marker(marker) is False:
                 raise RuntimeError(
@@ -308,8 +497,9 @@ class AnsibleLogAnalyzer:
 
         @param file_list : List of file paths, contains search expressions.
 
-        @return: A regex class instance, corresponding to loaded regex expressions.
-            Will be used for matching operations by callers.
+        @return: A MessageMatcher instance, corresponding to loaded regex expressions,
+            and the list of loaded regex expressions.
+            The MessageMatcher will be used for matching operations by callers.
         '''
         messages_regex = []
 
@@ -360,11 +550,20 @@ class AnsibleLogAnalyzer:
                         print((repr(e)))
                         sys.exit(err_invalid_string_format)
 
-        if (len(messages_regex)):
-            regex = re.compile('|'.join(messages_regex))
-        else:
-            regex = None
-        return regex, messages_regex
+        return self.compile_msg_regex(messages_regex), messages_regex
+    # ---------------------------------------------------------------------
+
+    def compile_msg_regex(self, messages_regex):
+        '''
+        @summary: Compile a list of regular expressions into a MessageMatcher.
+
+        @param messages_regex: List of regular expression strings.
+
+        @return: MessageMatcher instance, None if the list is empty.
+        '''
+        if messages_regex:
+            return MessageMatcher(messages_regex)
+        return None
     # ---------------------------------------------------------------------
 
     def line_matches(self, str, match_messages_regex, ignore_messages_regex):
@@ -388,7 +587,14 @@ class AnsibleLogAnalyzer:
 
         ret_code = False
 
-        if ((match_messages_regex is not None) and (match_messages_regex.findall(str))):
+        if isinstance(match_messages_regex, MessageMatcher):
+            index = match_messages_regex.search(str)
+            if index is not None and not (ignore_messages_regex is not None and ignore_messages_regex.findall(str)):
+                self.print_diagnostic_message('matching line: %s' % str)
+                match_messages_regex.count([index])
+                ret_code = True
+
+        elif ((match_messages_regex is not None) and (match_messages_regex.findall(str))):
             if (ignore_messages_regex is None):
                 ret_code = True
 
@@ -406,10 +612,17 @@ class AnsibleLogAnalyzer:
         '''
 
         ret_code = False
-        if self.run_id.startswith("test_advanced_reboot_test_"):
-            # Use the stricter (and better-performing) match instead of findall, but only when analyzing
-            # logs for advanced reboot test cases. This is so that other test cases are not affected in
-            # case their regexes don't start with .*
+        # Use the stricter (and better-performing) match instead of findall, but only when analyzing
+        # logs for advanced reboot test cases. This is so that other test cases are not affected in
+        # case their regexes don't start with .*
+        anchored = self.run_id.startswith("test_advanced_reboot_test_")
+        if isinstance(expect_messages_regex, MessageMatcher):
+            if not anchored or expect_messages_regex.search(str, anchored=True) is not None:
+                # -- count every expression found in the expected line, it is not missing anymore
+                indexes = expect_messages_regex.search_all(str)
+                expect_messages_regex.count(indexes)
+                ret_code = bool(indexes)
+        elif anchored:
             if (expect_messages_regex is not None) and (expect_messages_regex.match(str)):
                 ret_code = True
         else:
@@ -591,6 +804,8 @@ def usage():
     print('                                 to all log files specified in --logs parameter.')
     print('                                 analyze - perform log analysis of files specified in --logs parameter.')
     print('                                 add_end_marker - add end marker to all log files specified in --logs parameter.')           # noqa: E501
+    print('                                 analyze_to_json - analyze already extracted files specified in --logs parameter')           # noqa: E501
+    print('                                 and print the results as JSON, no marker is placed.')
     print('--out_dir path                   Directory path where to place output files, ')
     print('                                 must be present when --action == analyze')
     print('--logs path{,path}               List of full paths to log files to be analyzed.')
@@ -609,6 +824,9 @@ def usage():
     print('                                 All the strings from these files will be expected to present')
     print('                                 in one of specified log files during the analysis. Must be present')
     print('                                 when action == analyze.')
+    print('--regex_file path                JSON file with "match", "ignore" and "expect" lists of regular')
+    print('                                 expressions, used instead of the *_files_in when action == analyze_to_json.')  # noqa: E501
+    print('--maximum_log_length length      Lines longer than length are skipped when action == analyze_to_json.')
 
 # ---------------------------------------------------------------------
 
@@ -625,6 +843,10 @@ def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in,
 
     if action in ['init', 'add_end_marker', 'add_start_ignore_mark', 'add_end_ignore_mark']:
         ret_code = True
+    elif action == 'analyze_to_json':
+        if log_files_in is None or len(log_files_in) == 0:
+            print('ERROR: missing required logs for analyze_to_json action')
+            ret_code = False
     elif action == 'analyze':
         if out_dir is None or len(out_dir) == 0:
             print('ERROR: missing required out_dir for analyze action')
@@ -661,7 +883,7 @@ def check_run_id(run_id):
 # ---------------------------------------------------------------------
 
 
-def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_e, unused_regex_messages):
+def write_result_file(run_id, out_dir, analysis_result_per_file, unused_regex_messages, match_regex_hits=None):
     '''
     @summary: Write results of analysis into a file.
 
@@ -671,12 +893,15 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
 
     @param analysis_result_per_file: map file_name: [list of found matching strings]
 
+    @param unused_regex_messages: list of expected regular expressions which were not found.
+
+    @param match_regex_hits: map <regular expression, number of matching lines reported>
+
     @return: void
     '''
 
     match_cnt = 0
     expected_cnt = 0
-    expected_lines_total = []
 
     with open(out_dir + "/result.loganalysis." + run_id + ".log", 'w') as out_file:
         for key, val in list(analysis_result_per_file.items()):
@@ -694,7 +919,6 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
 
             for i in expected_lines:
                 out_file.write(i)
-                expected_lines_total.append(i)
             out_file.write('\nExpected and found matches:%d\n' %
                            len(expected_lines))
             expected_cnt += len(expected_lines)
@@ -702,13 +926,8 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
         out_file.write(
             "\n-------------------------------------------------\n\n")
         out_file.write('Total matches:%d\n' % match_cnt)
-        # Find unused regex matches
-        for regex in messages_regex_e:
-            for line in expected_lines_total:
-                if re.search(regex, line):
-                    break
-            else:
-                unused_regex_messages.append(regex)
+        for regex, hits in sorted((match_regex_hits or {}).items(), key=lambda item: -item[1]):
+            out_file.write('    %d matches of: %s\n' % (hits, regex))
 
         out_file.write('Total expected and found matches:%d\n' % expected_cnt)
         out_file.write('Total expected but not found matches: %d\n\n' %
@@ -763,6 +982,46 @@ def write_summary_file(run_id, out_dir, analysis_result_per_file, unused_regex_m
 # ---------------------------------------------------------------------
 
 
+def analyze_to_json(analyzer, log_file_list, regex_file, match_files_in, ignore_files_in, expect_files_in,
+                    maximum_log_length=None):
+    '''
+    @summary: Analyze the extracted log files next to them and print only the results as JSON.
+
+    The regular expressions are loaded from the JSON regex_file if it is given, otherwise
+    from the match/ignore/expect files.
+
+    @return: The results printed, map with keys:
+        'files': map <file_name, [list of matching strings, list of expected strings]>
+        'unused_expected_regexp': list of expected regular expressions which were not found
+        'match_regexp_hits': map <regular expression, number of matching lines reported>
+    '''
+    if regex_file:
+        with open(regex_file) as fp:
+            regex = json.load(fp)
+        match_list = regex.get('match', [])
+        ignore_list = regex.get('ignore', [])
+        expect_list = regex.get('expect', [])
+    else:
+        match_list = analyzer.create_msg_regex(match_files_in.split(tokenizer))[1] if match_files_in else []
+        ignore_list = analyzer.create_msg_regex(ignore_files_in.split(tokenizer))[1] if ignore_files_in else []
+        expect_list = analyzer.create_msg_regex(expect_files_in.split(tokenizer))[1] if expect_files_in else []
+
+    match_messages_regex = analyzer.compile_msg_regex(match_list)
+    ignore_messages_regex = analyzer.compile_msg_regex(ignore_list)
+    expect_messages_regex = analyzer.compile_msg_regex(expect_list)
+
+    result = analyzer.analyze_file_list(log_file_list, match_messages_regex, ignore_messages_regex,
+                                        expect_messages_regex, maximum_log_length=maximum_log_length)
+    output = {
+        'files': result,
+        'unused_expected_regexp': expect_messages_regex.unused_patterns() if expect_messages_regex else [],
+        'match_regexp_hits': match_messages_regex.hit_counts() if match_messages_regex else {}
+    }
+    print(json.dumps(output))
+    return output
+# ---------------------------------------------------------------------
+
+
 def main(argv):
 
     action = None
@@ -773,13 +1032,16 @@ def main(argv):
     match_files_in = None
     ignore_files_in = None
     expect_files_in = None
+    regex_file = None
+    maximum_log_length = None
     verbose = False
 
     try:
         opts, args = getopt.getopt(argv, "a:r:s:l:o:m:i:e:vh",
                                    ["action=", "run_id=", "start_marker=", "logs=",
                                     "out_dir=", "match_files_in=", "ignore_files_in=",
-                                    "expect_files_in=", "verbose", "help"])
+                                    "expect_files_in=", "regex_file=", "maximum_log_length=",
+                                    "verbose", "help"])
 
     except getopt.GetoptError:
         print("Invalid option specified")
@@ -815,6 +1077,12 @@ def main(argv):
         elif (opt in ("-e", "--expect_files_in")):
             expect_files_in = arg
 
+        elif (opt == "--regex_file"):
+            regex_file = arg
+
+        elif (opt == "--maximum_log_length"):
+            maximum_log_length = int(arg)
+
         elif (opt in ("-v", "--verbose")):
             verbose = True
 
@@ -829,7 +1097,7 @@ def main(argv):
 
     result = {}
     if action == "init":
-        analyzer.place_marker(log_file_list, analyzer.create_start_marker())
+        analyzer.place_marker(log_file_list, analyzer.create_start_marker(), record_position=True)
         return 0
     elif action == "analyze":
         match_file_list = match_files_in.split(tokenizer)
@@ -852,10 +1120,15 @@ def main(argv):
 
         result = analyzer.analyze_file_list(log_file_list, match_messages_regex,
                                             ignore_messages_regex, expect_messages_regex)
-        unused_regex_messages = []
+        unused_regex_messages = expect_messages_regex.unused_patterns() if expect_messages_regex else []
+        match_regex_hits = match_messages_regex.hit_counts() if match_messages_regex else {}
         write_result_file(run_id, out_dir, result,
-                          messages_regex_e, unused_regex_messages)
+                          unused_regex_messages, match_regex_hits)
         write_summary_file(run_id, out_dir, result, unused_regex_messages)
+    elif action == "analyze_to_json":
+        analyze_to_json(analyzer, log_file_list, regex_file, match_files_in, ignore_files_in, expect_files_in,
+                        maximum_log_length=maximum_log_length)
+        return 0
     elif action == "add_end_marker":
         analyzer.place_marker(
             log_file_list, analyzer.create_end_marker(), wait_for_marker=True)
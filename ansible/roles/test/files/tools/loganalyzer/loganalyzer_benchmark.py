@@ -0,0 +1,124 @@
+'''
+Description:    Benchmark of the LogAnalyzer message matching.
+
+                Replays a captured syslog through the legacy matching, which joins all the
+                match/ignore/expect regular expressions into alternations, and through
+                MessageMatcher. Verifies both report the same matching, expected and missing
+                expected messages and prints the time spent by each of them.
+
+Usage:          python loganalyzer_benchmark.py --logs /tmp/syslog \
+                    [--match_files_in loganalyzer_common_match.txt] \
+                    [--ignore_files_in loganalyzer_common_ignore.txt] \
+                    [--expect_files_in loganalyzer_common_expect.txt] \
+                    [--run_id benchmark] [--repeat 3]
+'''
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from loganalyzer import AnsibleLogAnalyzer, MAX_LOG_MESSAGE_LENGTH
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+COMMON_MATCH = os.path.join(TOOLS_DIR, "loganalyzer_common_match.txt")
+COMMON_IGNORE = os.path.join(TOOLS_DIR, "loganalyzer_common_ignore.txt")
+COMMON_EXPECT = os.path.join(TOOLS_DIR, "loganalyzer_common_expect.txt")
+
+
+def legacy_unused_regex(expect_regex, expected_lines):
+    unused = []
+    for regex in expect_regex:
+        for line in expected_lines:
+            if re.search(regex, line):
+                break
+        else:
+            unused.append(regex)
+    return unused
+
+
+def analyze(analyzer, lines, match_regex, ignore_regex, expect_regex):
+    '''
+    @summary: Analyze lines the same way as AnsibleLogAnalyzer.analyze_file() does for
+              a log without markers.
+    @return: matching lines, expected lines
+    '''
+    matching_lines = []
+    expected_lines = []
+    for line in lines:
+        if len(line) > MAX_LOG_MESSAGE_LENGTH:
+            continue
+        if analyzer.line_is_expected(line, expect_regex):
+            expected_lines.append(line)
+        elif analyzer.line_matches(line, match_regex, ignore_regex):
+            matching_lines.append(line)
+    return matching_lines, expected_lines
+
+
+def run_legacy(analyzer, lines, match, ignore, expect):
+    match_regex = re.compile('|'.join(match)) if match else None
+    ignore_regex = re.compile('|'.join(ignore)) if ignore else None
+    expect_regex = re.compile('|'.join(expect)) if expect else None
+    matching_lines, expected_lines = analyze(analyzer, lines, match_regex, ignore_regex, expect_regex)
+    return matching_lines, expected_lines, legacy_unused_regex(expect, expected_lines)
+
+
+def run_matcher(analyzer, lines, match, ignore, expect):
+    match_regex = analyzer.compile_msg_regex(match)
+    ignore_regex = analyzer.compile_msg_regex(ignore)
+    expect_regex = analyzer.compile_msg_regex(expect)
+    matching_lines, expected_lines = analyze(analyzer, lines, match_regex, ignore_regex, expect_regex)
+    return matching_lines, expected_lines, expect_regex.unused_patterns() if expect_regex else []
+
+
+def measure(func, repeat, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.time()
+        result = func(*args)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark LogAnalyzer message matching")
+    parser.add_argument("--logs", required=True, help="Captured syslog file to replay")
+    parser.add_argument("--match_files_in", default=COMMON_MATCH)
+    parser.add_argument("--ignore_files_in", default=COMMON_IGNORE)
+    parser.add_argument("--expect_files_in", default=COMMON_EXPECT)
+    parser.add_argument("--run_id", default="benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    analyzer = AnsibleLogAnalyzer(args.run_id, False)
+    match = analyzer.create_msg_regex(args.match_files_in.split(','))[1]
+    ignore = analyzer.create_msg_regex(args.ignore_files_in.split(','))[1]
+    expect = analyzer.create_msg_regex(args.expect_files_in.split(','))[1]
+
+    with open(args.logs, 'r', errors='replace') as log_file:
+        lines = log_file.readlines()
+
+    print("lines: %d, match regex: %d, ignore regex: %d, expect regex: %d" %
+          (len(lines), len(match), len(ignore), len(expect)))
+
+    legacy_time, legacy_result = measure(run_legacy, args.repeat, analyzer, lines, match, ignore, expect)
+    matcher_time, matcher_result = measure(run_matcher, args.repeat, analyzer, lines, match, ignore, expect)
+
+    print("legacy alternation: %.3fs" % legacy_time)
+    print("MessageMatcher:     %.3fs" % matcher_time)
+    if matcher_time:
+        print("speedup:            %.1fx" % (legacy_time / matcher_time))
+    print("matches: %d, expected matches: %d, expected missing: %d" %
+          tuple(len(item) for item in matcher_result))
+
+    if legacy_result != matcher_result:
+        print("ERROR: MessageMatcher result differs from legacy alternation")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,7 @@
 
 from __future__ import print_function
 
+import copy
 import json
 import logging
 import os
@@ -36,6 +37,7 @@ DUMP_FLOW_CMD = 'ovs-ofctl --names dump-flows {}'
 DEL_FLOW_CMD = 'ovs-ofctl --names del-flows {} in_port="{}"'
 ADD_FLOW_CMD = 'ovs-ofctl --names add-flow {} in_port="{}",actions={}'
 MOD_FLOW_CMD = 'ovs-ofctl --names mod-flows {} in_port="{}",actions={}'
+REPLACE_FLOWS_CMD = 'ovs-ofctl --names{} replace-flows {} -'
 
 RANDOM = 'random'
 TOGGLE = 'toggle'
@@ -106,11 +108,12 @@ def adaptive_name(template, vm_set, index):
     return rendered_name
 
 
-def run_cmd(cmdline):
+def run_cmd(cmdline, stdin_data=None):
     """Use subprocess to run a command line with shell=True
 
     Args:
         cmdline (string): The command to be executed.
+        stdin_data (string): Optional data written to stdin of the command.
 
     Raises:
         Exception: If return code of running command line is not zero, an exception is raised.
@@ -124,7 +127,7 @@ def run_cmd(cmdline):
         stdout=subprocess.PIPE,
         stdin=subprocess.PIPE,
         stderr=subprocess.PIPE)
-    stdout, stderr = process.communicate()
+    stdout, stderr = process.communicate(stdin_data.encode('utf-8') if stdin_data is not None else None)
     ret_code = process.returncode
 
     msg = {
@@ -169,6 +172,9 @@ class Mux(object):
     All operations related with a single mux bridge is encapsulated in this class.
     '''
 
+    # Cleared when ovs-ofctl of the test server does not support '--bundle' for replace-flows
+    bundle_supported = True
+
     def __init__(self, vm_set, port_index):
         # Flag for skipping bridge without ports attached to it.
         # Workaround for uncleaned mbr-xx bridges on server
@@ -395,18 +401,10 @@ class Mux(object):
         """
         with self.lock:
             self.info('>>>>>> updating mux active side from {} to {}'.format(self.active_side, new_active_side))
-            if new_active_side == RANDOM:
-                new_active_side = random.choice([UPPER_TOR, LOWER_TOR])
-
-            if self.active_side == new_active_side:
-                self.info('current active_side={}, new_active_side={}, no need to change. <<<<<<'
-                          .format(self.active_side, new_active_side))
+            new_active_side = self._resolve_active_side(new_active_side)
+            if new_active_side is None:
                 return
 
-            # Need to toggle active side
-            if new_active_side == TOGGLE:
-                new_active_side = UPPER_TOR if self.active_side == LOWER_TOR else LOWER_TOR
-
             new_active_port = self.ports[new_active_side]
 
             if len(self.flows['downstream']['out_sides']) == 1:
@@ -440,6 +438,85 @@ class Mux(object):
 
             self.info('updated mux active side to {} <<<<<<'.format(new_active_side))
 
+    def _resolve_active_side(self, new_active_side):
+        """Resolve RANDOM and TOGGLE to the new active side.
+
+        Returns:
+            string: The new active side, or None if it is the current active side.
+        """
+        if new_active_side == RANDOM:
+            new_active_side = random.choice([UPPER_TOR, LOWER_TOR])
+
+        if self.active_side == new_active_side:
+            self.info('current active_side={}, new_active_side={}, no need to change. <<<<<<'
+                      .format(self.active_side, new_active_side))
+            return None
+
+        # Need to toggle active side
+        if new_active_side == TOGGLE:
+            new_active_side = UPPER_TOR if self.active_side == LOWER_TOR else LOWER_TOR
+        return new_active_side
+
+    def _flow_specs(self, flows):
+        """Render a flows dict, same format as self.flows, to the flow specs of the bridge."""
+        specs = []
+        for direction in ['upstream', 'downstream']:
+            in_side = flows[direction]['in_side']
+            out_sides = flows[direction]['out_sides']
+            if in_side is None or len(out_sides) == 0:
+                continue
+            action_desc = ','.join(['{}:"{}"'.format(OUTPUT, self.ports[out_side]) for out_side in out_sides])
+            specs.append('in_port="{}",actions={}'.format(self.ports[in_side], action_desc))
+        return specs
+
+    def _replace_flows(self, flows):
+        """Replace all the flows of the bridge with the flows dict by a single ovs-ofctl command.
+
+        The flows are replaced in an OpenFlow bundle, so the bridge never forwards with half of the new flows. If
+        ovs-ofctl or the switch does not support bundles, fall back to replace-flows without a bundle, which still
+        only sends the flow changes.
+        """
+        specs = '\n'.join(self._flow_specs(flows)) + '\n'
+        if Mux.bundle_supported:
+            try:
+                run_cmd(REPLACE_FLOWS_CMD.format(' --bundle', self.bridge), stdin_data=specs)
+                return
+            except Exception as e:
+                self.error('bundled replace-flows failed, retrying without bundle: {}'.format(repr(e)))
+        run_cmd(REPLACE_FLOWS_CMD.format('', self.bridge), stdin_data=specs)
+        if Mux.bundle_supported:
+            app.logger.warning('replace-flows without bundle worked, not using bundles anymore')
+            Mux.bundle_supported = False
+
+    def switch_active_side(self, new_active_side):
+        """Set the active side of the mux bridge with a single bundled replace-flows.
+
+        Same as set_active_side, but the desired flows are computed from the flows kept in memory and applied to the
+        bridge by one ovs-ofctl command. The flows and state are only updated after the command succeeded.
+
+        Returns:
+            boolean: True if the active side changed.
+        """
+        with self.lock:
+            self.info('>>>>>> switching mux active side from {} to {}'.format(self.active_side, new_active_side))
+            new_active_side = self._resolve_active_side(new_active_side)
+            if new_active_side is None:
+                return False
+
+            flows = copy.deepcopy(self.flows)
+            flows['downstream']['in_side'] = new_active_side
+            # If currently downstream flow action is drop, there is no downstream flow to move.
+            if len(flows['downstream']['out_sides']) == 1:
+                flows['downstream']['out_sides'] = [NIC]
+                self._replace_flows(flows)
+
+            self._active_standby_state_helper(new_active_side)
+            self.flows = flows
+            self.flap_counter += 1
+
+            self.info('switched mux active side to {} <<<<<<'.format(new_active_side))
+            return True
+
     def _update_downstream_flow(self, new_action):
         self.debug('updating downstream flow, new_action={}'.format(new_action))
 
@@ -565,11 +642,13 @@ class Mux(object):
 class Muxes(object):
 
     MUXES_CONCURRENCY = 4
+    BULK_CONCURRENCY = 16
 
     def __init__(self, vm_set):
         self.vm_set = vm_set
         self.muxes = {}
         self.thread_pool = ThreadPool(Muxes.MUXES_CONCURRENCY)
+        self.bulk_thread_pool = ThreadPool(Muxes.BULK_CONCURRENCY)
         for bridge in self._mux_bridges():
             bridge_fields = bridge.split('-')
             port_index = int(bridge_fields[-1])
@@ -616,9 +695,38 @@ class Muxes(object):
             mux.set_active_side(new_active_side)
             return mux.status
         else:
-            list(self.thread_pool.map(lambda args: Mux.set_active_side(*args),
-                                      [(mux, new_active_side) for mux in self.muxes.values()]))
-            return {mux.bridge: mux.status for mux in self.muxes.values()}
+            return self.bulk_set_active_side(new_active_side)['muxes']
+
+    def bulk_set_active_side(self, new_active_side, port_indexes=None):
+        """Set the active side of many muxes in parallel, one bundled replace-flows per bridge.
+
+        Args:
+            new_active_side (string): One of "upper_tor", "lower_tor", "toggle" or "random".
+            port_indexes (list): Index of the ports to switch. All the muxes if not specified.
+
+        Returns:
+            dict: Status of the switched muxes, and the switchover latency of each port, which is the seconds from
+                the start of the bulk operation to the flows of the port being committed.
+        """
+        if port_indexes is None:
+            muxes = list(self.muxes.values())
+        else:
+            muxes = [self._port_to_mux(port_index) for port_index in port_indexes]
+
+        start_time = time.time()
+
+        def _switch(mux):
+            changed = mux.switch_active_side(new_active_side)
+            return mux, changed, time.time() - start_time
+
+        results = list(self.bulk_thread_pool.map(_switch, muxes))
+        app.logger.info('Switched {} of {} muxes to {} in {:.3f}s'.format(
+            len([changed for _, changed, _ in results if changed]), len(results), new_active_side,
+            time.time() - start_time))
+        return {
+            'muxes': {mux.bridge: mux.status for mux, _, _ in results},
+            'switchover_latency': {str(mux.port_index): latency for mux, _, latency in results}
+        }
 
     def update_flows(self, new_action, out_sides, port_index=None):
         if port_index is not None:
@@ -741,7 +849,8 @@ def all_mux_status(vm_set):
     For GET request, return detailed status of all the mux Y cables belong to the specified vm_set.
     For POST request, update mux active side according to poseted data. Posted data format:
         {"active_side": "upper_tor|upper_tor|random"}
-    The value of "active_side" must be one of "upper_tor", "lower_tor", "toggle" or "random".
+    The value of "active_side" must be one of "upper_tor", "lower_tor", "toggle" or "random". The muxes are switched
+    the same way as by /mux/<vm_set>/bulk, with one bundled replace-flows per bridge.
 
     Args:
         vm_set (string): The vm_set of test setup.
@@ -762,6 +871,40 @@ def all_mux_status(vm_set):
         return g_muxes.set_active_side(data['active_side'])
 
 
+@app.route('/mux/<vm_set>/bulk', methods=['POST'])
+def bulk_mux_status(vm_set):
+    """Handler for setting active side of many mux Y cables at once.
+
+    Posted data format:
+        {"active_side": "upper_tor|lower_tor|toggle|random", "port_indexes": [0, 1, ...]}
+    "port_indexes" is optional, all the mux Y cables belong to the specified vm_set are switched without it.
+
+    Args:
+        vm_set (string): The vm_set of test setup.
+
+    Returns:
+        object: Return a flask response object.
+    """
+    _validate_vm_set(vm_set)
+    data = _validate_posted_data(request)
+    port_indexes = data.get('port_indexes')
+    if port_indexes is not None:
+        if not isinstance(port_indexes, list) \
+                or len([port_index for port_index in port_indexes if not isinstance(port_index, int)]) > 0:
+            abort(400, description='remote_addr={} method={} url={} data={} msg={}'.format(
+                request.remote_addr,
+                request.method,
+                request.url,
+                json.dumps(data),
+                'Expect "port_indexes" to be a list of integers'
+            ))
+        unknown_ports = [port_index for port_index in port_indexes if not g_muxes.has_mux(port_index)]
+        if unknown_ports:
+            abort(404, 'Unknown bridge, vm_set={}, port_indexes={}'.format(vm_set, unknown_ports))
+    app.logger.info('===== {} POST {} with {} ====='.format(request.remote_addr, request.url, json.dumps(data)))
+    return g_muxes.bulk_set_active_side(data['active_side'], port_indexes)
+
+
 def _validate_out_sides(request):
     """Validate the posted data for updating flow action.
 
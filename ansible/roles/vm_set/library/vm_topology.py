@@ -1,5 +1,6 @@
 #!/usr/bin/python
 
+from collections import namedtuple
 from contextlib import contextmanager
 import functools
 import hashlib
@@ -92,6 +93,8 @@ Parameters:
     - duts_mgmt_port: duts mgmt port
     - duts_name: duts names
     - fp_mtu: MTU for FP ports
+    - reconcile: for 'bind' and 'renumber', snapshot the actual OVS bridges and links once and only configure the
+      bridges, ports and veth pairs which are not in the desired state, instead of rebuilding all of them
 '''
 
 EXAMPLES = '''
@@ -165,6 +168,9 @@ RETRIES = 10
 # name of interface must be less than or equal to 15 bytes.
 MAX_INTF_LEN = 15
 
+# Errors of "ovs-ofctl --bundle" when ovs-ofctl or the bridge doesn't support OpenFlow 1.4 bundles
+OVS_BUNDLE_UNSUPPORTED_REGEX = r'bundle|OFPBFC_|version negotiation failed'
+
 VS_CHASSIS_INBAND_BRIDGE_NAME_TEMPLATE = "br-{vm_set_name}-inb"
 VS_CHASSIS_MIDPLANE_BRIDGE_NAME_TEMPLATE = "br-{vm_set_name}-mid"
 
@@ -230,6 +236,271 @@ def adaptive_temporary_interface(vm_set_name, interface_name, reserved_space=0):
     return t_int_if
 
 
+class OvsTransaction(object):
+    """
+    Accumulate ovs-vsctl commands and run them as one ovs-vsctl call.
+
+    ovs-vsctl applies the commands separated by "--" in one OVSDB transaction, so the ports of a bridge are
+    added/removed with one ovs-vsctl call instead of one call per port.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def add(self, command):
+        """Add an ovs-vsctl command without the leading 'ovs-vsctl', e.g. '--may-exist add-br br1'."""
+        self.commands.append(command)
+
+    def add_bridge(self, bridge):
+        self.add('--may-exist add-br %s' % bridge)
+
+    def del_bridge(self, bridge):
+        self.add('--if-exists del-br %s' % bridge)
+
+    def add_port(self, bridge, port):
+        self.add('--may-exist add-port %s %s' % (bridge, port))
+
+    def del_port(self, port, bridge=None):
+        """Delete a port from a bridge, from whichever bridge it is on if bridge is None."""
+        if bridge is None:
+            self.add('--if-exists del-port %s' % port)
+        else:
+            self.add('--if-exists del-port %s %s' % (bridge, port))
+
+    def commit(self, processes=None):
+        """
+        Run the accumulated commands.
+
+        Args:
+            processes (list): If specified, start the ovs-vsctl call and append its process to the list instead of
+                waiting for it, see VMTopologyWorker.safe_subprocess_manager.
+        """
+        if not self.commands:
+            return
+        cmdline = 'ovs-vsctl -- %s' % ' -- '.join(self.commands)
+        self.commands = []
+        if processes is None:
+            VMTopology.cmd(cmdline)
+        else:
+            processes.append(VMTopology.fire_and_forget(cmdline))
+
+
+class OvsFlowBundle(object):
+    """
+    Accumulate the OpenFlow rules of an ovs bridge and replace the flows of the bridge with them.
+
+    The flows are written to a file and replaced with one "ovs-ofctl --bundle replace-flows" call, so the old flows
+    are removed and the new flows are added atomically, instead of one ovs-ofctl call per flow. If the bridge doesn't
+    support OpenFlow 1.4 bundles, the flows are replaced without a bundle, other errors are raised.
+    """
+
+    bundle_supported = True
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+        self.flows = []
+
+    def add_flow(self, flow):
+        """Add a flow, e.g. 'table=0,in_port=1,action=output:2'."""
+        self.flows.append(flow)
+
+    def commit(self, tmpdir=None):
+        with tempfile.NamedTemporaryFile("w", dir=tmpdir, prefix="flows_", delete=False) as f:
+            for flow in self.flows:
+                f.write(flow + "\n")
+        try:
+            if OvsFlowBundle.bundle_supported:
+                try:
+                    VMTopology.cmd('ovs-ofctl --bundle replace-flows %s %s' % (self.bridge, f.name))
+                    return
+                except Exception as e:
+                    # Only look at the error output, the command line has "--bundle" too
+                    if not re.search(OVS_BUNDLE_UNSUPPORTED_REGEX, str(e).split(' cmd="')[0], re.IGNORECASE):
+                        raise
+                    logging.warning("Bundles are not supported by bridge %s, replace flows without bundle: %s" %
+                                    (self.bridge, str(e)))
+                    OvsFlowBundle.bundle_supported = False
+            VMTopology.cmd('ovs-ofctl replace-flows %s %s' % (self.bridge, f.name))
+        finally:
+            os.remove(f.name)
+
+
+class IpBatch(object):
+    """
+    Accumulate ip commands of a network namespace and run them with one "ip -batch" call.
+
+    The commands are run in the host network namespace, in the network namespace of a docker if pid is specified,
+    or in a network namespace created by "ip netns" if netns is specified.
+    """
+
+    def __init__(self, pid=None, netns=None, family=None, force=False):
+        """
+        Args:
+            pid (str, optional): Pid of docker.
+            netns (str, optional): netns name.
+            family (int, optional): 4 or 6 to run the commands as "ip -4"/"ip -6".
+            force (bool, optional): Don't stop at the first failed command.
+        """
+        self.pid = pid
+        self.netns = netns
+        self.options = ''
+        if family is not None:
+            self.options += ' -%d' % family
+        if force:
+            self.options += ' -force'
+        self.commands = []
+
+    def add(self, command):
+        """Add an ip command without the leading 'ip', e.g. 'link set eth0 up'."""
+        self.commands.append(command)
+
+    def commit(self, ignore_errors=False):
+        if not self.commands:
+            return
+        with tempfile.NamedTemporaryFile("w", prefix="ip_batch_", delete=False) as f:
+            for command in self.commands:
+                f.write(command + "\n")
+        self.commands = []
+        if self.pid is not None:
+            cmdline = 'nsenter -t %s -n ip%s -batch %s' % (self.pid, self.options, f.name)
+        elif self.netns is not None:
+            cmdline = 'ip netns exec %s ip%s -batch %s' % (self.netns, self.options, f.name)
+        else:
+            cmdline = 'ip%s -batch %s' % (self.options, f.name)
+        try:
+            VMTopology.cmd(cmdline, ignore_errors=ignore_errors)
+        finally:
+            os.remove(f.name)
+
+
+Link = namedtuple('Link', ['index', 'peer', 'master', 'up', 'mtu'])
+
+
+class TopologySnapshot(object):
+    """
+    Actual state of the OVS bridges and of the links in the host, PTF docker and netns network namespaces.
+
+    The state is read once with a few commands. In reconcile mode, 'bind' and 'renumber' compare the desired state
+    derived from the topology with the snapshot and only configure the bridges, ports and veth pairs which are not
+    in the desired state yet.
+    """
+
+    LINK_REGEX = re.compile(r'^(\d+):\s+([^:@\s]+)(?:@(\S+))?:\s+<([^>]*)>.*\smtu\s+(\d+)')
+    MASTER_REGEX = re.compile(r'\smaster\s+(\S+)')
+
+    def __init__(self, pid=None, netns=None):
+        self.pid = pid
+        self.netns = netns
+        self.bridge_ports = {}
+        self.ofports = {}
+        self.host_links = {}
+        self.docker_links = {}
+        self.netns_links = {}
+
+    def take(self):
+        self.bridge_ports, self.ofports = TopologySnapshot.read_ovs()
+        self.host_links = TopologySnapshot.read_links()
+        if self.pid is not None:
+            self.docker_links = TopologySnapshot.read_links(pid=self.pid)
+        if self.netns is not None and os.path.exists("/var/run/netns/%s" % self.netns):
+            self.netns_links = TopologySnapshot.read_links(netns=self.netns)
+        logging.info('=== Topology snapshot: %d ovs bridges, %d host links, %d docker links, %d netns links ===' %
+                     (len(self.bridge_ports), len(self.host_links), len(self.docker_links), len(self.netns_links)))
+        return self
+
+    @staticmethod
+    def _ovsdb_list(table, columns):
+        out = VMTopology.cmd('ovs-vsctl --format=json --columns=%s list %s' % (','.join(columns), table))
+        return json.loads(out)['data']
+
+    @staticmethod
+    def _ovsdb_set(value):
+        # OVSDB json encodes a set with one element as the element itself
+        if isinstance(value, list) and len(value) == 2 and value[0] == 'set':
+            return value[1]
+        return [value]
+
+    @staticmethod
+    def read_ovs():
+        """
+        Read the ports of all the ovs bridges with 3 ovs-vsctl calls.
+
+        Returns:
+            tuple: dict of the port names of each bridge, dict of the OpenFlow port number of each interface.
+        """
+        port_names = {}
+        for uuid, name in TopologySnapshot._ovsdb_list('Port', ['_uuid', 'name']):
+            port_names[uuid[1]] = name
+
+        bridge_ports = {}
+        for name, ports in TopologySnapshot._ovsdb_list('Bridge', ['name', 'ports']):
+            bridge_ports[name] = set(port_names[uuid[1]] for uuid in TopologySnapshot._ovsdb_set(ports)
+                                     if uuid[1] in port_names)
+
+        ofports = {}
+        for name, ofport in TopologySnapshot._ovsdb_list('Interface', ['name', 'ofport']):
+            # ofport is an empty set before the interface is added to the datapath and -1 if it failed
+            if isinstance(ofport, int) and ofport > 0:
+                ofports[name] = str(ofport)
+        return bridge_ports, ofports
+
+    @staticmethod
+    def read_links(pid=None, netns=None):
+        """Read the links of a network namespace with one "ip -o link show" call."""
+        if pid is not None:
+            cmdline = 'nsenter -t %s -n ip -o link show' % pid
+        elif netns is not None:
+            cmdline = 'ip netns exec %s ip -o link show' % netns
+        else:
+            cmdline = 'ip -o link show'
+        links = {}
+        for line in VMTopology.cmd(cmdline).splitlines():
+            matched = TopologySnapshot.LINK_REGEX.match(line)
+            if not matched:
+                continue
+            index, name, peer, flags, mtu = matched.groups()
+            master = TopologySnapshot.MASTER_REGEX.search(line)
+            links[name] = Link(int(index), peer, master.group(1) if master else None,
+                               'UP' in flags.split(','), int(mtu))
+        return links
+
+    def links(self, pid=None, netns=None):
+        if pid is not None:
+            return self.docker_links
+        if netns is not None:
+            return self.netns_links
+        return self.host_links
+
+    def link_ready(self, name, mtu=DEFAULT_MTU, pid=None, netns=None):
+        """Check if a link exists in the network namespace, is up and has the mtu."""
+        link = self.links(pid=pid, netns=netns).get(name)
+        return link is not None and link.up and (mtu == DEFAULT_MTU or link.mtu == mtu)
+
+    def veth_ready(self, ext_if, int_if, mtu=DEFAULT_MTU, pid=None, netns=None):
+        """Check if ext_if in the host and int_if in the docker or netns are the ends of a veth pair and are ready."""
+        if not self.link_ready(ext_if, mtu) or not self.link_ready(int_if, mtu, pid=pid, netns=netns):
+            return False
+        ext_link = self.host_links[ext_if]
+        int_link = self.links(pid=pid, netns=netns)[int_if]
+        # the peer of a veth in another network namespace is shown as if<peer ifindex>
+        return ext_link.peer == 'if%d' % int_link.index and int_link.peer == 'if%d' % ext_link.index
+
+    def bridge_ready(self, bridge, mtu=DEFAULT_MTU):
+        return bridge in self.bridge_ports and self.link_ready(bridge, mtu)
+
+    def get_ovs_port_bindings(self, bridge, ports):
+        """
+        Get the OpenFlow port numbers of the ports of an ovs bridge.
+
+        Returns:
+            dict: OpenFlow port number of each port of the bridge, None if one of the ports is not on the bridge.
+        """
+        br_ports = self.bridge_ports.get(bridge)
+        if br_ports is None or any(port not in br_ports or port not in self.ofports for port in ports):
+            return None
+        return dict((port, self.ofports[port]) for port in br_ports if port in self.ofports)
+
+
 class VMTopology(object):
 
     def __init__(self, vm_names, vm_properties, fp_mtu, max_fp_num, topo, worker, current_vm_name=None,
@@ -247,6 +518,7 @@ class VMTopology(object):
         self.worker = worker
         self._is_dpu = is_dpu
         self._is_vs_chassis = is_vs_chassis
+        self.snapshot = None
 
     def init(self, vm_set_name, vm_base, duts_fp_ports, duts_name, ptf_exists=True, check_bridge=True):
         self.vm_set_name = vm_set_name
@@ -444,6 +716,10 @@ class VMTopology(object):
         self._host_interfaces_active_active = self._parse_host_interfaces(
             value)
 
+    def take_snapshot(self):
+        """Snapshot the actual state of the topology, the following operations only configure the delta."""
+        self.snapshot = TopologySnapshot(pid=self.pid, netns=self.netns).take()
+
     def extract_vm_vlans(self):
         vlans = {}
         for vm, attr in self.VMs.items():
@@ -460,6 +736,9 @@ class VMTopology(object):
 
     def add_network_namespace(self):
         """Create a network namespace."""
+        if self.snapshot is not None and os.path.exists("/var/run/netns/%s" % self.netns):
+            logging.info('=== Network namespace %s is already in place, skip ===' % self.netns)
+            return
         self.delete_network_namespace()
         VMTopology.cmd("ip netns add %s" % self.netns)
 
@@ -480,28 +759,42 @@ class VMTopology(object):
                                 default_gw=mgmt_gw, default_gw_v6=mgmt_gw_v6)
 
     def create_bridges(self):
+        fp_br_names = []
         for vm in self.vm_names:
             for fp_num in range(self.max_fp_num):
-                fp_br_name = adaptive_name(OVS_FP_BRIDGE_TEMPLATE, vm, fp_num)
-                self.create_ovs_bridge(fp_br_name, self.fp_mtu)
+                fp_br_names.append(adaptive_name(OVS_FP_BRIDGE_TEMPLATE, vm, fp_num))
+        self.create_ovs_bridges(fp_br_names, self.fp_mtu)
 
     def create_ovs_bridge(self, bridge_name, mtu):
-        logging.info('=== Create bridge %s with mtu %d ===' %
-                     (bridge_name, mtu))
-        VMTopology.cmd('ovs-vsctl --may-exist add-br %s' % bridge_name)
-
-        if mtu != DEFAULT_MTU:
-            VMTopology.cmd('ifconfig %s mtu %d' % (bridge_name, mtu))
-
-        VMTopology.cmd('ifconfig %s up' % bridge_name)
+        self.create_ovs_bridges([bridge_name], mtu)
+
+    def create_ovs_bridges(self, bridge_names, mtu):
+        """Create the ovs bridges with one ovs-vsctl call and bring them up with one ip call."""
+        txn = OvsTransaction()
+        batch = IpBatch()
+        for bridge_name in bridge_names:
+            if self.snapshot is not None and self.snapshot.bridge_ready(bridge_name, mtu):
+                logging.info('=== Bridge %s is already in place, skip ===' % bridge_name)
+                continue
+            logging.info('=== Create bridge %s with mtu %d ===' %
+                         (bridge_name, mtu))
+            txn.add_bridge(bridge_name)
+            if mtu != DEFAULT_MTU:
+                batch.add('link set dev %s mtu %d' % (bridge_name, mtu))
+            batch.add('link set %s up' % bridge_name)
+        txn.commit()
+        batch.commit()
 
     def destroy_bridges(self):
+        txn = OvsTransaction()
         bridge_count = 0
         for vm in self.vm_names:
             for fp_num in range(self.max_fp_num):
                 fp_br_name = adaptive_name(OVS_FP_BRIDGE_TEMPLATE, vm, fp_num)
                 bridge_count += 1
-                self.destroy_ovs_bridge(fp_br_name)
+                logging.info('=== Destroy bridge %s ===' % fp_br_name)
+                txn.del_bridge(fp_br_name)
+        txn.commit()
 
         # Wait the bridges to be cleaned up
         self.wait_for_bridges_cleanup(bridge_count)
@@ -628,6 +921,7 @@ class VMTopology(object):
         if ptf_bp_ip_addr or ptf_bp_ipv6_addr:
             self.add_ip_to_docker_if(BP_PORT_NAME, ptf_bp_ip_addr, ptf_bp_ipv6_addr)
 
+        batch = IpBatch(pid=self.pid)
         for vrf, data in vlan_data.items():
             vlan_id = data.get("vlan")
             addr = data.get("ipv4")
@@ -638,18 +932,17 @@ class VMTopology(object):
                 vlan_intf_name = "%s.%d" % (BP_PORT_NAME, vlan_id)
 
                 if VMTopology.intf_exists(vlan_intf_name,  pid=self.pid):
-                    VMTopology.cmd("nsenter -t %s -n ip addr flush dev %s" % (self.pid, vlan_intf_name))
+                    batch.add("addr flush dev %s" % vlan_intf_name)
                 else:
-                    VMTopology.cmd("nsenter -t %s -n ip link add link %s name %s type vlan id %d" %
-                                   (self.pid, BP_PORT_NAME, vlan_intf_name, vlan_id))
+                    batch.add("link add link %s name %s type vlan id %d" % (BP_PORT_NAME, vlan_intf_name, vlan_id))
                 if addr:
-                    VMTopology.cmd(
-                        "nsenter -t %s -n ip address add %s dev %s" % (self.pid, addr, vlan_intf_name))
+                    batch.add("address add %s dev %s" % (addr, vlan_intf_name))
                 if addr6:
-                    VMTopology.cmd(
-                        "nsenter -t %s -n ip -6 address add %s dev %s" % (self.pid, addr6, vlan_intf_name))
+                    # the address family is taken from the address, same as "ip -6 address add"
+                    batch.add("address add %s dev %s" % (addr6, vlan_intf_name))
 
-                VMTopology.iface_up(vlan_intf_name, pid=self.pid)
+                batch.add("link set %s up" % vlan_intf_name)
+        batch.commit()
 
         VMTopology.iface_disable_txoff(BP_PORT_NAME, self.pid)
 
@@ -665,6 +958,10 @@ class VMTopology(object):
         # add unique suffix to int_if to support multiple tasks run concurrently
         tmp_int_if = int_if + \
             VMTopology._generate_fingerprint(ext_if, MAX_INTF_LEN - len(int_if))
+        if self.snapshot is not None and self.snapshot.veth_ready(ext_if, int_if, pid=self.pid) and \
+                self.snapshot.host_links[ext_if].master == bridge:
+            logging.info('=== veth pair %s/%s on bridge %s is already in place, skip ===' % (ext_if, int_if, bridge))
+            return
         logging.info('=== For veth pair, add %s to bridge %s, set %s to PTF docker, tmp intf %s' % (
             ext_if, bridge, int_if, tmp_int_if))
         if VMTopology.intf_not_exists(ext_if):
@@ -713,56 +1010,52 @@ class VMTopology(object):
             self.pid = api_server_pid
 
         if VMTopology.intf_exists(int_if, pid=self.pid):
-            VMTopology.cmd("nsenter -t %s -n ip addr flush dev %s" %
-                           (self.pid, int_if))
-            VMTopology.cmd("nsenter -t %s -n ip addr replace %s dev %s" %
-                           (self.pid, mgmt_ip_addr, int_if))
+            batch = IpBatch(pid=self.pid)
+            batch.add("addr flush dev %s" % int_if)
+            batch.add("addr replace %s dev %s" % (mgmt_ip_addr, int_if))
             if extra_mgmt_ip_addr is not None:
                 for ip_addr in extra_mgmt_ip_addr:
                     if ip_addr != "":
-                        VMTopology.cmd("nsenter -t %s -n ip addr replace %s dev %s" %
-                                       (self.pid, ip_addr, int_if))
+                        batch.add("addr replace %s dev %s" % (ip_addr, int_if))
             if mgmt_gw:
                 if api_server_pid:
-                    VMTopology.cmd(
-                        "nsenter -t %s -n ip route del default" % (self.pid))
-                VMTopology.cmd(
-                    "nsenter -t %s -n ip route add default via %s dev %s" % (self.pid, mgmt_gw, int_if))
+                    batch.add("route del default")
+                batch.add("route add default via %s dev %s" % (mgmt_gw, int_if))
+            batch.commit()
+
+            batch_v6 = IpBatch(pid=self.pid, family=6)
             if mgmt_ipv6_addr:
-                VMTopology.cmd(
-                    "nsenter -t %s -n ip -6 addr flush dev %s" % (self.pid, int_if))
-                VMTopology.cmd("nsenter -t %s -n ip -6 addr replace %s dev %s" %
-                               (self.pid, mgmt_ipv6_addr, int_if))
+                batch_v6.add("addr flush dev %s" % int_if)
+                batch_v6.add("addr replace %s dev %s" % (mgmt_ipv6_addr, int_if))
             if mgmt_ipv6_addr and mgmt_gw_v6:
-                VMTopology.cmd(
-                    "nsenter -t %s -n ip -6 route flush default" % (self.pid))
-                VMTopology.cmd(
-                    "nsenter -t %s -n ip -6 route add default via %s dev %s" % (self.pid, mgmt_gw_v6, int_if))
+                batch_v6.add("route flush default")
+                batch_v6.add("route add default via %s dev %s" % (mgmt_gw_v6, int_if))
+            batch_v6.commit()
 
     def add_ip_to_netns_if(self, int_if, ip_addr, ipv6_addr=None, default_gw=None, default_gw_v6=None):
         """Add ip address to netns interface."""
         if VMTopology.intf_exists(int_if, netns=self.netns):
-            VMTopology.cmd("ip netns exec %s ip addr flush dev %s" %
-                           (self.netns, int_if))
-            VMTopology.cmd("ip netns exec %s ip addr add %s dev %s" %
-                           (self.netns, ip_addr, int_if))
+            batch = IpBatch(netns=self.netns)
+            batch.add("addr flush dev %s" % int_if)
+            batch.add("addr add %s dev %s" % (ip_addr, int_if))
             if default_gw:
-                VMTopology.cmd(
-                    "ip netns exec %s ip route flush default" % (self.netns))
-                VMTopology.cmd("ip netns exec %s ip route add default via %s dev %s" % (
-                    self.netns, default_gw, int_if))
+                batch.add("route flush default")
+                batch.add("route add default via %s dev %s" % (default_gw, int_if))
+            batch.commit()
+
+            batch_v6 = IpBatch(netns=self.netns, family=6)
             if ipv6_addr:
-                VMTopology.cmd(
-                    "ip netns exec %s ip -6 addr flush dev %s" % (self.netns, int_if))
-                VMTopology.cmd("ip netns exec %s ip -6 addr replace %s dev %s" %
-                               (self.netns, ipv6_addr, int_if))
+                batch_v6.add("addr flush dev %s" % int_if)
+                batch_v6.add("addr replace %s dev %s" % (ipv6_addr, int_if))
                 if default_gw_v6:
-                    VMTopology.cmd(
-                        "ip netns exec %s ip -6 route flush default" % (self.netns))
-                    VMTopology.cmd("ip netns exec %s ip -6 route add default via %s dev %s" %
-                                   (self.netns, default_gw_v6, int_if))
+                    batch_v6.add("route flush default")
+                    batch_v6.add("route add default via %s dev %s" % (default_gw_v6, int_if))
+            batch_v6.commit()
 
     def add_dut_if_to_docker(self, iface_name, dut_iface):
+        if self.snapshot is not None and self.snapshot.link_ready(iface_name, pid=self.pid):
+            logging.info("=== DUT interface %s is already in PTF docker as %s, skip ===" % (dut_iface, iface_name))
+            return
         logging.info("=== Add DUT interface %s to PTF docker as %s ===" %
                      (dut_iface, iface_name))
         if VMTopology.intf_exists(dut_iface) \
@@ -780,6 +1073,9 @@ class VMTopology(object):
         if VMTopology.intf_not_exists(iface_name, pid=self.pid):
             raise ValueError("Interface %s not present in docker" % iface_name)
         vlan_sub_iface_name = iface_name + vlan_separator + vlan_id
+        if self.snapshot is not None and self.snapshot.link_ready(vlan_sub_iface_name, pid=self.pid):
+            logging.info("=== Vlan sub interface %s is already in PTF docker, skip ===" % vlan_sub_iface_name)
+            return
         VMTopology.cmd("nsenter -t %s -n ip link add link %s name %s type vlan id %s" %
                        (self.pid, iface_name, vlan_sub_iface_name, vlan_id))
         VMTopology.cmd("nsenter -t %s -n ip link set %s up" %
@@ -832,64 +1128,67 @@ class VMTopology(object):
             int_sub_if = int_if + vlan_subintf_sep + vlan_subintf_vlan_id
             t_int_sub_if = t_int_if + vlan_subintf_sep + vlan_subintf_vlan_id
 
+        if self.snapshot is not None and self.snapshot.veth_ready(ext_if, int_if, self.fp_mtu, pid=self.pid) and \
+                (not create_vlan_subintf or self.snapshot.link_ready(int_sub_if, self.fp_mtu, pid=self.pid)):
+            logging.info('=== veth pair %s/%s is already in place, skip ===' % (ext_if, int_if))
+            return
+
         if VMTopology.intf_exists(t_int_if):
+            # Deleting the temporary interface also deletes its peer and vlan sub interface
             VMTopology.cmd("ip link del dev %s" % t_int_if)
 
-        if VMTopology.intf_not_exists(ext_if):
+        # The temporary interfaces are only in the host namespace if the veth pair is created here
+        created = VMTopology.intf_not_exists(ext_if)
+        if created:
             VMTopology.cmd("ip link add %s type veth peer name %s" %
                            (ext_if, t_int_if))
             if create_vlan_subintf:
                 VMTopology.cmd("vconfig add %s %s" %
                                (t_int_if, vlan_subintf_vlan_id))
 
+        t_int_if_in_docker = VMTopology.intf_exists(t_int_if, pid=self.pid)
+        int_if_in_docker = VMTopology.intf_exists(int_if, pid=self.pid)
+        if create_vlan_subintf:
+            t_int_sub_if_in_docker = VMTopology.intf_exists(t_int_sub_if, pid=self.pid)
+            int_sub_if_in_docker = VMTopology.intf_exists(int_sub_if, pid=self.pid)
+
+        host_batch = IpBatch()
+        docker_batch = IpBatch(pid=self.pid)
         if self.fp_mtu != DEFAULT_MTU:
-            VMTopology.cmd("ip link set dev %s mtu %d" % (ext_if, self.fp_mtu))
-            if VMTopology.intf_exists(t_int_if):
-                VMTopology.cmd("ip link set dev %s mtu %d" %
-                               (t_int_if, self.fp_mtu))
-            elif VMTopology.intf_exists(t_int_if, pid=self.pid):
-                VMTopology.cmd("nsenter -t %s -n ip link set dev %s mtu %d" %
-                               (self.pid, t_int_if, self.fp_mtu))
-            elif VMTopology.intf_exists(int_if, pid=self.pid):
-                VMTopology.cmd("nsenter -t %s -n ip link set dev %s mtu %d" %
-                               (self.pid, int_if, self.fp_mtu))
+            host_batch.add("link set dev %s mtu %d" % (ext_if, self.fp_mtu))
+            if created:
+                host_batch.add("link set dev %s mtu %d" % (t_int_if, self.fp_mtu))
+            elif t_int_if_in_docker:
+                docker_batch.add("link set dev %s mtu %d" % (t_int_if, self.fp_mtu))
+            elif int_if_in_docker:
+                docker_batch.add("link set dev %s mtu %d" % (int_if, self.fp_mtu))
             if create_vlan_subintf:
-                if VMTopology.intf_exists(t_int_sub_if):
-                    VMTopology.cmd("ip link set dev %s mtu %d" %
-                                   (t_int_sub_if, self.fp_mtu))
-                elif VMTopology.intf_exists(t_int_sub_if, pid=self.pid):
-                    VMTopology.cmd("nsenter -t %s -n ip link set dev %s mtu %d" %
-                                   (self.pid, t_int_sub_if, self.fp_mtu))
-                elif VMTopology.intf_exists(int_sub_if, pid=self.pid):
-                    VMTopology.cmd("nsenter -t %s -n ip link set dev %s mtu %d" %
-                                   (self.pid, int_sub_if, self.fp_mtu))
-
-        VMTopology.iface_up(ext_if)
-
-        if VMTopology.intf_exists(t_int_if) \
-                and VMTopology.intf_not_exists(t_int_if, pid=self.pid) \
-                and VMTopology.intf_not_exists(int_if, pid=self.pid):
-            VMTopology.cmd("ip link set dev %s netns %s" %
-                           (t_int_if, self.pid))
-        if create_vlan_subintf \
-                and VMTopology.intf_exists(t_int_sub_if) \
-                and VMTopology.intf_not_exists(t_int_sub_if, pid=self.pid) \
-                and VMTopology.intf_not_exists(int_sub_if, pid=self.pid):
-            VMTopology.cmd("ip link set dev %s netns %s" %
-                           (t_int_sub_if, self.pid))
-
-        if VMTopology.intf_exists(t_int_if, pid=self.pid) and VMTopology.intf_not_exists(int_if, pid=self.pid):
-            VMTopology.cmd("nsenter -t %s -n ip link set dev %s name %s" %
-                           (self.pid, t_int_if, int_if))
-        if create_vlan_subintf \
-                and VMTopology.intf_exists(t_int_sub_if, pid=self.pid) \
-                and VMTopology.intf_not_exists(int_sub_if, pid=self.pid):
-            VMTopology.cmd("nsenter -t %s -n ip link set dev %s name %s" %
-                           (self.pid, t_int_sub_if, int_sub_if))
-
-        VMTopology.iface_up(int_if, pid=self.pid)
+                if created:
+                    host_batch.add("link set dev %s mtu %d" % (t_int_sub_if, self.fp_mtu))
+                elif t_int_sub_if_in_docker:
+                    docker_batch.add("link set dev %s mtu %d" % (t_int_sub_if, self.fp_mtu))
+                elif int_sub_if_in_docker:
+                    docker_batch.add("link set dev %s mtu %d" % (int_sub_if, self.fp_mtu))
+
+        host_batch.add("link set %s up" % ext_if)
+
+        if created and not t_int_if_in_docker and not int_if_in_docker:
+            host_batch.add("link set dev %s netns %s" % (t_int_if, self.pid))
+            t_int_if_in_docker = True
+        if create_vlan_subintf and created and not t_int_sub_if_in_docker and not int_sub_if_in_docker:
+            host_batch.add("link set dev %s netns %s" % (t_int_sub_if, self.pid))
+            t_int_sub_if_in_docker = True
+        host_batch.commit()
+
+        if t_int_if_in_docker and not int_if_in_docker:
+            docker_batch.add("link set dev %s name %s" % (t_int_if, int_if))
+        if create_vlan_subintf and t_int_sub_if_in_docker and not int_sub_if_in_docker:
+            docker_batch.add("link set dev %s name %s" % (t_int_sub_if, int_sub_if))
+
+        docker_batch.add("link set %s up" % int_if)
         if create_vlan_subintf:
-            VMTopology.iface_up(int_sub_if, pid=self.pid)
+            docker_batch.add("link set %s up" % int_sub_if)
+        docker_batch.commit()
 
     def add_veth_if_to_netns(self, ext_if, int_if):
         """Create vethernet devices (ext_if, int_if) and put int_if into the netns for active-active."""
@@ -898,38 +1197,45 @@ class VMTopology(object):
 
         t_int_if = adaptive_temporary_interface(self.vm_set_name, int_if)
 
+        if self.snapshot is not None and self.snapshot.veth_ready(ext_if, int_if, self.fp_mtu, netns=self.netns):
+            logging.info('=== veth pair %s/%s is already in place, skip ===' % (ext_if, int_if))
+            return
+
         if VMTopology.intf_exists(t_int_if):
+            # Deleting the temporary interface also deletes its peer
             VMTopology.cmd("ip link del dev %s" % t_int_if)
 
-        if VMTopology.intf_not_exists(ext_if):
+        # The temporary interface is only in the host namespace if the veth pair is created here
+        created = VMTopology.intf_not_exists(ext_if)
+        if created:
             VMTopology.cmd("ip link add %s type veth peer name %s" %
                            (ext_if, t_int_if))
 
-        if self.fp_mtu != DEFAULT_MTU:
-            VMTopology.cmd("ip link set dev %s mtu %d" % (ext_if, self.fp_mtu))
-            if VMTopology.intf_exists(t_int_if):
-                VMTopology.cmd("ip link set dev %s mtu %d" %
-                               (t_int_if, self.fp_mtu))
-            elif VMTopology.intf_exists(t_int_if, netns=self.netns):
-                VMTopology.cmd("ip netns exec %s ip link set dev %s mtu %d" % (
-                    self.netns, t_int_if, self.fp_mtu))
-            elif VMTopology.intf_exists(int_if, netns=self.netns):
-                VMTopology.cmd("ip netns exec %s ip link set dev %s mtu %d" % (
-                    self.netns, int_if, self.fp_mtu))
-
-        VMTopology.iface_up(ext_if)
-
-        if VMTopology.intf_exists(t_int_if) \
-                and VMTopology.intf_not_exists(t_int_if, netns=self.netns) \
-                and VMTopology.intf_not_exists(int_if, netns=self.netns):
-            VMTopology.cmd("ip link set dev %s netns %s" %
-                           (t_int_if, self.netns))
-
-        if VMTopology.intf_exists(t_int_if, netns=self.netns) and VMTopology.intf_not_exists(int_if, netns=self.netns):
-            VMTopology.cmd("ip netns exec %s ip link set dev %s name %s" % (
-                self.netns, t_int_if, int_if))
+        t_int_if_in_netns = VMTopology.intf_exists(t_int_if, netns=self.netns)
+        int_if_in_netns = VMTopology.intf_exists(int_if, netns=self.netns)
 
-        VMTopology.iface_up(int_if, netns=self.netns)
+        host_batch = IpBatch()
+        netns_batch = IpBatch(netns=self.netns)
+        if self.fp_mtu != DEFAULT_MTU:
+            host_batch.add("link set dev %s mtu %d" % (ext_if, self.fp_mtu))
+            if created:
+                host_batch.add("link set dev %s mtu %d" % (t_int_if, self.fp_mtu))
+            elif t_int_if_in_netns:
+                netns_batch.add("link set dev %s mtu %d" % (t_int_if, self.fp_mtu))
+            elif int_if_in_netns:
+                netns_batch.add("link set dev %s mtu %d" % (int_if, self.fp_mtu))
+
+        host_batch.add("link set %s up" % ext_if)
+
+        if created and not t_int_if_in_netns and not int_if_in_netns:
+            host_batch.add("link set dev %s netns %s" % (t_int_if, self.netns))
+            t_int_if_in_netns = True
+        host_batch.commit()
+
+        if t_int_if_in_netns and not int_if_in_netns:
+            netns_batch.add("link set dev %s name %s" % (t_int_if, int_if))
+        netns_batch.add("link set %s up" % int_if)
+        netns_batch.commit()
 
     def bind_mgmt_port(self, br_name, mgmt_port):
         logging.info('=== Bind mgmt port %s to bridge %s ===' %
@@ -977,20 +1283,14 @@ class VMTopology(object):
             self.destroy_ovs_bridge(interconnection_bridge)
 
     def bind_devices_interconnect_ports(self, br_name, vlan1_iface, vlan2_iface):
-        ports = VMTopology.get_ovs_br_ports(br_name)
-        if vlan1_iface not in ports:
-            VMTopology.cmd('ovs-vsctl --may-exist add-port %s %s' % (br_name, vlan1_iface))
-        if vlan2_iface not in ports:
-            VMTopology.cmd('ovs-vsctl --may-exist add-port %s %s' % (br_name, vlan2_iface))
-        bindings = VMTopology.get_ovs_port_bindings(br_name)
+        bindings = self.attach_ovs_ports(br_name, [vlan1_iface, vlan2_iface])
         vlan1_iface_id = bindings[vlan1_iface]
         vlan2_iface_id = bindings[vlan2_iface]
-        # clear old bindings
-        VMTopology.cmd('ovs-ofctl del-flows %s' % br_name)
-        VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                       (br_name, vlan1_iface_id, vlan2_iface_id))
-        VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                       (br_name, vlan2_iface_id, vlan1_iface_id))
+        # replace old bindings
+        flows = OvsFlowBundle(br_name)
+        flows.add_flow("table=0,in_port=%s,action=output:%s" % (vlan1_iface_id, vlan2_iface_id))
+        flows.add_flow("table=0,in_port=%s,action=output:%s" % (vlan2_iface_id, vlan1_iface_id))
+        flows.commit()
 
     def bind_fp_ports(self, disconnect_vm=False):
         """
@@ -1024,6 +1324,8 @@ class VMTopology(object):
                     (br_name, self.duts_fp_ports[self.duts_name[dut_index]][str(vlan_index)],
                      injected_iface, vm_iface, disconnect_vm)
                 )
+        if self.snapshot is not None:
+            self.remove_stale_ovs_ports(bind_ovs_ports_args)
         with VMTopologyWorker.safe_subprocess_manager() as [processes, tmpdir]:
             self.worker.map(lambda args: self.bind_ovs_ports(*args, processes=processes,
                                                              tmpdir=tmpdir), bind_ovs_ports_args)
@@ -1135,13 +1437,10 @@ class VMTopology(object):
         VMTopology.iface_up(br_name)
 
         # Remove port from ovs bridge
-        br = VMTopology.get_ovs_bridge_by_port(port1)
-        if br is not None:
-            VMTopology.cmd('ovs-vsctl --if-exists del-port %s %s' % (br, port1))
-
-        br = VMTopology.get_ovs_bridge_by_port(port2)
-        if br is not None:
-            VMTopology.cmd('ovs-vsctl --if-exists del-port %s %s' % (br, port2))
+        txn = OvsTransaction()
+        txn.del_port(port1)
+        txn.del_port(port2)
+        txn.commit()
 
         m_to_ifs, _ = VMTopology.brctl_show()
         if port1 not in m_to_ifs[br_name]:
@@ -1202,22 +1501,51 @@ class VMTopology(object):
         self.destroy_ovs_bridge(self._vs_chassis_midplane_br_name)
 
     def bind_vs_dut_ports(self, br_name, dut_name, dut_ports):
-        br_ports = VMTopology.get_ovs_br_ports(br_name)
-        for port in dut_ports:
-            br = VMTopology.get_ovs_bridge_by_port(port)
-            if br is not None and br != br_name:
-                VMTopology.cmd('ovs-vsctl --if-exists del-port {} {}'.format(br, port))
-
-            if port not in br_ports:
-                VMTopology.cmd('ovs-vsctl --may-exist add-port {} {}'.format(br_name, port))
+        self.attach_ovs_ports(br_name, dut_ports)
 
     def unbind_vs_dut_ports(self, br_name, dut_name, dut_ports):
         """unbind all ports except the vm port from an ovs bridge"""
         if VMTopology.intf_exists(br_name):
             br_ports = VMTopology.get_ovs_br_ports(br_name)
+            txn = OvsTransaction()
             for port in dut_ports:
                 if port in br_ports:
-                    VMTopology.cmd('ovs-vsctl --if-exists del-port {} {}'.format(br_name, port))
+                    txn.del_port(port, bridge=br_name)
+            txn.commit()
+
+    def attach_ovs_ports(self, br_name, ports, wait_ports=None):
+        """
+        Attach the ports to an ovs bridge.
+
+        Args:
+            br_name (str): Name of the ovs bridge.
+            ports (list): The ports to attach, they are moved from the bridge they are on if any.
+            wait_ports (list): Wait for the OpenFlow port number of these ports.
+
+        Returns:
+            dict: OpenFlow port number of each port of the bridge.
+        """
+        if self.snapshot is not None:
+            bindings = self.snapshot.get_ovs_port_bindings(br_name, ports)
+            if bindings is not None:
+                logging.info('=== Ports %s are already on bridge %s, skip ===' % (', '.join(ports), br_name))
+                return bindings
+        VMTopology.add_ovs_br_ports(br_name, ports)
+        return VMTopology.get_ovs_port_bindings(br_name, wait_ports or [])
+
+    def remove_stale_ovs_ports(self, bind_ovs_ports_args):
+        """Remove the ports which are not in the topology anymore from the bridges of the front panel ports."""
+        desired_ports = {}
+        for br_name, dut_iface, injected_iface, vm_iface, _ in bind_ovs_ports_args:
+            # the internal port of the bridge has the name of the bridge
+            desired_ports.setdefault(br_name, set([br_name])).update([dut_iface, injected_iface, vm_iface])
+
+        txn = OvsTransaction()
+        for br_name, ports in desired_ports.items():
+            for port in sorted(self.snapshot.bridge_ports.get(br_name, set()) - ports):
+                logging.info('=== Remove stale port %s from bridge %s ===' % (port, br_name))
+                txn.del_port(port, bridge=br_name)
+        txn.commit()
 
     def bind_ovs_ports(self, br_name, dut_iface, injected_iface, vm_iface, disconnect_vm=False, **kwargs):
         """
@@ -1229,107 +1557,77 @@ class VMTopology(object):
                                    |                      +---- vm_iface
                                    +----------------------+
         """
-        br = VMTopology.get_ovs_bridge_by_port(injected_iface)
-        if br is not None and br != br_name:
-            VMTopology.cmd('ovs-vsctl --if-exists del-port %s %s' % (br, injected_iface))
-
-        br = VMTopology.get_ovs_bridge_by_port(dut_iface)
-        if br is not None and br != br_name:
-            VMTopology.cmd('ovs-vsctl --if-exists del-port %s %s' % (br, dut_iface))
-
-        br = VMTopology.get_ovs_bridge_by_port(vm_iface)
-        if br is not None and br != br_name:
-            VMTopology.cmd('ovs-vsctl --if-exists del-port %s %s' % (br, vm_iface))
-
-        ports = VMTopology.get_ovs_br_ports(br_name)
-        if injected_iface not in ports:
-            VMTopology.cmd('ovs-vsctl --may-exist add-port %s %s' %
-                           (br_name, injected_iface))
-
-        if dut_iface not in ports:
-            VMTopology.cmd('ovs-vsctl --may-exist add-port %s %s' % (br_name, dut_iface))
-
-        if vm_iface not in ports:
-            VMTopology.cmd('ovs-vsctl --may-exist add-port %s %s' % (br_name, vm_iface))
-
-        bindings = VMTopology.get_ovs_port_bindings(br_name, [dut_iface])
+        bindings = self.attach_ovs_ports(br_name, [injected_iface, dut_iface, vm_iface], [dut_iface])
         dut_iface_id = bindings[dut_iface]
         injected_iface_id = bindings[injected_iface]
         vm_iface_id = bindings[vm_iface]
 
-        # clear old bindings
-        VMTopology.cmd('ovs-ofctl del-flows %s' % br_name)
+        # replace old bindings
+        flows = OvsFlowBundle(br_name)
 
         if disconnect_vm:
             # Drop packets from VM
-            VMTopology.cmd(
-                "ovs-ofctl add-flow %s table=0,in_port=%s,action=drop" % (br_name, vm_iface_id))
+            flows.add_flow("table=0,in_port=%s,action=drop" % vm_iface_id)
         else:
             # Add flow from a VM to an external iface
-            VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                           (br_name, vm_iface_id, dut_iface_id))
+            flows.add_flow("table=0,in_port=%s,action=output:%s" % (vm_iface_id, dut_iface_id))
 
         if disconnect_vm:
             # Add flow from external iface to ptf container
-            VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                           (br_name, dut_iface_id, injected_iface_id))
+            flows.add_flow("table=0,in_port=%s,action=output:%s" % (dut_iface_id, injected_iface_id))
         else:
-            all_cmds = []
-            bind_helper = lambda cmd: \
-                all_cmds.append(cmd.split()[-1])  # noqa: E731
-
             # Add flow from external iface to a VM and a ptf container
             # Allow BGP, IPinIP, fragmented packets, ICMP, SNMP packets and layer2 packets from DUT to neighbors
             # Block other traffic from DUT to EOS for EOS's stability,
             # Allow all traffic from DUT to PTF.
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp,in_port=%s,tp_src=179,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp,in_port=%s,tp_dst=179,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp,in_port=%s,tp_dst=22,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp,in_port=%s,tp_src=22,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp6,in_port=%s,tp_src=179,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp6,in_port=%s,tp_dst=179,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp6,in_port=%s,tp_dst=22,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,tcp6,in_port=%s,tp_src=22,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,ip,in_port=%s,nw_proto=4,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,ip,in_port=%s,nw_frag=yes,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,ipv6,in_port=%s,nw_frag=yes,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,icmp,in_port=%s,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,icmp6,in_port=%s,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,udp,in_port=%s,udp_src=161,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,udp,in_port=%s,udp_src=53,action=output:%s" %
-                        (br_name, dut_iface_id, vm_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=8,udp6,in_port=%s,udp_src=161,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=6,udp6,in_port=%s,udp_dst=4784,action=output:%s" %
-                        (br_name, dut_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp,in_port=%s,tp_src=179,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp,in_port=%s,tp_dst=179,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp,in_port=%s,tp_dst=22,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp,in_port=%s,tp_src=22,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp6,in_port=%s,tp_src=179,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp6,in_port=%s,tp_dst=179,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp6,in_port=%s,tp_dst=22,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,tcp6,in_port=%s,tp_src=22,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,ip,in_port=%s,nw_proto=4,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=8,ip,in_port=%s,nw_frag=yes,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=8,ipv6,in_port=%s,nw_frag=yes,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=8,icmp,in_port=%s,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=8,icmp6,in_port=%s,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=8,udp,in_port=%s,udp_src=161,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=8,udp,in_port=%s,udp_src=53,action=output:%s" %
+                           (dut_iface_id, vm_iface_id))
+            flows.add_flow("table=0,priority=8,udp6,in_port=%s,udp_src=161,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=6,udp6,in_port=%s,udp_dst=4784,action=output:%s" %
+                           (dut_iface_id, injected_iface_id))
             if self._is_smartswitch_ha:
-                bind_helper("ovs-ofctl add-flow %s table=0,priority=5,ip,in_port=%s,action=output:%s,%s" %
-                            (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
+                flows.add_flow("table=0,priority=5,ip,in_port=%s,action=output:%s,%s" %
+                               (dut_iface_id, vm_iface_id, injected_iface_id))
             else:
-                bind_helper("ovs-ofctl add-flow %s table=0,priority=5,ip,in_port=%s,action=output:%s" %
-                            (br_name, dut_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=5,ipv6,in_port=%s,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=3,in_port=%s,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,ip,in_port=%s,nw_proto=89,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,ipv6,in_port=%s,nw_proto=89,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
+                flows.add_flow("table=0,priority=5,ip,in_port=%s,action=output:%s" %
+                               (dut_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=5,ipv6,in_port=%s,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=3,in_port=%s,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,ip,in_port=%s,nw_proto=89,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,ipv6,in_port=%s,nw_proto=89,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
             # added ovs rules for HA
             # cp_data_channel_port: 11362, dp_channel_dst_port: 11364
             # swbus_port: 23606-23613 (one per DPU)
@@ -1337,58 +1635,44 @@ class VMTopology(object):
             for ha_port in [11362, 11364, 11367, 11368,
                             23606, 23607, 23608, 23609, 23610, 23611, 23612, 23613]:
                 for proto in ['tcp', 'udp', 'tcp6', 'udp6']:
-                    bind_helper("ovs-ofctl add-flow %s table=0,priority=10,%s,in_port=%s,tp_dst=%d,action=output:%s,%s" %  # noqa: E501
-                                (br_name, proto, dut_iface_id, ha_port, vm_iface_id, injected_iface_id))
-                    bind_helper("ovs-ofctl add-flow %s table=0,priority=10,%s,in_port=%s,tp_src=%d,action=output:%s,%s" %  # noqa: E501
-                                (br_name, proto, dut_iface_id, ha_port, vm_iface_id, injected_iface_id))
-                    bind_helper("ovs-ofctl add-flow %s table=0,priority=10,%s,in_port=%s,tp_dst=%d,action=output:%s" %
-                                (br_name, proto, vm_iface_id, ha_port, dut_iface_id))
-                    bind_helper("ovs-ofctl add-flow %s table=0,priority=10,%s,in_port=%s,tp_src=%d,action=output:%s" %
-                                (br_name, proto, vm_iface_id, ha_port, dut_iface_id))
+                    flows.add_flow("table=0,priority=10,%s,in_port=%s,tp_dst=%d,action=output:%s,%s" %
+                                   (proto, dut_iface_id, ha_port, vm_iface_id, injected_iface_id))
+                    flows.add_flow("table=0,priority=10,%s,in_port=%s,tp_src=%d,action=output:%s,%s" %
+                                   (proto, dut_iface_id, ha_port, vm_iface_id, injected_iface_id))
+                    flows.add_flow("table=0,priority=10,%s,in_port=%s,tp_dst=%d,action=output:%s" %
+                                   (proto, vm_iface_id, ha_port, dut_iface_id))
+                    flows.add_flow("table=0,priority=10,%s,in_port=%s,tp_src=%d,action=output:%s" %
+                                   (proto, vm_iface_id, ha_port, dut_iface_id))
         # Add flow for BFD Control packets (UDP port 3784)
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,udp,in_port=%s,"
-                        "udp_dst=3784,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,udp6,in_port=%s,"
-                        "udp_dst=3784,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,udp,in_port=%s,"
+                           "udp_dst=3784,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,udp6,in_port=%s,"
+                           "udp_dst=3784,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
             # Add flow for BFD Control packets (UDP port 3784)
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,udp,in_port=%s,"
-                        "udp_src=49152,udp_dst=3784,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
-            bind_helper("ovs-ofctl add-flow %s table=0,priority=10,udp6,in_port=%s,"
-                        "udp_src=49152,udp_dst=3784,action=output:%s,%s" %
-                        (br_name, dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,udp,in_port=%s,"
+                           "udp_src=49152,udp_dst=3784,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
+            flows.add_flow("table=0,priority=10,udp6,in_port=%s,"
+                           "udp_src=49152,udp_dst=3784,action=output:%s,%s" %
+                           (dut_iface_id, vm_iface_id, injected_iface_id))
 
         # Add flow from a ptf container to an external iface
-            bind_helper("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                        (br_name, injected_iface_id, dut_iface_id))
-
-            if all_cmds:
-                processes = kwargs.get("processes")
-                tmpdir = kwargs.get("tmpdir")
-                with tempfile.NamedTemporaryFile("w", dir=tmpdir, delete=False) as f:
-                    for rule in all_cmds:
-                        f.write(rule.strip("'") + "\n")
+            flows.add_flow("table=0,in_port=%s,action=output:%s" %
+                           (injected_iface_id, dut_iface_id))
 
-                processes.append(VMTopology.fire_and_forget("ovs-ofctl add-flows {} {}".format(br_name, f.name)))
+        flows.commit(tmpdir=kwargs.get("tmpdir"))
 
     def unbind_ovs_ports(self, br_name, vm_port, **kwargs):
         """unbind all ports except the vm port from an ovs bridge"""
         if VMTopology.intf_exists(br_name):
             ports = VMTopology.get_ovs_br_ports(br_name)
-            all_cmds = []
-            bind_helper = lambda cmd: \
-                all_cmds.append(cmd[len("ovs-vsctl "):])  # noqa: E731
-
+            txn = OvsTransaction()
             for port in ports:
                 if port != vm_port:
-                    bind_helper('ovs-vsctl --if-exists del-port %s %s' % (br_name, port))
-
-            if all_cmds:
-                processes = kwargs.get("processes")
-                batch_cmd = 'ovs-vsctl -- %s' % (' -- '.join(all_cmds))
-                processes.append(VMTopology.fire_and_forget(batch_cmd))
+                    txn.del_port(port, bridge=br_name)
+            txn.commit(processes=kwargs.get("processes"))
 
     def unbind_ovs_port(self, br_name, port):
         """unbind a port from an ovs bridge"""
@@ -1423,43 +1707,31 @@ class VMTopology(object):
 
         self.create_ovs_bridge(br_name, self.fp_mtu)
 
-        for intf in [host_if, upper_if, lower_if]:
-            br = VMTopology.get_ovs_bridge_by_port(intf)
-            if br is not None and br != br_name:
-                VMTopology.cmd('ovs-vsctl --if-exists del-port %s %s' % (br, intf))
-
-        ports = VMTopology.get_ovs_br_ports(br_name)
         ports_to_be_attached = [host_if, upper_if, lower_if]
         if nic_if is not None:
             ports_to_be_attached.append(nic_if)
-        for intf in ports_to_be_attached:
-            if intf not in ports:
-                VMTopology.cmd('ovs-vsctl --may-exist add-port %s %s' % (br_name, intf))
-
         bridge_ports = [upper_if, lower_if]
         if nic_if is not None:
             bridge_ports.append(nic_if)
-        bindings = VMTopology.get_ovs_port_bindings(br_name, bridge_ports)
+        bindings = self.attach_ovs_ports(br_name, ports_to_be_attached, bridge_ports)
         host_if_id = bindings[host_if]
         upper_if_id = bindings[upper_if]
         lower_if_id = bindings[lower_if]
 
-        # clear old bindings
-        VMTopology.cmd('ovs-ofctl del-flows %s' % br_name)
+        # replace old bindings
+        flows = OvsFlowBundle(br_name)
 
         if nic_if is not None:
             # TODO: open-flow configuration for ovs-bridge simulating server smart NIC
             pass
         else:
             # open-flow configuration for ovs-bridge simulating mux of dualtor y-cable
-            VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s,%s" %
-                           (br_name, host_if_id, upper_if_id, lower_if_id))
+            flows.add_flow("table=0,in_port=%s,action=output:%s,%s" % (host_if_id, upper_if_id, lower_if_id))
             if active_if_index == 0:
-                VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                               (br_name, upper_if_id, host_if_id))
+                flows.add_flow("table=0,in_port=%s,action=output:%s" % (upper_if_id, host_if_id))
             else:
-                VMTopology.cmd("ovs-ofctl add-flow %s table=0,in_port=%s,action=output:%s" %
-                               (br_name, lower_if_id, host_if_id))
+                flows.add_flow("table=0,in_port=%s,action=output:%s" % (lower_if_id, host_if_id))
+        flows.commit()
 
     def remove_dualtor_cable(self, host_ifindex, is_active_active=False):
         """
@@ -1581,6 +1853,11 @@ class VMTopology(object):
         # table.
         rt_tables = get_existing_rt_tables()
         slot_start_index = 100
+        # issue: https://www.mail-archive.com/debian-bugs-dist@lists.debian.org/msg1811241.html
+        # When the route table is empty, the ip route flush command will fail.
+        # So ignore the errors of the flush commands.
+        flush_batch = IpBatch(netns=self.netns, force=True)
+        batch = IpBatch(netns=self.netns)
 
         for i, intf in enumerate(self.host_interfaces):
             is_active_active = intf in self.host_interfaces_active_active
@@ -1602,19 +1879,14 @@ class VMTopology(object):
                     # add route table mapping, use interface name as route table name
                     VMTopology.cmd("ip netns exec %s echo \"%s\t%s\n\" >> /etc/iproute2/rt_tables" %
                                    (self.netns, rt_slot, rt_name), shell=True, split_cmd=False)
-                VMTopology.cmd("ip netns exec %s ip rule add iif %s table %s" % (
-                    self.netns, ns_if, rt_name))
-                VMTopology.cmd("ip netns exec %s ip rule add from %s table %s" % (
-                    self.netns, ns_if_addr.ip, rt_name))
-                # issue: https://www.mail-archive.com/debian-bugs-dist@lists.debian.org/msg1811241.html
-                # When the route table is empty, the ip route flush command will fail.
-                # So ignore the error here.
-                VMTopology.cmd(
-                    "ip netns exec %s ip route flush table %s" % (self.netns, rt_name), ignore_errors=True)
-                VMTopology.cmd("ip netns exec %s ip route add %s dev %s table %s" % (
-                    self.netns, ns_if_addr.network, ns_if, rt_name))
-                VMTopology.cmd("ip netns exec %s ip route add default via %s dev %s table %s" % (
-                    self.netns, gateway_addr, ns_if, rt_name))
+                flush_batch.add("route flush table %s" % rt_name)
+                batch.add("rule add iif %s table %s" % (ns_if, rt_name))
+                batch.add("rule add from %s table %s" % (ns_if_addr.ip, rt_name))
+                batch.add("route add %s dev %s table %s" % (ns_if_addr.network, ns_if, rt_name))
+                batch.add("route add default via %s dev %s table %s" % (gateway_addr, ns_if, rt_name))
+
+        flush_batch.commit(ignore_errors=True)
+        batch.commit()
 
     def remove_host_ports(self):
         """
@@ -1894,6 +2166,18 @@ class VMTopology(object):
                 ports.add(port)
         return ports
 
+    @staticmethod
+    def add_ovs_br_ports(bridge, ports):
+        """Move the ports to an ovs bridge with one ovs-vsctl call, the ports already on the bridge are kept."""
+        br_ports = VMTopology.get_ovs_br_ports(bridge)
+        txn = OvsTransaction()
+        for port in ports:
+            if port not in br_ports:
+                # remove the port from the bridge it is on, if any
+                txn.del_port(port)
+                txn.add_port(bridge, port)
+        txn.commit()
+
     @staticmethod
     def get_ovs_bridge_by_port(port):
         try:
@@ -2334,7 +2618,8 @@ def main():
                                                  multiprocessing.cpu_count() // 8)),
             multi_vrf=dict(required=False, type='bool', default=False),
             multi_vrf_data=dict(required=False, type='dict', default={}),
-            topo_config=dict(required=False, type='dict', default={})
+            topo_config=dict(required=False, type='dict', default={}),
+            reconcile=dict(required=False, type='bool', default=False)
         ),
         supports_check_mode=False)
 
@@ -2350,6 +2635,7 @@ def main():
     dut_interfaces = module.params['dut_interfaces']
     use_thread_worker = module.params['use_thread_worker']
     thread_worker_count = module.params['thread_worker_count']
+    reconcile = module.params['reconcile']
 
     config_module_logging(construct_log_filename(cmd, vm_set_name))
 
@@ -2406,6 +2692,8 @@ def main():
                 vm_base = None
 
             net.init(vm_set_name, vm_base, duts_fp_ports, duts_name)
+            if reconcile:
+                net.take_snapshot()
 
             ptf_mgmt_ip_addr = module.params['ptf_mgmt_ip_addr']
             ptf_mgmt_ipv6_addr = module.params['ptf_mgmt_ipv6_addr']
@@ -2588,6 +2876,8 @@ def main():
                 vm_base = None
 
             net.init(vm_set_name, vm_base, duts_fp_ports, duts_name, True)
+            if reconcile:
+                net.take_snapshot()
 
             ptf_mgmt_ip_addr = module.params['ptf_mgmt_ip_addr']
             ptf_mgmt_ipv6_addr = module.params['ptf_mgmt_ipv6_addr']
@@ -2610,14 +2900,16 @@ def main():
                         # unbind step detached from the mgmt bridge.
                         net.bind_mgmt_port(mgmt_bridge, dut_mgmt_port)
 
-            if net.netns:
+            # In reconcile mode, the netns and the bridge ports are kept and only the delta is configured
+            if net.netns and not reconcile:
                 net.unbind_mgmt_port(NETNS_MGMT_IF_TEMPLATE % net.vm_set_name)
                 net.delete_network_namespace()
 
             if vms_exists:
-                net.unbind_fp_ports()
-                if is_vs_chassis:
-                    net.unbind_vs_chassis_ports(duts_midplane_ports, duts_inband_ports)
+                if not reconcile:
+                    net.unbind_fp_ports()
+                    if is_vs_chassis:
+                        net.unbind_vs_chassis_ports(duts_midplane_ports, duts_inband_ports)
                 net.add_injected_fp_ports_to_docker()
                 net.add_injected_VM_ports_to_docker()
                 net.bind_fp_ports()
@@ -1,6 +1,9 @@
 from __future__ import unicode_literals, print_function
 import os
+import io
 import sys
+import gzip
+import base64
 import json
 import re
 import logging
@@ -120,6 +123,10 @@ class Net(object):
         # 1: fallback 2: always 3: not supported
         self.console_file_transfer = env.getint("SPYTEST_CONSOLE_FILE_TRANSFER", "1")
         self.max_cmds_once = 100
+        # console transfers: gzip + base64 heredoc chunks, chunks sent at once
+        self.console_transfer_compress = env.match("SPYTEST_CONSOLE_TRANSFER_COMPRESS", "1", "1")
+        self.console_transfer_window = env.getint("SPYTEST_CONSOLE_TRANSFER_WINDOW", "4")
+        self.transfer_stats = dict()
         self.pending_downloads = dict()
         self.log_dutid_fmt = env.get("SPYTEST_LOG_DUTID_FMT", "LABEL")
         self.dut_log_lock = putils.Lock()
@@ -3887,6 +3894,92 @@ class Net(object):
         script_cmd = "base64 -d {0}.tmp > {0}".format(dst_file)
         self._send_command(access, script_cmd, prompt)
 
+    def _transfer_console(self, access, src_file, dst_file):
+        if self.console_transfer_compress:
+            if self._transfer_compressed(access, dst_file, src_file=src_file):
+                return
+            self.dut_warn(access["devname"], "Compressed transfer failed - Doing base64 transfer")
+        self._transfer_base64(access, src_file, dst_file)
+
+    def _transfer_compressed(self, access, dst_file, src_file=None, data=None):
+        """
+        Transfer a file over the CLI session: the data is compressed and
+        sent as base64 heredoc chunks, a window of chunks in one command
+        without waiting for the prompt after each chunk. The checksum of
+        every chunk is verified once after all the chunks are sent, only
+        the bad chunks are sent again, and the md5 of the file at the end.
+        :return: True if the file is transferred and verified
+        """
+        devname = access["devname"]
+        self._enter_linux(devname)
+        prompt = self._get_cli_prompt(devname)
+        start_time = time.time()
+        if data is None:
+            with open(src_file, "rb") as fh:
+                data = fh.read()
+
+        buf = io.BytesIO()
+        gz = gzip.GzipFile(fileobj=buf, mode="wb", mtime=0)
+        gz.write(data)
+        gz.close()
+        encoded = utils.str_decode(base64.b64encode(buf.getvalue()))
+        lines = [encoded[i:i + 76] for i in range(0, len(encoded), 76)]
+        chunks = utils.split_list(lines, self.max_cmds_once)
+        part = "{}.gz.b64".format(dst_file)
+        parts = ["{}.{:05d}".format(part, index) for index in range(len(chunks))]
+        sums = [utils.md5(None, base64.b64decode("".join(chunk))) for chunk in chunks]
+
+        self._send_command(access, "rm -f {0} {0}.*".format(part), prompt)
+        pending, sent = list(range(len(chunks))), 0
+        for _ in range(3):
+            for window in utils.split_list(pending, self.console_transfer_window):
+                script_cmds = ["{"]
+                for index in window:
+                    script_cmds.append("cat > {} <<'SPYTEST_EOF'".format(parts[index]))
+                    script_cmds.extend(chunks[index])
+                    script_cmds.append("SPYTEST_EOF")
+                script_cmds.append("}")
+                script_cmd = nl.join(script_cmds) + nl
+                self._send_command(access, script_cmd, prompt, True, 6, trace_log=1,
+                                   ufcli=False, normalize=False)
+                sent = sent + len(script_cmd)
+            if self.is_filemode(devname):
+                return True
+            script_cmd = 'for f in {}.*; do echo "$f $(base64 -d $f | md5sum)"; done'.format(part)
+            output = self._send_command(access, script_cmd, prompt, True, 6, trace_log=1, ufcli=False)
+            found = dict(re.findall(r"(\S+)\s+([a-fA-F\d]{32})", output))
+            pending = [index for index in range(len(chunks)) if found.get(parts[index]) != sums[index]]
+            if not pending:
+                break
+            msg = "Resending {} of {} chunks of {}".format(len(pending), len(chunks), dst_file)
+            self.dut_warn(devname, msg)
+        if pending:
+            return False
+
+        script_cmd = "cat {0}.* | base64 -d | gunzip -c > {1} && rm -f {0}.* && md5sum {1}"
+        output = self._send_command(access, script_cmd.format(part, dst_file), prompt, True, 6)
+        if utils.md5(None, data) not in output:
+            self.dut_warn(devname, "MD5 mismatch after transfer of {}".format(dst_file))
+            return False
+
+        elapsed = time.time() - start_time
+        stats = self.transfer_stats.setdefault(devname, {"files": 0, "bytes": 0, "sent": 0, "secs": 0})
+        stats["files"] = stats["files"] + 1
+        stats["bytes"] = stats["bytes"] + len(data)
+        stats["sent"] = stats["sent"] + sent
+        stats["secs"] = stats["secs"] + elapsed
+        msg = "Transferred {} bytes ({} sent) to {} in {:.1f} secs {:.1f} KB/s, total {:.1f} KB/s"
+        self.dut_log(devname, msg.format(len(data), sent, dst_file, elapsed,
+                                         len(data) / 1024.0 / max(elapsed, 0.001),
+                                         stats["bytes"] / 1024.0 / max(stats["secs"], 0.001)))
+        return True
+
+    def get_transfer_stats(self, devname=None):
+        if devname:
+            devname = self._check_devname(devname)
+            return self.transfer_stats.get(devname, {})
+        return self.transfer_stats
+
     def _save_json_to_remote_file(self, devname, data, dst_file, do_indent=False):
         devname = self._check_devname(devname)
         try:
@@ -3926,6 +4019,11 @@ class Net(object):
         devname = access["devname"]
         msg = "Creating: DST: {}".format(dst_file)
         self.dut_log(devname, msg)
+        if self.console_transfer_compress and len(str_list) > l_split:
+            data = (nl.join(str_list) + nl).encode("utf-8")
+            if self._transfer_compressed(access, dst_file, data=data):
+                return dst_file
+            self.dut_warn(devname, "Compressed transfer failed - Creating {} with printf".format(dst_file))
         redir = ">"
         cli_prompt = self._get_cli_prompt(devname)
         for clist in utils.split_list(str_list, l_split):
@@ -3952,7 +4050,7 @@ class Net(object):
             return dst_file
 
         if cft == 2:
-            self._transfer_base64(access, src_file, dst_file)
+            self._transfer_console(access, src_file, dst_file)
             return dst_file
 
         try:
@@ -3975,7 +4073,7 @@ class Net(object):
                 errmsg = ""
             if cft == 1 and fallback:
                 self.dut_warn(devname, "SFTP Failed - Doing Console transfer {}".format(errmsg))
-                self._transfer_base64(access, src_file, dst_file)
+                self._transfer_console(access, src_file, dst_file)
             else:
                 self.dut_err(devname, "SFTP {} Failed {}".format(src_file, errmsg))
                 if errmsg:
@@ -1,7 +1,10 @@
 import sys
 import os
 import re
+import copy
 import json
+import time
+import threading
 from collections import OrderedDict
 
 bundled_parser = os.getenv("SPYTEST_TEXTFSM_USE_BUNDLED_PARSER")
@@ -12,15 +15,128 @@ if bundled_parser:
 import textfsm  # noqa: E402
 try:
     import clitable
+    import texttable
 except Exception:
     from textfsm import clitable
+    from textfsm import texttable
 
 from spytest import env  # noqa: E402
 import utilities.common as utils  # noqa: E402
 
 
+class TextFSMPool(object):
+    """
+    Compiled TextFSM state machines shared by all the Template objects.
+
+    Every template file is compiled once. Parsing takes an idle copy of the
+    compiled state machine, which is a deepcopy of the first one instead of
+    reading and compiling the template file again, and gives it back to the
+    pool once the data is parsed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.compiled = dict()
+        self.idle = dict()
+        self.stats = OrderedDict()
+
+    def _get_stats(self, path):
+        if path not in self.stats:
+            self.stats[path] = OrderedDict([("parses", 0), ("parse_time", 0.0),
+                                            ("compiles", 0), ("clones", 0)])
+        return self.stats[path]
+
+    def _acquire(self, path):
+        with self.lock:
+            if self.idle.get(path):
+                fsm = self.idle[path].pop()
+                fsm.Reset()
+                return fsm
+            compiled = self.compiled.get(path)
+        if compiled is None:
+            with open(path, "r") as tmpl_fp:
+                compiled = textfsm.TextFSM(tmpl_fp)
+            with self.lock:
+                self._get_stats(path)["compiles"] += 1
+                compiled = self.compiled.setdefault(path, compiled)
+        fsm = copy.deepcopy(compiled)
+        with self.lock:
+            self._get_stats(path)["clones"] += 1
+        return fsm
+
+    def parse(self, path, data):
+        """
+        parse the data with the template file
+        :param path: absolute path of the template file
+        :param data: text to parse
+        :return: header, key values and records of the parsed data
+        """
+        fsm = self._acquire(path)
+        start = time.time()
+        try:
+            rows = fsm.ParseText(data)
+            return fsm.header, fsm.GetValuesByAttrib('Key'), rows
+        finally:
+            elapsed = time.time() - start
+            with self.lock:
+                stats = self._get_stats(path)
+                stats["parses"] += 1
+                stats["parse_time"] += elapsed
+                self.idle.setdefault(path, []).append(fsm)
+
+    def get_stats(self, root=None):
+        with self.lock:
+            retval = OrderedDict()
+            for path, stats in self.stats.items():
+                if root and not path.startswith(os.path.join(root, "")):
+                    continue
+                name = os.path.relpath(path, root) if root else path
+                retval[name] = dict(stats)
+            return retval
+
+    def clear(self):
+        with self.lock:
+            self.compiled.clear()
+            self.idle.clear()
+            self.stats.clear()
+
+
+textfsm_pool = TextFSMPool()
+
+
+class _TemplateFile(object):
+    def __init__(self, name):
+        self.name = name
+
+    def close(self):
+        pass
+
+
+class PooledCliTable(clitable.CliTable):
+    """
+    CliTable parsing with the state machines of the TextFSM pool
+    instead of opening and compiling the template files on every parse.
+    """
+
+    def _TemplateNamesToFiles(self, template_str):
+        return [_TemplateFile(os.path.join(self.template_dir, tmplt))
+                for tmplt in template_str.split(':')]
+
+    def _ParseCmdItem(self, cmd_input, template_file=None):
+        header, keys, rows = textfsm_pool.parse(template_file.name, cmd_input)
+        if not self._keys:
+            self._keys = set(keys)
+        table = texttable.TextTable()
+        table.header = header
+        for record in rows:
+            table.Append(record)
+        return table
+
+
 class Template(object):
 
+    max_cache_entries = 10000
+
     def __init__(self, platform=None, cli=None, root=None):
         self.reinit(platform, cli, root)
 
@@ -38,26 +154,48 @@ class Template(object):
         for index in index.split(","):
             if not os.path.exists(os.path.join(self.root, index)):
                 index = "index"
-            self.cli_tables[index] = clitable.CliTable(index, self.root)
+            self.cli_tables[index] = PooledCliTable(index, self.root)
         self.platform = platform
         self.cli = cli
+        self.cmd_cache = dict()
+        self.row_cache = dict()
 
-    # find the template given command
-    def get_tmpl(self, cmd):
+    def _cache_add(self, cache, key, value):
+        if len(cache) >= self.max_cache_entries:
+            cache.clear()
+        cache[key] = value
+        return value
+
+    # find the index table and template given command
+    def _resolve(self, cmd):
+        if cmd in self.cmd_cache:
+            return self.cmd_cache[cmd]
         attrs = dict(Command=cmd)
         for cli_table in self.cli_tables.values():
             row_idx = cli_table.index.GetRowMatch(attrs)
             if row_idx != 0:
-                return cli_table.index.index[row_idx]['Template']
-        return None
+                value = [cli_table, cli_table.index.index[row_idx]['Template']]
+                return self._cache_add(self.cmd_cache, cmd, value)
+        return self._cache_add(self.cmd_cache, cmd, [None, None])
+
+    # find the templates of the index table row matching all the attributes
+    def _resolve_row(self, cli_table, attrs):
+        key = (id(cli_table), tuple(sorted(attrs.items())))
+        if key in self.row_cache:
+            return self.row_cache[key]
+        row_idx = cli_table.index.GetRowMatch(attrs)
+        value = cli_table.index.index[row_idx]['Template'] if row_idx != 0 else None
+        return self._cache_add(self.row_cache, key, value)
+
+    # find the template given command
+    def get_tmpl(self, cmd):
+        return self._resolve(cmd)[1]
 
     def get_table(self, cmd):
-        attrs = dict(Command=cmd)
-        for cli_table in self.cli_tables.values():
-            row_idx = cli_table.index.GetRowMatch(attrs)
-            if row_idx != 0:
-                return cli_table
-        return None
+        return self._resolve(cmd)[0]
+
+    def get_parse_stats(self):
+        return textfsm_pool.get_stats(self.root)
 
     # retrieve template and sample file given the command
     def read_sample(self, cmd):
@@ -90,15 +228,18 @@ class Template(object):
         if self.cli:
             attrs["cli"] = self.cli
 
-        tmpl_file = self.get_tmpl(cmd)
+        cli_table, tmpl_file = self._resolve(cmd)
         if not tmpl_file:
             raise ValueError('Unknown command "%s"' % (cmd))
 
-        cli_table = self.get_table(cmd)
         if not cli_table:
             raise ValueError('Unable to parse command "%s"' % (cmd))
 
-        cli_table.ParseCmd(output, attrs)
+        templates = self._resolve_row(cli_table, attrs)
+        if not templates:
+            raise clitable.CliTableError('No template found for attributes: "%s"' % attrs)
+
+        cli_table.ParseCmd(output, attrs, templates)
         objs = self.result(cli_table.header, cli_table)
         return [tmpl_file, objs]
 
@@ -160,12 +301,9 @@ class Template(object):
     # apply the given template on given data
     def apply_textfsm(self, tmpl_file, data):
         tmpl_file2 = os.path.join(self.root, tmpl_file)
-        tmpl_fp = open(tmpl_file2, "r")
-        re_table = textfsm.TextFSM(tmpl_fp)
-        out = re_table.ParseText(data)
-        tmpl_fp.close()
-        objs = self.result(re_table.header, out)
-        return re_table.header, objs
+        header, _, out = textfsm_pool.parse(tmpl_file2, data)
+        objs = self.result(header, out)
+        return header, objs
 
 
 if __name__ == "__main__":
@@ -4,12 +4,12 @@ import inspect
 import logging
 import os
 import pickle
-import random
 import shutil
 import sys
+import tempfile
 import time
 
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from pickle import UnpicklingError
 from threading import Lock
 from six import with_metaclass
@@ -22,7 +22,10 @@ CACHE_LOCATION = os.path.join(CURRENT_PATH, '../../../_cache')
 
 SIZE_LIMIT = 1000000000  # 1G bytes, max disk usage allowed by cache
 ENTRY_LIMIT = 1000000    # Max number of pickle files allowed in cache.
+MEMORY_ENTRY_LIMIT = 4096   # Max number of facts kept in the in-process LRU.
+EVICTION_RATIO = 0.9     # When a limit is exceeded, evict zones until usage drops below this ratio of the limit.
 DISABLE_CACHE_PARAM = "disable_cache"
+TMP_SUFFIX = '.tmp'
 
 
 class Singleton(type):
@@ -38,43 +41,161 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class _UsageLedger(object):
+    """Book keeping of the disk usage of the cache.
+
+    The ledger is built by scanning the cache folder once, after that it is updated incrementally on every write and
+    cleanup, so checking the usage is O(1). Every zone records the size of its pickle files and the last time it was
+    used, which is used for picking the zones to be evicted.
+    """
+
+    def __init__(self):
+        self.total_size = 0
+        self.total_entries = 0
+        self.zones = defaultdict(dict)      # zone -> {key: size}
+        self.last_used = {}                 # zone -> timestamp
+
+    def scan(self, cache_location):
+        self.__init__()
+        if not os.path.isdir(cache_location):
+            return
+        for zone in os.listdir(cache_location):
+            zone_path = os.path.join(cache_location, zone)
+            if not os.path.isdir(zone_path):
+                continue
+            for f in os.listdir(zone_path):
+                if not f.endswith('.pickle'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(zone_path, f))
+                except OSError:
+                    continue
+                self.add(zone, f[:-len('.pickle')], st.st_size, st.st_mtime)
+
+    def add(self, zone, key, size, timestamp=None):
+        self.remove(zone, key)
+        self.zones[zone][key] = size
+        self.total_size += size
+        self.total_entries += 1
+        self.touch(zone, timestamp)
+
+    def remove(self, zone, key):
+        size = self.zones.get(zone, {}).pop(key, None)
+        if size is not None:
+            self.total_size -= size
+            self.total_entries -= 1
+
+    def remove_zone(self, zone):
+        keys = self.zones.pop(zone, {})
+        self.total_size -= sum(keys.values())
+        self.total_entries -= len(keys)
+        self.last_used.pop(zone, None)
+
+    def touch(self, zone, timestamp=None):
+        timestamp = timestamp or time.time()
+        self.last_used[zone] = max(self.last_used.get(zone, 0), timestamp)
+
+    def exceeds(self, size_limit, entry_limit):
+        return self.total_size > size_limit or self.total_entries > entry_limit
+
+    def eviction_candidates(self):
+        """Zones ordered from the least recently used to the most recently used."""
+        return sorted(self.zones, key=lambda zone: self.last_used.get(zone, 0))
+
+
 class FactsCache(with_metaclass(Singleton, object)):
     """Singleton class for reading from cache and write to cache.
 
     Used singleton design pattern. Only a single instance of this class can be initialized.
 
+    The cache has two tiers. A bounded in-memory LRU holds the recently used facts, pickle files on disk hold all of
+    them. Pickle files are written to a temporary file first and then renamed, so readers never see a partially
+    written file. Disk usage is tracked by a ledger, when the limits are exceeded the least recently used zones are
+    evicted.
+
     Args:
         with_metaclass ([function]): Python 2&3 compatible function from the six library for adding metaclass.
     """
 
     NOTEXIST = object()
 
-    def __init__(self, cache_location=CACHE_LOCATION):
+    def __init__(self, cache_location=CACHE_LOCATION, memory_entry_limit=MEMORY_ENTRY_LIMIT):
         self._cache_location = os.path.abspath(cache_location)
-        self._cache = defaultdict(dict)
+        self._memory_entry_limit = memory_entry_limit
+        self._cache = OrderedDict()     # (zone, key) -> facts, in LRU order
+        self._ledger = None
         self._write_lock = Lock()
-
-    def _check_usage(self):
-        """Check cache usage, raise exception if usage exceeds the limitations.
+        self._memory_lock = Lock()
+
+    def _facts_file(self, zone, key):
+        return os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+
+    def _memory_get(self, zone, key):
+        with self._memory_lock:
+            facts = self._cache.get((zone, key), self.NOTEXIST)
+            if facts is not self.NOTEXIST:
+                self._cache.move_to_end((zone, key))
+            return facts
+
+    def _memory_put(self, zone, key, value):
+        with self._memory_lock:
+            self._cache[(zone, key)] = value
+            self._cache.move_to_end((zone, key))
+            while len(self._cache) > self._memory_entry_limit:
+                self._cache.popitem(last=False)
+
+    def _memory_pop(self, zone, key):
+        with self._memory_lock:
+            return self._cache.pop((zone, key), self.NOTEXIST)
+
+    def _memory_drop_zone(self, zone):
+        with self._memory_lock:
+            for cached_key in [k for k in self._cache if k[0] == zone]:
+                del self._cache[cached_key]
+
+    def _memory_clear(self):
+        with self._memory_lock:
+            self._cache.clear()
+
+    def _get_ledger(self):
+        if self._ledger is None:
+            self._ledger = _UsageLedger()
+            self._ledger.scan(self._cache_location)
+        return self._ledger
+
+    def _check_usage(self, current_zone=None):
+        """Check cache usage, evict the least recently used zones if usage exceeds the limitations.
+
+        Other processes may write to the same cache folder, so the ledger is re-synced from disk before evicting.
         """
-        total_size = 0
-        total_entries = 0
-        for root, _, files in os.walk(self._cache_location):
-            for f in files:
-                fp = os.path.join(root, f)
-                total_size += os.path.getsize(fp)
-                total_entries += 1
-
-        if total_size > SIZE_LIMIT or total_entries > ENTRY_LIMIT:
-            msg = 'Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, ENTRY_LIMIT={}' \
-                .format(total_size, SIZE_LIMIT, total_entries, ENTRY_LIMIT)
-            raise Exception(msg)
+        ledger = self._get_ledger()
+        if not ledger.exceeds(SIZE_LIMIT, ENTRY_LIMIT):
+            return
+
+        ledger.scan(self._cache_location)
+        if not ledger.exceeds(SIZE_LIMIT, ENTRY_LIMIT):
+            return
+
+        logger.warning('[Cache] Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, '
+                       'ENTRY_LIMIT={}'.format(ledger.total_size, SIZE_LIMIT, ledger.total_entries, ENTRY_LIMIT))
+        for zone in ledger.eviction_candidates():
+            if not ledger.exceeds(SIZE_LIMIT * EVICTION_RATIO, ENTRY_LIMIT * EVICTION_RATIO):
+                break
+            if zone == current_zone:
+                continue
+            logger.info('[Cache] Evict zone "{}"'.format(zone))
+            self._memory_drop_zone(zone)
+            ledger.remove_zone(zone)
+            shutil.rmtree(os.path.join(self._cache_location, zone), ignore_errors=True)
 
     def _read_facts_file(self, facts_file, z, k):
         with open(facts_file, 'rb') as f:
-            self._cache[z][k] = pickle.load(f)
-            logger.debug('[Cache] Loaded cached facts "{}.{}" from {}'.format(z, k, facts_file))
-            return self._cache[z][k]
+            facts = pickle.load(f)
+        self._memory_put(z, k, facts)
+        if self._ledger is not None:
+            self._ledger.touch(z)
+        logger.debug('[Cache] Loaded cached facts "{}.{}" from {}'.format(z, k, facts_file))
+        return facts
 
     def read(self, zone, key):
         """Read cached facts.
@@ -88,41 +209,28 @@ class FactsCache(with_metaclass(Singleton, object)):
             obj: Cached object, usually a dictionary.
         """
         # Lazy load
-        if zone in self._cache and key in self._cache[zone]:
+        facts = self._memory_get(zone, key)
+        if facts is not self.NOTEXIST:
             logger.debug('[Cache] Read cached facts "{}.{}"'.format(zone, key))
-            return self._cache[zone][key]
-        else:
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
-            try:
-                return self._read_facts_file(facts_file, zone, key)
-            except (IOError, ValueError) as e:
-                logger.info('[Cache] Load cache file "{}" failed with IOError or ValueError: {}'
-                            .format(os.path.abspath(facts_file), repr(e)))
-                return self.NOTEXIST
-            except (EOFError, UnpicklingError) as e:
-                # When parallel run is enabled, multiple processes may try to read/write the same cache file,
-                # so there will be a chance that
-                #   - a file is being written by process1 while process2 is reading it, causing EOFError in process2
-                #   - a file is being read by multiple processes at the same time, causing UnpicklingError in some of
-                #     the processes
-                # In these cases, we will retry to read the file after a short random sleep. If we still get the same
-                # error after retrying, we will return NOTEXIST to overwrite the file.
-                retry_attempts = 3
-                for attempt in range(retry_attempts):
-                    time.sleep(random.randint(3, 6))
-                    try:
-                        return self._read_facts_file(facts_file, zone, key)
-                    except (EOFError, UnpicklingError):
-                        logger.warning('[Cache] Retry {}/{} failed for file "{}"'
-                                       .format(attempt + 1, retry_attempts, facts_file))
-
-                logger.error('[Cache] Load cache file "{}" failed with EOFError or UnpicklingError: {}'
-                             .format(facts_file, repr(e)))
-                return self.NOTEXIST
-            except Exception as e:
-                logger.info('[Cache] Load cache file "{}" failed with unknown exception: {}'
-                            .format(os.path.abspath(facts_file), repr(e)))
-                return self.NOTEXIST
+            return facts
+
+        facts_file = self._facts_file(zone, key)
+        try:
+            return self._read_facts_file(facts_file, zone, key)
+        except (IOError, ValueError) as e:
+            logger.info('[Cache] Load cache file "{}" failed with IOError or ValueError: {}'
+                        .format(os.path.abspath(facts_file), repr(e)))
+            return self.NOTEXIST
+        except (EOFError, UnpicklingError) as e:
+            # Cache files are replaced atomically, so a truncated or corrupted file will not fix itself by waiting.
+            # Return NOTEXIST so that the facts will be gathered again and the file will be overwritten.
+            logger.error('[Cache] Load cache file "{}" failed with EOFError or UnpicklingError: {}'
+                         .format(facts_file, repr(e)))
+            return self.NOTEXIST
+        except Exception as e:
+            logger.info('[Cache] Load cache file "{}" failed with unknown exception: {}'
+                        .format(os.path.abspath(facts_file), repr(e)))
+            return self.NOTEXIST
 
     def write(self, zone, key, value):
         """Store facts to cache.
@@ -137,22 +245,32 @@ class FactsCache(with_metaclass(Singleton, object)):
             boolean: Caching facts is successful or not.
         """
         with self._write_lock:
-            self._check_usage()
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+            self._check_usage(current_zone=zone)
+            facts_file = self._facts_file(zone, key)
+            tmp_file = None
             try:
                 cache_subfolder = os.path.join(self._cache_location, zone)
                 if not os.path.exists(cache_subfolder):
                     logger.info('[Cache] Create cache dir {}'.format(cache_subfolder))
-                    os.makedirs(cache_subfolder)
+                    os.makedirs(cache_subfolder, exist_ok=True)
 
-                with open(facts_file, 'wb') as f:
+                fd, tmp_file = tempfile.mkstemp(prefix='{}.'.format(key), suffix=TMP_SUFFIX, dir=cache_subfolder)
+                with os.fdopen(fd, 'wb') as f:
                     pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
-                    self._cache[zone][key] = value
-                    logger.info('[Cache] Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
-                    return True
-            except (IOError, ValueError) as e:
+                    size = f.tell()
+                os.replace(tmp_file, facts_file)
+                tmp_file = None
+
+                self._memory_put(zone, key, value)
+                self._get_ledger().add(zone, key, size)
+                logger.info('[Cache] Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
+                return True
+            except (IOError, ValueError, pickle.PicklingError) as e:
                 logger.error('[Cache] Dump cache file "{}" failed with exception: {}'.format(facts_file, repr(e)))
                 return False
+            finally:
+                if tmp_file and os.path.exists(tmp_file):
+                    os.remove(tmp_file)
 
     def cleanup(self, zone=None, key=None):
         """Cleanup cached files.
@@ -165,9 +283,10 @@ class FactsCache(with_metaclass(Singleton, object)):
         """
         if zone:
             if key:
-                if zone in self._cache and key in self._cache[zone]:
-                    del self._cache[zone][key]
+                if self._memory_pop(zone, key) is not self.NOTEXIST:
                     logger.debug('[Cache] Removed "{}.{}" from cache.'.format(zone, key))
+                if self._ledger is not None:
+                    self._ledger.remove(zone, key)
                 try:
                     cache_file = os.path.join(self._cache_location, zone, '{}.pickle'.format(key))
                     os.remove(cache_file)
@@ -176,9 +295,10 @@ class FactsCache(with_metaclass(Singleton, object)):
                     logger.error('[Cache] Cleanup cache {}.{}.pickle failed with exception: {}'
                                  .format(zone, key, repr(e)))
             else:
-                if zone in self._cache:
-                    del self._cache[zone]
-                    logger.debug('[Cache] Removed zone "{}" from cache'.format(zone))
+                self._memory_drop_zone(zone)
+                logger.debug('[Cache] Removed zone "{}" from cache'.format(zone))
+                if self._ledger is not None:
+                    self._ledger.remove_zone(zone)
                 try:
                     cache_subfolder = os.path.join(self._cache_location, zone)
                     shutil.rmtree(cache_subfolder)
@@ -186,7 +306,8 @@ class FactsCache(with_metaclass(Singleton, object)):
                 except OSError as e:
                     logger.error('[Cache] Remove cache subfolder "{}" failed with exception: {}'.format(zone, repr(e)))
         else:
-            self._cache = defaultdict(dict)
+            self._memory_clear()
+            self._ledger = None
             try:
                 shutil.rmtree(self._cache_location)
                 logger.debug('[Cache] Removed all cache files under "{}"'.format(self._cache_location))
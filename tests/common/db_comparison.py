@@ -10,15 +10,19 @@ Main features:
 - Compare snapshots and generate detailed diffs
 - Filter out volatile/transient data that changes frequently
 - Provide metrics on database differences
+
+Snapshots are dumped on the DUT into a gzipped file of one line per key, with an index of the content hash of
+every key and of every table. Comparing two snapshots only loads the keys of the tables whose hashes differ.
 """
 
 from enum import Enum
+import gzip
 import json
 import logging
 import os
 import re
 import copy
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from collections import Counter
 from dataclasses import dataclass
 
@@ -81,6 +85,203 @@ def dut_dump(redis_cmd, duthost, data_dir, fname):
     return db_read
 
 
+# Runs on the DUT with the python3 of the host OS. Dumps a DB like redis-dump into a gzipped file of one
+# '<json key>\t<json entry>' line per key, sorted by key, and writes a gzipped JSON index of the hash of every key
+# and of every table. The hashes leave out the fields in the ignore list, at any level of the entry.
+HASHED_DUMP_SCRIPT = r'''
+import gzip
+import hashlib
+import json
+import re
+import sys
+import time
+
+import redis
+
+BATCH_SIZE = 1000
+TABLE_RE = re.compile(r"^(ASIC_STATE:[^:]+|[^:|]+)")
+
+
+def strip(value, ignore):
+    if isinstance(value, dict):
+        return dict((k, strip(v, ignore)) for k, v in value.items() if k not in ignore)
+    return value
+
+
+def read_batch(db, keys):
+    pipe = db.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+        pipe.pttl(key)
+    meta = pipe.execute()
+    types = meta[0::2]
+    pttls = meta[1::2]
+    pipe = db.pipeline(transaction=False)
+    for key, key_type in zip(keys, types):
+        if key_type == "hash":
+            pipe.hgetall(key)
+        elif key_type == "list":
+            pipe.lrange(key, 0, -1)
+        elif key_type == "set":
+            pipe.smembers(key)
+        elif key_type == "zset":
+            pipe.zrange(key, 0, -1, withscores=True)
+        else:
+            pipe.get(key)
+    now = time.time()
+    for key, key_type, pttl, value in zip(keys, types, pttls, pipe.execute()):
+        if key_type == "none" or value is None:
+            # Deleted since the scan
+            continue
+        if key_type == "set":
+            value = sorted(value)
+        elif key_type == "zset":
+            value = [[member, score] for member, score in value]
+        entry = {"type": key_type, "value": value}
+        if pttl is not None and pttl > 0:
+            entry["ttl"] = pttl / 1000.0
+            entry["expireat"] = now + pttl / 1000.0
+        yield key, entry
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        config = json.load(f)
+    ignore = set(config["ignore"])
+    db = redis.Redis(db=config["db"], decode_responses=True)
+    keys = sorted(db.scan_iter(count=BATCH_SIZE))
+    tables = {}
+    hashers = {}
+    with gzip.open(config["data"], "wt") as data:
+        for start in range(0, len(keys), BATCH_SIZE):
+            for key, entry in read_batch(db, keys[start:start + BATCH_SIZE]):
+                data.write(json.dumps(key) + "\t" + json.dumps(entry, sort_keys=True) + "\n")
+                key_hash = hashlib.sha1(json.dumps(strip(entry, ignore), sort_keys=True).encode()).hexdigest()
+                match = TABLE_RE.match(key)
+                table_name = match.group(1) if match else key
+                table = tables.get(table_name)
+                if table is None:
+                    table = tables[table_name] = {"keys": {}, "values": 0, "values_excl": 0}
+                    hashers[table_name] = hashlib.sha1()
+                table["keys"][key] = key_hash
+                value = entry["value"]
+                table["values"] += len(value)
+                table["values_excl"] += len([k for k in value if k not in ignore]) if isinstance(value, dict) \
+                    else len(value)
+                hashers[table_name].update((key + "\0" + key_hash + "\n").encode())
+    for table_name, table in tables.items():
+        table["hash"] = hashers[table_name].hexdigest()
+    with gzip.open(config["index"], "wt") as f:
+        json.dump({"version": 1, "db": config["db"], "ignore": sorted(ignore), "tables": tables}, f)
+
+
+main()
+'''
+
+
+def dut_hashed_dump(duthost, db, ignore, data_dir, fname):
+    """
+    Dump a Redis DB on a DUT into a hashed snapshot and fetch it.
+
+    Unlike dut_dump(), the dump is compressed on the DUT and is not loaded: the snapshot only reads the keys that
+    are asked for, see HashedSnapshot.
+
+    Args:
+        duthost: The DUT host object with shell, copy and fetch capabilities
+        db (int): Index of the Redis DB to dump
+        ignore (iterable): Names of the volatile fields left out of the hashes
+        data_dir (str): Local directory path where the snapshot files will be stored
+        fname (str): Base filename for the snapshot files (without extension)
+
+    Returns:
+        HashedSnapshot: The fetched snapshot
+
+    Raises:
+        AssertionError: If the dump fails or file operations fail
+    """
+    script_file = "/tmp/hashed_redis_dump.py"
+    config_file = "/tmp/{}.config.json".format(fname)
+    files = {"data": "/tmp/{}.jsonl.gz".format(fname), "index": "/tmp/{}.index.json.gz".format(fname)}
+    duthost.copy(content=HASHED_DUMP_SCRIPT, dest=script_file)
+    duthost.copy(content=json.dumps(dict(files, db=db, ignore=sorted(ignore))), dest=config_file)
+    try:
+        ret = duthost.shell("python3 {} {}".format(script_file, config_file), module_ignore_errors=True)
+        assert ret["rc"] == 0, "Failed to dump DB {}: {}".format(db, ret.get("stderr", ""))
+
+        local_files = {}
+        for kind, dut_file in files.items():
+            ret = duthost.fetch(src=dut_file, dest=os.path.join(data_dir, ""), flat=True)
+            dest_file = ret.get("dest", None)
+            assert dest_file is not None, "Failed to fetch src={} dest:{}".format(dut_file, data_dir)
+            assert os.path.exists(dest_file), "Fetched file not exist: {}".format(dest_file)
+            local_files[kind] = dest_file
+    finally:
+        duthost.shell("rm -f {} {}".format(config_file, " ".join(files.values())), module_ignore_errors=True)
+    return HashedSnapshot(local_files["data"], local_files["index"])
+
+
+class HashedSnapshot:
+    """
+    Snapshot of a Redis DB taken by dut_hashed_dump().
+
+    The index, with the hash of every key and of every table, is loaded on creation. The entries of the keys
+    are only loaded by load(), which streams the data file and only decodes the requested keys.
+    """
+
+    def __init__(self, data_file: str, index_file: str):
+        self.data_file = data_file
+        with gzip.open(index_file, "rt") as f:
+            index = json.load(f)
+        self.ignore = frozenset(index["ignore"])
+        self.tables: Dict[str, dict] = index["tables"]
+
+    def __len__(self) -> int:
+        return sum(len(table["keys"]) for table in self.tables.values())
+
+    def total_values(self) -> Tuple[int, int]:
+        """Number of values of all the keys, including and excluding the ignored fields"""
+        return (sum(table["values"] for table in self.tables.values()),
+                sum(table["values_excl"] for table in self.tables.values()))
+
+    def load(self, keys: Optional[Iterable[str]] = None) -> dict:
+        """
+        Load the entries of some keys of the snapshot.
+
+        Args:
+            keys (iterable): Keys to load, all the keys if None
+
+        Returns:
+            dict: Entries by key, in the format of redis-dump
+        """
+        wanted = None if keys is None else set(json.dumps(key) for key in keys)
+        result = {}
+        with gzip.open(self.data_file, "rt") as f:
+            for line in f:
+                key, entry = line.split("\t", 1)
+                if wanted is None or key in wanted:
+                    result[json.loads(key)] = json.loads(entry)
+        return result
+
+
+def differing_keys(snapshot_a: HashedSnapshot, snapshot_b: HashedSnapshot) -> Set[str]:
+    """
+    Find the keys whose entries may differ between two snapshots.
+
+    The tables with the same hash are skipped, then the keys of the other tables are compared by hash. A key in
+    only one of the snapshots is returned too.
+    """
+    keys = set()
+    for name in set(snapshot_a.tables) | set(snapshot_b.tables):
+        table_a = snapshot_a.tables.get(name, {"hash": None, "keys": {}})
+        table_b = snapshot_b.tables.get(name, {"hash": None, "keys": {}})
+        if table_a["hash"] is not None and table_a["hash"] == table_b["hash"]:
+            continue
+        keys_a = table_a["keys"]
+        keys_b = table_b["keys"]
+        keys.update(key for key in set(keys_a) | set(keys_b) if keys_a.get(key) != keys_b.get(key))
+    return keys
+
+
 class DBType(Enum):
     """Supported Redis database types in SONiC. Value is their numeric DB index."""
     APPL = 0
@@ -291,22 +492,52 @@ class DbComparisonMetrics:
 
 class SnapshotDiff:
     """Container for differing values and metrics of a snapshot comparison for a singleDB supporting metric tracking
+
+    The snapshots are either the full dumps as dicts, or HashedSnapshots. Of HashedSnapshots hashed without the
+    volatile values of db_type, only the keys whose hashes differ are loaded and diffed.
     """
-    def __init__(self, db_type: DBType, snapshot_a: dict, snapshot_b: dict, label_a: str = "a", label_b: str = "b"):
+    def __init__(self, db_type: DBType, snapshot_a, snapshot_b, label_a: str = "a", label_b: str = "b"):
         self._db_type = db_type
-        self._snapshot_a = snapshot_a
-        self._snapshot_b = snapshot_b
         self._label_a = label_a
         self._label_b = label_b
-
-        # Start building metrics on snapshot
         self._metrics = DbComparisonMetrics()
-        self._metrics.total_a_keys = len(self._snapshot_a)
-        self._metrics.total_a_values_incl_volatile, self._metrics.total_a_values_excl_volatile = \
-            _sum_total_values(db_type, self._snapshot_a)
-        self._metrics.total_b_keys = len(self._snapshot_b)
-        self._metrics.total_b_values_incl_volatile, self._metrics.total_b_values_excl_volatile = \
-            _sum_total_values(db_type, self._snapshot_b)
+
+        indexed = False
+        if isinstance(snapshot_a, HashedSnapshot) and isinstance(snapshot_b, HashedSnapshot):
+            ignore = frozenset(VOLATILE_VALUES.get(db_type, []))
+            indexed = snapshot_a.ignore == ignore and snapshot_b.ignore == ignore
+            if indexed:
+                # Start building metrics on snapshot from the indexes
+                self._metrics.total_a_keys = len(snapshot_a)
+                self._metrics.total_a_values_incl_volatile, self._metrics.total_a_values_excl_volatile = \
+                    snapshot_a.total_values()
+                self._metrics.total_b_keys = len(snapshot_b)
+                self._metrics.total_b_values_incl_volatile, self._metrics.total_b_values_excl_volatile = \
+                    snapshot_b.total_values()
+                keys = differing_keys(snapshot_a, snapshot_b)
+                if db_type == DBType.STATE:
+                    # PROCESS_STATS entries are paired up by CMD, not by key
+                    keys.update(key for snapshot in (snapshot_a, snapshot_b)
+                                for key in snapshot.tables.get("PROCESS_STATS", {"keys": {}})["keys"])
+                logger.info(f"Loading {len(keys)} differing keys of {db_type.name} DB")
+                self._snapshot_a = snapshot_a.load(keys)
+                self._snapshot_b = snapshot_b.load(keys)
+            else:
+                # Hashed with other volatile values, the hashes can't be used
+                self._snapshot_a = snapshot_a.load()
+                self._snapshot_b = snapshot_b.load()
+        else:
+            self._snapshot_a = snapshot_a
+            self._snapshot_b = snapshot_b
+
+        if not indexed:
+            # Start building metrics on snapshot
+            self._metrics.total_a_keys = len(self._snapshot_a)
+            self._metrics.total_a_values_incl_volatile, self._metrics.total_a_values_excl_volatile = \
+                _sum_total_values(db_type, self._snapshot_a)
+            self._metrics.total_b_keys = len(self._snapshot_b)
+            self._metrics.total_b_values_incl_volatile, self._metrics.total_b_values_excl_volatile = \
+                _sum_total_values(db_type, self._snapshot_b)
 
         # Build the diff
         if db_type == DBType.STATE:
@@ -567,7 +798,7 @@ class SonicRedisDBSnapshotter:
         Take a snapshot of specified Redis databases on the DUT.
 
         This method captures the current state of the specified Redis databases
-        and stores them as JSON files in a snapshot directory.
+        and stores them as hashed snapshots (see dut_hashed_dump()) in a snapshot directory.
 
         Args:
             snapshot_name (str): Name identifier for this snapshot
@@ -578,10 +809,7 @@ class SonicRedisDBSnapshotter:
         snapshot_dir = f"{self._snapshot_base_dir}/{snapshot_name}/"
         os.makedirs(snapshot_dir, exist_ok=True)
         for db in snapshot_dbs:
-            cmd = f"redis-dump -d {db.value} --pretty"
-            dump = dut_dump(cmd, self._duthost, snapshot_dir, db.name)
-            with open(f"{snapshot_dir}/{db.name}.json", "w") as f:
-                f.write(json.dumps(dump, indent=4, default=str))
+            dut_hashed_dump(self._duthost, db.value, VOLATILE_VALUES.get(db, []), snapshot_dir, db.name)
 
         logger.info(f"Snapshot {snapshot_name} taken for {self._duthost.hostname} at {snapshot_dir}")
 
@@ -605,23 +833,25 @@ class SonicRedisDBSnapshotter:
             AssertionError: If the snapshots don't contain the same database types
         """
         snapshot_a_dir = f"{self._snapshot_base_dir}/{snapshot_a}"
-        snapshot_a_dbs = [f for f in os.listdir(snapshot_a_dir) if f.endswith(".json")]
+        snapshot_a_dbs = [f for f in os.listdir(snapshot_a_dir) if f.endswith(".index.json.gz")]
 
         snapshot_b_dir = f"{self._snapshot_base_dir}/{snapshot_b}"
-        snapshot_b_dbs = [f for f in os.listdir(snapshot_b_dir) if f.endswith(".json")]
+        snapshot_b_dbs = [f for f in os.listdir(snapshot_b_dir) if f.endswith(".index.json.gz")]
 
         assert set(snapshot_a_dbs) == set(snapshot_b_dbs), "Snapshotted dbs do not match. Cannot compare"
 
         result = {}
 
         for db_file in snapshot_a_dbs:
-            db_name = db_file.replace(".json", "")
+            db_name = db_file.replace(".index.json.gz", "")
             db_type = DBType[db_name]
             if db_type == DBType.ASIC:
                 # NOTE: ASIC DB diffing not currently supported
                 continue
-            db_dump_a = json.load(open(os.path.join(snapshot_a_dir, db_file), 'r'))
-            db_dump_b = json.load(open(os.path.join(snapshot_b_dir, db_file), 'r'))
+            db_dump_a = HashedSnapshot(os.path.join(snapshot_a_dir, f"{db_name}.jsonl.gz"),
+                                       os.path.join(snapshot_a_dir, db_file))
+            db_dump_b = HashedSnapshot(os.path.join(snapshot_b_dir, f"{db_name}.jsonl.gz"),
+                                       os.path.join(snapshot_b_dir, db_file))
             snapshot_diff = SnapshotDiff(db_type, db_dump_a, db_dump_b, label_a=snapshot_a, label_b=snapshot_b)
 
             result[db_type] = snapshot_diff
@@ -0,0 +1,125 @@
+"""
+Batched command execution for SonicHost.
+
+Independent commands queued in a CommandBatch are shipped to the DUT in a single shell_cmds module call. Every queued
+command gets a BatchCommandResult right away, its result is available once the batch has run. Reading a result before
+that runs the batch.
+
+Example:
+    with duthost.batch() as batch:
+        crm = batch.shell("crm show resources all")
+        version = batch.shell("show version")
+    crm_lines = crm["stdout_lines"]
+"""
+import logging
+
+from pytest_ansible.results import ModuleResult
+
+from tests.common.errors import RunAnsibleModuleFail
+
+logger = logging.getLogger(__name__)
+
+
+class BatchCommandResult(object):
+    """
+    Result of a command queued in a CommandBatch.
+
+    It can be used like the result of the shell module, e.g. result["stdout_lines"].
+    """
+
+    def __init__(self, batch, cmd, module_ignore_errors):
+        self.batch = batch
+        self.cmd = cmd
+        self.module_ignore_errors = module_ignore_errors
+        self._result = None
+
+    @property
+    def done(self):
+        return self._result is not None
+
+    def set_result(self, result):
+        self._result = result
+
+    def result(self):
+        """
+        Get the result of the command, run the batch if it hasn't run yet.
+
+        Returns:
+            ModuleResult: Result with the keys of the shell module result.
+
+        Raises:
+            RunAnsibleModuleFail: The command failed and module_ignore_errors is not set.
+        """
+        if self._result is None:
+            self.batch.run()
+        if self._result['failed'] and not self.module_ignore_errors:
+            raise RunAnsibleModuleFail("run command '{}' in batch failed".format(self.cmd), self._result)
+        return self._result
+
+    def __getitem__(self, key):
+        return self.result()[key]
+
+    def get(self, key, default=None):
+        return self.result().get(key, default)
+
+    def __repr__(self):
+        return '<BatchCommandResult {} {}>'.format(self.cmd, 'done' if self.done else 'pending')
+
+
+class CommandBatch(object):
+    """
+    Collects independent shell commands and runs them on the host in one remote execution.
+
+    The commands run one after another by /bin/sh in the order they were queued, a failed command doesn't stop the
+    rest. Commands queued after the batch has run go into the next execution.
+    """
+
+    def __init__(self, host, timeout=0):
+        """
+        Args:
+            host: The SonicHost to run the commands on.
+            timeout (int): Time limit in seconds of each command, 0 means no limit.
+        """
+        self.host = host
+        self.timeout = timeout
+        self._pending = []
+
+    def shell(self, cmd, module_ignore_errors=False):
+        """
+        Queue a shell command.
+
+        Returns:
+            BatchCommandResult: Result of the command, available once the batch has run.
+        """
+        pending = BatchCommandResult(self, cmd, module_ignore_errors)
+        self._pending.append(pending)
+        return pending
+
+    def run(self):
+        """Run the pending commands."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        logger.debug("[{}] Run {} commands in batch".format(self.host.hostname, len(pending)))
+        res = self.host.shell_cmds(cmds=[p.cmd for p in pending], continue_on_fail=True,
+                                   timeout=self.timeout, module_ignore_errors=True)
+        results = res.get('results', [])
+        if len(results) != len(pending):
+            raise RunAnsibleModuleFail("run {} commands in batch failed".format(len(pending)), res)
+
+        for p, result in zip(pending, results):
+            # Same as the shell module, the trailing new line of the output is stripped
+            result['stdout'] = result['stdout'].rstrip('\r\n')
+            result['stderr'] = result['stderr'].rstrip('\r\n')
+            result['failed'] = result['rc'] != 0
+            result['changed'] = True
+            p.set_result(ModuleResult(result))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.run()
+        return False
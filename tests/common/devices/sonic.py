@@ -12,10 +12,15 @@ from datetime import datetime, timedelta
 
 from ansible import constants as ansible_constants
 from ansible.plugins.loader import connection_loader
+from ansible.template import Templar
+from pytest_ansible.results import ModuleResult
 
 from tests.common.devices.base import AnsibleHostBase
+from tests.common.devices.command_batch import CommandBatch
 from tests.common.devices.constants import ACL_COUNTERS_UPDATE_INTERVAL_IN_SEC
+from tests.common.devices.ssh_channel import ChannelNotSupported, ChannelUnavailable, PersistentShellChannel
 from tests.common.helpers.dut_utils import is_supervisor_node, is_macsec_capable_node
+from tests.common.helpers.show_table import parse_column_positions, parse_show
 from tests.common.utilities import get_host_visible_vars, wait_until
 from tests.common.cache import cached
 from tests.common.helpers.constants import DEFAULT_ASIC_ID, DEFAULT_NAMESPACE
@@ -73,6 +78,10 @@ class SonicHost(AnsibleHostBase):
     """
     DEFAULT_ASIC_SERVICES = ["bgp", "database", "lldp", "swss", "syncd", "teamd"]
 
+    # Class-level flag for running shell/command calls over a persistent SSH channel instead of Ansible.
+    # Set by the persistent_shell_enabled fixture in conftest.py
+    _persistent_shell_mode = False
+
     """
     setting either one of shell_user/shell_pw or ssh_user/ssh_passwd pair should yield the same result.
     """
@@ -82,6 +91,7 @@ class SonicHost(AnsibleHostBase):
         AnsibleHostBase.__init__(self, ansible_adhoc, hostname)
 
         self.DEFAULT_ASIC_SERVICES = ["bgp", "database", "lldp", "swss", "syncd", "teamd"]
+        self._persistent_shell = None
 
         if shell_user and shell_passwd:
             im = self.host.options['inventory_manager']
@@ -151,6 +161,92 @@ class SonicHost(AnsibleHostBase):
     def __repr__(self):
         return self.__str__()
 
+    @classmethod
+    def set_persistent_shell(cls, enabled):
+        """Enable or disable running shell/command calls over a persistent SSH channel.
+
+        Called by the persistent_shell_enabled fixture in conftest.py.
+        """
+        cls._persistent_shell_mode = enabled
+        if enabled:
+            logger.info("Persistent shell mode enabled")
+
+    def get_persistent_shell(self):
+        """
+        Get the persistent SSH channel of this host.
+
+        The channel uses the SSH credentials Ansible uses for this host.
+
+        Returns:
+            PersistentShellChannel or None: None if the host isn't reached over SSH.
+        """
+        if self._persistent_shell is None:
+            vm = self.host.options['variable_manager']
+            im = self.host.options['inventory_manager']
+            hostvars = vm.get_vars(host=im.get_host(self.hostname))
+            if hostvars.get('ansible_connection', 'ssh') not in ('ssh', 'paramiko', 'smart'):
+                self._persistent_shell = False
+                return None
+
+            templar = Templar(loader=vm._loader, variables=hostvars)
+            username = templar.template(hostvars.get('ansible_ssh_user') or hostvars.get('ansible_user'))
+            password = templar.template(hostvars.get('ansible_ssh_pass') or hostvars.get('ansible_password'))
+            port = int(templar.template(hostvars.get('ansible_ssh_port') or hostvars.get('ansible_port') or 22))
+            self._persistent_shell = PersistentShellChannel(self.hostname, self.mgmt_ip, username, password,
+                                                            port=port)
+        return self._persistent_shell or None
+
+    def _run_shell_module(self, module_name, *module_args, **complex_args):
+        verbose = complex_args.get('verbose', True)
+        module_ignore_errors = complex_args.get('module_ignore_errors', False)
+        options = dict((k, v) for k, v in complex_args.items() if k not in ('verbose', 'module_ignore_errors'))
+
+        channel = self.get_persistent_shell() if self._persistent_shell_mode else None
+        if channel is None or not PersistentShellChannel.supports(module_name, module_args, options):
+            return self._run(module_name, *module_args, **complex_args)
+
+        if verbose:
+            logger.debug("[{}] PersistentShell::{}, args={}, kwargs={}".format(
+                self.hostname, module_name, json.dumps(module_args), json.dumps(options)))
+        try:
+            res = ModuleResult(channel.run(module_name, *module_args, **options))
+        except ChannelUnavailable as e:
+            logger.warning("[{}] PersistentShell::{} unavailable: {}, fall back to Ansible".format(
+                self.hostname, module_name, repr(e)))
+            if isinstance(e, ChannelNotSupported):
+                self._persistent_shell = False
+            return self._run(module_name, *module_args, **complex_args)
+        res.encoder = AnsibleHostBase.CustomEncoder
+
+        if verbose:
+            logger.debug("[{}] PersistentShell::{} Result => {}".format(self.hostname, module_name, json.dumps(res)))
+        else:
+            logger.debug("[{}] PersistentShell::{} done, is_failed={}, rc={}".format(
+                self.hostname, module_name, res['failed'], res['rc']))
+
+        if res['failed'] and not module_ignore_errors:
+            raise RunAnsibleModuleFail("run module {} failed".format(module_name), res)
+        return res
+
+    def shell(self, *module_args, **complex_args):
+        return self._run_shell_module('shell', *module_args, **complex_args)
+
+    def command(self, *module_args, **complex_args):
+        return self._run_shell_module('command', *module_args, **complex_args)
+
+    def batch(self, timeout=0):
+        """
+        Collect independent shell commands and run them on the DUT in one remote execution.
+
+        Args:
+            timeout (int): Time limit in seconds of each command, 0 means no limit.
+
+        Returns:
+            CommandBatch: Queue commands by batch.shell(), the batch runs when the context exits or when a result is
+                read before that.
+        """
+        return CommandBatch(self, timeout=timeout)
+
     @property
     def facts(self):
         """
@@ -490,19 +586,25 @@ class SonicHost(AnsibleHostBase):
                 return retry
         return result
 
-    def get_critical_group_and_process_lists(self, container_name):
+    def _critical_processes_cmd(self, container_name):
+        return "docker exec {} bash -c '[ -f /etc/supervisor/critical_processes ] \
+                && cat /etc/supervisor/critical_processes'".format(container_name)
+
+    def get_critical_group_and_process_lists(self, container_name, file_content=None, process_list=None):
         """
         @summary: Get critical group and process lists by parsing the
                   critical_processes file in the specified container
+        @param file_content: Result of the command reading the critical_processes file, read it if not given
+        @param process_list: Result of supervisorctl status of the pmon container, run it if needed and not given
         @return: Two lists which include the critical groups and critical processes respectively
         """
         critical_group_list = []
         critical_process_list = []
         succeeded = True
 
-        cmd = "docker exec {} bash -c '[ -f /etc/supervisor/critical_processes ] \
-                && cat /etc/supervisor/critical_processes'".format(container_name)
-        file_content = self.shell(cmd, module_ignore_errors=True)
+        cmd = self._critical_processes_cmd(container_name)
+        if file_content is None:
+            file_content = self.shell(cmd, module_ignore_errors=True)
         file_content = self._retry_if_oci_exec_race(cmd, file_content)
         for line in file_content["stdout_lines"]:
             line_info = line.strip().split(':')
@@ -530,8 +632,9 @@ class SonicHost(AnsibleHostBase):
         if succeeded and container_name == "pmon":
             expected_critical_group_list = []
             expected_critical_process_list = []
-            process_list = self.shell("docker exec {} supervisorctl status"
-                                      .format(container_name), module_ignore_errors=True)
+            if process_list is None:
+                process_list = self.shell("docker exec {} supervisorctl status"
+                                          .format(container_name), module_ignore_errors=True)
             for process_info in process_list["stdout_lines"]:
                 process_name = process_info.split()[0].strip()
                 process_status = process_info.split()[1].strip()
@@ -615,20 +718,28 @@ class SonicHost(AnsibleHostBase):
             'running_critical_process': []
         }
 
+        # Get service state, critical processes definition and process status in one round trip
+        with self.batch() as batch:
+            service_state = batch.shell(r"docker inspect -f \{\{.State.Running\}\} %s" % service,
+                                        module_ignore_errors=True)
+            file_content = batch.shell(self._critical_processes_cmd(service), module_ignore_errors=True)
+            output = batch.shell("docker exec {} supervisorctl status".format(service), module_ignore_errors=True)
+
         # return false if the service is not started
-        service_status = self.is_service_fully_started(service)
-        if service_status is False:
+        if service_state["rc"] != 0 or service_state["stdout"].strip() != "true":
             result['status'] = False
             return result
 
+        # get process status for the service
+        output = self._retry_if_oci_exec_race("docker exec {} supervisorctl status".format(service), output.result())
+
         # get critical group and process lists for the service
-        critical_group_list, critical_process_list, succeeded = self.get_critical_group_and_process_lists(service)
+        critical_group_list, critical_process_list, succeeded = self.get_critical_group_and_process_lists(
+            service, file_content=file_content.result(), process_list=output)
         if succeeded is False:
             result['status'] = False
             return result
 
-        # get process status for the service
-        output = self.command("docker exec {} supervisorctl status".format(service), module_ignore_errors=True)
         logging.info("====== supervisor process status for service {} ======".format(service))
 
         return self.parse_service_status_and_critical_process(
@@ -934,16 +1045,18 @@ class SonicHost(AnsibleHostBase):
         # some services are meant to have a short life span or not part of the daemons
         exemptions = ['lm-sensors', 'start.sh', 'rsyslogd', 'start', 'dependent-startup', 'chassis_db_init', 'delay']
 
-        daemons = self.shell('docker exec pmon supervisorctl status', module_ignore_errors=True)['stdout_lines']
-
-        daemon_list = [line.strip().split()[0] for line in daemons if len(line.strip()) > 0]
-
         daemon_ctl_key_prefix = 'skip_'
         daemon_config_file_path = os.path.join('/usr/share/sonic/device',
                                                self.facts["platform"], 'pmon_daemon_control.json')
 
+        with self.batch() as batch:
+            daemons = batch.shell('docker exec pmon supervisorctl status', module_ignore_errors=True)
+            output = batch.shell('cat %s' % daemon_config_file_path)
+        daemons = daemons['stdout_lines']
+
+        daemon_list = [line.strip().split()[0] for line in daemons if len(line.strip()) > 0]
+
         try:
-            output = self.shell('cat %s' % daemon_config_file_path)
             json_data = json.loads(output["stdout"])
             logging.debug("Original file content is %s" % str(json_data))
             for key in daemon_list:
@@ -1638,61 +1751,10 @@ Totals               6450                 6449
             Returns a list. Each item is a tuple with two elements. The first element is start position of a column.
             The second element is the end position of the column.
         """
-        prev = ' ',
-        positions = []
-        for pos, char in enumerate(sep_line + ' '):
-            if char == sep_char:
-                if char != prev:
-                    left = pos
-            else:
-                if char != prev:
-                    right = pos
-                    positions.append((left, right))
-            prev = char
-        return positions
+        return parse_column_positions(sep_line, sep_char)
 
     def _parse_show(self, output_lines, header_len=1):
-
-        result = []
-
-        sep_line_pattern = re.compile(r"^( *-+ *)+$")
-        sep_line_found = False
-        for idx, line in enumerate(output_lines):
-            if sep_line_pattern.match(line):
-                sep_line_found = True
-                header_lines = output_lines[idx - header_len:idx]
-                sep_line = output_lines[idx]
-                content_lines = output_lines[idx + 1:]
-                break
-
-        if not sep_line_found:
-            logging.error('Failed to find separation line in the show command output')
-            return result
-
-        try:
-            positions = self._parse_column_positions(sep_line)
-        except Exception as e:
-            logging.error('Possibly bad command output, exception: {}'.format(repr(e)))
-            return result
-
-        headers = []
-        for (left, right) in positions:
-            header = " ".join([header_line[left:right].strip().lower() for header_line in header_lines]).strip()
-            headers.append(header)
-
-        for content_line in content_lines:
-            # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
-            # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
-            if len(content_line) == 0:
-                break
-            item = {}
-            for idx, (left, right) in enumerate(positions):
-                k = headers[idx]
-                v = content_line[left:right].strip()
-                item[k] = v
-            result.append(item)
-
-        return result
+        return parse_show(output_lines, header_len).to_list()
 
     def show_and_parse(self, show_cmd, header_len=1, **kwargs):
         """Run a show command and parse the output using a generic pattern.
@@ -1764,6 +1826,23 @@ Totals               6450                 6449
             corresponding to one content line under the header in the output. Keys of the dictionary are the column
             headers in lowercase.
         """
+        return self.show_and_parse_table(show_cmd, header_len, **kwargs).to_list()
+
+    def show_and_parse_table(self, show_cmd, header_len=1, numeric_columns=None, **kwargs):
+        """Run a show command and parse the output into a ShowTable.
+
+        Same as show_and_parse(), but the output is stored column by column. Use table.column(header) to get all
+        the cells of a column, rows are only built when they are accessed. Prefer it for big outputs like
+        'show interfaces counters' or 'show mac'.
+
+        Args:
+            show_cmd: The show command that will be executed.
+            numeric_columns: Headers of the columns whose numeric cells are converted to int or float. True to
+                convert all the columns.
+
+        Returns:
+            ShowTable of the output. Iterating it gives the same dicts as show_and_parse().
+        """
         start_line_index = kwargs.pop("start_line_index", 0)
         end_line_index = kwargs.pop("end_line_index", None)
         output = self.shell(show_cmd, **kwargs)["stdout_lines"]
@@ -1771,7 +1850,10 @@ Totals               6450                 6449
             output = output[start_line_index:]
         else:
             output = output[start_line_index:end_line_index]
-        return self._parse_show(output, header_len)
+        table = parse_show(output, header_len)
+        if numeric_columns:
+            table.convert_numbers(None if numeric_columns is True else numeric_columns)
+        return table
 
     @cached(name='mg_facts')
     def get_extended_minigraph_facts(self, tbinfo, namespace=DEFAULT_NAMESPACE):
@@ -0,0 +1,243 @@
+"""
+Persistent SSH command channel for SonicHost shell/command calls.
+
+Running a shell command through Ansible builds an ad-hoc task and starts a TaskQueueManager for every call, which costs
+far more than the command itself for short commands. PersistentShellChannel keeps one SSH connection per host open and
+runs every command on a new channel multiplexed over it, the same way an OpenSSH ControlMaster does.
+"""
+import logging
+import os
+import select
+import shlex
+import threading
+import time
+import weakref
+from datetime import datetime
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+RECV_SIZE = 65536
+SELECT_INTERVAL = 1
+# After failing to reach the host, the channel isn't tried again for a backoff time doubling on every failure
+RETRY_BACKOFF_MIN = 1
+RETRY_BACKOFF_MAX = 60
+
+# Options of the shell/command modules that the persistent channel handles, calls with other options go through Ansible
+SUPPORTED_OPTIONS = {'_raw_params', 'cmd', 'chdir', 'executable'}
+
+_channels = weakref.WeakSet()
+
+
+class ChannelUnavailable(Exception):
+    """The command couldn't be started on the persistent channel, it is safe to run it by other means."""
+
+
+class ChannelNotSupported(ChannelUnavailable):
+    """The host can't run commands on a persistent channel at all, e.g. sudo needs a password."""
+
+
+class PersistentShellChannel(object):
+    """
+    An SSH connection to a host which runs shell/command module calls without Ansible.
+
+    The result of run() has the same keys as the result of the Ansible shell and command modules.
+    """
+
+    def __init__(self, hostname, address, username, password, port=22, become=True,
+                 connect_timeout=30, keepalive_interval=30):
+        self.hostname = hostname
+        self.address = address
+        self.username = username
+        self.password = password
+        self.port = port
+        self.become = become
+        self.connect_timeout = connect_timeout
+        self.keepalive_interval = keepalive_interval
+        self._client = None
+        self._client_pid = None
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_after = 0
+        _channels.add(self)
+
+    @staticmethod
+    def supports(module_name, module_args, complex_args):
+        """Check whether a shell/command call can run on the persistent channel."""
+        if module_name not in ('shell', 'command'):
+            return False
+        if len(module_args) > 1 or (module_args and not isinstance(module_args[0], str)):
+            return False
+        if not module_args and not isinstance(complex_args.get('cmd'), str):
+            return False
+        return set(complex_args).issubset(SUPPORTED_OPTIONS)
+
+    def _get_transport(self):
+        with self._lock:
+            # The paramiko transport thread doesn't survive a fork, a forked worker opens its own connection
+            if self._client is not None and self._client_pid != os.getpid():
+                self._client = None
+            if self._client is not None:
+                transport = self._client.get_transport()
+                if transport is not None and transport.is_active():
+                    return transport
+                self._client.close()
+                self._client = None
+
+            logger.debug("[{}] Open persistent SSH connection to {}:{}".format(self.hostname, self.address, self.port))
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(self.address, port=self.port, username=self.username, password=self.password,
+                           timeout=self.connect_timeout, allow_agent=False, look_for_keys=False)
+            transport = client.get_transport()
+            transport.set_keepalive(self.keepalive_interval)
+            if self.become:
+                # Commands run as root like Ansible become, which needs sudo without password
+                probe = transport.open_session()
+                try:
+                    probe.exec_command('sudo -n true')
+                    rc = probe.recv_exit_status()
+                finally:
+                    probe.close()
+                if rc != 0:
+                    client.close()
+                    raise ChannelNotSupported("sudo without password is not allowed on {}".format(self.hostname))
+            self._client = client
+            self._client_pid = os.getpid()
+            return transport
+
+    def _open_session(self):
+        retry_in = self._retry_after - time.time()
+        if retry_in > 0:
+            raise ChannelUnavailable("SSH connection to {} failed, retry in {:.1f}s".format(self.hostname, retry_in))
+        try:
+            try:
+                session = self._get_transport().open_session()
+            except ChannelUnavailable:
+                raise
+            except (paramiko.SSHException, EOFError, OSError):
+                # The connection may have been closed by the host, e.g. by a reboot, retry on a new connection once
+                self.close()
+                session = self._get_transport().open_session()
+        except ChannelUnavailable:
+            raise
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            self._failures += 1
+            backoff = min(RETRY_BACKOFF_MIN * 2 ** (self._failures - 1), RETRY_BACKOFF_MAX)
+            self._retry_after = time.time() + backoff
+            raise ChannelUnavailable("Failed to open SSH channel to {}, retry in {}s: {}".format(
+                self.hostname, backoff, repr(e)))
+        self._failures = 0
+        return session
+
+    def build_command(self, module_name, cmd, chdir=None, executable=None):
+        """Build the command line which is executed on the host for a shell/command module call."""
+        if module_name == 'shell':
+            command = '{} -c {}'.format(executable or '/bin/sh', shlex.quote(cmd))
+        else:
+            # The command module doesn't run the command through a shell
+            command = ' '.join(shlex.quote(arg) for arg in shlex.split(cmd))
+        if chdir:
+            command = 'cd {} && {}'.format(shlex.quote(chdir), command)
+        if self.become:
+            command = 'sudo -n -H /bin/sh -c {}'.format(shlex.quote(command))
+        return command
+
+    @staticmethod
+    def _read_channel(channel):
+        stdout = []
+        stderr = []
+        while True:
+            if channel.recv_ready():
+                stdout.append(channel.recv(RECV_SIZE))
+            elif channel.recv_stderr_ready():
+                stderr.append(channel.recv_stderr(RECV_SIZE))
+            elif channel.exit_status_ready() and (channel.eof_received or channel.closed):
+                break
+            else:
+                select.select([channel], [], [], SELECT_INTERVAL)
+        # Drain what arrived together with the exit status
+        while channel.recv_ready():
+            stdout.append(channel.recv(RECV_SIZE))
+        while channel.recv_stderr_ready():
+            stderr.append(channel.recv_stderr(RECV_SIZE))
+        return b''.join(stdout), b''.join(stderr)
+
+    def run(self, module_name, *module_args, **complex_args):
+        """
+        Run a shell/command module call on the host.
+
+        Args:
+            module_name (str): 'shell' or 'command'.
+            module_args: The free form command.
+            complex_args: 'cmd', 'chdir' and 'executable' options of the module.
+
+        Returns:
+            dict: Result with the keys of the Ansible shell/command module result.
+
+        Raises:
+            ChannelUnavailable: The command was not started.
+        """
+        cmd = module_args[0] if module_args else complex_args['cmd']
+        command = self.build_command(module_name, cmd, complex_args.get('chdir'), complex_args.get('executable'))
+
+        start = datetime.now()
+        channel = self._open_session()
+        try:
+            channel.exec_command(command)
+            stdout, stderr = self._read_channel(channel)
+            rc = channel.recv_exit_status()
+        finally:
+            channel.close()
+        end = datetime.now()
+
+        stdout = stdout.decode('utf-8', errors='replace').rstrip('\r\n')
+        stderr = stderr.decode('utf-8', errors='replace').rstrip('\r\n')
+        result = {
+            'cmd': cmd,
+            'rc': rc,
+            'stdout': stdout,
+            'stderr': stderr,
+            'stdout_lines': stdout.splitlines(),
+            'stderr_lines': stderr.splitlines(),
+            'start': str(start),
+            'end': str(end),
+            'delta': str(end - start),
+            'changed': True,
+            'failed': rc != 0,
+            'msg': 'non-zero return code' if rc != 0 else ''
+        }
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                if self._client_pid == os.getpid():
+                    self._client.close()
+                self._client = None
+
+
+def close_all_channels():
+    """Close the connections of all persistent channels."""
+    for channel in list(_channels):
+        channel.close()
+
+
+def measure_latency(func, iterations):
+    """
+    Measure the latency of calling func.
+
+    Returns:
+        dict: min, avg and max seconds of the calls.
+    """
+    latencies = []
+    for _ in range(iterations):
+        start = time.time()
+        func()
+        latencies.append(time.time() - start)
+    return {
+        'min': min(latencies),
+        'avg': sum(latencies) / len(latencies),
+        'max': max(latencies)
+    }
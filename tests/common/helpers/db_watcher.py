@@ -0,0 +1,352 @@
+"""
+Event driven waits on the SONiC Redis DBs.
+
+wait_until() re-runs its condition, often one or several commands on the DUT, every interval seconds, so a wait
+for e.g. ports to come up returns up to an interval late and keeps the SSH connection busy while the DUT converges.
+
+DbWatcher instead runs one watcher process on the DUT for the lifetime of the object. It subscribes to the Redis
+keyspace notifications of the watched key patterns of APPL_DB, STATE_DB, COUNTERS_DB, ..., and writes every change
+of a watched key to an output file. DbWatcher.wait_until() long-polls that file, so it returns as soon as a change
+makes the predicate true, with one SSH call per batch of changes instead of one per interval. The predicate is
+evaluated on the local copy of the watched keys:
+
+    {'APPL_DB': {'PORT_TABLE:Ethernet0': {'oper_status': 'up', ...}, ...}, 'STATE_DB': {...}}
+
+Usage:
+    watches = [('APPL_DB', 'PORT_TABLE:Ethernet*')]
+    ports_up = keys_fields_match('APPL_DB', ['PORT_TABLE:' + port for port in ports], oper_status='up')
+    pytest_assert(wait_until_db(duthost, 60, 2, 0, watches, ports_up), "Ports are not up")
+
+    # Or several waits on the same watcher
+    with DbWatcher(duthost, watches) as watcher:
+        ...
+        watcher.wait_until(60, ports_up)
+
+wait_until_db() falls back to polling the watched keys with sonic-db-dump every interval seconds if the watcher
+can't run on the DUT. On a DB without keyspace notifications, the watcher rescans the patterns every interval
+seconds on the DUT.
+"""
+import json
+import logging
+import sys
+import time
+import traceback
+
+import pytest
+
+from tests.common.helpers.constants import DEFAULT_NAMESPACE
+from tests.common.helpers.dut_background_script import DutBackgroundScript
+from tests.common.utilities import wait_until
+
+logger = logging.getLogger(__name__)
+
+# Runs on the DUT with the python3 of the host OS. Writes a {"synced": ...} line once the current values of the
+# watched keys are written, then one [timestamp, db, key, value] line per change, value is null for a deleted key.
+WATCHER_SCRIPT = r'''
+import json
+import signal
+import sys
+import time
+
+import redis
+from swsscommon.swsscommon import SonicDBConfig
+
+
+def read(conn, key):
+    key_type = conn.type(key)
+    if key_type == "hash":
+        return conn.hgetall(key) or None
+    if key_type == "string":
+        return conn.get(key)
+    if key_type == "list":
+        return conn.lrange(key, 0, -1)
+    if key_type == "set":
+        return sorted(conn.smembers(key))
+    return None
+
+
+def emit(record):
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        config = json.load(f)
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    namespace = config["namespace"]
+    if namespace and not SonicDBConfig.isGlobalInit():
+        SonicDBConfig.initializeGlobalConfig()
+    patterns = {}
+    for db_name, pattern in config["watches"]:
+        patterns.setdefault(db_name, []).append(pattern)
+    conns = {}
+    pubsubs = {}
+    for db_name, db_patterns in patterns.items():
+        db_id = SonicDBConfig.getDbId(db_name, namespace)
+        conn = conns[db_name] = redis.Redis(unix_socket_path=SonicDBConfig.getDbSock(db_name, namespace),
+                                            db=db_id, decode_responses=True)
+        events = conn.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+        if "K" in events and ("A" in events or "h" in events):
+            # Subscribe before the first scan, not to miss a change made in between
+            pubsub = pubsubs[db_name] = conn.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(*["__keyspace@{}__:{}".format(db_id, pattern) for pattern in db_patterns])
+
+    values = dict((db_name, {}) for db_name in patterns)
+
+    def update(db_name, key):
+        value = read(conns[db_name], key)
+        if value != values[db_name].get(key):
+            if value is None:
+                values[db_name].pop(key, None)
+            else:
+                values[db_name][key] = value
+            emit([round(time.time(), 3), db_name, key, value])
+
+    def scan(db_name):
+        keys = set()
+        for pattern in patterns[db_name]:
+            keys.update(conns[db_name].scan_iter(match=pattern, count=1000))
+        for key in sorted(keys | set(values[db_name])):
+            update(db_name, key)
+
+    for db_name in patterns:
+        scan(db_name)
+    emit({"synced": time.time(), "notifications": sorted(pubsubs)})
+
+    deadline = time.time() + config["max_duration"]
+    next_scan = time.time() + config["interval"]
+    while not stopping and time.time() < deadline:
+        for db_name, pubsub in pubsubs.items():
+            message = pubsub.get_message(timeout=0.1 / len(pubsubs))
+            while message:
+                update(db_name, message["channel"].split(":", 1)[1])
+                message = pubsub.get_message()
+        if len(pubsubs) < len(patterns):
+            if time.time() >= next_scan:
+                for db_name in patterns:
+                    if db_name not in pubsubs:
+                        scan(db_name)
+                next_scan = time.time() + config["interval"]
+            if not pubsubs:
+                time.sleep(0.1)
+    emit({"exit": "stopped" if stopping else "max_duration"})
+
+
+main()
+'''
+
+
+def keys_fields_match(db, keys, **fields):
+    """
+    Build a predicate, true when all the keys exist in a DB and their fields have the given values.
+
+    Args:
+        db (str): Name of the DB, e.g. 'APPL_DB'.
+        keys (list): Keys to check.
+        fields: Field values all the keys must have.
+
+    Returns:
+        function: Predicate over the watched keys, for DbWatcher.wait_until() and wait_until_db().
+    """
+    keys = list(keys)
+
+    def match(state):
+        values = state.get(db, {})
+        for key in keys:
+            value = values.get(key)
+            if not isinstance(value, dict) or any(value.get(f) != v for f, v in fields.items()):
+                return False
+        return True
+
+    match.__name__ = 'keys_fields_match({}, {} keys, {})'.format(db, len(keys), fields)
+    return match
+
+
+def _check(predicate, state):
+    """Evaluate a predicate like wait_until() evaluates its condition: an exception is logged and means False."""
+    try:
+        return predicate(state)
+    except (Exception, pytest.fail.Exception) as e:
+        details = traceback.format_exception(*sys.exc_info())
+        logger.error("Exception caught while checking {}:{}, error:{}".format(
+            getattr(predicate, '__name__', predicate), "".join(details), e))
+        return False
+
+
+class DbWatcher(object):
+    """Watch keys of the Redis DBs of a DUT through one long-lived watcher process on the DUT."""
+
+    def __init__(self, duthost, watches, namespace=DEFAULT_NAMESPACE, interval=1, max_duration=3600):
+        """
+        Args:
+            duthost: DUT host object.
+            watches (list): (DB name, key pattern) to watch, e.g. ('STATE_DB', 'BGP_NEIGHBOR_TABLE|*').
+            namespace (str): Namespace of the DBs, for a multi-ASIC DUT.
+            interval (float): Seconds between two scans of a DB without keyspace notifications.
+            max_duration (int): Seconds after which the watcher stops if stop() was not called.
+        """
+        self.duthost = duthost
+        self.watches = [tuple(watch) for watch in watches]
+        self.namespace = namespace
+        self.interval = interval
+        self.max_duration = max_duration
+        self.state = dict((db, {}) for db, _ in self.watches)
+        self.notifications = []
+        self._synced = False
+        self.script = DutBackgroundScript(duthost, 'db_watcher', WATCHER_SCRIPT)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    def start(self):
+        """
+        Start the watcher on the DUT and wait for the current values of the watched keys.
+
+        Raises:
+            RuntimeError: The watcher failed to start, e.g. python3 or its modules are not available on the DUT.
+        """
+        self.script.start({
+            'namespace': self.namespace or '',
+            'watches': self.watches,
+            'interval': self.interval,
+            'max_duration': self.max_duration,
+        })
+        try:
+            deadline = time.time() + 30
+            while not self._synced:
+                if self.script.exited or time.time() > deadline:
+                    raise RuntimeError('DB watcher on {} did not start'.format(self.duthost.hostname))
+                self.fetch(wait=deadline - time.time())
+        except RuntimeError:
+            self.stop()
+            raise
+        logger.info('Started DB watcher on {} (pid {}) for {}, keyspace notifications on {}'.format(
+            self.duthost.hostname, self.script.pid, self.watches, self.notifications))
+
+    def fetch(self, wait=0):
+        """
+        Apply the changes written by the watcher since the last call to the state.
+
+        Args:
+            wait (float): Seconds to wait for a change if there is none yet.
+
+        Returns:
+            bool: True if there was a change.
+
+        Raises:
+            RuntimeError: The watcher failed.
+        """
+        lines = self.script.read(wait)
+        changed = False
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise RuntimeError('DB watcher on {} failed: {}'.format(self.duthost.hostname, '\n'.join(lines)))
+            if isinstance(record, dict):
+                if 'synced' in record:
+                    self._synced = True
+                    self.notifications = record['notifications']
+                continue
+            _, db, key, value = record
+            if value is None:
+                self.state[db].pop(key, None)
+            else:
+                self.state[db][key] = value
+            changed = True
+        return changed
+
+    def wait_until(self, timeout, predicate, delay=0):
+        """
+        Wait until a predicate over the watched keys is true, or timeout.
+
+        Args:
+            timeout (float): Maximum time to wait.
+            predicate (function): Function of the state, {DB name: {key: value}}, returning True or False.
+            delay (float): Delay time.
+
+        Returns:
+            bool: True if the predicate became true before timeout.
+
+        Raises:
+            RuntimeError: The watcher failed or stopped.
+        """
+        name = getattr(predicate, '__name__', predicate)
+        logger.debug("Wait until %s is True, timeout is %s seconds, delay is %s seconds" % (name, timeout, delay))
+        if delay > 0:
+            time.sleep(delay)
+        start_time = time.time()
+        self.fetch()
+        while not _check(predicate, self.state):
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
+                logger.debug("%s is still False after %d seconds, exit with False" % (name, timeout))
+                return False
+            if self.script.exited:
+                raise RuntimeError('DB watcher on {} stopped'.format(self.duthost.hostname))
+            self.fetch(wait=remaining)
+        logger.debug("%s is True after %.1f seconds" % (name, time.time() - start_time))
+        return True
+
+    def stop(self):
+        """Stop the watcher and remove its files from the DUT."""
+        self.script.stop()
+        self.script.remove()
+
+
+def dump_watched_keys(duthost, watches, namespace=DEFAULT_NAMESPACE):
+    """
+    Read the watched keys with sonic-db-dump, for polling without a watcher.
+
+    Returns:
+        dict: The values of the keys, in the same format as DbWatcher.state.
+    """
+    prefix = 'sudo ip netns exec {} '.format(namespace) if namespace else ''
+    state = dict((db, {}) for db, _ in watches)
+    for db, pattern in watches:
+        output = duthost.shell("{}sonic-db-dump -n {} -y -k '{}'".format(prefix, db, pattern))['stdout']
+        for key, entry in (json.loads(output) if output.strip() else {}).items():
+            state[db][key] = entry.get('value')
+    return state
+
+
+def wait_until_db(duthost, timeout, interval, delay, watches, predicate, namespace=DEFAULT_NAMESPACE):
+    """
+    Wait until a predicate over watched keys of the DUT DBs is true, or timeout.
+
+    Event driven counterpart of wait_until(): the predicate is checked on every change of the watched keys
+    reported by a DbWatcher. If the watcher can't run, the keys are polled every interval seconds instead.
+
+    Args:
+        duthost: DUT host object.
+        timeout (float): Maximum time to wait.
+        interval (float): Poll interval, when the watcher can't run.
+        delay (float): Delay time.
+        watches (list): (DB name, key pattern) to watch.
+        predicate (function): Function of the watched keys, {DB name: {key: value}}, returning True or False.
+        namespace (str): Namespace of the DBs, for a multi-ASIC DUT.
+
+    Returns:
+        bool: True if the predicate became true before timeout.
+    """
+    if delay > 0:
+        time.sleep(delay)
+    start_time = time.time()
+    try:
+        with DbWatcher(duthost, watches, namespace=namespace, interval=interval) as watcher:
+            return watcher.wait_until(timeout - (time.time() - start_time), predicate)
+    except RuntimeError as e:
+        logger.warning('{}, polling the DB instead'.format(e))
+
+    def condition():
+        return predicate(dump_watched_keys(duthost, watches, namespace))
+
+    condition.__name__ = getattr(predicate, '__name__', 'predicate')
+    return wait_until(max(timeout - (time.time() - start_time), 0), interval, 0, condition)
@@ -0,0 +1,102 @@
+"""
+Python scripts running in the background on a DUT.
+
+A DutBackgroundScript copies a script and its JSON config to the DUT, runs the script with the python3 of the host
+OS in the background and reads back what it writes to its output file, one record per line. It is the common part
+of the long-lived DUT side helpers like DbWatcher and DutCounterSampler.
+
+Usage:
+    script = DutBackgroundScript(duthost, 'my_script', SCRIPT)
+    script.start({'interval': 1})
+    lines = script.read(wait=5)
+    ...
+    script.stop()
+    script.remove()
+"""
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Longest single long-poll of the output, bounds the duration of one SSH call
+MAX_POLL_TIME = 10
+# Printed after the output by read() when the script process is gone
+EXITED_MARKER = '__dut_background_script_exited__'
+
+
+class DutBackgroundScript(object):
+    """A python3 script running in the background on a DUT and writing one record per line to an output file."""
+
+    def __init__(self, duthost, name, script):
+        """
+        Args:
+            duthost: DUT host object.
+            name (str): Name of the script, used in the names of the files on the DUT.
+            script (str): Source of the script. It is run as 'python3 <script> <config file>', its stdout and stderr
+                go to the output file.
+        """
+        self.duthost = duthost
+        self.name = name
+        self.script = script
+        self.script_path = '/tmp/{}.py'.format(name)
+        prefix = '/tmp/{}_{}'.format(name, uuid.uuid4().hex)
+        self.config_path = prefix + '.json'
+        self.output_path = prefix + '.out'
+        self.pid = None
+        self.lines = 0
+        self.exited = False
+
+    def start(self, config):
+        """
+        Copy the script and its config to the DUT and start it.
+
+        Args:
+            config (dict): Config of the script, written to the config file as JSON.
+        """
+        self.duthost.copy(content=self.script, dest=self.script_path, verbose=False)
+        self.duthost.copy(content=json.dumps(config), dest=self.config_path, verbose=False)
+        self.lines = 0
+        self.exited = False
+        self.pid = self.duthost.shell('nohup python3 {} {} > {} 2>&1 & echo $!'.format(
+            self.script_path, self.config_path, self.output_path))['stdout'].strip()
+        logger.debug('Started {} on {} (pid {})'.format(self.name, self.duthost.hostname, self.pid))
+
+    def read(self, wait=0):
+        """
+        Read the lines written by the script since the last call.
+
+        A line the script is still writing is left for the next call. If the script is gone, all its remaining output
+        is read and exited is set.
+
+        Args:
+            wait (float): Seconds to wait for a new line if there is none yet, at most MAX_POLL_TIME.
+
+        Returns:
+            list: The new lines.
+        """
+        checks = max(0, int(min(wait, MAX_POLL_TIME) * 10))
+        cmd = ('f={out}; for i in $(seq {checks}); do [ $(wc -l < $f) -gt {lines} ] && break; '
+               'kill -0 {pid} 2>/dev/null || break; sleep 0.1; done; '
+               'if kill -0 {pid} 2>/dev/null; then tail -n +{start} $f | head -n $(($(wc -l < $f) - {lines})); '
+               'else tail -n +{start} $f; echo; echo {marker}; fi').format(
+            out=self.output_path, checks=checks, lines=self.lines, pid=self.pid, start=self.lines + 1,
+            marker=EXITED_MARKER)
+        lines = self.duthost.shell(cmd, module_ignore_errors=True)['stdout_lines']
+        if lines and lines[-1] == EXITED_MARKER:
+            self.exited = True
+            # The echo before the marker ends the last line if the script didn't
+            lines = [line for line in lines[:-1] if line]
+        self.lines += len(lines)
+        return lines
+
+    def stop(self):
+        """Stop the script and wait for it to exit, its output file is kept for a last read()."""
+        if self.pid:
+            self.duthost.shell('kill {pid}; for i in $(seq 50); do kill -0 {pid} || break; sleep 0.1; done'.format(
+                pid=self.pid), module_ignore_errors=True)
+
+    def remove(self):
+        """Remove the config and the output file of the script from the DUT."""
+        self.pid = None
+        self.duthost.shell('rm -f {} {}'.format(self.config_path, self.output_path), module_ignore_errors=True)
@@ -0,0 +1,168 @@
+"""
+Columnar parser of the tabular output of show commands.
+
+The output of show commands like 'show interfaces status' has lines of headers, a separation line with '-' under each
+column header and the content lines. The content is sliced column by column and stored as one list per column, row
+dicts are only built when they are accessed. The column layout is memoized by the header lines and the separation
+line, so parsing the output of the same command again doesn't parse the headers again.
+"""
+import functools
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SEP_LINE_PATTERN = re.compile(r"^( *-+ *)+$")
+# Digits are either plain or grouped by thousands, so lists like lanes '0,1,2,3' are not numbers
+INT_PATTERN = re.compile(r"^[+-]?(\d{1,3}(,\d{3})+|\d+)$")
+FLOAT_PATTERN = re.compile(r"^[+-]?(\d{1,3}(,\d{3})+|\d+)?\.\d+$")
+LAYOUT_CACHE_SIZE = 256
+
+
+def parse_column_positions(sep_line, sep_char='-'):
+    """Parse the position of each column in the command output.
+
+    Args:
+        sep_line: The output line separating actual data and column headers
+        sep_char: The character used in separation line. Defaults to '-'.
+
+    Returns:
+        A list. Each item is a tuple of the start and the end position of a column.
+    """
+    return [(m.start(), m.end()) for m in re.finditer(re.escape(sep_char) + '+', sep_line)]
+
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def get_column_layout(header_lines, sep_line):
+    """Get the column positions and the lower case column headers of a table.
+
+    Args:
+        header_lines: Tuple of the header lines above the separation line.
+        sep_line: The separation line.
+
+    Returns:
+        Tuple of the column positions and the column headers.
+    """
+    positions = tuple(parse_column_positions(sep_line))
+    headers = tuple(" ".join([header_line[left:right].strip().lower() for header_line in header_lines]).strip()
+                    for left, right in positions)
+    return positions, headers
+
+
+def convert_number(value):
+    """Convert a cell like '9100', '1,234' or '0.5' to a number, other cells are returned as they are."""
+    if INT_PATTERN.match(value):
+        return int(value.replace(',', ''))
+    if FLOAT_PATTERN.match(value):
+        return float(value.replace(',', ''))
+    return value
+
+
+class ShowTable(object):
+    """
+    Parsed show command output stored column by column.
+
+    Iterating, indexing and to_list() give the rows as dicts keyed by the column headers, the same as the list
+    returned by SonicHost.show_and_parse().
+    """
+
+    def __init__(self, headers=(), columns=None, length=0):
+        self.headers = list(headers)
+        self.columns = columns if columns is not None else {}
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def column(self, header):
+        """Get all the cells of a column."""
+        return self.columns[header]
+
+    def row(self, index):
+        """Get a row as a dict keyed by the column headers."""
+        return dict((header, cells[index]) for header, cells in self.columns.items())
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self.row(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ShowTable index out of range")
+        return self.row(index)
+
+    def __eq__(self, other):
+        if isinstance(other, ShowTable):
+            return self.columns == other.columns
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return '<ShowTable {} rows, columns {}>'.format(self._length, self.headers)
+
+    def to_list(self):
+        """Get all the rows as a list of dicts."""
+        if not self.columns:
+            return [{} for _ in range(self._length)]
+        headers = list(self.columns)
+        return [dict(zip(headers, values)) for values in zip(*self.columns.values())]
+
+    def convert_numbers(self, headers=None):
+        """Convert the numeric cells of the columns to int or float in place.
+
+        Args:
+            headers: Headers of the columns to convert, all columns if not specified.
+
+        Returns:
+            The table itself.
+        """
+        for header in (headers if headers is not None else list(self.columns)):
+            self.columns[header] = [convert_number(value) for value in self.columns[header]]
+        return self
+
+
+def parse_show(output_lines, header_len=1):
+    """Parse the tabular output of a show command.
+
+    Args:
+        output_lines: Lines of the show command output.
+        header_len: Number of header lines above the separation line.
+
+    Returns:
+        ShowTable of the content lines under the separation line, empty if the output has no separation line.
+    """
+    for idx, line in enumerate(output_lines):
+        if SEP_LINE_PATTERN.match(line):
+            header_lines = tuple(output_lines[idx - header_len:idx])
+            sep_line = line
+            content_lines = output_lines[idx + 1:]
+            break
+    else:
+        logger.error('Failed to find separation line in the show command output')
+        return ShowTable()
+
+    positions, headers = get_column_layout(header_lines, sep_line)
+
+    # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
+    # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
+    for idx, content_line in enumerate(content_lines):
+        if len(content_line) == 0:
+            content_lines = content_lines[:idx]
+            break
+
+    columns = {}
+    for header, (left, right) in zip(headers, positions):
+        columns[header] = [content_line[left:right].strip() for content_line in content_lines]
+    return ShowTable(headers, columns, len(content_lines))
@@ -3,6 +3,7 @@
 This plugin supports adding any mark to specified test cases based on conditions. All the information of test cases,
 marks, and conditions can be specified in a centralized file.
 """
+import functools
 import json
 import logging
 import os
@@ -14,6 +15,7 @@ import pytest
 
 from tests.common.testbed import TestbedInfo
 from .issue import check_issues
+from .rule_index import get_rule_index
 from tests.common.utilities import get_duts_from_host_pattern
 from tests.common.cisco_data import (
     CISCO_8122_PREFIX,
@@ -45,6 +47,12 @@ MARK_CONDITIONS_CONSTANTS = {
                      'urh_min', 'lrh_min', 'lt2-o224', 'lt2-o32', 'lt2-o256-u32d224']
 }
 
+# Conditions with issue URLs replaced by the issue state, keyed by the raw condition. Cleared for every session.
+_resolved_conditions = {}
+# Evaluation results of the resolved conditions, keyed by the resolved condition and the basic facts.
+_condition_results = {}
+_basic_facts_key = [None, None]
+
 
 def pytest_addoption(parser):
     """Add options for the conditional mark plugin.
@@ -470,35 +478,11 @@ def find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, ba
     Returns:
         list: All match test case name or None if not found
     """
-    all_matches = []
     max_length = -1
     conditional_marks = {}
     matches = []
 
-    for condition in conditions:
-        # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
-        condition_entry = list(condition.keys())[0]
-        condition_items = condition[condition_entry]
-        if "regex" in condition_items.keys():
-            assert isinstance(condition_items["regex"], bool), \
-                "The value of 'regex' in the mark conditions yaml should be bool type."
-            if condition_items["regex"] is True:
-                match = re.search(condition_entry, nodeid)
-            else:
-                match = None
-
-        elif "use_longest" in condition_items.keys():
-            assert isinstance(condition_items["use_longest"], bool), \
-                "The value of 'use_longest' in the mark conditions yaml should be bool type."
-            if nodeid.startswith(condition_entry) and condition_items["use_longest"] is True:
-                all_matches = []
-
-            match = nodeid.startswith(condition_entry)
-        else:
-            match = nodeid.startswith(condition_entry)
-
-        if match:
-            all_matches.append(condition)
+    all_matches = get_rule_index(conditions).find(nodeid)
 
     for match in all_matches:
         case_starting_substring = list(match.keys())[0]
@@ -579,6 +563,24 @@ def update_issue_status(condition_str, session):
     return condition_str
 
 
+@functools.lru_cache(maxsize=None)
+def compile_condition(condition_str):
+    """Compile a condition string to a code object, every distinct condition string is only compiled once."""
+    return compile(condition_str, '<condition>', 'eval')
+
+
+def get_basic_facts_key(basic_facts):
+    """Get a hashable key of the basic facts for memoizing condition evaluation results.
+
+    The key is only computed again when another basic facts dict is supplied, the basic facts dict is not changed
+    while the marks are added.
+    """
+    if _basic_facts_key[0] is not basic_facts:
+        _basic_facts_key[0] = basic_facts
+        _basic_facts_key[1] = json.dumps(basic_facts, sort_keys=True, default=str)
+    return _basic_facts_key[1]
+
+
 def evaluate_condition(dynamic_update_skip_reason, mark_details, condition, basic_facts, session):
     """Evaluate a condition string based on supplied basic facts.
 
@@ -598,26 +600,34 @@ def evaluate_condition(dynamic_update_skip_reason, mark_details, condition, basi
     if condition is None or condition.strip() == '':
         return True    # Empty condition item will be evaluated as True. Equivalent to be ignored.
 
-    condition_str = update_issue_status(condition, session)
-    try:
-        safe_facts = {k: v for k, v in basic_facts.items()}
-        safe_globals = {}
-        safe_globals.update(safe_facts)
+    condition_str = _resolved_conditions.get(condition)
+    if condition_str is None:
+        condition_str = update_issue_status(condition, session)
+        _resolved_conditions[condition] = condition_str
+
+    result_key = (condition_str, get_basic_facts_key(basic_facts))
+    condition_result = _condition_results.get(result_key)
+    if condition_result is None:
+        try:
+            safe_facts = {k: v for k, v in basic_facts.items()}
+            safe_globals = {}
+            safe_globals.update(safe_facts)
 
-        for var in ["asic_type", "platform", "hwsku", "asic_gen"]:
-            if var not in safe_globals:
-                logger.warning("Variable %s not found in basic_facts, defaulting to None", var)
-                safe_globals[var] = None
+            for var in ["asic_type", "platform", "hwsku", "asic_gen"]:
+                if var not in safe_globals:
+                    logger.warning("Variable %s not found in basic_facts, defaulting to None", var)
+                    safe_globals[var] = None
 
-        condition_result = bool(eval(condition_str, safe_globals))
+            condition_result = bool(eval(compile_condition(condition_str), safe_globals))
+        except Exception:
+            raise RuntimeError('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
+                condition,
+                condition_str))
+        _condition_results[result_key] = condition_result
 
-        if condition_result and dynamic_update_skip_reason:
-            mark_details['reason'].append(condition)
-        return condition_result
-    except Exception:
-        raise RuntimeError('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
-            condition,
-            condition_str))
+    if condition_result and dynamic_update_skip_reason:
+        mark_details['reason'].append(condition)
+    return condition_result
 
 
 def evaluate_conditions(dynamic_update_skip_reason, mark_details, conditions, basic_facts,
@@ -669,6 +679,9 @@ def pytest_collection(session):
 
     # Always clear cached conditions of previous run.
     session.config.cache.set('TESTS_MARK_CONDITIONS', None)
+    # Issue states may have changed since the previous run.
+    _resolved_conditions.clear()
+    _condition_results.clear()
 
     if session.config.option.ignore_conditional_mark:
         logger.info('Ignore conditional mark')
@@ -0,0 +1,110 @@
+"""Index of the entries in the mark conditions files for looking up the entries matching a test case.
+
+Plain entries match test cases starting with the entry, they are stored in a prefix trie so that all the plain entries
+matching a test case are found by walking the test case name once. Entries with 'regex: True' match test cases with
+re.search(), they are combined into one alternation which is tried first, the patterns are only searched one by one
+for the test cases matched by the alternation.
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+class _TrieNode(object):
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+class RuleIndex(object):
+    """Precompiled index of a list of mark conditions, as loaded by load_conditions()."""
+
+    def __init__(self, conditions):
+        """
+        Args:
+            conditions (list): List of dicts, each dict has one item. The key is the test case entry and the value is
+                the marks of the entry.
+        """
+        self.conditions = conditions
+        self._root = _TrieNode()
+        self._regex_entries = []
+        self._use_longest = set()
+
+        patterns = []
+        for index, condition in enumerate(conditions):
+            # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
+            condition_entry = list(condition.keys())[0]
+            condition_items = condition[condition_entry]
+            if "regex" in condition_items.keys():
+                assert isinstance(condition_items["regex"], bool), \
+                    "The value of 'regex' in the mark conditions yaml should be bool type."
+                if condition_items["regex"] is True:
+                    self._regex_entries.append((index, re.compile(condition_entry)))
+                    patterns.append(condition_entry)
+                # Entries with 'regex: False' never match
+                continue
+
+            if "use_longest" in condition_items.keys():
+                assert isinstance(condition_items["use_longest"], bool), \
+                    "The value of 'use_longest' in the mark conditions yaml should be bool type."
+                if condition_items["use_longest"] is True:
+                    self._use_longest.add(index)
+
+            node = self._root
+            for char in condition_entry:
+                node = node.children.setdefault(char, _TrieNode())
+            node.entries.append(index)
+
+        self._combined_regex = None
+        if patterns:
+            try:
+                self._combined_regex = re.compile('|'.join('(?:{})'.format(pattern) for pattern in patterns))
+            except re.error as e:
+                # Patterns with group references can't be combined, they are searched one by one
+                logger.debug('Failed to combine regex entries of mark conditions: {}'.format(repr(e)))
+
+    def _matching_indexes(self, nodeid):
+        indexes = list(self._root.entries)
+        node = self._root
+        for char in nodeid:
+            node = node.children.get(char)
+            if node is None:
+                break
+            indexes.extend(node.entries)
+
+        if self._regex_entries and (self._combined_regex is None or self._combined_regex.search(nodeid)):
+            indexes.extend(index for index, pattern in self._regex_entries if pattern.search(nodeid))
+        return sorted(indexes)
+
+    def find(self, nodeid):
+        """Find the entries matching a test case.
+
+        Same as scanning the conditions in order, a matching entry with 'use_longest: True' drops the matching entries
+        before it.
+
+        Args:
+            nodeid (str): Full test case name.
+
+        Returns:
+            list: The matching conditions in the order of the conditions list.
+        """
+        all_matches = []
+        for index in self._matching_indexes(nodeid):
+            if index in self._use_longest:
+                all_matches = []
+            all_matches.append(self.conditions[index])
+        return all_matches
+
+
+_rule_index = None
+
+
+def get_rule_index(conditions):
+    """Get the RuleIndex of the conditions, the index is only built again when other conditions are supplied."""
+    global _rule_index
+    if _rule_index is None or _rule_index.conditions is not conditions:
+        _rule_index = RuleIndex(conditions)
+    return _rule_index
@@ -43,6 +43,11 @@ def pytest_addoption(parser):
                      help="store loganalyzer errors")
     parser.addoption("--ignore_la_failure", action="store_true", default=False,
                      help="do not fail the test if new bugs were found")
+    parser.addoption("--la_analyze_on_dut", action="store_true", default=False,
+                     help="run loganalyzer analysis on the DUT and only transfer the results, "
+                          "instead of downloading the extracted logs")
+    parser.addoption("--la_dump_logs", action="store_true", default=False,
+                     help="dump the content of the logs analyzed by loganalyzer to the debug log")
     parser.addoption("--loganalyzer_rotate_logs", action="store_true", default=True,
                      help="rotate log on all the dut engines at the beginning of the log analyzer fixture")
     parser.addoption("--bug_handler_params", action="store", default=None,
@@ -17,6 +17,8 @@ COMMON_MATCH = join(split(__file__)[0], "loganalyzer_common_match.txt")
 COMMON_IGNORE = join(split(__file__)[0], "loganalyzer_common_ignore.txt")
 COMMON_EXPECT = join(split(__file__)[0], "loganalyzer_common_expect.txt")
 SYSLOG_TMP_FOLDER = "/tmp/syslog"
+# Number of lines logged per debug record when dumping the extracted log files
+DUMP_LOG_CHUNK_LINES = 1000
 
 
 class DisableLogrotateCronContext:
@@ -174,6 +176,10 @@ class LogAnalyzer:
         self._markers = []
         self.fail = True
         self.store_la_logs = False
+        # Run the analysis on the DUT and transfer only the results instead of the extracted logs
+        self.analyze_on_dut = False
+        # Dump the content of the extracted logs to the debug log
+        self.dump_logs = False
 
         self.additional_files = list(additional_files.keys())
         self.additional_start_str = list(additional_files.values())
@@ -182,6 +188,8 @@ class LogAnalyzer:
             # override the fail and store_la_logs if they are set in the request config options
             self.fail = not (self.request.config.getoption("--ignore_la_failure"))
             self.store_la_logs = self.request.config.getoption("--store_la_logs")
+            self.analyze_on_dut = self.request.config.getoption("--la_analyze_on_dut", default=False)
+            self.dump_logs = self.request.config.getoption("--la_dump_logs", default=False)
 
         self._la_logs_dir = "/tmp/loganalyzer/{}".format(self.ansible_host.hostname)
         self.bughandler = bughandler
@@ -448,10 +456,10 @@ class LogAnalyzer:
                             "match_files": {},
                             "match_messages": {},
                             "expect_messages": {},
-                            "unused_expected_regexp": []
+                            "unused_expected_regexp": [],
+                            "match_regexp_hits": {}
                             }
         timestamp = time.strftime("%Y-%m-%d-%H:%M:%S", time.gmtime())
-        tmp_folder = ".".join((SYSLOG_TMP_FOLDER, self.ansible_host.hostname, timestamp))
         marker = marker.replace(' ', '_')
         self.ansible_loganalyzer.run_id = marker
 
@@ -477,36 +485,16 @@ class LogAnalyzer:
                 self.ansible_host.extract_log(directory=file_dir, file_prefix=file_name, start_string=start_str,
                                               target_filename=extracted_file_name)
 
-        # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
-        self.save_extracted_log(dest=tmp_folder)
-        file_list = [tmp_folder]
-
+        extracted_files = [self.extracted_syslog]
         for path in self.additional_files:
-            file_dir, file_name = split(path)
-            extracted_file_name = os.path.join(self.dut_run_dir, file_name)
-            tmp_folder = ".".join((extracted_file_name, timestamp))
-            self.save_extracted_file(dest=tmp_folder, src=extracted_file_name)
-            file_list.append(tmp_folder)
-
-        match_messages_regex = re.compile('|'.join(self.match_regex)) if len(self.match_regex) else None
-        ignore_messages_regex = re.compile('|'.join(self.ignore_regex)) if len(self.ignore_regex) else None
-        expect_messages_regex = re.compile('|'.join(self.expect_regex)) if len(self.expect_regex) else None
+            extracted_files.append(os.path.join(self.dut_run_dir, split(path)[1]))
 
-        logging.debug("Analyze files {}".format(file_list))
-        logging.debug('    match_regex="{}"'.format(match_messages_regex.pattern if match_messages_regex else ''))
-        logging.debug('    ignore_regex="{}"'.format(ignore_messages_regex.pattern if ignore_messages_regex else ''))
-        logging.debug('    expect_regex="{}"'.format(expect_messages_regex.pattern if expect_messages_regex else ''))
-        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(
-            file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
-            maximum_log_length=maximum_log_length)
-        # Print file content and remove the file
-        for folder in file_list:
-            with open(folder) as fo:
-                logging.debug("{} file content:\n\n{}".format(folder, fo.read()))
-            os.remove(folder)
-
-        expected_lines_total = []
-        unused_regex_messages = []
+        if self.analyze_on_dut:
+            analyzer_parse_result, unused_regex_messages, match_regexp_hits = self._analyze_on_dut(
+                marker, extracted_files, maximum_log_length)
+        else:
+            analyzer_parse_result, unused_regex_messages, match_regexp_hits = self._analyze_locally(
+                extracted_files, timestamp, maximum_log_length)
 
         for key, value in list(analyzer_parse_result.items()):
             matching_lines, expecting_lines = value
@@ -516,17 +504,10 @@ class LogAnalyzer:
                                                     "expected_match": len(expecting_lines)}
             analyzer_summary["match_messages"][key] = matching_lines
             analyzer_summary["expect_messages"][key] = expecting_lines
-            expected_lines_total.extend(expecting_lines)
 
-        # Find unused regex matches
-        for regex in self.expect_regex:
-            for line in expected_lines_total:
-                if re.search(regex, line):
-                    break
-            else:
-                unused_regex_messages.append(regex)
         analyzer_summary["total"]["expected_missing_match"] = len(unused_regex_messages)
         analyzer_summary["unused_expected_regexp"] = unused_regex_messages
+        analyzer_summary["match_regexp_hits"] = match_regexp_hits
         logging.debug("Analyzer summary: {}".format(pprint.pformat(analyzer_summary)))
         try:
             shutil.rmtree(self._la_logs_dir)
@@ -545,6 +526,106 @@ class LogAnalyzer:
             logging.warning("Skip bug handler execution because it is not a valid BugHandler")
         return analyzer_summary
 
+    def _analyze_locally(self, extracted_files, timestamp, maximum_log_length=None):
+        """
+        @summary: Download the extracted log files and analyze them on the sonic-mgmt host.
+
+        @param extracted_files: Paths of the extracted log files on the DUT, extracted syslog first.
+        @param timestamp: Timestamp used to name the downloaded files.
+        @param maximum_log_length: The long message (length > maximum_log_length) will be skipped.
+        @return: Tuple of map <file_name, [matching lines, expected lines]>, list of the expected regexps
+                 which are missing and map <regexp, number of matching lines>.
+        """
+        # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
+        tmp_folder = ".".join((SYSLOG_TMP_FOLDER, self.ansible_host.hostname, timestamp))
+        self.save_extracted_log(dest=tmp_folder)
+        file_list = [tmp_folder]
+
+        for extracted_file_name in extracted_files[1:]:
+            tmp_folder = ".".join((extracted_file_name, timestamp))
+            self.save_extracted_file(dest=tmp_folder, src=extracted_file_name)
+            file_list.append(tmp_folder)
+
+        match_messages_regex = self.ansible_loganalyzer.compile_msg_regex(self.match_regex)
+        ignore_messages_regex = self.ansible_loganalyzer.compile_msg_regex(self.ignore_regex)
+        expect_messages_regex = self.ansible_loganalyzer.compile_msg_regex(self.expect_regex)
+
+        logging.debug("Analyze files {}".format(file_list))
+        logging.debug('    match_regex="{}"'.format(match_messages_regex.pattern if match_messages_regex else ''))
+        logging.debug('    ignore_regex="{}"'.format(ignore_messages_regex.pattern if ignore_messages_regex else ''))
+        logging.debug('    expect_regex="{}"'.format(expect_messages_regex.pattern if expect_messages_regex else ''))
+        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(
+            file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
+            maximum_log_length=maximum_log_length)
+        # Print file content if requested and remove the file
+        for folder in file_list:
+            if self.dump_logs:
+                self._dump_log_file(folder)
+            os.remove(folder)
+
+        # The matchers counted the lines found by every regex during the analysis
+        unused_regex_messages = expect_messages_regex.unused_patterns() if expect_messages_regex else []
+        match_regexp_hits = match_messages_regex.hit_counts() if match_messages_regex else {}
+        return analyzer_parse_result, unused_regex_messages, match_regexp_hits
+
+    def _analyze_on_dut(self, marker, extracted_files, maximum_log_length=None):
+        """
+        @summary: Analyze the extracted log files on the DUT, only the results are transferred back.
+
+        @param marker: Marker obtained from "init" method.
+        @param extracted_files: Paths of the extracted log files on the DUT.
+        @param maximum_log_length: The long message (length > maximum_log_length) will be skipped.
+        @return: Same as _analyze_locally.
+        """
+        regex_file = os.path.join(self.dut_run_dir, "loganalyzer_regex.{}.json".format(marker))
+        self.ansible_host.copy(content=json.dumps({"match": self.match_regex,
+                                                   "ignore": self.ignore_regex,
+                                                   "expect": self.expect_regex}),
+                               dest=regex_file)
+
+        cmd = "python {run_dir}/loganalyzer.py --action analyze_to_json --run_id {marker} --logs {logs} "\
+              "--regex_file {regex_file}".format(run_dir=self.dut_run_dir, marker=marker,
+                                                 logs=",".join(extracted_files), regex_file=regex_file)
+        if self.ansible_loganalyzer.start_marker:
+            cmd += " --start_marker '{}'".format(self.ansible_loganalyzer.start_marker)
+        if maximum_log_length is not None:
+            cmd += " --maximum_log_length {}".format(maximum_log_length)
+
+        logging.debug("Analyze files {} on DUT".format(extracted_files))
+        result = self.ansible_host.shell(cmd, module_ignore_errors=True)
+        self.ansible_host.file(path=regex_file, state="absent")
+        if result["rc"] != 0:
+            raise LogAnalyzerError("Log analyzer failed on DUT, rc={}:\n{}\n{}"
+                                   .format(result["rc"], result["stdout"], result["stderr"]))
+
+        if self.dump_logs:
+            for extracted_file_name in extracted_files:
+                local_file = ".".join((SYSLOG_TMP_FOLDER, self.ansible_host.hostname, split(extracted_file_name)[1],
+                                       marker))
+                self.save_extracted_file(dest=local_file, src=extracted_file_name)
+                self._dump_log_file(local_file)
+                os.remove(local_file)
+
+        output = json.loads(result["stdout"])
+        return output["files"], output["unused_expected_regexp"], output["match_regexp_hits"]
+
+    @staticmethod
+    def _dump_log_file(path):
+        """
+        @summary: Log the content of a file in chunks, without reading the whole file in memory.
+        """
+        with open(path) as fo:
+            chunk = []
+            part = 1
+            for line in fo:
+                chunk.append(line)
+                if len(chunk) >= DUMP_LOG_CHUNK_LINES:
+                    logging.debug("{} file content part {}:\n\n{}".format(path, part, "".join(chunk)))
+                    chunk = []
+                    part += 1
+            if chunk or part == 1:
+                logging.debug("{} file content part {}:\n\n{}".format(path, part, "".join(chunk)))
+
     def save_extracted_log(self, dest):
         """
         @summary: Download extracted syslog log file to the ansible host.
@@ -19,6 +19,7 @@ from typing import Any, Dict, List, Optional, Set, Tuple, Union
 import pytest
 
 from tests.common.plugins.proc_mem_cpu_monitor.constants import MEM_LEAK_EVENT
+from tests.common.plugins.proc_mem_cpu_monitor.sample_store import DEFAULT_MAX_POINTS, SampleStore
 from tests.common.plugins.proc_mem_cpu_monitor.tcmalloc_parser import parse_tcmalloc_stats
 from tests.common.plugins.proc_mem_cpu_monitor.top_parser import (
     SYSTEM_CPU_IDLE_PROCESS,
@@ -260,6 +261,9 @@ class MemCpuMonitorResult:
     timeline: List[Dict[str, Any]] = field(default_factory=list)
     top_raw_log_path: Optional[str] = None
     tcmalloc_raw_log_path: Optional[str] = None
+    # Per (dut, scope, process, probe_transport) aggregates over every sample, see ``SampleStore.stats()``
+    series_stats: Dict[Tuple[str, str, str, str], Dict[str, Any]] = field(default_factory=dict)
+    store: Optional[SampleStore] = None
 
 
 class ProcMemCpuMonitor(object):
@@ -285,12 +289,13 @@ class ProcMemCpuMonitor(object):
     def __init__(self, request):
         self.request = request
         self._lock = threading.RLock()
-        # Serialize duthost.command(): sampler thread vs snapshot(MEM_LEAK_EVENT) / same Ansible SSH.
-        self._dut_ssh_lock = threading.Lock()
+        # Serialize duthost.command() per DUT: sampler thread vs snapshot(MEM_LEAK_EVENT) / same Ansible SSH.
+        self._dut_ssh_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
         self._stop_event = threading.Event()
-        self._thread: Optional[threading.Thread] = None
+        # One sampler thread per DUT, so a slow DUT only delays its own samples.
+        self._threads: List[threading.Thread] = []
         self._running = False
-        self._samples: List[Dict[str, Any]] = []
+        self._store = SampleStore()
         self._events: List[Dict[str, Any]] = []
         self._seq = 0
         self._baseline_mem: Dict[Tuple[str, str, str], float] = {}
@@ -365,8 +370,35 @@ class ProcMemCpuMonitor(object):
             with open(self._tcmalloc_raw_log_path, "a", encoding="utf-8") as fh:
                 fh.write(block)
 
+    def _dut_ssh_lock(self, hostname: str) -> threading.Lock:
+        with self._lock:
+            return self._dut_ssh_locks[hostname]
+
+    def _targets_by_dut(self) -> List[List[Tuple[Any, str, str, str]]]:
+        """``_targets`` grouped per DUT, in ``start()`` order."""
+        groups: Dict[str, List[Tuple[Any, str, str, str]]] = {}
+        for target in self._targets:
+            hn = getattr(target[0], "hostname", None) or str(target[0])
+            groups.setdefault(hn, []).append(target)
+        return list(groups.values())
+
+    def _run_per_dut(self, func, name: str) -> None:
+        """Run ``func(targets)`` for the targets of every DUT concurrently and wait for all of them."""
+        groups = self._targets_by_dut()
+        if len(groups) == 1:
+            func(groups[0])
+            return
+        threads = [
+            threading.Thread(target=func, args=(targets,), name=name, daemon=True)
+            for targets in groups
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
     def _dut_command_raw(self, duthost: Any, cmd: str, hostname: str, scope: str, kind: str) -> str:
-        with self._dut_ssh_lock:
+        with self._dut_ssh_lock(hostname):
             try:
                 with _suppress_devices_base_debug():
                     out = duthost.command(cmd, module_ignore_errors=True)
@@ -394,7 +426,7 @@ class ProcMemCpuMonitor(object):
                 continue
             seen.add(hn)
             try:
-                with self._dut_ssh_lock:
+                with self._dut_ssh_lock(hn):
                     with _suppress_devices_base_debug():
                         out = duthost.command(_NUM_CORES_CMD, module_ignore_errors=True)
             except Exception as ex:  # noqa: BLE001
@@ -413,9 +445,24 @@ class ProcMemCpuMonitor(object):
                     self._host_top_num_cores = n
                     return
 
-    def _poll_tick(self) -> None:
+    def _record_sample(
+        self,
+        hostname: str,
+        scope: str,
+        process: str,
+        probe_transport: str,
+        mem_unit: str,
+        t_wall: datetime,
+        t_mono: float,
+        **values: Any
+    ) -> None:
+        with self._lock:
+            seq = self._next_seq()
+        self._store.append(hostname, scope, process, probe_transport, mem_unit, t_wall, t_mono, seq, **values)
+
+    def _poll_tick(self, targets: Optional[List[Tuple[Any, str, str, str]]] = None) -> None:
         proc_list = self._proc_list
-        for duthost, scope, cmd, kind in self._targets:
+        for duthost, scope, cmd, kind in (self._targets if targets is None else targets):
             try:
                 hostname = duthost.hostname
                 stdout = self._dut_command_raw(duthost, cmd, hostname, scope, kind)
@@ -425,76 +472,46 @@ class ProcMemCpuMonitor(object):
                     data = parse_free_m_used(stdout)
                     if not data:
                         continue
+                    self._record_sample(
+                        hostname, scope, "free_used", "free", "%", now, mono,
+                        cpu_pct=None,
+                        mem_pct=data["used_pct"],
+                        mem_mib_used=data["used_mib"],
+                        mem_total_mib=data.get("total_mib"),
+                        mem_res_mib=round(data["used_mib"], 2),
+                    )
                     with self._lock:
-                        rec = {
-                            "kind": "sample",
-                            "dut": hostname,
-                            "scope": scope,
-                            "process": "free_used",
-                            "cpu_pct": None,
-                            "mem_pct": data["used_pct"],
-                            "mem_mib_used": data["used_mib"],
-                            "mem_total_mib": data.get("total_mib"),
-                            "mem_res_mib": round(data["used_mib"], 2),
-                            "mem_unit": "%",
-                            "probe_transport": "free",
-                            "t_wall": now,
-                            "t_mono": mono,
-                            "seq": self._next_seq(),
-                        }
-                        self._samples.append(rec)
                         key = (hostname, scope, "free_used")
                         if key not in self._baseline_mem:
                             self._baseline_mem[key] = data["used_pct"]
                     continue
 
                 if kind == "tcmalloc":
-                    rows = parse_tcmalloc_stats(stdout)
-                    with self._lock:
-                        for row in rows:
-                            heap_b = row["heap_size_bytes"]
-                            free_b = row["pageheap_free_bytes"]
-                            rec = {
-                                "kind": "sample",
-                                "dut": hostname,
-                                "scope": scope,
-                                "process": row["process"],
-                                "cpu_pct": None,
-                                "mem_pct": None,
-                                "mem_res_mib": round(heap_b / (1024.0 * 1024.0), 2),
-                                "mem_unit": "bytes",
-                                "probe_transport": "tcmalloc",
-                                "tcmalloc_heap_size_bytes": heap_b,
-                                "tcmalloc_pageheap_free_bytes": free_b,
-                                "t_wall": now,
-                                "t_mono": mono,
-                                "seq": self._next_seq(),
-                            }
-                            self._samples.append(rec)
+                    for row in parse_tcmalloc_stats(stdout):
+                        heap_b = row["heap_size_bytes"]
+                        self._record_sample(
+                            hostname, scope, row["process"], "tcmalloc", "bytes", now, mono,
+                            cpu_pct=None,
+                            mem_pct=None,
+                            mem_res_mib=round(heap_b / (1024.0 * 1024.0), 2),
+                            tcmalloc_heap_size_bytes=heap_b,
+                            tcmalloc_pageheap_free_bytes=row["pageheap_free_bytes"],
+                        )
                     continue
 
                 if kind in ("top", "top_all") and scope == "host":
                     cpu_summary = parse_top_cpu_summary(stdout)
                     if cpu_summary:
-                        with self._lock:
-                            self._samples.append({
-                                "kind": "sample",
-                                "dut": hostname,
-                                "scope": scope,
-                                "process": SYSTEM_CPU_IDLE_PROCESS,
-                                "cpu_pct": cpu_summary["idle_pct"],
-                                "mem_pct": None,
-                                "mem_res_mib": None,
-                                "mem_unit": "%",
-                                "probe_transport": "top_summary",
-                                "system_cpu_idle_pct": cpu_summary["idle_pct"],
-                                "system_cpu_busy_pct": cpu_summary.get("busy_pct"),
-                                "system_cpu_us_pct": cpu_summary["us_pct"],
-                                "system_cpu_sy_pct": cpu_summary["sy_pct"],
-                                "t_wall": now,
-                                "t_mono": mono,
-                                "seq": self._next_seq(),
-                            })
+                        self._record_sample(
+                            hostname, scope, SYSTEM_CPU_IDLE_PROCESS, "top_summary", "%", now, mono,
+                            cpu_pct=cpu_summary["idle_pct"],
+                            mem_pct=None,
+                            mem_res_mib=None,
+                            system_cpu_idle_pct=cpu_summary["idle_pct"],
+                            system_cpu_busy_pct=cpu_summary.get("busy_pct"),
+                            system_cpu_us_pct=cpu_summary["us_pct"],
+                            system_cpu_sy_pct=cpu_summary["sy_pct"],
+                        )
 
                 if kind == "top_all":
                     rows = parse_top_host_all(stdout)
@@ -502,24 +519,15 @@ class ProcMemCpuMonitor(object):
                     rows = [r for r in rows if r["process"] in cap]
                 else:
                     rows = parse_top(stdout, proc_list)
-                with self._lock:
-                    for row in rows:
-                        rec = {
-                            "kind": "sample",
-                            "dut": hostname,
-                            "scope": scope,
-                            "process": row["process"],
-                            "cpu_pct": row["cpu_pct"],
-                            "mem_pct": row["mem_pct"],
-                            "mem_res_mib": row.get("mem_res_mib"),
-                            "mem_unit": "%",
-                            "probe_transport": "top",
-                            "pid": row.get("pid"),
-                            "t_wall": now,
-                            "t_mono": mono,
-                            "seq": self._next_seq(),
-                        }
-                        self._samples.append(rec)
+                for row in rows:
+                    self._record_sample(
+                        hostname, scope, row["process"], "top", "%", now, mono,
+                        cpu_pct=row["cpu_pct"],
+                        mem_pct=row["mem_pct"],
+                        mem_res_mib=row.get("mem_res_mib"),
+                        pid=row.get("pid"),
+                    )
+                    with self._lock:
                         key = (hostname, scope, row["process"])
                         if key not in self._baseline_mem and self._should_set_mem_baseline(row["process"]):
                             self._baseline_mem[key] = row["mem_pct"]
@@ -535,13 +543,13 @@ class ProcMemCpuMonitor(object):
                     exc_info=True,
                 )
 
-    def _loop(self) -> None:
+    def _loop(self, targets: List[Tuple[Any, str, str, str]]) -> None:
         try:
             while not self._stop_event.is_set():
                 with self._lock:
                     if not self._running:
                         break
-                self._poll_tick()
+                self._poll_tick(targets)
                 self._stop_event.wait(self._interval)
         except Exception as ex:  # noqa: BLE001  surface sampler failures on stop(), not BaseException
             logger.exception("mem_cpu_monitor sampler thread died")
@@ -565,6 +573,7 @@ class ProcMemCpuMonitor(object):
         include_tcmalloc_stats: bool = False,
         tcmalloc_raw_log_path: Optional[str] = None,
         output_basename_style: str = "full",
+        max_samples_per_series: Optional[int] = DEFAULT_MAX_POINTS,
     ) -> None:
         """
         Begin background sampling.
@@ -575,7 +584,8 @@ class ProcMemCpuMonitor(object):
                 host process basenames when using ``host_top_all_procs``. Also used for
                 adaptive plot/export (interest list) and optional mem-leak baselines on host rows.
             interval: seconds between completed poll rounds (default ``1.0``). The first round runs
-                immediately after ``start()``; the sampler thread then sleeps ``interval`` between rounds.
+                immediately after ``start()``; each DUT then has its own sampler thread sleeping
+                ``interval`` between its rounds, so a slow DUT does not delay the others.
             docker_service: SONiC feature name for per-ASIC docker (default ``bgp``).
             include_host_top: if True, sample host ``top`` filtered by ``proc_list`` (ignored if
                 ``host_top_all_procs`` is True  host ``top`` is then full-process only).
@@ -606,6 +616,9 @@ class ProcMemCpuMonitor(object):
                 ``<tmp_path>/mem_cpu_monitor_tcmalloc_raw.log`` when ``include_tcmalloc_stats`` is True.
             output_basename_style: how to build PNG/JSON/CSV basename  ``full`` (default, long
                 ``nodeid``), ``short_node`` (``node.name`` only), or ``dut_ts_hash`` (DUT + time + hash).
+            max_samples_per_series: samples kept per (dut, scope, process) series (default ``20000``).
+                When a series is full its older half is downsampled by 2; ``None`` keeps every sample.
+                ``series_stats`` of the result are computed from every sample either way.
         """
         if output_basename_style not in OUTPUT_BASENAME_STYLES:
             raise ValueError(
@@ -713,7 +726,8 @@ class ProcMemCpuMonitor(object):
             self._running = True
             self._stop_event.clear()
             self._thread_exc = None
-            self._samples.clear()
+            # A new store: the store of a previous result stays valid
+            self._store = SampleStore(max_samples_per_series)
             self._events.clear()
             self._seq = 0
             self._baseline_mem.clear()
@@ -734,11 +748,20 @@ class ProcMemCpuMonitor(object):
                     "tcmalloc_raw_log_path": self._tcmalloc_raw_log_path,
                     "output_basename_style": output_basename_style,
                     "num_cores": self._host_top_num_cores,
+                    "max_samples_per_series": max_samples_per_series,
                 },
             )
-            self._poll_tick()
-            self._thread = threading.Thread(target=self._loop, name="mem_cpu_monitor", daemon=True)
-            self._thread.start()
+            groups = self._targets_by_dut()
+
+        # Outside of self._lock: the per-DUT pollers take it to record samples.
+        self._run_per_dut(self._poll_tick, "mem_cpu_monitor_poll")
+        with self._lock:
+            self._threads = [
+                threading.Thread(target=self._loop, args=(targets,), name="mem_cpu_monitor", daemon=True)
+                for targets in groups
+            ]
+            for thread in self._threads:
+                thread.start()
 
     def snapshot(self, event: Optional[str] = None, threshold: Optional[str] = None, strict: bool = True) -> None:
         """
@@ -772,24 +795,29 @@ class ProcMemCpuMonitor(object):
         rel = self._parse_threshold_relative(threshold)
         current: Dict[Tuple[str, str, str], float] = {}
         proc_list = self._proc_list
-        for duthost, scope, cmd, kind in self._targets:
-            stdout = self._dut_command_raw(duthost, cmd, duthost.hostname, scope, kind)
-            hostname = duthost.hostname
-            if kind == "free":
-                data = parse_free_m_used(stdout)
-                if data:
-                    current[(hostname, scope, "free_used")] = data["used_pct"]
-                continue
-            if kind == "top_all":
-                rows = parse_top_host_all(stdout)
-                cap = _host_top_capture_names(rows, proc_list, self._jumper_top_n)
-                rows = [r for r in rows if r["process"] in cap]
-            else:
-                rows = parse_top(stdout, proc_list)
-            for row in rows:
-                key = (hostname, scope, row["process"])
-                current[key] = row["mem_pct"]
 
+        def collect(targets: List[Tuple[Any, str, str, str]]) -> None:
+            for duthost, scope, cmd, kind in targets:
+                stdout = self._dut_command_raw(duthost, cmd, duthost.hostname, scope, kind)
+                hostname = duthost.hostname
+                if kind == "free":
+                    data = parse_free_m_used(stdout)
+                    if data:
+                        current[(hostname, scope, "free_used")] = data["used_pct"]
+                    continue
+                if kind == "top_all":
+                    rows = parse_top_host_all(stdout)
+                    cap = _host_top_capture_names(rows, proc_list, self._jumper_top_n)
+                    rows = [r for r in rows if r["process"] in cap]
+                else:
+                    rows = parse_top(stdout, proc_list)
+                for row in rows:
+                    key = (hostname, scope, row["process"])
+                    current[key] = row["mem_pct"]
+
+        self._run_per_dut(collect, "mem_cpu_monitor_mem_leak")
+
+        stats = self._store.stats()
         failures: List[str] = []
         with self._lock:
             for key, base in self._baseline_mem.items():
@@ -799,11 +827,14 @@ class ProcMemCpuMonitor(object):
                 cur = current[key]
                 low, high = base * (1.0 - rel), base * (1.0 + rel)
                 if cur < low or cur > high:
-                    failures.append(
-                        "{} baseline={:.2f}% current={:.2f}% allowed=[{:.2f}%, {:.2f}%]".format(
-                            key, base, cur, low, high
-                        )
+                    msg = "{} baseline={:.2f}% current={:.2f}% allowed=[{:.2f}%, {:.2f}%]".format(
+                        key, base, cur, low, high
                     )
+                    transport = "free" if key[2] == "free_used" else "top"
+                    slope = (stats.get(key + (transport,)) or {}).get("mem_pct_slope_per_hour")
+                    if slope is not None:
+                        msg += " slope={:+.3f}%/h".format(slope)
+                    failures.append(msg)
         return failures, False
 
     def stop(self) -> MemCpuMonitorResult:
@@ -816,20 +847,23 @@ class ProcMemCpuMonitor(object):
             if self._running:
                 self._running = False
             self._stop_event.set()
-        if self._thread is not None:
-            self._thread.join(timeout=30.0)
-            self._thread = None
+        for thread in self._threads:
+            thread.join(timeout=30.0)
+        self._threads = []
         self._append_event("stop")
 
+        samples = self._store.samples()
         with self._lock:
-            merged = list(self._samples) + list(self._events)
+            merged = samples + list(self._events)
             merged.sort(key=lambda r: (r["t_mono"], r["seq"]))
             result = MemCpuMonitorResult(
-                samples=list(self._samples),
+                samples=samples,
                 events=list(self._events),
                 timeline=merged,
                 top_raw_log_path=self._top_raw_log_path,
                 tcmalloc_raw_log_path=self._tcmalloc_raw_log_path,
+                series_stats=self._store.stats(),
+                store=self._store,
             )
             self._last_result = result
             self._stopped = True
@@ -853,6 +887,8 @@ class ProcMemCpuMonitor(object):
 
     @staticmethod
     def _filter_samples_for_plot(res: MemCpuMonitorResult, proc_subset: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if res.store is not None:
+            return res.store.samples(exclude_transports=("tcmalloc", "top_summary"), processes=proc_subset)
         samples = [
             s for s in res.samples
             if s.get("probe_transport") not in ("tcmalloc", "top_summary")
@@ -864,10 +900,14 @@ class ProcMemCpuMonitor(object):
     @staticmethod
     def _system_cpu_samples_for_plot(res: MemCpuMonitorResult) -> List[Dict[str, Any]]:
         """Host ``%Cpu(s)`` idle %  always plotted; not subject to proc_subset."""
+        if res.store is not None:
+            return res.store.samples(transports=("top_summary",))
         return [s for s in res.samples if s.get("probe_transport") == "top_summary"]
 
     @staticmethod
     def _tcmalloc_samples_for_plot(res: MemCpuMonitorResult) -> List[Dict[str, Any]]:
+        if res.store is not None:
+            return res.store.samples(transports=("tcmalloc",))
         return [s for s in res.samples if s.get("probe_transport") == "tcmalloc"]
 
     def _output_stem(self, out_dir: str, samples: List[Dict[str, Any]], basename_style: Optional[str] = None) -> str:
@@ -893,32 +933,23 @@ class ProcMemCpuMonitor(object):
         use_adaptive = self._host_top_all_procs if auto_host_jumper_subset is None else bool(auto_host_jumper_subset)
         if not use_adaptive:
             return None
+        if res.store is not None:
+            series = {(scope, process, transport) for _dut, scope, process, transport in res.store.keys()}
+        else:
+            series = {
+                (s.get("scope"), s.get("process"), s.get("probe_transport"))
+                for s in res.samples if s.get("kind") == "sample"
+            }
+        keys: Set[str] = set()
         if self._host_top_all_procs:
-            keys: Set[str] = set()
-            for s in res.samples:
-                if s.get("kind") != "sample" or s.get("probe_transport") != "top":
-                    continue
-                if s.get("scope") == "host":
-                    keys.add(s["process"])
-                elif self._proc_list and s.get("scope") != "host":
-                    proc = s.get("process")
-                    if proc and any(u in proc for u in self._proc_list):
-                        keys.add(proc)
-            if any(s.get("process") == "free_used" for s in res.samples):
-                keys.add("free_used")
-            return sorted(keys) if keys else None
-        eff = effective_adaptive_plot_processes(res.samples, self._proc_list, self._jumper_top_n)
-        keys = set(eff) if eff else set()
+            keys.update(proc for scope, proc, transport in series if transport == "top" and scope == "host")
+        else:
+            keys.update(effective_adaptive_plot_processes(res.samples, self._proc_list, self._jumper_top_n) or [])
         if self._proc_list:
-            for s in res.samples:
-                if s.get("kind") != "sample" or s.get("probe_transport") != "top":
-                    continue
-                if s.get("scope") == "host":
-                    continue
-                proc = s.get("process")
-                if proc and any(u in proc for u in self._proc_list):
+            for scope, proc, transport in series:
+                if transport == "top" and scope != "host" and proc and any(u in proc for u in self._proc_list):
                     keys.add(proc)
-        if any(s.get("process") == "free_used" for s in res.samples):
+        if any(proc == "free_used" for _scope, proc, _transport in series):
             keys.add("free_used")
         return sorted(keys) if keys else None
 
@@ -1210,6 +1241,10 @@ class ProcMemCpuMonitor(object):
                 "tcmalloc_raw_log": self._tcmalloc_raw_log_path,
                 "samples": [_build_export_sample_row(s) for s in export_samples],
                 "events": [_serialize_event(e) for e in res.events],
+                "series_stats": [
+                    dict(zip(("dut", "scope", "process", "probe_transport"), key), **stats)
+                    for key, stats in sorted(res.series_stats.items())
+                ],
             }
             with open(path, "w", encoding="utf-8") as fh:
                 json.dump(payload, fh, indent=2)
@@ -1244,7 +1279,7 @@ class ProcMemCpuMonitor(object):
 
     def teardown(self) -> None:
         """Fixture cleanup: stop sampler if still running."""
-        if self._running or (self._thread and self._thread.is_alive()):
+        if self._running or any(thread.is_alive() for thread in self._threads):
             try:
                 self.stop()
             except Exception:  # noqa: BLE001
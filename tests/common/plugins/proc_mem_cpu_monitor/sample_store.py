@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""Columnar in-memory store for ``mem_cpu_monitor`` samples.
+
+Samples are kept per series, one series per (dut, scope, process, probe_transport), as typed
+arrays (one array per field) instead of one dict per sample. Each series keeps at most
+``max_points`` samples: when full, the older half is downsampled by 2, so a long run keeps
+its whole time range with full resolution on the recent samples. Per-series aggregates
+(min/max, baseline, memory slope) are updated on every append, from every sample,
+including the ones later dropped by downsampling.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Fields stored as float like the others (``None`` is NaN) but returned as int
+_INT_FIELDS = frozenset(("pid", "tcmalloc_heap_size_bytes", "tcmalloc_pageheap_free_bytes"))
+
+DEFAULT_MAX_POINTS = 20000
+
+SeriesKey = Tuple[str, str, str, str]
+
+
+def _to_float(value: Any) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def _from_float(name: str, value: float) -> Any:
+    if math.isnan(value):
+        return None
+    if name in _INT_FIELDS:
+        return int(value)
+    return value
+
+
+class _MinMax(object):
+    __slots__ = ("min", "max")
+
+    def __init__(self):
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: Optional[float]) -> None:
+        if value is None:
+            return
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+
+class _Slope(object):
+    """Least squares slope of ``y`` over ``x``, updated one point at a time."""
+
+    __slots__ = ("n", "x0", "sx", "sy", "sxx", "sxy")
+
+    def __init__(self):
+        self.n = 0
+        self.x0 = 0.0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def add(self, x: float, y: Optional[float]) -> None:
+        if y is None:
+            return
+        if self.n == 0:
+            self.x0 = x
+        # Offset x by the first point to keep the sums small
+        x -= self.x0
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+
+    def slope(self) -> Optional[float]:
+        den = self.n * self.sxx - self.sx * self.sx
+        if self.n < 2 or den <= 0.0:
+            return None
+        return (self.n * self.sxy - self.sx * self.sy) / den
+
+
+class SeriesStats(object):
+    """Aggregates of every sample appended to one series."""
+
+    __slots__ = ("count", "first_t_mono", "last_t_mono", "cpu_pct", "mem_pct", "mem_res_mib",
+                 "baseline_mem_pct", "last_mem_pct", "_mem_pct_slope", "_mem_mib_slope")
+
+    def __init__(self):
+        self.count = 0
+        self.first_t_mono: Optional[float] = None
+        self.last_t_mono: Optional[float] = None
+        self.cpu_pct = _MinMax()
+        self.mem_pct = _MinMax()
+        self.mem_res_mib = _MinMax()
+        self.baseline_mem_pct: Optional[float] = None
+        self.last_mem_pct: Optional[float] = None
+        self._mem_pct_slope = _Slope()
+        self._mem_mib_slope = _Slope()
+
+    def add(self, t_mono: float, values: Dict[str, Any]) -> None:
+        self.count += 1
+        if self.first_t_mono is None:
+            self.first_t_mono = t_mono
+        self.last_t_mono = t_mono
+        cpu = values.get("cpu_pct")
+        mem = values.get("mem_pct")
+        mib = values.get("mem_res_mib")
+        if mib is None:
+            mib = values.get("mem_mib_used")
+        cpu = None if cpu is None else float(cpu)
+        mem = None if mem is None else float(mem)
+        mib = None if mib is None else float(mib)
+        self.cpu_pct.add(cpu)
+        self.mem_pct.add(mem)
+        self.mem_res_mib.add(mib)
+        if mem is not None:
+            if self.baseline_mem_pct is None:
+                self.baseline_mem_pct = mem
+            self.last_mem_pct = mem
+        self._mem_pct_slope.add(t_mono, mem)
+        self._mem_mib_slope.add(t_mono, mib)
+
+    def as_dict(self) -> Dict[str, Any]:
+        pct_slope = self._mem_pct_slope.slope()
+        mib_slope = self._mem_mib_slope.slope()
+        return {
+            "count": self.count,
+            "duration_s": (self.last_t_mono - self.first_t_mono) if self.count else None,
+            "cpu_pct_min": self.cpu_pct.min,
+            "cpu_pct_max": self.cpu_pct.max,
+            "mem_pct_min": self.mem_pct.min,
+            "mem_pct_max": self.mem_pct.max,
+            "mem_mib_min": self.mem_res_mib.min,
+            "mem_mib_max": self.mem_res_mib.max,
+            "baseline_mem_pct": self.baseline_mem_pct,
+            "last_mem_pct": self.last_mem_pct,
+            "mem_pct_slope_per_hour": pct_slope * 3600.0 if pct_slope is not None else None,
+            "mem_mib_slope_per_hour": mib_slope * 3600.0 if mib_slope is not None else None,
+        }
+
+
+class SampleSeries(object):
+    """Retained samples of one (dut, scope, process, probe_transport) series, one array per field."""
+
+    __slots__ = ("key", "mem_unit", "t_wall", "t_mono", "seq", "columns", "stats")
+
+    def __init__(self, key: SeriesKey, mem_unit: str):
+        self.key = key
+        self.mem_unit = mem_unit
+        self.t_wall = array("d")
+        self.t_mono = array("d")
+        self.seq = array("q")
+        self.columns: Dict[str, array] = {}
+        self.stats = SeriesStats()
+
+    def __len__(self) -> int:
+        return len(self.seq)
+
+    def append(self, t_wall: datetime, t_mono: float, seq: int, values: Dict[str, Any]) -> None:
+        count = len(self.seq)
+        for name, value in values.items():
+            if name not in self.columns:
+                # A field seen for the first time is missing in the older samples
+                self.columns[name] = array("d", [float("nan")]) * count
+            self.columns[name].append(_to_float(value))
+        for name, column in self.columns.items():
+            if name not in values:
+                column.append(float("nan"))
+        self.t_wall.append(t_wall.timestamp())
+        self.t_mono.append(t_mono)
+        self.seq.append(seq)
+        self.stats.add(t_mono, values)
+
+    def downsample(self) -> None:
+        """Drop every other sample of the older half."""
+        half = len(self.seq) // 2
+        self.t_wall = self.t_wall[0:half:2] + self.t_wall[half:]
+        self.t_mono = self.t_mono[0:half:2] + self.t_mono[half:]
+        self.seq = self.seq[0:half:2] + self.seq[half:]
+        for name in list(self.columns):
+            column = self.columns[name]
+            self.columns[name] = column[0:half:2] + column[half:]
+
+    def samples(self) -> List[Dict[str, Any]]:
+        dut, scope, process, transport = self.key
+        out = []
+        for i in range(len(self.seq)):
+            rec = {
+                "kind": "sample",
+                "dut": dut,
+                "scope": scope,
+                "process": process,
+                "mem_unit": self.mem_unit,
+                "probe_transport": transport,
+                "t_wall": datetime.fromtimestamp(self.t_wall[i], timezone.utc),
+                "t_mono": self.t_mono[i],
+                "seq": self.seq[i],
+            }
+            for name, column in self.columns.items():
+                rec[name] = _from_float(name, column[i])
+            out.append(rec)
+        return out
+
+
+class SampleStore(object):
+    """Thread-safe set of ``SampleSeries`` with bounded retention per series."""
+
+    def __init__(self, max_points: Optional[int] = DEFAULT_MAX_POINTS):
+        self._lock = threading.Lock()
+        self._series: Dict[SeriesKey, SampleSeries] = {}
+        self.max_points = max_points
+        self.total_appended = 0
+
+    def append(
+        self,
+        dut: str,
+        scope: str,
+        process: str,
+        probe_transport: str,
+        mem_unit: str,
+        t_wall: datetime,
+        t_mono: float,
+        seq: int,
+        **values: Any
+    ) -> None:
+        key = (dut, scope, process, probe_transport)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = SampleSeries(key, mem_unit)
+            if self.max_points and len(series) >= self.max_points:
+                series.downsample()
+            series.append(t_wall, t_mono, seq, values)
+            self.total_appended += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(series) for series in self._series.values())
+
+    def keys(self) -> List[SeriesKey]:
+        with self._lock:
+            return list(self._series.keys())
+
+    def stats(self) -> Dict[SeriesKey, Dict[str, Any]]:
+        with self._lock:
+            return {key: series.stats.as_dict() for key, series in self._series.items()}
+
+    def series_stats(self, key: SeriesKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            series = self._series.get(key)
+            return series.stats.as_dict() if series is not None else None
+
+    def samples(
+        self,
+        transports: Optional[Iterable[str]] = None,
+        exclude_transports: Optional[Iterable[str]] = None,
+        processes: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Retained samples of the selected series as dicts, in ``seq`` order."""
+        transports = set(transports) if transports is not None else None
+        exclude_transports = set(exclude_transports or ())
+        processes = set(processes) if processes else None
+        with self._lock:
+            selected = [
+                series for key, series in self._series.items()
+                if (transports is None or key[3] in transports)
+                and key[3] not in exclude_transports
+                and (processes is None or key[2] in processes)
+            ]
+            out: List[Dict[str, Any]] = []
+            for series in selected:
+                out.extend(series.samples())
+        out.sort(key=lambda s: s["seq"])
+        return out
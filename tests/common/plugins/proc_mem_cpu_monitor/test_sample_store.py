@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone
+
+import pytest
+from tests.common.plugins.proc_mem_cpu_monitor.sample_store import SampleStore
+
+pytestmark = [
+    pytest.mark.topology('t0', 't1', 'any')
+]
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _append_top(store, seq, process="bgpd", mem_pct=1.0, **extra):
+    t = float(seq)
+    store.append(
+        "dut1", "host", process, "top", "%",
+        datetime.fromtimestamp(T0 + t, timezone.utc), t, seq,
+        cpu_pct=seq % 7, mem_pct=mem_pct, mem_res_mib=mem_pct * 10, pid=1001, **extra
+    )
+
+
+def test_sample_store_round_trip():
+    store = SampleStore()
+    _append_top(store, 1, mem_pct=2.5)
+    store.append(
+        "dut1", "host:free", "free_used", "free", "%",
+        datetime.fromtimestamp(T0 + 2, timezone.utc), 2.0, 2,
+        cpu_pct=None, mem_pct=40.0, mem_mib_used=1000.0, mem_total_mib=2500.0, mem_res_mib=1000.0,
+    )
+    _append_top(store, 3, mem_pct=2.75)
+
+    samples = store.samples()
+    assert [s["seq"] for s in samples] == [1, 2, 3]
+    assert samples[0]["process"] == "bgpd" and samples[0]["pid"] == 1001
+    assert isinstance(samples[0]["pid"], int)
+    assert samples[0]["t_wall"] == datetime.fromtimestamp(T0 + 1, timezone.utc)
+    assert samples[1]["cpu_pct"] is None and samples[1]["mem_total_mib"] == 2500.0
+    assert [s["seq"] for s in store.samples(transports=("free",))] == [2]
+    assert [s["seq"] for s in store.samples(exclude_transports=("free",), processes=["bgpd"])] == [1, 3]
+
+
+def test_sample_store_downsamples_older_half():
+    store = SampleStore(max_points=8)
+    for seq in range(1, 21):
+        _append_top(store, seq, mem_pct=float(seq))
+
+    seqs = [s["seq"] for s in store.samples()]
+    assert len(seqs) <= 8
+    # The first sample and the most recent samples are kept at full resolution
+    assert seqs[0] == 1
+    assert seqs[-3:] == [18, 19, 20]
+    assert store.total_appended == 20
+
+    stats = store.stats()[("dut1", "host", "bgpd", "top")]
+    assert stats["count"] == 20
+    assert stats["mem_pct_min"] == 1.0 and stats["mem_pct_max"] == 20.0
+    assert stats["baseline_mem_pct"] == 1.0 and stats["last_mem_pct"] == 20.0
+    # mem_pct grows by 1% per second
+    assert stats["mem_pct_slope_per_hour"] == pytest.approx(3600.0)
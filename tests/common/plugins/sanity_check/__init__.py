@@ -13,6 +13,7 @@ from tests.common.plugins.sanity_check import constants
 from tests.common.plugins.sanity_check import checks
 from tests.common.plugins.sanity_check.checks import *      # noqa: F401, F403
 from tests.common.plugins.sanity_check.recover import recover, recover_chassis
+from tests.common.plugins.sanity_check.scheduler import run_check_items, format_timing_report
 from tests.common.plugins.sanity_check.constants import STAGE_PRE_TEST, STAGE_POST_TEST
 from tests.common.helpers.assertions import pytest_assert as pt_assert
 from tests.common.helpers.custom_msg_utils import add_custom_msg
@@ -149,15 +150,15 @@ def filter_check_items(tbinfo, duthosts, check_items):
 
 
 def do_checks(request, check_items, *args, **kwargs):
-    check_results = []
-    for item in check_items:
-        check_fixture = request.getfixturevalue(item)
-        results = check_fixture(*args, **kwargs)
-        logger.debug("check results of each item {}".format(results))
-        if results and isinstance(results, list):
-            check_results.extend(results)
-        elif results:
-            check_results.append(results)
+    workers = request.config.getoption("--sanity_check_workers", default=constants.DEFAULT_SANITY_CHECK_WORKERS)
+    # Fixtures are resolved here, pytest fixture setup is not thread safe
+    check_fixtures = [(item, request.getfixturevalue(item)) for item in check_items]
+    check_results, timing_report = run_check_items(check_fixtures, max(workers, 1), *args, **kwargs)
+    logger.info(format_timing_report(timing_report))
+    stage = kwargs.get("stage", "unknown_stage")
+    if kwargs.get("after_recovery"):
+        stage += "_after_recovery"
+    add_custom_msg(request, "{}.sanity_check_timing.{}".format(DUT_CHECK_NAMESPACE, stage), timing_report)
     return check_results
 
 
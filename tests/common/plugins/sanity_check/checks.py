@@ -16,6 +16,7 @@ from tests.common.dualtor.dual_tor_common import CableType, active_standby_ports
 from tests.common.cache import FactsCache
 from tests.common.plugins.sanity_check.constants import STAGE_PRE_TEST, STAGE_POST_TEST
 from tests.common.helpers.parallel import parallel_run, reset_ansible_local_tmp
+from tests.common.plugins.sanity_check.scheduler import fetch_shared, record_dut_timing
 from tests.common.dualtor.mux_simulator_control import _probe_mux_ports
 from tests.common.fixtures.duthost_utils import check_bgp_router_id
 from tests.common.errors import RunAnsibleModuleFail
@@ -109,13 +110,14 @@ def check_interfaces(duthosts, tbinfo):
                               timeout=1200, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("interfaces")
     @reset_ansible_local_tmp
     def _check_interfaces_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
         logger.info("Checking interfaces status on %s..." % dut.hostname)
 
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = fetch_shared(kwargs, dut, 'networking_uptime', dut.get_networking_uptime).seconds
         timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), MIN_PROCESS_CHECK_TIMEOUT)
         if dut.get_facts().get("modular_chassis"):
             timeout = max(timeout, 600)
@@ -193,6 +195,7 @@ def check_bgp(duthosts, tbinfo):
                               timeout=1200, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("bgp")
     @reset_ansible_local_tmp
     def _check_bgp_on_dut(*args, **kwargs):
         dut = kwargs['node']
@@ -223,14 +226,14 @@ def check_bgp(duthosts, tbinfo):
 
             def _bgp_facts_ready():
                 try:
-                    return len(dut.bgp_facts(asic_index='all')) > 0
+                    return len(fetch_shared(kwargs, dut, 'bgp_facts', lambda: dut.bgp_facts(asic_index='all'))) > 0
                 except Exception:
                     return False
 
             wait_until(120, 10, 0, _bgp_facts_ready)
 
             try:
-                bgp_facts = dut.bgp_facts(asic_index='all')
+                bgp_facts = fetch_shared(kwargs, dut, 'bgp_facts', lambda: dut.bgp_facts(asic_index='all'))
             except Exception as e:
                 logger.error("Failed to get BGP status on host %s: %s", dut.hostname, repr(e))
                 check_result['failed'] = True
@@ -308,7 +311,7 @@ def check_bgp(duthosts, tbinfo):
             results[dut.hostname] = check_result
             return
 
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = fetch_shared(kwargs, dut, 'networking_uptime', dut.get_networking_uptime).seconds
         if SYSTEM_STABILIZE_MAX_TIME - networking_uptime + 480 > 500:
             # If max_timeout is higher than 600, it will exceed parallel_run's timeout
             # the check will be killed by parallel_run, we can't get expected results.
@@ -379,6 +382,7 @@ def check_dbmemory(duthosts):
         result = parallel_run(_check_dbmemory_on_dut, args, kwargs, duthosts, timeout=600, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("dbmemory")
     @reset_ansible_local_tmp
     def _check_dbmemory_on_dut(*args, **kwargs):
         dut = kwargs['node']
@@ -846,13 +850,14 @@ def check_monit(duthosts):
         result = parallel_run(_check_monit_on_dut, args, kwargs, duthosts, timeout=600, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("monit")
     @reset_ansible_local_tmp
     def _check_monit_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
 
         logger.info("Checking status of each Monit service...")
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = fetch_shared(kwargs, dut, 'networking_uptime', dut.get_networking_uptime).seconds
         timeout = max((MONIT_STABILIZE_MAX_TIME - networking_uptime), 0)
         interval = 20
         logger.info("networking_uptime = {} seconds, timeout = {} seconds, interval = {} seconds"
@@ -918,13 +923,14 @@ def check_processes(duthosts):
         result = parallel_run(_check_processes_on_dut, args, kwargs, duthosts, timeout=timeout, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("processes")
     @reset_ansible_local_tmp
     def _check_processes_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
         logger.info("Checking process status on %s..." % dut.hostname)
 
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = fetch_shared(kwargs, dut, 'networking_uptime', dut.get_networking_uptime).seconds
         timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), MIN_PROCESS_CHECK_TIMEOUT)
         interval = 20
         logger.info("networking_uptime=%d seconds, timeout=%d seconds, interval=%d seconds" %
@@ -1136,6 +1142,7 @@ def check_ipv4_mgmt(duthosts, localhost):
         result = parallel_run(_check_ipv4_mgmt_to_dut, args, kwargs, duthosts, timeout=30, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("ipv4_mgmt")
     def _check_ipv4_mgmt_to_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
@@ -1181,6 +1188,7 @@ def check_ipv6_mgmt(duthosts, localhost):
         result = parallel_run(_check_ipv6_mgmt_to_dut, args, kwargs, duthosts, timeout=30, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("ipv6_mgmt")
     def _check_ipv6_mgmt_to_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
@@ -1213,6 +1221,7 @@ def check_orchagent_usage(duthosts):
 
         return list(result.values())
 
+    @record_dut_timing("orchagent_usage")
     def _check_orchagent_usage_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
@@ -1296,6 +1305,7 @@ def check_bfd_up_count(duthosts):
         asic_id = "asic{}".format(asic.asic_index)
         wait_until(300, 20, 0, _check_bfd_up_count, dut, asic_id, check_result)
 
+    @record_dut_timing("bfd_up_count")
     def _check_bfd_up_count_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
@@ -1364,6 +1374,7 @@ def check_mac_entry_count(duthosts):
                 check_result["failed"] = True
                 logger.error("MAC entry count on {} of {} is not as expected".format(asic_id, dut.hostname))
 
+    @record_dut_timing("mac_entry_count")
     def _check_mac_entry_count_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
@@ -1413,6 +1424,7 @@ def check_disk_usage(duthosts):
                               timeout=600, init_result=init_result)
         return list(result.values())
 
+    @record_dut_timing("disk_usage")
     @reset_ansible_local_tmp
     def _check_disk_usage_on_dut(*args, **kwargs):
         dut = kwargs['node']
@@ -27,6 +27,14 @@ INFRA_CHECK_ITEMS = [
     "mux_simulator"
 ]
 
+# Check items which are not run concurrently with other check items
+SERIAL_CHECK_ITEMS = [
+    "check_mux_simulator"
+]
+
+# Default max number of check items running at the same time
+DEFAULT_SANITY_CHECK_WORKERS = 4
+
 # Recover related definitions
 RECOVER_METHODS = {
     "config_reload": {
@@ -0,0 +1,198 @@
+"""
+Concurrent executor of sanity check items.
+
+Every check item runs its per-DUT checks in parallel by itself, but the check items used to run one after another.
+run_check_items() runs independent check items concurrently, each in a process forked from the main thread like the
+processes of parallel_run, and keeps the order of the results. The check items of one run share the data fetched from
+the DUTs through SharedCheckData, and the time spent by every check item and by every DUT is collected into a timing
+report.
+"""
+import logging
+import time
+from functools import wraps
+from multiprocessing import Manager
+from multiprocessing.connection import wait
+
+from tests.common.helpers.assertions import pytest_assert as pt_assert
+from tests.common.helpers.parallel import SonicProcess, fix_logging_handler_fork_lock, reset_ansible_local_tmp
+from tests.common.plugins.sanity_check.constants import SERIAL_CHECK_ITEMS
+
+logger = logging.getLogger(__name__)
+
+# Data fetched by a check item is reused by other check items for this many seconds. It is short enough that the
+# retry loops of the check items, which wait at least 10 seconds between retries, always fetch new data.
+SHARED_DATA_TTL = 5
+
+
+class SharedCheckData(object):
+    """
+    Data fetched from the DUTs, shared by the check items of one sanity check run.
+
+    The check items run their per-DUT checks in processes spawned by parallel_run, so the data is kept in a
+    multiprocessing.Manager dict. Two check items which miss the same entry at the same time both fetch it.
+    """
+
+    def __init__(self, store, ttl=SHARED_DATA_TTL):
+        self._store = store
+        self.ttl = ttl
+
+    def get(self, dut, name, fetch):
+        """
+        Get data of a DUT, fetch it if it was not fetched in the last ttl seconds.
+
+        Args:
+            dut: The SonicHost or SonicAsic the data belongs to.
+            name (str): Name of the data, e.g. 'networking_uptime'.
+            fetch (function): Function without arguments which fetches the data.
+        """
+        key = '{}|{}|{}'.format(dut.hostname, getattr(dut, 'namespace', None), name)
+        entry = self._store.get(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            logger.debug("Reuse {} of {}".format(name, dut.hostname))
+            return entry[1]
+        value = fetch()
+        self._store[key] = (time.time(), value)
+        return value
+
+
+def fetch_shared(kwargs, dut, name, fetch):
+    """Fetch data of a DUT through the SharedCheckData in the check kwargs, or directly if there is none."""
+    shared_data = kwargs.get('shared_data')
+    if shared_data is None:
+        return fetch()
+    return shared_data.get(dut, name, fetch)
+
+
+def record_dut_timing(check_item):
+    """Decorator of a per-DUT check function recording its duration into the 'check_timings' of its kwargs.
+
+    Args:
+        check_item (str): Name of the check item in the timing report.
+    """
+    def decorator(target):
+        @wraps(target)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                check_timings = kwargs.get('check_timings')
+                if check_timings is not None:
+                    check_timings['{}|{}'.format(check_item, kwargs['node'].hostname)] = \
+                        round(time.time() - start, 3)
+        return wrapper
+    return decorator
+
+
+def _timed_check(check_fixture, args, kwargs):
+    start = time.time()
+    results = check_fixture(*args, **kwargs)
+    return results, round(time.time() - start, 3)
+
+
+@reset_ansible_local_tmp
+def _run_check_item(item, check_fixture, args, kwargs, item_results):
+    item_results[item] = _timed_check(check_fixture, args, kwargs)
+
+
+def _run_concurrent_items(check_fixtures, workers, args, kwargs, item_results):
+    """
+    Run check items in processes, at most workers of them at the same time.
+
+    The processes are forked from the main thread with the logging handler locks held, the same way parallel_run()
+    forks its processes, so the check items can fork their per-DUT processes in turn.
+    """
+    fix_logging_handler_fork_lock()
+    pending = list(check_fixtures)
+    running = []
+    failed = {}
+    while pending or running:
+        while pending and len(running) < workers:
+            item, check = pending.pop(0)
+            worker = SonicProcess(name='sanity_check--{}'.format(item), target=_run_check_item,
+                                  args=(item, check, args, kwargs, item_results))
+            worker.start()
+            running.append(worker)
+        wait([worker.sentinel for worker in running])
+        for worker in [worker for worker in running if not worker.is_alive()]:
+            running.remove(worker)
+            # Read the exception before join, the process may block on sending it
+            exception = worker.exception
+            worker.join()
+            if exception is not None or worker.exitcode != 0:
+                failed[worker.name] = (worker.exitcode, exception)
+
+    for name, (exitcode, exception) in failed.items():
+        exception, tb = exception if exception else ('', '')
+        pt_assert(False, 'Process "{}" failed with exit code "{}"\nException:\n{}\nTraceback:\n{}'.format(
+            name, exitcode, exception, tb))
+
+
+def _run_serial_items(check_fixtures, args, kwargs, item_results):
+    for item, check in check_fixtures:
+        if item not in item_results:
+            item_results[item] = _timed_check(check, args, kwargs)
+
+
+def run_check_items(check_fixtures, workers, *args, **kwargs):
+    """
+    Run check items, independent check items are run concurrently in processes.
+
+    Args:
+        check_fixtures (list): List of (check item name, check function returned by the check fixture).
+        workers (int): Max number of check items running at the same time, 1 to run them one after another.
+        args, kwargs: Arguments of the check functions.
+
+    Returns:
+        tuple: The check results in the order of check_fixtures and the timing report.
+    """
+    start = time.time()
+    concurrent_items = [(item, check) for item, check in check_fixtures if item not in SERIAL_CHECK_ITEMS]
+    if workers > 1 and len(concurrent_items) > 1:
+        with Manager() as manager:
+            check_timings = manager.dict()
+            item_results = manager.dict()
+            kwargs = dict(kwargs, shared_data=SharedCheckData(manager.dict()), check_timings=check_timings)
+            _run_concurrent_items(concurrent_items, workers, args, kwargs, item_results)
+            _run_serial_items(check_fixtures, args, kwargs, item_results)
+            item_results = dict(item_results)
+            check_timings = dict(check_timings)
+    else:
+        # Without a Manager, data fetched and timings recorded by the per-DUT processes of parallel_run are lost,
+        # so they are neither shared nor reported
+        workers = 1
+        item_results = {}
+        check_timings = {}
+        _run_serial_items(check_fixtures, args, kwargs, item_results)
+
+    dut_timings = {}
+    for key, seconds in check_timings.items():
+        item, hostname = key.split('|', 1)
+        dut_timings.setdefault(item, {})[hostname] = seconds
+
+    check_results = []
+    for item, _ in check_fixtures:
+        results = item_results[item][0]
+        logger.debug("check results of each item {}".format(results))
+        if results and isinstance(results, list):
+            check_results.extend(results)
+        elif results:
+            check_results.append(results)
+
+    timing_report = {
+        "total": round(time.time() - start, 3),
+        "workers": workers,
+        "checks": dict((item, item_results[item][1]) for item, _ in check_fixtures),
+        "duts": dut_timings
+    }
+    return check_results, timing_report
+
+
+def format_timing_report(timing_report):
+    lines = ["Sanity check took {}s with {} workers".format(timing_report["total"], timing_report["workers"])]
+    for item, seconds in sorted(timing_report["checks"].items(), key=lambda x: -x[1]):
+        lines.append("  {:<32} {:>8.3f}s".format(item, seconds))
+    for item, duts in sorted(timing_report["duts"].items()):
+        for hostname, seconds in sorted(duts.items(), key=lambda x: -x[1]):
+            lines.append("  {:<32} {:<24} {:>8.3f}s".format(item, hostname, seconds))
+    return "\n".join(lines)
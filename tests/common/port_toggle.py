@@ -4,6 +4,7 @@ import logging
 import pprint
 
 from tests.common.helpers.assertions import pytest_assert
+from tests.common.helpers.db_watcher import keys_fields_match, wait_until_db
 from tests.common.utilities import wait_until
 
 logger = logging.getLogger(__name__)
@@ -46,11 +47,13 @@ def port_toggle(duthost, tbinfo, ports=None, wait_time_getter=None, wait_after_p
 
     cmds_down = []
     cmds_up = []
+    ports_by_namespace = {}
     for port in ports:
         namespace = '-n {}'.format(mg_facts["minigraph_neighbors"][port]['namespace']) \
             if mg_facts["minigraph_neighbors"][port]['namespace'] else ''
         cmds_down.append("config interface {} shutdown {}".format(namespace, port))
         cmds_up.append("config interface {} startup {}".format(namespace, port))
+        ports_by_namespace.setdefault(mg_facts["minigraph_neighbors"][port]['namespace'], []).append(port)
 
     shutdown_ok = False
     shutdown_err_msg = ""
@@ -77,7 +80,17 @@ def port_toggle(duthost, tbinfo, ports=None, wait_time_getter=None, wait_after_p
         duthost.shell_cmds(cmds=cmds_up)
 
         logger.info("Wait for ports to come up")
-        startup_ok = wait_until(port_up_wait_time, 5, 0, lambda: len(__get_down_ports()) == 0)
+        start = time.time()
+        # Wait for the oper status in APPL_DB on its changes, then check the ports once more with the CLI
+        startup_ok = all(
+            wait_until_db(duthost, max(port_up_wait_time - (time.time() - start), 1), 5, 0,
+                          [("APPL_DB", "PORT_TABLE:*")],
+                          keys_fields_match("APPL_DB", ["PORT_TABLE:" + port for port in namespace_ports],
+                                            oper_status="up"),
+                          namespace=namespace)
+            for namespace, namespace_ports in ports_by_namespace.items())
+        startup_ok = startup_ok and wait_until(max(port_up_wait_time - (time.time() - start), 1), 5, 0,
+                                               lambda: len(__get_down_ports()) == 0)
 
         if not startup_ok:
             down_ports = __get_down_ports()
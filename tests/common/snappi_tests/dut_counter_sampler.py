@@ -0,0 +1,346 @@
+"""
+Time-aligned DUT counter sampling for snappi traffic runs.
+
+Reading the DUT counters through the CLI (portstat, show pfc counters, show queue counters, ...) takes one or
+several shell calls per port and per queue, so one poll round of a multi-port test can take longer than the poll
+interval. DutCounterSampler instead runs a small sampler on the DUT, which reads the counters of all the requested
+ports, queues and PGs from COUNTERS_DB with one redis pipeline per namespace, at a fixed cadence. Each sample is
+written as one timestamped row; the rows are streamed back with fetch() into a CounterTable, whose timestamps are
+converted to the clock of the test host so that the samples can be aligned with the TGEN flow metrics.
+
+Usage:
+    sampler = DutCounterSampler(duthost, ['Ethernet0', 'Ethernet8'], interval=1, queues=[3, 4])
+    sampler.start()
+    ...
+    table = sampler.fetch()
+    index = table.nearest(time.time())
+    stats = flat_port_stats(table, duthost.hostname, 'Ethernet0', index)
+    ...
+    table = sampler.stop()
+"""
+import bisect
+import json
+import logging
+import time
+
+from tests.common.helpers.dut_background_script import DutBackgroundScript
+
+logger = logging.getLogger(__name__)
+
+# Port counters sampled by default, enough for flat_port_stats()
+DEFAULT_PORT_COUNTERS = (
+    ['SAI_PORT_STAT_IF_IN_UCAST_PKTS', 'SAI_PORT_STAT_IF_IN_NON_UCAST_PKTS',
+     'SAI_PORT_STAT_IF_IN_ERRORS', 'SAI_PORT_STAT_IF_IN_DISCARDS', 'SAI_PORT_STAT_ETHER_RX_OVERSIZE_PKTS',
+     'SAI_PORT_STAT_IF_IN_OCTETS',
+     'SAI_PORT_STAT_IF_OUT_UCAST_PKTS', 'SAI_PORT_STAT_IF_OUT_NON_UCAST_PKTS',
+     'SAI_PORT_STAT_IF_OUT_ERRORS', 'SAI_PORT_STAT_IF_OUT_DISCARDS', 'SAI_PORT_STAT_ETHER_TX_OVERSIZE_PKTS',
+     'SAI_PORT_STAT_IF_OUT_OCTETS'] +
+    ['SAI_PORT_STAT_PFC_{}_RX_PKTS'.format(prio) for prio in range(8)] +
+    ['SAI_PORT_STAT_PFC_{}_TX_PKTS'.format(prio) for prio in range(8)]
+)
+DEFAULT_QUEUE_COUNTERS = ['SAI_QUEUE_STAT_PACKETS', 'SAI_QUEUE_STAT_BYTES']
+DEFAULT_PG_COUNTERS = ['SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS', 'SAI_INGRESS_PRIORITY_GROUP_STAT_DROPPED_PACKETS']
+
+
+# Runs on the DUT with the python3 of the host OS. The first output line is the list of columns, then one row
+# [timestamp, value, ...] per sample. SIGTERM takes a last sample and stops the sampler.
+SAMPLER_SCRIPT = r'''
+import json
+import signal
+import sys
+import time
+
+import redis
+from swsscommon.swsscommon import SonicDBConfig
+
+NAME_MAPS = (("ports", "COUNTERS_PORT_NAME_MAP", "port_counters"),
+             ("queues", "COUNTERS_QUEUE_NAME_MAP", "queue_counters"),
+             ("pgs", "COUNTERS_PG_NAME_MAP", "pg_counters"))
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        config = json.load(f)
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    if any(config["namespaces"]) and not SonicDBConfig.isGlobalInit():
+        SonicDBConfig.initializeGlobalConfig()
+    columns = []
+    sources = []
+    for namespace, objects in sorted(config["namespaces"].items()):
+        db = redis.Redis(unix_socket_path=SonicDBConfig.getDbSock("COUNTERS_DB", namespace),
+                         db=SonicDBConfig.getDbId("COUNTERS_DB", namespace), decode_responses=True)
+        keys = []
+        for kind, name_map, counters_kind in NAME_MAPS:
+            names = objects.get(kind) or []
+            counters = config[counters_kind]
+            if not names or not counters:
+                continue
+            for name, oid in zip(names, db.hmget(name_map, names)):
+                keys.append(("COUNTERS:" + oid if oid else None, counters))
+                columns.extend("{}|{}".format(name, counter) for counter in counters)
+        sources.append((db, keys))
+    sys.stdout.write(json.dumps({"columns": columns, "time": time.time()}) + "\n")
+    sys.stdout.flush()
+
+    interval = config["interval"]
+    deadline = time.time() + config["max_duration"]
+    next_time = time.time()
+    while True:
+        row = [round(time.time(), 3)]
+        for db, keys in sources:
+            pipe = db.pipeline(transaction=False)
+            for key, counters in keys:
+                if key:
+                    pipe.hmget(key, counters)
+            results = iter(pipe.execute())
+            for key, counters in keys:
+                values = next(results) if key else [None] * len(counters)
+                row.extend(to_int(value) for value in values)
+        sys.stdout.write(json.dumps(row) + "\n")
+        sys.stdout.flush()
+        if stopping or time.time() > deadline:
+            return
+        next_time += interval
+        if next_time < time.time():
+            # Late, restart the cadence from now instead of sampling in a burst
+            next_time = time.time()
+        while not stopping and time.time() < next_time:
+            time.sleep(min(0.1, max(0.0, next_time - time.time())))
+
+
+main()
+'''
+
+
+class CounterTable(object):
+    """
+    Counter samples of a DUT: one row of counter values per sample time.
+
+    The columns are named '<object>|<counter>', e.g. 'Ethernet0|SAI_PORT_STAT_IF_IN_OCTETS' for a port counter and
+    'Ethernet0:3|SAI_QUEUE_STAT_PACKETS' for the counter of queue 3 of the port. The times are in seconds since the
+    epoch, on the clock of the test host. A counter which is not in COUNTERS_DB has the value None.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.index = dict((column, i) for i, column in enumerate(self.columns))
+        self.times = []
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, timestamp, values):
+        self.times.append(timestamp)
+        self.rows.append(values)
+
+    def nearest(self, timestamp):
+        """Return the index of the sample closest to timestamp, None if there is no sample."""
+        if not self.rows:
+            return None
+        i = bisect.bisect_left(self.times, timestamp)
+        if i == len(self.times):
+            return i - 1
+        if i > 0 and timestamp - self.times[i - 1] <= self.times[i] - timestamp:
+            return i - 1
+        return i
+
+    def value(self, index, column, default=0):
+        """Return the value of a column in the sample at index, default if the counter is not available."""
+        value = self.rows[index][self.index[column]] if column in self.index else None
+        return default if value is None else value
+
+    def delta(self, index, column, base_index=0):
+        """Return the increase of a column from the sample at base_index to the sample at index."""
+        return self.value(index, column) - self.value(base_index, column)
+
+    def column(self, column):
+        i = self.index[column]
+        return [row[i] for row in self.rows]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.rows, columns=self.columns, index=pd.Index(self.times, name='time'))
+
+
+class DutCounterSampler(object):
+    """Sample the COUNTERS_DB counters of ports, queues and PGs of a DUT at a fixed cadence."""
+
+    def __init__(self, duthost, ports, interval, queues=(), pgs=(), port_counters=DEFAULT_PORT_COUNTERS,
+                 queue_counters=DEFAULT_QUEUE_COUNTERS, pg_counters=DEFAULT_PG_COUNTERS, max_duration=3600):
+        """
+        Args:
+            duthost: DUT host object.
+            ports (list): Names of the ports to sample.
+            interval (float): Seconds between two samples.
+            queues (list): Indexes of the queues of each port to sample.
+            pgs (list): Indexes of the PGs of each port to sample.
+            port_counters (list): SAI port counters to sample.
+            queue_counters (list): SAI queue counters to sample.
+            pg_counters (list): SAI PG counters to sample.
+            max_duration (int): Seconds after which the sampler stops if stop() was not called.
+        """
+        self.duthost = duthost
+        self.ports = list(ports)
+        self.interval = interval
+        self.queues = list(queues)
+        self.pgs = list(pgs)
+        self.port_counters = list(port_counters)
+        self.queue_counters = list(queue_counters)
+        self.pg_counters = list(pg_counters)
+        self.max_duration = max_duration
+        self.clock_offset = 0.0
+        self.table = None
+        self.script = DutBackgroundScript(duthost, 'snappi_counter_sampler', SAMPLER_SCRIPT)
+
+    def _namespace(self, port):
+        if not self.duthost.is_multi_asic:
+            return ''
+        return self.duthost.get_port_asic_instance(port).namespace
+
+    def start(self):
+        """
+        Start the sampler on the DUT and wait for its first sample.
+
+        Raises:
+            RuntimeError: The sampler failed to start, e.g. python3 or its modules are not available on the DUT.
+        """
+        namespaces = {}
+        for port in self.ports:
+            objects = namespaces.setdefault(self._namespace(port), {'ports': [], 'queues': [], 'pgs': []})
+            objects['ports'].append(port)
+            objects['queues'].extend('{}:{}'.format(port, queue) for queue in self.queues)
+            objects['pgs'].extend('{}:{}'.format(port, pg) for pg in self.pgs)
+        config = {
+            'namespaces': namespaces,
+            'interval': self.interval,
+            'max_duration': self.max_duration,
+            'port_counters': self.port_counters,
+            'queue_counters': self.queue_counters,
+            'pg_counters': self.pg_counters,
+        }
+        # The DUT clock is used for the sample times, measure its offset to the clock of the test host
+        before = time.time()
+        dut_time = float(self.duthost.shell('date +%s.%N')['stdout'])
+        after = time.time()
+        self.clock_offset = dut_time - (before + after) / 2
+
+        self.table = None
+        self.script.start(config)
+        try:
+            # Wait for the first sample, it is the base of the counters
+            deadline = time.time() + 10
+            while not len(self.fetch(wait=deadline - time.time())):
+                if self.script.exited or time.time() > deadline:
+                    raise RuntimeError('Counter sampler on {} did not start'.format(self.duthost.hostname))
+        except RuntimeError:
+            self.stop()
+            raise
+        logger.info('Started counter sampler on {} (pid {}) for {} ports every {}s, clock offset {:.3f}s'.format(
+            self.duthost.hostname, self.script.pid, len(self.ports), self.interval, self.clock_offset))
+
+    def fetch(self, wait=0):
+        """
+        Read the samples taken since the last call.
+
+        Args:
+            wait (float): Seconds to wait for a sample if there is none yet.
+
+        Returns:
+            CounterTable of all the samples taken since start().
+
+        Raises:
+            RuntimeError: The sampler failed.
+        """
+        lines = self.script.read(wait)
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise RuntimeError('Counter sampler on {} failed: {}'.format(self.duthost.hostname, '\n'.join(lines)))
+            if isinstance(record, dict):
+                self.table = CounterTable(record['columns'])
+            elif self.table is None:
+                raise RuntimeError('Counter sampler on {} failed: {}'.format(self.duthost.hostname, line))
+            else:
+                self.table.append(record[0] - self.clock_offset, record[1:])
+        if self.table is None:
+            # Not started yet
+            return CounterTable([])
+        return self.table
+
+    def stop(self):
+        """
+        Take a last sample, stop the sampler and remove its files from the DUT.
+
+        Returns:
+            CounterTable of all the samples.
+        """
+        self.script.stop()
+        try:
+            return self.fetch()
+        finally:
+            self.script.remove()
+
+
+def flat_port_stats(table, hostname, port, index, base_index=0, queues=range(7)):
+    """
+    Get the counters of a port in a sample, in the format of the flattened get_interface_stats(), get_pfc_count()
+    and get_queue_count_all_prio() output.
+
+    The counters are relative to the sample at base_index, like the CLI counters are relative to the last
+    sonic-clear. The throughput is measured from the sample before index.
+
+    Returns:
+        dict: Counter values with keys '<hostname>_<port>_<counter>', lowercase like the keys of flatten_dict().
+    """
+    prefix = '{}_{}_'.format(hostname, port).lower()
+    stats = {}
+
+    def delta(counter):
+        return table.delta(index, '{}|{}'.format(port, counter), base_index)
+
+    stats['rx_ok'] = delta('SAI_PORT_STAT_IF_IN_UCAST_PKTS') + delta('SAI_PORT_STAT_IF_IN_NON_UCAST_PKTS')
+    stats['rx_err'] = delta('SAI_PORT_STAT_IF_IN_ERRORS')
+    stats['rx_drp'] = delta('SAI_PORT_STAT_IF_IN_DISCARDS')
+    stats['rx_ovr'] = delta('SAI_PORT_STAT_ETHER_RX_OVERSIZE_PKTS')
+    stats['tx_ok'] = delta('SAI_PORT_STAT_IF_OUT_UCAST_PKTS') + delta('SAI_PORT_STAT_IF_OUT_NON_UCAST_PKTS')
+    stats['tx_err'] = delta('SAI_PORT_STAT_IF_OUT_ERRORS')
+    stats['tx_drp'] = delta('SAI_PORT_STAT_IF_OUT_DISCARDS')
+    stats['tx_ovr'] = delta('SAI_PORT_STAT_ETHER_TX_OVERSIZE_PKTS')
+    stats['rx_pkts'] = stats['rx_ok']
+    stats['tx_pkts'] = stats['tx_ok']
+    stats['rx_fail'] = stats['rx_err'] + stats['rx_ovr'] + stats['rx_drp']
+    stats['tx_fail'] = stats['tx_err'] + stats['tx_ovr'] + stats['tx_drp']
+
+    for direction, counter in (('rx', 'SAI_PORT_STAT_IF_IN_OCTETS'), ('tx', 'SAI_PORT_STAT_IF_OUT_OCTETS')):
+        thrput = 0
+        if index > 0:
+            elapsed = table.times[index] - table.times[index - 1]
+            octets = table.delta(index, '{}|{}'.format(port, counter), index - 1)
+            # Same as get_interface_stats(), any throughput below 1MBps is measured as 0
+            if elapsed > 0 and octets / elapsed >= 1000000:
+                thrput = round(octets * 8 / elapsed / 1000000, 2)
+        stats['{}_thrput_mbps'.format(direction)] = thrput
+
+    for prio in range(8):
+        stats['tx_pfc_{}'.format(prio)] = delta('SAI_PORT_STAT_PFC_{}_TX_PKTS'.format(prio))
+        stats['rx_pfc_{}'.format(prio)] = delta('SAI_PORT_STAT_PFC_{}_RX_PKTS'.format(prio))
+    for queue in queues:
+        stats['prio_{}'.format(queue)] = queue_count(table, port, queue, index, base_index)
+
+    return dict((prefix + key, value) for key, value in stats.items())
+
+
+def queue_count(table, port, queue, index, base_index=0):
+    """Get the number of packets of a queue of a port in a sample, relative to the sample at base_index."""
+    return table.delta(index, '{}:{}|SAI_QUEUE_STAT_PACKETS'.format(port, queue), base_index)
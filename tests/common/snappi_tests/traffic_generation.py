@@ -28,6 +28,7 @@ from tests.common.reboot import reboot
 from tests.common.macsec.macsec_helper import get_macsec_counters, clear_macsec_counters, \
     get_dict_macsec_counters  # noqa: F401
 from tests.common.snappi_tests.snappi_test_params import SnappiTestParams
+from tests.common.snappi_tests.dut_counter_sampler import DutCounterSampler, flat_port_stats, queue_count
 from tests.common.snappi_tests.port import SnappiPortConfig
 
 # Imported to support rest_py in ixnetwork
@@ -1660,151 +1661,175 @@ def run_traffic_and_collect_stats(rx_duthost,
     for dut, port in dutport_list:
         clear_counters(dut, port)
 
-    if pcap_type != packet_capture.NO_CAPTURE:
-        logger.info("Starting packet capture ...")
-        cs = api.control_state()
-        cs.port.capture.port_names = snappi_extra_params.packet_capture_ports
-        cs.port.capture.state = cs.port.capture.START
-        api.set_control_state(cs)
-
-    # Returns the rest API object for features not present in Snappi
-    ixnet_rest_api = api._ixnetwork
-
-    # If imix flag is set, IMIX packet-profile is enabled.
-    if (imix):
-        logger.info('Test packet-profile setting to IMIX')
-        for traff_item in ixnet_rest_api.Traffic.TrafficItem.find():
-            config_ele = traff_item.ConfigElement.find()[0].FrameSize
-            config_ele.PresetDistribution = "imix"
-            config_ele.Type = "weightedPairs"
-            config_ele.WeightedPairs = ["128", "7", "570", "4", "1518", "1"]
-
-        ixnet_rest_api.Traffic.TrafficItem.find().Generate()
-        ixnet_rest_api.Traffic.Apply()
-
-    logger.info("Starting transmit on all flows ...")
-    cs = api.control_state()
-    cs.traffic.flow_transmit.state = cs.traffic.flow_transmit.START
-    api.set_control_state(cs)
-
-    stormed = False
-    if tx_duthost.facts["platform_asic"] == 'cisco-8000' and enable_pfcwd_drop:
-        retry = 3
-        while retry > 0 and not stormed:
-            for dut, port in dutport_list:
-                for pri in switch_tx_lossless_prios:
-                    stormed = clear_pfc_counter_after_storm(dut, port, pri)
-                    if stormed:
-                        clear_dut_pfc_counters(rx_duthost)
-                        clear_dut_pfc_counters(tx_duthost)
-                        logger.info("PFC storm detected on {}:{}".format(dut.hostname, port))
-                        break  # break inner for
-                if stormed:
-                    break  # break outer for
-            retry = retry - 1
-            if retry and not stormed:
-                time.sleep(2)
-        pytest_assert(stormed, "PFC storm not detected")
-
-    time.sleep(5)
-    iter_count = round((int(exp_dur_sec) - stats_interval)/stats_interval)
-
-    f_stats = {}
-    logger.info('Polling DUT and tool for traffic statistics for {} iterations and {} seconds'.
-                format(iter_count, exp_dur_sec))
-    switch_device_results = {}
-    switch_device_results["tx_frames"] = {}
-    switch_device_results["rx_frames"] = {}
-    for lossless_prio in switch_tx_lossless_prios:
-        switch_device_results["tx_frames"][lossless_prio] = []
-        switch_device_results["rx_frames"][lossless_prio] = []
-
-    exp_dur_sec = exp_dur_sec + ANSIBLE_POLL_DELAY_SEC
+    # Sample the DUT counters from COUNTERS_DB on the DUTs, instead of polling the CLI for every port and queue
+    samplers = start_dut_counter_samplers(dutport_list, stats_interval, set(range(7)) | set(switch_tx_lossless_prios))
 
-    for m in range(int(iter_count)):
-        now = datetime.now()
-        logger.info('----------- Collecting Stats for Iteration : {} ------------'.format(m+1))
-        f_stats[m] = {'Date': datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}
-        flow_metrics = fetch_snappi_flow_metrics(api, data_flow_names)
-        traf_metrics = StatViewAssistant(ixnet_rest_api, 'Traffic Item Statistics').Rows
-        tx_frame = sum([metric.frames_tx for metric in flow_metrics if metric.name in data_flow_names])
-        f_stats[m]['tgen_tx_frames'] = tx_frame
-        rx_frame = sum([metric.frames_rx for metric in flow_metrics if metric.name in data_flow_names])
-        f_stats[m]['tgen_rx_frames'] = rx_frame
-        f_stats = update_dict(m, f_stats, tgen_curr_stats(traf_metrics, flow_metrics, data_flow_names))
+    def dut_stats(index_by_dut):
+        stats = {}
         for dut, port in dutport_list:
-            f_stats = update_dict(m, f_stats, flatten_dict(get_interface_stats(dut, port)))
-            f_stats = update_dict(m, f_stats, flatten_dict(get_interface_counters_detailed(dut, port)))
-            f_stats = update_dict(m, f_stats, flatten_dict(get_pfc_count(dut, port)))
-            f_stats = update_dict(m, f_stats, flatten_dict(get_queue_count_all_prio(dut, port)))
+            if samplers:
+                sampler = samplers[dut.hostname]
+                stats.update(flat_port_stats(sampler.table, dut.hostname, port, index_by_dut[dut.hostname]))
+            else:
+                stats.update(flatten_dict(get_interface_stats(dut, port)))
+                stats.update(flatten_dict(get_interface_counters_detailed(dut, port)))
+                stats.update(flatten_dict(get_pfc_count(dut, port)))
+                stats.update(flatten_dict(get_queue_count_all_prio(dut, port)))
+        return stats
+
+    def egress_queue_count(dut, port, prio, index_by_dut):
+        if samplers:
+            return queue_count(samplers[dut.hostname].table, port, prio, index_by_dut[dut.hostname])
+        return get_egress_queue_count(dut, port, prio)[0]
+
+    try:
+        if pcap_type != packet_capture.NO_CAPTURE:
+            logger.info("Starting packet capture ...")
+            cs = api.control_state()
+            cs.port.capture.port_names = snappi_extra_params.packet_capture_ports
+            cs.port.capture.state = cs.port.capture.START
+            api.set_control_state(cs)
+
+        # Returns the rest API object for features not present in Snappi
+        ixnet_rest_api = api._ixnetwork
+
+        # If imix flag is set, IMIX packet-profile is enabled.
+        if (imix):
+            logger.info('Test packet-profile setting to IMIX')
+            for traff_item in ixnet_rest_api.Traffic.TrafficItem.find():
+                config_ele = traff_item.ConfigElement.find()[0].FrameSize
+                config_ele.PresetDistribution = "imix"
+                config_ele.Type = "weightedPairs"
+                config_ele.WeightedPairs = ["128", "7", "570", "4", "1518", "1"]
+
+            ixnet_rest_api.Traffic.TrafficItem.find().Generate()
+            ixnet_rest_api.Traffic.Apply()
 
-        logger.info("Polling DUT for Egress Queue statistics")
+        logger.info("Starting transmit on all flows ...")
+        cs = api.control_state()
+        cs.traffic.flow_transmit.state = cs.traffic.flow_transmit.START
+        api.set_control_state(cs)
 
+        stormed = False
+        if tx_duthost.facts["platform_asic"] == 'cisco-8000' and enable_pfcwd_drop:
+            retry = 3
+            while retry > 0 and not stormed:
+                for dut, port in dutport_list:
+                    for pri in switch_tx_lossless_prios:
+                        stormed = clear_pfc_counter_after_storm(dut, port, pri)
+                        if stormed:
+                            clear_dut_pfc_counters(rx_duthost)
+                            clear_dut_pfc_counters(tx_duthost)
+                            logger.info("PFC storm detected on {}:{}".format(dut.hostname, port))
+                            break  # break inner for
+                    if stormed:
+                        break  # break outer for
+                retry = retry - 1
+                if retry and not stormed:
+                    time.sleep(2)
+            pytest_assert(stormed, "PFC storm not detected")
+
+        time.sleep(5)
+        iter_count = round((int(exp_dur_sec) - stats_interval)/stats_interval)
+
+        f_stats = {}
+        logger.info('Polling DUT and tool for traffic statistics for {} iterations and {} seconds'.
+                    format(iter_count, exp_dur_sec))
+        switch_device_results = {}
+        switch_device_results["tx_frames"] = {}
+        switch_device_results["rx_frames"] = {}
         for lossless_prio in switch_tx_lossless_prios:
-            count_frames = 0
-            for n in range(port_map[0]):
-                dut, port = dutport_list[n]
-                count_frames = count_frames + (get_egress_queue_count(dut, port, lossless_prio)[0])
-                logger.info(
-                    'Egress Queue Count for DUT:{}, Port:{}, Priority:{} - {}'.format(
-                        dut.hostname, port, lossless_prio, count_frames
-                        )
-                    )
-            switch_device_results["tx_frames"][lossless_prio].append(count_frames)
-            count_frames = 0
-            for n in range(port_map[2]):
-                dut, port = dutport_list[-(n+1)]
-                count_frames = count_frames + (get_egress_queue_count(dut, port, lossless_prio)[0])
-            switch_device_results["rx_frames"][lossless_prio].append(count_frames)
-        later = datetime.now()
-        time.sleep(abs(round(stats_interval - ((later - now).total_seconds()))))
-        logger.info('------------------------------------------------------------')
-
-    attempts = 0
-    max_attempts = 10
+            switch_device_results["tx_frames"][lossless_prio] = []
+            switch_device_results["rx_frames"][lossless_prio] = []
 
-    while attempts < max_attempts:
-        logger.info("Checking if all flows have stopped. Attempt #{}".format(attempts + 1))
-        flow_metrics = fetch_snappi_flow_metrics(api, data_flow_names)
+        exp_dur_sec = exp_dur_sec + ANSIBLE_POLL_DELAY_SEC
 
-        # If all the data flows have stopped
-        transmit_states = [metric.transmit for metric in flow_metrics]
-        if len(flow_metrics) == len(data_flow_names) and\
-           list(set(transmit_states)) == ['stopped']:
-            logger.info("All test and background traffic flows stopped")
-            time.sleep(SNAPPI_POLL_DELAY_SEC)
-            break
-        else:
-            if (attempts == 4):
-                logger.info("Stopping transmit on all remaining flows")
-                cs = api.control_state()
-                cs.traffic.flow_transmit.state = cs.traffic.flow_transmit.STOP
-                api.set_control_state(cs)
-            time.sleep(stats_interval/4)
-            attempts += 1
+        for m in range(int(iter_count)):
+            now = datetime.now()
+            logger.info('----------- Collecting Stats for Iteration : {} ------------'.format(m+1))
+            f_stats[m] = {'Date': datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}
+            flow_metrics = fetch_snappi_flow_metrics(api, data_flow_names)
+            traf_metrics = StatViewAssistant(ixnet_rest_api, 'Traffic Item Statistics').Rows
+            tx_frame = sum([metric.frames_tx for metric in flow_metrics if metric.name in data_flow_names])
+            f_stats[m]['tgen_tx_frames'] = tx_frame
+            rx_frame = sum([metric.frames_rx for metric in flow_metrics if metric.name in data_flow_names])
+            f_stats[m]['tgen_rx_frames'] = rx_frame
+            f_stats = update_dict(m, f_stats, tgen_curr_stats(traf_metrics, flow_metrics, data_flow_names))
+            # The DUT samples closest to the time the TGEN metrics were read
+            index_by_dut = fetch_dut_counter_samples(samplers, time.time())
+            f_stats = update_dict(m, f_stats, dut_stats(index_by_dut))
+
+            logger.info("Polling DUT for Egress Queue statistics")
 
-    pytest_assert(attempts < max_attempts,
-                  "Flows do not stop in {} seconds".format(max_attempts*stats_interval))
+            for lossless_prio in switch_tx_lossless_prios:
+                count_frames = 0
+                for n in range(port_map[0]):
+                    dut, port = dutport_list[n]
+                    count_frames = count_frames + egress_queue_count(dut, port, lossless_prio, index_by_dut)
+                    logger.info(
+                        'Egress Queue Count for DUT:{}, Port:{}, Priority:{} - {}'.format(
+                            dut.hostname, port, lossless_prio, count_frames
+                            )
+                        )
+                switch_device_results["tx_frames"][lossless_prio].append(count_frames)
+                count_frames = 0
+                for n in range(port_map[2]):
+                    dut, port = dutport_list[-(n+1)]
+                    count_frames = count_frames + egress_queue_count(dut, port, lossless_prio, index_by_dut)
+                switch_device_results["rx_frames"][lossless_prio].append(count_frames)
+            later = datetime.now()
+            time.sleep(abs(round(stats_interval - ((later - now).total_seconds()))))
+            logger.info('------------------------------------------------------------')
+
+        attempts = 0
+        max_attempts = 10
+
+        while attempts < max_attempts:
+            logger.info("Checking if all flows have stopped. Attempt #{}".format(attempts + 1))
+            flow_metrics = fetch_snappi_flow_metrics(api, data_flow_names)
 
-    if pcap_type != packet_capture.NO_CAPTURE:
-        logger.info("Stopping packet capture ...")
-        request = api.capture_request()
-        request.port_name = snappi_extra_params.packet_capture_ports[0]
-        cs = api.control_state()
-        cs.port.capture.state = cs.port.capture.STOP
-        api.set_control_state(cs)
-        logger.info("Retrieving and saving packet capture to {}.pcapng".format(snappi_extra_params.packet_capture_file))
-        pcap_bytes = api.get_capture(request)
-        with open(snappi_extra_params.packet_capture_file + ".pcapng", 'wb') as fid:
-            fid.write(pcap_bytes.getvalue())
+            # If all the data flows have stopped
+            transmit_states = [metric.transmit for metric in flow_metrics]
+            if len(flow_metrics) == len(data_flow_names) and\
+               list(set(transmit_states)) == ['stopped']:
+                logger.info("All test and background traffic flows stopped")
+                time.sleep(SNAPPI_POLL_DELAY_SEC)
+                break
+            else:
+                if (attempts == 4):
+                    logger.info("Stopping transmit on all remaining flows")
+                    cs = api.control_state()
+                    cs.traffic.flow_transmit.state = cs.traffic.flow_transmit.STOP
+                    api.set_control_state(cs)
+                time.sleep(stats_interval/4)
+                attempts += 1
 
-    time.sleep(5)
+        pytest_assert(attempts < max_attempts,
+                      "Flows do not stop in {} seconds".format(max_attempts*stats_interval))
+
+        if pcap_type != packet_capture.NO_CAPTURE:
+            logger.info("Stopping packet capture ...")
+            request = api.capture_request()
+            request.port_name = snappi_extra_params.packet_capture_ports[0]
+            cs = api.control_state()
+            cs.port.capture.state = cs.port.capture.STOP
+            api.set_control_state(cs)
+            logger.info("Retrieving and saving packet capture to {}.pcapng".format(
+                snappi_extra_params.packet_capture_file))
+            pcap_bytes = api.get_capture(request)
+            with open(snappi_extra_params.packet_capture_file + ".pcapng", 'wb') as fid:
+                fid.write(pcap_bytes.getvalue())
+
+        time.sleep(5)
+    finally:
+        # Stopping the samplers takes a last sample, used for the final counts
+        index_by_dut = stop_dut_counter_samplers(samplers)
     # Counting egress queue frames at the end of the test.
     for lossless_prio in switch_tx_lossless_prios:
         count_frames = 0
         for n in range(port_map[0]):
             dut, port = dutport_list[n]
-            count_frames = count_frames + (get_egress_queue_count(dut, port, lossless_prio)[0])
+            count_frames = count_frames + egress_queue_count(dut, port, lossless_prio, index_by_dut)
             logger.info(
                 'Final egress Queue Count for DUT:{},Port:{}, Priority:{} - {}'.format(
                     dut.hostname, port, lossless_prio, count_frames
@@ -1814,7 +1839,7 @@ def run_traffic_and_collect_stats(rx_duthost,
         count_frames = 0
         for n in range(port_map[2]):
             dut, port = dutport_list[-(n+1)]
-            count_frames = count_frames + (get_egress_queue_count(dut, port, lossless_prio)[0])
+            count_frames = count_frames + egress_queue_count(dut, port, lossless_prio, index_by_dut)
         switch_device_results["rx_frames"][lossless_prio].append(count_frames)
 
     # Dump per-flow statistics for final rows
@@ -1828,10 +1853,13 @@ def run_traffic_and_collect_stats(rx_duthost,
     f_stats[m]['tgen_tx_frames'] = tx_frame
     f_stats[m]['tgen_rx_frames'] = rx_frame
     f_stats = update_dict(m, f_stats, tgen_curr_stats(traf_metrics, flow_metrics, data_flow_names))
-    for dut, port in dutport_list:
-        f_stats = update_dict(m, f_stats, flatten_dict(get_interface_stats(dut, port)))
-        f_stats = update_dict(m, f_stats, flatten_dict(get_pfc_count(dut, port)))
-        f_stats = update_dict(m, f_stats, flatten_dict(get_queue_count_all_prio(dut, port)))
+    if samplers:
+        f_stats = update_dict(m, f_stats, dut_stats(index_by_dut))
+    else:
+        for dut, port in dutport_list:
+            f_stats = update_dict(m, f_stats, flatten_dict(get_interface_stats(dut, port)))
+            f_stats = update_dict(m, f_stats, flatten_dict(get_pfc_count(dut, port)))
+            f_stats = update_dict(m, f_stats, flatten_dict(get_queue_count_all_prio(dut, port)))
 
     flow_metrics = fetch_snappi_flow_metrics(api, all_flow_names)
     time.sleep(10)
@@ -1907,9 +1935,9 @@ def run_traffic_and_collect_stats(rx_duthost,
             rx_thrput = 0
             tx_thrput = 0
             for item in results:
-                if (new_key in item and item.split(new_key)[1] == '_rx_thrput_Mbps'):
+                if (new_key in item and item.split(new_key)[1] == '_rx_thrput_mbps'):
                     rx_thrput = round(df_t.loc[df_t[item] != 0, item].mean(), 2)
-                if (new_key in item and item.split(new_key)[1] == '_tx_thrput_Mbps'):
+                if (new_key in item and item.split(new_key)[1] == '_tx_thrput_mbps'):
                     tx_thrput = round(df_t.loc[df_t[item] != 0, item].mean(), 2)
                 if (new_key in item and item.split(new_key)[1] == '_rx_pkts'):
                     rx_pkts = df_t[item].max()
@@ -1968,6 +1996,62 @@ def run_traffic_and_collect_stats(rx_duthost,
     return flow_metrics, switch_device_results, test_stats
 
 
+def start_dut_counter_samplers(dutport_list, interval, queues):
+    """
+    Start a DutCounterSampler on every DUT of dutport_list.
+
+    Args:
+        dutport_list (list): [duthost, port] of the DUT ports to sample.
+        interval (int): Seconds between two samples.
+        queues (set): Indexes of the queues to sample.
+    Returns:
+        dict: DutCounterSampler by DUT hostname, empty if a sampler failed to start, the DUT counters are then
+        read through the CLI.
+    """
+    ports_by_dut = {}
+    for dut, port in dutport_list:
+        ports_by_dut.setdefault(dut.hostname, (dut, []))[1].append(port)
+    samplers = {}
+    try:
+        for hostname, (dut, ports) in ports_by_dut.items():
+            samplers[hostname] = DutCounterSampler(dut, ports, interval, queues=sorted(queues))
+            samplers[hostname].start()
+    except Exception as e:
+        logger.warning('Failed to start the DUT counter samplers, polling the DUT CLI instead: {}'.format(e))
+        for sampler in samplers.values():
+            sampler.stop()
+        return {}
+    return samplers
+
+
+def fetch_dut_counter_samples(samplers, timestamp):
+    """
+    Read the new samples of the DUT counter samplers.
+
+    Returns:
+        dict: Index of the sample closest to timestamp by DUT hostname.
+    """
+    index_by_dut = {}
+    for hostname, sampler in samplers.items():
+        table = sampler.fetch()
+        index = table.nearest(timestamp)
+        index_by_dut[hostname] = index
+        if abs(table.times[index] - timestamp) > 2 * sampler.interval:
+            logger.warning('Latest counter sample of {} is {:.1f}s away from the TGEN statistics'.format(
+                hostname, table.times[index] - timestamp))
+    return index_by_dut
+
+
+def stop_dut_counter_samplers(samplers):
+    """
+    Stop the DUT counter samplers.
+
+    Returns:
+        dict: Index of the last sample by DUT hostname.
+    """
+    return dict((hostname, len(sampler.stop()) - 1) for hostname, sampler in samplers.items())
+
+
 def update_dict(m,
                 orig_dict,
                 new_dict):
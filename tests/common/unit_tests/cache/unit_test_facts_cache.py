@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+
+# Make the repo root importable so ``tests.common.cache.facts_cache`` resolves
+# regardless of the pytest invocation directory.
+_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(_TEST_DIR)))
+)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from tests.common.cache import facts_cache  # noqa: E402
+
+
+def _new_cache(tmp_path, memory_entry_limit=2):
+    """Bypass the singleton so that every test gets its own cache folder."""
+    instance = object.__new__(facts_cache.FactsCache)
+    instance.__init__(str(tmp_path), memory_entry_limit=memory_entry_limit)
+    return instance
+
+
+def test_write_then_read_from_disk(tmp_path):
+    cache = _new_cache(tmp_path)
+    assert cache.write("dut1", "basic_facts", {"hwsku": "x"})
+    assert os.path.exists(os.path.join(str(tmp_path), "dut1", "basic_facts.pickle"))
+    assert not [f for f in os.listdir(os.path.join(str(tmp_path), "dut1")) if f.endswith(".tmp")]
+
+    other = _new_cache(tmp_path)
+    assert other.read("dut1", "basic_facts") == {"hwsku": "x"}
+    assert other.read("dut1", "missing") is facts_cache.FactsCache.NOTEXIST
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = _new_cache(tmp_path, memory_entry_limit=2)
+    for i in range(3):
+        cache.write("dut1", "k{}".format(i), i)
+    assert len(cache._cache) == 2
+    assert ("dut1", "k0") not in cache._cache
+    # Evicted from memory, still served from disk
+    assert cache.read("dut1", "k0") == 0
+
+
+def test_corrupted_file_returns_notexist(tmp_path):
+    cache = _new_cache(tmp_path)
+    os.makedirs(os.path.join(str(tmp_path), "dut1"))
+    with open(os.path.join(str(tmp_path), "dut1", "broken.pickle"), "wb") as f:
+        f.write(b"\x80")
+    assert cache.read("dut1", "broken") is facts_cache.FactsCache.NOTEXIST
+
+
+def test_ledger_tracks_usage(tmp_path):
+    cache = _new_cache(tmp_path)
+    cache.write("dut1", "a", "x" * 100)
+    cache.write("dut1", "a", "x" * 10)
+    cache.write("dut2", "b", 1)
+    ledger = cache._get_ledger()
+    assert ledger.total_entries == 2
+
+    rescanned = facts_cache._UsageLedger()
+    rescanned.scan(str(tmp_path))
+    assert rescanned.total_size == ledger.total_size
+
+    cache.cleanup("dut1")
+    assert ledger.total_entries == 1
+    assert cache.read("dut1", "a") is facts_cache.FactsCache.NOTEXIST
+
+
+def test_least_recently_used_zone_is_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(facts_cache, "ENTRY_LIMIT", 2)
+    cache = _new_cache(tmp_path)
+    cache.write("old", "a", 1)
+    cache._get_ledger().last_used["old"] = 1
+    cache.write("new", "a", 2)
+    cache.write("new", "b", 3)
+    cache.write("new", "c", 4)
+
+    assert not os.path.exists(os.path.join(str(tmp_path), "old"))
+    assert cache.read("old", "a") is facts_cache.FactsCache.NOTEXIST
+    assert cache.read("new", "c") == 4
+
+
+def test_cleanup_holds_memory_lock(tmp_path):
+    cache = _new_cache(tmp_path)
+    cache.write("dut1", "a", 1)
+    cache.write("dut2", "b", 2)
+    for args in [("dut1", "a"), ("dut2",), ()]:
+        with cache._memory_lock:
+            cleanup = threading.Thread(target=cache.cleanup, args=args)
+            cleanup.start()
+            cleanup.join(0.2)
+            # The memory tier isn't changed while another thread holds the lock
+            assert cleanup.is_alive()
+        cleanup.join()
+    assert len(cache._cache) == 0
+    assert not os.path.exists(str(tmp_path))
@@ -0,0 +1,178 @@
+"""
+Unit tests for tests/common/devices/ssh_channel.py (PersistentShellChannel) and
+the SonicHost.shell/command path which runs on it.
+
+paramiko is mocked, so these tests check the command lines, the result shape
+and the reconnect/backoff/fallback behavior without a live DUT.
+
+Follows the repo unit-test convention (unit_test_*.py, unittest.mock).
+"""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import paramiko
+import pytest
+
+_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(_TEST_DIR)))
+)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from tests.common.devices import ssh_channel  # noqa: E402
+from tests.common.devices.sonic import SonicHost  # noqa: E402
+from tests.common.errors import RunAnsibleModuleFail  # noqa: E402
+
+
+def make_session(stdout=b"", stderr=b"", rc=0):
+    """A paramiko channel which has already received all output of a command."""
+    session = MagicMock()
+    out = [stdout] if stdout else []
+    err = [stderr] if stderr else []
+    session.recv_ready.side_effect = lambda: bool(out)
+    session.recv.side_effect = lambda size: out.pop(0)
+    session.recv_stderr_ready.side_effect = lambda: bool(err)
+    session.recv_stderr.side_effect = lambda size: err.pop(0)
+    session.exit_status_ready.return_value = True
+    session.eof_received = True
+    session.recv_exit_status.return_value = rc
+    return session
+
+
+def make_channel(become=False):
+    return ssh_channel.PersistentShellChannel("dut", "10.0.0.1", "admin", "password", become=become)
+
+
+@pytest.fixture
+def ssh_client():
+    """Patch paramiko.SSHClient, the transport of every new connection is ssh_client.transport."""
+    with patch.object(ssh_channel.paramiko, "SSHClient") as client_cls:
+        client_cls.transport = client_cls.return_value.get_transport.return_value
+        client_cls.transport.is_active.return_value = True
+        yield client_cls
+
+
+def test_supports():
+    supports = ssh_channel.PersistentShellChannel.supports
+    assert supports("shell", ("ls",), {})
+    assert supports("command", (), {"cmd": "ls", "chdir": "/tmp"})
+    assert not supports("copy", ("ls",), {})
+    assert not supports("shell", ("ls",), {"creates": "/tmp/x"})
+    assert not supports("shell", (), {})
+
+
+def test_build_command():
+    channel = make_channel(become=True)
+    assert channel.build_command("shell", "echo $HOME | wc -c") == \
+        "sudo -n -H /bin/sh -c '/bin/sh -c '\"'\"'echo $HOME | wc -c'\"'\"''"
+    channel.become = False
+    assert channel.build_command("command", "echo 'a b'", chdir="/tmp") == "cd /tmp && echo 'a b'"
+    assert channel.build_command("shell", "echo", executable="/bin/bash") == "/bin/bash -c echo"
+
+
+def test_run_result(ssh_client):
+    ssh_client.transport.open_session.return_value = make_session(b"line1\nline2\n", b"warn\n", rc=1)
+    res = make_channel().run("shell", "cat x")
+    assert res["cmd"] == "cat x"
+    assert res["rc"] == 1
+    assert res["failed"]
+    assert res["stdout"] == "line1\nline2"
+    assert res["stdout_lines"] == ["line1", "line2"]
+    assert res["stderr_lines"] == ["warn"]
+    assert res["msg"] == "non-zero return code"
+
+
+def test_reconnect_after_connection_loss(ssh_client):
+    ssh_client.transport.open_session.side_effect = [paramiko.SSHException("closed"), make_session(b"ok")]
+    assert make_channel().run("shell", "true")["stdout"] == "ok"
+    assert ssh_client.return_value.connect.call_count == 2
+
+
+def test_backoff_after_failure(ssh_client):
+    channel = make_channel()
+    ssh_client.return_value.connect.side_effect = OSError("unreachable")
+    with patch.object(ssh_channel.time, "time", return_value=1000):
+        with pytest.raises(ssh_channel.ChannelUnavailable):
+            channel.run("shell", "true")
+        assert channel._retry_after == 1000 + ssh_channel.RETRY_BACKOFF_MIN
+        connects = ssh_client.return_value.connect.call_count
+        # The host isn't tried again during the backoff time
+        with pytest.raises(ssh_channel.ChannelUnavailable):
+            channel.run("shell", "true")
+        assert ssh_client.return_value.connect.call_count == connects
+
+    with patch.object(ssh_channel.time, "time", return_value=1001):
+        with pytest.raises(ssh_channel.ChannelUnavailable):
+            channel.run("shell", "true")
+        assert channel._retry_after == 1001 + 2 * ssh_channel.RETRY_BACKOFF_MIN
+
+    ssh_client.return_value.connect.side_effect = None
+    ssh_client.transport.open_session.return_value = make_session(b"ok")
+    with patch.object(ssh_channel.time, "time", return_value=1010):
+        assert channel.run("shell", "true")["stdout"] == "ok"
+    assert channel._failures == 0
+
+
+def test_sudo_not_allowed(ssh_client):
+    ssh_client.transport.open_session.return_value = make_session(rc=1)
+    with pytest.raises(ssh_channel.ChannelNotSupported):
+        make_channel(become=True).run("shell", "true")
+
+
+def test_measure_latency():
+    calls = []
+    latency = ssh_channel.measure_latency(lambda: calls.append(1), 3)
+    assert len(calls) == 3
+    assert latency["min"] <= latency["avg"] <= latency["max"]
+
+
+class ModuleResult(dict):
+    """Stands in for pytest_ansible's ModuleResult, a dict with an encoder attribute."""
+
+
+@pytest.fixture
+def duthost():
+    """A SonicHost running shell/command calls on a mocked persistent channel, Ansible is a mock too."""
+    host = SonicHost.__new__(SonicHost)
+    host.hostname = "dut"
+    host._persistent_shell = MagicMock()
+    host._run = MagicMock(return_value={"rc": 0, "stdout": "from ansible"})
+    with patch.object(SonicHost, "_persistent_shell_mode", True), \
+            patch("tests.common.devices.sonic.ModuleResult", ModuleResult):
+        yield host
+
+
+def test_shell_runs_on_channel(duthost):
+    duthost._persistent_shell.run.return_value = {"rc": 0, "stdout": "ok", "failed": False}
+    assert duthost.shell("echo ok")["stdout"] == "ok"
+    duthost._persistent_shell.run.assert_called_once_with("shell", "echo ok")
+    duthost._run.assert_not_called()
+
+    duthost._persistent_shell.run.return_value = {"rc": 1, "stdout": "", "failed": True}
+    with pytest.raises(RunAnsibleModuleFail):
+        duthost.command("false")
+    assert duthost.command("false", module_ignore_errors=True)["rc"] == 1
+
+
+def test_shell_unsupported_options_use_ansible(duthost):
+    assert duthost.shell("echo ok", creates="/tmp/x")["stdout"] == "from ansible"
+    duthost._persistent_shell.run.assert_not_called()
+
+
+def test_shell_falls_back_while_channel_unavailable(duthost):
+    channel = duthost._persistent_shell
+    channel.run.side_effect = ssh_channel.ChannelUnavailable("retry in 1s")
+    assert duthost.shell("echo ok")["stdout"] == "from ansible"
+    # A transient failure keeps the channel, the next call tries it again
+    channel.run.side_effect = None
+    channel.run.return_value = {"rc": 0, "stdout": "ok", "failed": False}
+    assert duthost.shell("echo ok")["stdout"] == "ok"
+
+    channel.run.side_effect = ssh_channel.ChannelNotSupported("sudo needs password")
+    assert duthost.shell("echo ok")["stdout"] == "from ansible"
+    assert duthost._persistent_shell is False
+    assert duthost.shell("echo ok")["stdout"] == "from ansible"
+    assert channel.run.call_count == 3
@@ -0,0 +1,194 @@
+"""
+Unit tests for ansible/roles/vm_set/files/mux_simulator.py.
+
+The mux simulator is driven through the Flask test client. run_cmd is replaced
+by a fake OVS keeping the ports and flows of every mux bridge in memory, so the
+tests check the ovs-ofctl commands and the flows kept by the Mux objects:
+
+  * /mux/<vm_set> POST      - all muxes switched with bundled replace-flows
+  * /mux/<vm_set>/bulk      - only the posted ports, switchover latency
+  * bundle fallback         - replace-flows without bundle when not supported
+  * drop downstream flow    - only the state changes, no flow to move
+  * bad requests            - 400/404 for bad or unknown port indexes
+
+Follows the repo unit-test convention (unit_test_*.py, unittest.mock).
+"""
+
+import importlib.util
+import re
+import shlex
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+MODULE_PATH = (Path(__file__).resolve().parents[4] /
+               "ansible/roles/vm_set/files/mux_simulator.py")
+
+VM_SET = "vms1-1"
+PORTS = [0, 1, 2]
+
+
+def _load_target_module():
+    spec = importlib.util.spec_from_file_location("unit_target_mux_simulator", str(MODULE_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def mux_simulator():
+    module = _load_target_module()
+    module.app.config["VERBOSE"] = False
+    return module
+
+
+class FakeOvs(object):
+    """Mux bridges of one vm_set, each one with a NIC port and two ToR ports, all flows forwarding."""
+
+    def __init__(self, port_indexes, bundle_supported=True):
+        self.bundle_supported = bundle_supported
+        self.commands = []
+        self.ports = {}
+        self.flows = {}
+        for index in port_indexes:
+            bridge = "mbr-{}-{}".format(VM_SET, index)
+            nic, upper, lower = "muxy-{}-{}".format(VM_SET, index), "eth0.{}".format(1000 + index), \
+                "eth0.{}".format(2000 + index)
+            self.ports[bridge] = [upper, lower, nic]
+            self.flows[bridge] = {nic: [upper, lower], upper: [nic]}
+
+    def bridges(self):
+        return list(self.flows)
+
+    def run_cmd(self, cmdline, stdin_data=None):
+        self.commands.append(cmdline)
+        args = shlex.split(cmdline)
+        if args[:2] == ["ovs-vsctl", "list-ports"]:
+            return "\n".join(self.ports[args[2]]) + "\n"
+        if "dump-flows" in args:
+            return "".join('cookie=0x0, table=0, in_port="{}" actions={}\n'.format(
+                in_port, ",".join('output:"{}"'.format(out_port) for out_port in out_ports))
+                for in_port, out_ports in self.flows[args[-1]].items())
+        if "replace-flows" in args:
+            if "--bundle" in args and not self.bundle_supported:
+                raise Exception({"cmd": cmdline, "ret_code": 1,
+                                 "stderr": ["ovs-ofctl: OFPT_ERROR: OFPBFC_BAD_TYPE"]})
+            bridge = args[-2]
+            self.flows[bridge] = {}
+            for in_port, actions in re.findall(r'in_port="(\S+)",actions=(\S+)', stdin_data):
+                self.flows[bridge][in_port] = re.findall(r'output:"(\S+?)"', actions)
+            return ""
+        raise AssertionError("Unexpected command: {}".format(cmdline))
+
+    def replace_commands(self):
+        return [cmd for cmd in self.commands if "replace-flows" in cmd]
+
+
+@pytest.fixture
+def make_client(mux_simulator):
+    """Create the muxes on a fake OVS and return a Flask test client of the simulator."""
+    patchers = []
+
+    def _make_client(ovs):
+        run_cmd = patch.object(mux_simulator, "run_cmd", side_effect=ovs.run_cmd)
+        run_cmd.start()
+        patchers.append(run_cmd)
+        with patch.object(mux_simulator.os, "listdir", return_value=ovs.bridges() + ["eth0", "lo"]):
+            mux_simulator.create_muxes(VM_SET)
+        ovs.commands = []
+        return mux_simulator.app.test_client()
+
+    yield _make_client
+    for patcher in patchers:
+        patcher.stop()
+    mux_simulator.Mux.bundle_supported = True
+
+
+def test_post_all_muxes_uses_bundles(make_client):
+    ovs = FakeOvs(PORTS)
+    client = make_client(ovs)
+
+    res = client.post("/mux/{}".format(VM_SET), json={"active_side": "lower_tor"})
+    assert res.status_code == 200
+    status = res.get_json()
+    assert sorted(status) == sorted(ovs.bridges())
+    for bridge, mux_status in status.items():
+        nic, upper, lower = "muxy-{}".format(bridge[4:]), ovs.ports[bridge][0], ovs.ports[bridge][1]
+        assert mux_status["active_side"] == "lower_tor"
+        assert mux_status["healthy"]
+        assert ovs.flows[bridge] == {nic: [upper, lower], lower: [nic]}
+
+    # One bundled replace-flows per bridge instead of del-flows and add-flow
+    assert len(ovs.commands) == len(PORTS)
+    assert all("--bundle replace-flows" in cmd for cmd in ovs.commands)
+
+    # Nothing to do for the muxes already on the lower ToR
+    ovs.commands = []
+    assert client.post("/mux/{}".format(VM_SET), json={"active_side": "lower_tor"}).status_code == 200
+    assert ovs.commands == []
+
+
+def test_bulk_switches_posted_ports(make_client):
+    ovs = FakeOvs(PORTS)
+    client = make_client(ovs)
+
+    res = client.post("/mux/{}/bulk".format(VM_SET), json={"active_side": "toggle", "port_indexes": [1]})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert list(data["muxes"]) == ["mbr-{}-1".format(VM_SET)]
+    assert data["muxes"]["mbr-{}-1".format(VM_SET)]["active_side"] == "lower_tor"
+    assert list(data["switchover_latency"]) == ["1"]
+    assert ovs.replace_commands() == ["ovs-ofctl --names --bundle replace-flows mbr-{}-1 -".format(VM_SET)]
+
+    status = client.get("/mux/{}".format(VM_SET)).get_json()
+    assert [status["mbr-{}-{}".format(VM_SET, index)]["active_side"] for index in PORTS] == \
+        ["upper_tor", "lower_tor", "upper_tor"]
+    assert status["mbr-{}-1".format(VM_SET)]["flap_counter"] == 1
+
+
+def test_bulk_falls_back_without_bundle(make_client, mux_simulator):
+    ovs = FakeOvs(PORTS, bundle_supported=False)
+    client = make_client(ovs)
+
+    res = client.post("/mux/{}/bulk".format(VM_SET), json={"active_side": "lower_tor", "port_indexes": [0]})
+    assert res.status_code == 200
+    assert ovs.replace_commands() == [
+        "ovs-ofctl --names --bundle replace-flows mbr-{}-0 -".format(VM_SET),
+        "ovs-ofctl --names replace-flows mbr-{}-0 -".format(VM_SET)
+    ]
+    assert not mux_simulator.Mux.bundle_supported
+
+    ovs.commands = []
+    assert client.post("/mux/{}/bulk".format(VM_SET),
+                       json={"active_side": "lower_tor", "port_indexes": [1]}).status_code == 200
+    assert ovs.replace_commands() == ["ovs-ofctl --names replace-flows mbr-{}-1 -".format(VM_SET)]
+    assert ovs.flows["mbr-{}-1".format(VM_SET)]["eth0.2001"] == ["muxy-{}-1".format(VM_SET)]
+
+
+def test_bulk_with_drop_downstream_flow(make_client, mux_simulator):
+    ovs = FakeOvs([0])
+    bridge = "mbr-{}-0".format(VM_SET)
+    client = make_client(ovs)
+    # The downstream flow drops, the ToR port forwards nothing to the NIC
+    del ovs.flows[bridge]["eth0.1000"]
+    mux_simulator.g_muxes.muxes[bridge].flows["downstream"]["out_sides"] = []
+
+    data = client.post("/mux/{}/bulk".format(VM_SET), json={"active_side": "lower_tor"}).get_json()
+    assert data["muxes"][bridge]["active_side"] == "lower_tor"
+    assert not data["muxes"][bridge]["healthy"]
+    assert ovs.commands == []
+
+
+@pytest.mark.parametrize("data, status_code", [
+    ({"active_side": "middle_tor"}, 400),
+    ({"active_side": "toggle", "port_indexes": "1"}, 400),
+    ({"active_side": "toggle", "port_indexes": ["1"]}, 400),
+    ({"active_side": "toggle", "port_indexes": [1, 7]}, 404),
+])
+def test_bulk_bad_requests(make_client, data, status_code):
+    ovs = FakeOvs(PORTS)
+    client = make_client(ovs)
+    assert client.post("/mux/{}/bulk".format(VM_SET), json=data).status_code == status_code
+    assert client.post("/mux/vms9-9/bulk", json={"active_side": "toggle"}).status_code == 404
+    assert ovs.replace_commands() == []
@@ -0,0 +1,172 @@
+"""
+Unit tests for tests/common/helpers/db_watcher.py.
+
+The fake duthost runs the shell commands of DbWatcher and DutBackgroundScript
+on the local host, against an output file written by the test instead of the
+watcher script on a DUT. They cover:
+
+  * fetch()             - lines the watcher is still writing, changes and
+                          deletes applied to the state
+  * exit marker         - a stopped or failed watcher is reported
+  * wait_until()        - returning on a change instead of polling
+  * wait_until_db()     - polling with sonic-db-dump when the watcher can't run
+  * keys_fields_match() - the predicate over the watched keys
+
+Follows the repo unit-test convention (unit_test_*.py, unittest.mock).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(_TEST_DIR)))
+)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from tests.common.helpers import db_watcher  # noqa: E402
+
+PORTS = ["PORT_TABLE:Ethernet0", "PORT_TABLE:Ethernet4"]
+WATCHES = [("APPL_DB", "PORT_TABLE:*")]
+
+
+class FakeDuthost(object):
+    """Runs shell commands locally, sonic-db-dump returns the given dumps one after another."""
+
+    hostname = "dut"
+
+    def __init__(self, db_dumps=()):
+        self.db_dumps = list(db_dumps)
+        self.commands = []
+
+    def shell(self, cmd, module_ignore_errors=False):
+        self.commands.append(cmd)
+        if cmd.startswith("sonic-db-dump"):
+            dump = self.db_dumps.pop(0) if len(self.db_dumps) > 1 else self.db_dumps[0]
+            stdout = json.dumps(dump)
+        else:
+            stdout = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        stdout = stdout.rstrip("\n")
+        return {"stdout": stdout, "stdout_lines": stdout.splitlines()}
+
+
+def port(status):
+    return {"oper_status": status, "mtu": "9100"}
+
+
+def record(db, key, value):
+    return json.dumps([1.0, db, key, value]) + "\n"
+
+
+SYNCED = json.dumps({"synced": 1.0, "notifications": ["APPL_DB"]}) + "\n"
+
+
+@pytest.fixture
+def running():
+    """A live process standing in for the watcher process."""
+    proc = subprocess.Popen(["sleep", "60"])
+    yield str(proc.pid)
+    proc.kill()
+    proc.wait()
+
+
+@pytest.fixture
+def exited():
+    """The pid of a process which is gone."""
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    return str(proc.pid)
+
+
+def make_watcher(tmp_path, pid, output=""):
+    watcher = db_watcher.DbWatcher(FakeDuthost(), WATCHES)
+    watcher.script.output_path = str(tmp_path / "db_watcher.out")
+    watcher.script.pid = pid
+    with open(watcher.script.output_path, "w") as f:
+        f.write(output)
+    return watcher
+
+
+def append(watcher, output):
+    with open(watcher.script.output_path, "a") as f:
+        f.write(output)
+
+
+def test_fetch_leaves_partial_line(tmp_path, running):
+    line = record("APPL_DB", PORTS[1], port("up"))
+    watcher = make_watcher(tmp_path, running, SYNCED + record("APPL_DB", PORTS[0], port("down")) + line[:20])
+    assert watcher.fetch()
+    assert watcher._synced
+    assert watcher.notifications == ["APPL_DB"]
+    assert watcher.state == {"APPL_DB": {PORTS[0]: port("down")}}
+
+    append(watcher, line[20:])
+    assert watcher.fetch()
+    assert watcher.state["APPL_DB"][PORTS[1]] == port("up")
+    assert not watcher.fetch()
+
+    append(watcher, record("APPL_DB", PORTS[0], None))
+    assert watcher.fetch()
+    assert watcher.state == {"APPL_DB": {PORTS[1]: port("up")}}
+    assert not watcher.script.exited
+
+
+def test_exit_marker(tmp_path, exited):
+    watcher = make_watcher(tmp_path, exited, SYNCED + record("APPL_DB", PORTS[0], port("up")) +
+                           json.dumps({"exit": "max_duration"}))
+    assert watcher.fetch()
+    assert watcher.script.exited
+    assert watcher.state["APPL_DB"][PORTS[0]] == port("up")
+    with pytest.raises(RuntimeError, match="stopped"):
+        watcher.wait_until(5, db_watcher.keys_fields_match("APPL_DB", PORTS, oper_status="up"))
+
+
+def test_failed_watcher(tmp_path, exited):
+    watcher = make_watcher(tmp_path, exited, "Traceback (most recent call last):\nImportError: No module named redis")
+    with pytest.raises(RuntimeError, match="No module named redis"):
+        watcher.fetch()
+
+
+def test_wait_until_returns_on_change(tmp_path, running):
+    watcher = make_watcher(tmp_path, running, SYNCED + "".join(record("APPL_DB", key, port("down")) for key in PORTS))
+    ports_up = db_watcher.keys_fields_match("APPL_DB", PORTS, oper_status="up")
+    assert not watcher.wait_until(0.3, ports_up)
+
+    timer = threading.Timer(0.3, append, (watcher, "".join(record("APPL_DB", key, port("up")) for key in PORTS)))
+    timer.start()
+    try:
+        assert watcher.wait_until(5, ports_up)
+    finally:
+        timer.cancel()
+
+
+def test_wait_until_db_polls_without_watcher():
+    down = {PORTS[0]: {"type": "hash", "value": port("up")}, PORTS[1]: {"type": "hash", "value": port("down")}}
+    up = {PORTS[0]: {"type": "hash", "value": port("up")}, PORTS[1]: {"type": "hash", "value": port("up")}}
+    duthost = FakeDuthost(db_dumps=[down, up])
+    ports_up = db_watcher.keys_fields_match("APPL_DB", PORTS, oper_status="up")
+    with patch.object(db_watcher.DbWatcher, "start", side_effect=RuntimeError("no python3")):
+        assert db_watcher.wait_until_db(duthost, 5, 0.01, 0, WATCHES, ports_up)
+        assert duthost.commands == ["sonic-db-dump -n APPL_DB -y -k 'PORT_TABLE:*'"] * 2
+
+        duthost = FakeDuthost(db_dumps=[down])
+        assert not db_watcher.wait_until_db(duthost, 0.1, 0.01, 0, WATCHES, ports_up, namespace="asic1")
+        assert duthost.commands[0] == "sudo ip netns exec asic1 sonic-db-dump -n APPL_DB -y -k 'PORT_TABLE:*'"
+
+
+def test_keys_fields_match():
+    match = db_watcher.keys_fields_match("STATE_DB", ["A", "B"], state="ok")
+    assert match({"STATE_DB": {"A": {"state": "ok"}, "B": {"state": "ok", "other": "1"}}})
+    assert not match({"STATE_DB": {"A": {"state": "ok"}}})
+    assert not match({"STATE_DB": {"A": {"state": "ok"}, "B": {"state": "down"}}})
+    assert not match({"STATE_DB": {"A": {"state": "ok"}, "B": "ok"}})
+    assert not match({})
+    assert db_watcher.keys_fields_match("STATE_DB", [])({})
+    assert match.__name__ == "keys_fields_match(STATE_DB, 2 keys, {'state': 'ok'})"
@@ -0,0 +1,80 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(_TEST_DIR))))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from tests.common.devices.sonic import SonicHost  # noqa: E402
+from tests.common.helpers import show_table  # noqa: E402
+
+INTERFACES_STATUS = [
+    "  Interface        Lanes    Speed    MTU  Alias    Oper",
+    "-----------  -----------  -------  -----  -------  ------",
+    "  Ethernet0      0,1,2,3      40G   9100  etp1     up",
+    "  Ethernet4      4,5,6,7      40G   9100  etp2     down",
+    "",
+    "Total: 2",
+]
+
+COUNTERS = [
+    "      IFACE    STATE       RX_OK    RX_BPS",
+    "             (admin)",
+    "-----------  -------  ----------  --------",
+    "  Ethernet0        U   1,234,567  0.50 B/s",
+    "  Ethernet4        D         N/A      0.25",
+]
+
+
+def test_parse_rows():
+    table = show_table.parse_show(INTERFACES_STATUS)
+    assert len(table) == 2
+    assert table.headers == ["interface", "lanes", "speed", "mtu", "alias", "oper"]
+    assert table.column("interface") == ["Ethernet0", "Ethernet4"]
+    assert table[1] == {"interface": "Ethernet4", "lanes": "4,5,6,7", "speed": "40G",
+                        "mtu": "9100", "alias": "etp2", "oper": "down"}
+    assert table.to_list() == list(table)
+    assert table == table.to_list()
+
+
+def test_multi_line_headers_and_numbers():
+    table = show_table.parse_show(COUNTERS, header_len=2)
+    assert table.headers == ["iface", "state (admin)", "rx_ok", "rx_bps"]
+    table.convert_numbers(["rx_ok", "rx_bps"])
+    assert table.column("rx_ok") == [1234567, "N/A"]
+    assert table.column("rx_bps") == ["0.50 B/s", 0.25]
+    assert table.column("state (admin)") == ["U", "D"]
+
+
+def test_layout_is_memoized():
+    show_table.parse_show(INTERFACES_STATUS)
+    hits = show_table.get_column_layout.cache_info().hits
+    show_table.parse_show(INTERFACES_STATUS[:3])
+    assert show_table.get_column_layout.cache_info().hits == hits + 1
+
+
+def test_no_separation_line():
+    table = show_table.parse_show(["no table here"])
+    assert len(table) == 0
+    assert table.to_list() == []
+    assert not table
+
+
+def test_number_lists_stay_strings():
+    table = show_table.parse_show(INTERFACES_STATUS)
+    table.convert_numbers()
+    assert table.column("lanes") == ["0,1,2,3", "4,5,6,7"]
+    assert table.column("mtu") == [9100, 9100]
+    assert [show_table.convert_number(value) for value in ("1,234", "-12,345.5", "12,34", "1,2345", ",123")] == \
+        [1234, -12345.5, "12,34", "1,2345", ",123"]
+
+
+def test_show_and_parse_table_numeric_columns():
+    duthost = SonicHost.__new__(SonicHost)
+    duthost.shell = MagicMock(return_value={"stdout_lines": INTERFACES_STATUS})
+    table = duthost.show_and_parse_table("show interfaces status", numeric_columns=True)
+    assert table[0]["lanes"] == "0,1,2,3"
+    assert table[0]["mtu"] == 9100
+    assert table[0]["speed"] == "40G"
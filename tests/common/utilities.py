@@ -16,6 +16,7 @@ import threading
 import time
 import traceback
 import copy
+import hashlib
 import tempfile
 import uuid
 import paramiko
@@ -358,6 +359,114 @@ def get_variable_manager(inv_files):
     return VariableManager(loader=DataLoader(), inventory=get_inventory_manager(inv_files))
 
 
+def _inventory_paths(inv_files):
+    return [inv_files] if isinstance(inv_files, six.string_types) else list(inv_files)
+
+
+def inventory_signature(inv_files):
+    """Get a signature of the content of inventory files.
+
+    The signature covers the modification time and size of the inventory files and of the files in the host_vars
+    and group_vars folders next to them, the variables of the hosts are defined in all of them. It is the same in
+    all the processes as long as none of these files changes.
+
+    Args:
+        inv_files (list or string): List of inventory file paths, or string of a single inventory file path.
+
+    Returns:
+        str: Signature of the inventory.
+    """
+    stats = []
+    for inv_file in _inventory_paths(inv_files):
+        inv_file = os.path.abspath(inv_file)
+        paths = [inv_file]
+        for vars_dir in ("host_vars", "group_vars"):
+            for root, dirs, files in os.walk(os.path.join(os.path.dirname(inv_file), vars_dir)):
+                dirs.sort()
+                paths.extend(os.path.join(root, f) for f in sorted(files))
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stats.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append((path, None, None))
+    return hashlib.sha1(json.dumps(stats).encode()).hexdigest()
+
+
+class InventoryIndex(object):
+    """Parsed inventory files, with the variables of their hosts and groups.
+
+    The inventory is parsed once, the variables of all the hosts are indexed by host name when it is built. The
+    variables visible to a host, which are more expensive to resolve, are resolved on first use and kept.
+    Use get_inventory_index() to get the index shared by the whole process.
+    """
+
+    def __init__(self, inv_files, signature):
+        self.inv_files = inv_files
+        self.signature = signature
+        self._lock = threading.Lock()
+        self._variable_manager = get_variable_manager(inv_files)
+        self._inventory = self._variable_manager._inventory
+        self._host_vars = dict((name, host.vars.copy()) for name, host in self._inventory.hosts.items())
+        self._visible_vars = {}
+        self._group_hosts = {}
+
+    def get_host(self, hostname):
+        return self._inventory.get_host(hostname)
+
+    def get_group_hosts(self, group_name):
+        """Get the hosts of a group, None if the group is not found."""
+        with self._lock:
+            if group_name not in self._group_hosts:
+                group = self._inventory.groups.get(group_name, None)
+                self._group_hosts[group_name] = group.get_hosts() if group else None
+            return self._group_hosts[group_name]
+
+    def get_host_vars(self, hostname):
+        """Get the variables defined for a host, None if the host is not found."""
+        host_vars = self._host_vars.get(hostname)
+        if host_vars is None:
+            return None
+        return host_vars.copy()
+
+    def get_visible_vars(self, host):
+        """Get the variables visible to a host, defined in its host_vars or in the group_vars of its groups."""
+        with self._lock:
+            if host.name not in self._visible_vars:
+                self._visible_vars[host.name] = self._variable_manager.get_vars(host=host)
+            return self._visible_vars[host.name].copy()
+
+
+_inventory_indexes = {}
+_inventory_indexes_lock = threading.Lock()
+
+
+def get_inventory_index(inv_files):
+    """Get the InventoryIndex of inventory files.
+
+    The index is shared by the whole process. It is built again when any of the inventory files, or of the host_vars
+    and group_vars files, changes.
+
+    Args:
+        inv_files (list or string): List of inventory file paths, or string of a single inventory file path.
+
+    Returns:
+        InventoryIndex: Index of the inventory.
+    """
+    signature = inventory_signature(inv_files)
+    with _inventory_indexes_lock:
+        index = _inventory_indexes.get(signature)
+        if index is None:
+            # Forget the indexes of the previous content of the same files
+            for stale in [sig for sig, idx in _inventory_indexes.items()
+                          if _inventory_paths(idx.inv_files) == _inventory_paths(inv_files)]:
+                del _inventory_indexes[stale]
+            start = time.time()
+            index = _inventory_indexes[signature] = InventoryIndex(inv_files, signature)
+            logger.info("Indexed inventory {} in {:.1f} seconds".format(inv_files, time.time() - start))
+    return index
+
+
 def get_inventory_files(request):
     """Use request.config.getoption('ansible_inventory') to the get list of inventory files.
        The 'ansible_inventory' option could have already been converted to a list by #enchance_inventory fixture.
@@ -391,10 +500,10 @@ def zone_getter_factory(argname):
 
 
 def _check_inv_files_after_read(facts, function, func_args, func_kargs):
-    """Check if inventory file matches after read host variable from cached files."""
+    """Check if inventory file and its content match after read host variable from cached files."""
     if facts is not FactsCache.NOTEXIST:
         inv_files = _get_parameter(function, func_args, func_kargs, "inv_files")
-        if inv_files == facts["inv_files"]:
+        if inv_files == facts["inv_files"] and facts.get("inv_signature") == inventory_signature(inv_files):
             return facts["vars"]
     # no facts cached or facts not in the same inventory, return `NOTEXIST`
     # to force calling the decorated function to get facts
@@ -402,9 +511,9 @@ def _check_inv_files_after_read(facts, function, func_args, func_kargs):
 
 
 def _mark_inv_files_before_write(facts, function, func_args, func_kargs):
-    """Add inventory to the facts before write to cached file."""
+    """Add inventory and the signature of its content to the facts before write to cached file."""
     inv_files = _get_parameter(function, func_args, func_kargs, "inv_files")
-    return {"inv_files": inv_files, "vars": facts}
+    return {"inv_files": inv_files, "inv_signature": inventory_signature(inv_files), "vars": facts}
 
 
 @cached(
@@ -425,12 +534,10 @@ def get_host_vars(inv_files, hostname):
     Returns:
         dict or None: dict if the host is found, None if the host is not found.
     """
-    im = get_inventory_manager(inv_files)
-    host = im.get_host(hostname)
-    if not host:
+    host_vars = get_inventory_index(inv_files).get_host_vars(hostname)
+    if host_vars is None:
         logger.error("Unable to find host {} in {}".format(hostname, str(inv_files)))
-        return None
-    return host.vars.copy()
+    return host_vars
 
 
 @cached(
@@ -453,13 +560,12 @@ def get_host_visible_vars(inv_files, hostname):
     Returns:
         dict or None: dict if the host is found, None if the host is not found.
     """
-    vm = get_variable_manager(inv_files)
-    im = vm._inventory
-    host = im.get_host(hostname)
+    index = get_inventory_index(inv_files)
+    host = index.get_host(hostname)
     if not host:
         logger.error("Unable to find host {} in {}".format(hostname, str(inv_files)))
         return None
-    return vm.get_vars(host=host)
+    return index.get_visible_vars(host)
 
 
 @cached(
@@ -481,29 +587,25 @@ def get_group_visible_vars(inv_files, group_name):
     Returns:
         dict or None: dict if the host is found, None if the host is not found.
     """
-    vm = get_variable_manager(inv_files)
-    im = vm._inventory
-    group = im.groups.get(group_name, None)
-    if not group:
+    index = get_inventory_index(inv_files)
+    group_hosts = index.get_group_hosts(group_name)
+    if group_hosts is None:
         logger.error("Unable to find group {} in {}".format(group_name, str(inv_files)))
         return None
-    group_hosts = group.get_hosts()
     if len(group_hosts) == 0:
         logger.error("No host in group {}".format(group_name))
         return None
     first_host = group_hosts[0]
-    return vm.get_vars(host=first_host)
+    return index.get_visible_vars(first_host)
 
 
 def get_test_server_host(inv_files, server):
     """Get test server ansible host from the 'server' column in testbed file."""
-    vm = get_variable_manager(inv_files)
-    im = vm._inventory
-    group = im.groups.get(server, None)
-    if not group:
+    group_hosts = get_inventory_index(inv_files).get_group_hosts(server)
+    if group_hosts is None:
         logger.error("Unable to find group {} in {}".format(server, str(inv_files)))
         return None
-    for host in group.get_hosts():
+    for host in group_hosts:
         if not re.match(r'VM\d+', host.name):   # This must be the test server host
             return host
     return None
@@ -563,12 +665,11 @@ def get_test_server_visible_vars(inv_files, server):
         dict or None: dict if the host is found, None if the host is not found.
     """
     test_server_host = get_test_server_host(inv_files, server)
-    vm = get_variable_manager(inv_files)
     if not test_server_host:
         logger.error("Unable to find host %s in %s", test_server_host, inv_files)
         return None
 
-    return vm.get_vars(host=test_server_host)
+    return get_inventory_index(inv_files).get_visible_vars(test_server_host)
 
 
 def is_ipv4_address(ip_address):
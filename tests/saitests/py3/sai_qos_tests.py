@@ -43,7 +43,8 @@ from switch import (switch_init,          # noqa F401
                     sai_thrift_read_queue_occupancy,
                     sai_thrift_read_pg_occupancy,
                     sai_thrift_read_port_voq_counters,
-                    sai_thrift_get_voq_port_id
+                    sai_thrift_get_voq_port_id,
+                    sai_thrift_read_counter_snapshot
                     )
 from switch_sai_thrift.ttypes import (sai_thrift_attribute_value_t,  # noqa F401
                                       sai_thrift_attribute_t)
@@ -210,6 +211,18 @@ def flat_test_port_ids(hierarchy):
 class CounterCollector:
     '''Collect, compare and display counters for test'''
 
+    # Counter family of sai_thrift_read_counter_snapshot() and fields of each counter, family None is PTF counters
+    counter_info = {
+        'PortCnt': ['port', port_counter_fields],
+        'QueCnt': ['queue_packets', [queue_counter_field_template.format(i) for i in range(QUEUE_NUM)]],
+        'QueShareWm': ['queue_shared_watermark', [queue_share_wm_field_template.format(i) for i in range(QUEUE_NUM)]],
+        'PgShareWm': ['pg_shared_watermark', [pg_share_wm_field_template.format(i) for i in range(PG_NUM)]],
+        'PgHdrmWm': ['pg_headroom_watermark', [pg_headroom_wm_field_template.format(i) for i in range(PG_NUM)]],
+        'PgCnt': ['pg_packets', [pg_counter_field_template.format(i) for i in range(PG_NUM)]],
+        'PgDrop': ['pg_dropped', [pg_drop_field_template.format(i) for i in range(PG_NUM)]],
+        'PtfCnt': [None, ['rx', 'tx']]
+    }
+
     def __init__(self, ptftest, counter_name):
         self.ptftest = ptftest
         if 'dst' in self.ptftest.clients and self.ptftest.clients['src'] != self.ptftest.clients['dst']:
@@ -223,68 +236,35 @@ class CounterCollector:
             self.asic_type = ptftest.test_params.get('sonic_asic_type', None)
             self.flat_ports = list(flat_test_port_ids(ptftest.test_params.get('test_port_ids', None)))
 
-    def collect_counter(self, step_name, step_desc=None, compare=True):
+    @property
+    def counter_family(self):
+        return self.counter_info.get(self.counter_name, [None])[0]
+
+    def read_snapshot(self, families):
+        return sai_thrift_read_counter_snapshot(
+            self.ptftest.clients['src'], self.asic_type,
+            [port_list['src'][port] for port in self.flat_ports], families)
+
+    def collect_counter(self, step_name, step_desc=None, compare=True, snapshot=None):
         if not self.valid:
             return
-        counter_info = {
-            'PortCnt': [
-                port_counter_fields,
-                lambda _ptftest, _asic_type, _port: sai_thrift_read_port_counters(
-                    _ptftest.clients['src'], _asic_type, port_list['src'][_port]
-                )[0]
-            ],
-            'QueCnt': [
-                [queue_counter_field_template.format(i) for i in range(QUEUE_NUM)],
-                lambda _ptftest, _asic_type, _port: sai_thrift_read_port_counters(
-                    _ptftest.clients['src'], _asic_type, port_list['src'][_port]
-                )[1]
-            ],
-            'QueShareWm': [
-                [queue_share_wm_field_template.format(i) for i in range(QUEUE_NUM)],
-                lambda _ptftest, _, _port: sai_thrift_read_port_watermarks(
-                    _ptftest.clients['src'], port_list['src'][_port]
-                )[0]
-            ],
-            'PgShareWm': [
-                [pg_share_wm_field_template.format(i) for i in range(PG_NUM)],
-                lambda _ptftest, _, _port: sai_thrift_read_port_watermarks(
-                    _ptftest.clients['src'], port_list['src'][_port]
-                )[1]
-            ],
-            'PgHdrmWm': [
-                [pg_headroom_wm_field_template.format(i) for i in range(PG_NUM)],
-                lambda _ptftest, _, _port: sai_thrift_read_port_watermarks(
-                    _ptftest.clients['src'], port_list['src'][_port]
-                )[2]
-            ],
-            'PgCnt': [
-                [pg_counter_field_template.format(i) for i in range(PG_NUM)],
-                lambda _ptftest, _, _port: sai_thrift_read_pg_counters(
-                    _ptftest.clients['src'], port_list['src'][_port]
-                )
-            ],
-            'PgDrop': [
-                [pg_drop_field_template.format(i) for i in range(PG_NUM)],
-                lambda _ptftest, _, _port: sai_thrift_read_pg_drop_counters(
-                    _ptftest.clients['src'], port_list['src'][_port]
-                )
-            ],
-            'PtfCnt': [
-                ['rx', 'tx'],
-                lambda _ptftest, _, _port: read_ptf_counters(
-                    _ptftest.dataplane, _port
-                )
-            ]
-        }
-
-        if self.counter_name not in counter_info:
+        if self.counter_name not in self.counter_info:
             return None
-        counter_fields, query_func = counter_info[self.counter_name]
+        family, counter_fields = self.counter_info[self.counter_name]
+        if family is None:
+            def query_func(port):
+                return read_ptf_counters(self.ptftest.dataplane, port)
+        else:
+            if snapshot is None or family not in snapshot.counters:
+                snapshot = self.read_snapshot([family])
+
+            def query_func(port):
+                return snapshot[family][port_list['src'][port]]
 
         table = texttable.TextTable(['port'] + counter_fields, attr_name='step', attr_value=step_name)
         for port in self.flat_ports:
-            data = query_func(self.ptftest, self.asic_type, port)
-            table.add_row([port] + data)
+            data = query_func(port)
+            table.add_row([port] + list(data))
 
         self.steps.append({'table': table, 'name': step_name, 'desc': step_desc})
         current = len(self.steps) - 1
@@ -317,20 +297,32 @@ class CounterCollector:
                 self.counter_name, base_counter, changed_counter, merged_table))
 
 
+def read_diag_counter_snapshot(ptftest):
+    """Read the SAI counters of all the counter collectors of a test in one pass."""
+    collectors = [collector for collector in ptftest.counter_collectors.values()
+                  if isinstance(collector, CounterCollector) and collector.valid and collector.counter_family]
+    if not collectors:
+        return None
+    return collectors[0].read_snapshot(sorted(set(collector.counter_family for collector in collectors)))
+
+
 def initialize_diag_counter(ptftest):
     ptftest.counter_collectors = {}
     for counter_name in ['PortCnt', 'QueCnt', 'QueShareWm', 'PgShareWm', 'PgHdrmWm', 'PgCnt', 'PgDrop', 'PtfCnt']:
         ptftest.counter_collectors[counter_name] = CounterCollector(ptftest, counter_name)
+    snapshot = read_diag_counter_snapshot(ptftest)
+    for collector in ptftest.counter_collectors.values():
         # not need to show counter for init stage
-        ptftest.counter_collectors[counter_name].collect_counter('init', compare=False)
+        collector.collect_counter('init', compare=False, snapshot=snapshot)
 
 
 def capture_diag_counter(ptftest, step_name='run', step_desc=None):
     if not hasattr(ptftest, 'counter_collectors') or not ptftest.counter_collectors:
         return
+    snapshot = read_diag_counter_snapshot(ptftest)
     for collector in ptftest.counter_collectors.values():
         if isinstance(collector, CounterCollector):
-            collector.collect_counter(step_name, step_desc)
+            collector.collect_counter(step_name, step_desc, snapshot=snapshot)
 
 
 def summarize_diag_counter(ptftest, changed_counter=-1, base_counter=0):
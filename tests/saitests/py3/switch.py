@@ -20,6 +20,7 @@ Thrift SAI interface basic tests
 import time
 import sys
 import os
+import weakref
 
 from sai_base_test import interface_to_front_mapping
 from ptf.thriftutils import *       # noqa F403
@@ -89,6 +90,26 @@ is_bmv2 = ('BMV2_TEST' in os.environ) and (int(os.environ['BMV2_TEST']) == 1)
 STOP_PORT_MAX_RATE = 1
 RELEASE_PORT_MAX_RATE = 0
 
+# Queue and PG object IDs of the ports, cached per thrift client, i.e. per test
+port_object_ids = weakref.WeakKeyDictionary()
+
+# Counter families of sai_thrift_read_counter_snapshot()
+PORT_STAT_FAMILY = 'port'
+QUEUE_STAT_FAMILIES = {
+    'queue_packets': SAI_QUEUE_STAT_PACKETS,
+    'queue_shared_watermark': SAI_QUEUE_STAT_SHARED_WATERMARK_BYTES,
+    'queue_occupancy': SAI_QUEUE_STAT_CURR_OCCUPANCY_BYTES,
+}
+PG_STAT_FAMILIES = {
+    'pg_packets': SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS,
+    'pg_dropped': SAI_INGRESS_PRIORITY_GROUP_STAT_DROPPED_PACKETS,
+    'pg_shared_watermark': SAI_INGRESS_PRIORITY_GROUP_STAT_SHARED_WATERMARK_BYTES,
+    'pg_headroom_watermark': SAI_INGRESS_PRIORITY_GROUP_STAT_XOFF_ROOM_WATERMARK_BYTES,
+    'pg_occupancy': SAI_INGRESS_PRIORITY_GROUP_STAT_CURR_OCCUPANCY_BYTES,
+}
+# Only the first 8 queues (unicast) are read, multicast queues are not used
+UNICAST_QUEUE_NUM = 8
+
 
 def switch_init(clients):
     global switch_inited
@@ -725,16 +746,37 @@ def sai_thrift_create_pool_profile(client, pool_type, size, threshold_mode):
     return pool_id
 
 
+def sai_thrift_get_port_object_ids(client, port):
+    """
+    Return the queue and the PG object IDs of a port.
+
+    The IDs are read from the port attributes on the first call for a client and port, and then taken from
+    port_object_ids.
+    """
+    ports = port_object_ids.setdefault(client, {})
+    if port in ports:
+        return ports[port]
+
+    queue_list = []
+    pg_list = []
+    port_attr_list = client.sai_thrift_get_port_attribute(port)
+    attr_list = port_attr_list.attr_list
+    for attribute in attr_list:
+        if attribute.id == SAI_PORT_ATTR_QOS_QUEUE_LIST:
+            for queue_id in attribute.value.objlist.object_id_list:
+                queue_list.append(queue_id)
+        elif attribute.id == SAI_PORT_ATTR_INGRESS_PRIORITY_GROUP_LIST:
+            for pg_id in attribute.value.objlist.object_id_list:
+                pg_list.append(pg_id)
+    if queue_list or pg_list:
+        ports[port] = (queue_list, pg_list)
+    return queue_list, pg_list
+
+
 def sai_thrift_clear_all_counters(client, target):
     for port in sai_port_list[target]:
-        queue_list = []
         client.sai_thrift_clear_port_all_stats(port)
-        port_attr_list = client.sai_thrift_get_port_attribute(port)
-        attr_list = port_attr_list.attr_list
-        for attribute in attr_list:
-            if attribute.id == SAI_PORT_ATTR_QOS_QUEUE_LIST:
-                for queue_id in attribute.value.objlist.object_id_list:
-                    queue_list.append(queue_id)
+        queue_list, _ = sai_thrift_get_port_object_ids(client, port)
 
         cnt_ids = []
         cnt_ids.append(SAI_QUEUE_STAT_PACKETS)
@@ -796,7 +838,7 @@ def sai_thrift_credit_wd_enable(client):
     return status
 
 
-def sai_thrift_read_port_counters(client, asic_type, port):
+def sai_thrift_read_port_stats(client, asic_type, port):
     port_cnt_ids = []
     port_cnt_ids.append(SAI_PORT_STAT_IF_OUT_DISCARDS)
     port_cnt_ids.append(SAI_PORT_STAT_IF_IN_DISCARDS)
@@ -838,25 +880,30 @@ def sai_thrift_read_port_counters(client, asic_type, port):
         in_drop_pkts_cnt_result = client.sai_thrift_get_port_stats(
             port, in_drop_pkts_cnt_id, 1)
         counters_results.insert(12, in_drop_pkts_cnt_result[0])
+    return counters_results
 
-    queue_list = []
-    port_attr_list = client.sai_thrift_get_port_attribute(port)
-    attr_list = port_attr_list.attr_list
-    for attribute in attr_list:
-        if attribute.id == SAI_PORT_ATTR_QOS_QUEUE_LIST:
-            for queue_id in attribute.value.objlist.object_id_list:
-                queue_list.append(queue_id)
-    cnt_ids = []
-    thrift_results = []
+
+def sai_thrift_read_queue_stat(client, port, cnt_id):
+    queue_list, _ = sai_thrift_get_port_object_ids(client, port)
     queue_counters_results = []
-    cnt_ids.append(SAI_QUEUE_STAT_PACKETS)
-    queue1 = 0
-    for queue in queue_list:
-        if queue1 <= 7:
-            thrift_results = client.sai_thrift_get_queue_stats(
-                queue, cnt_ids, len(cnt_ids))
-            queue_counters_results.append(thrift_results[0])
-            queue1 += 1
+    for queue in queue_list[:UNICAST_QUEUE_NUM]:
+        thrift_results = client.sai_thrift_get_queue_stats(queue, [cnt_id], 1)
+        queue_counters_results.append(thrift_results[0])
+    return queue_counters_results
+
+
+def sai_thrift_read_pg_stat(client, port_id, cnt_id):
+    _, pg_ids = sai_thrift_get_port_object_ids(client, port_id)
+    pg_cntrs = []
+    for pg_id in pg_ids:
+        cntr_vals = client.sai_thrift_get_pg_stats(pg_id, [cnt_id], 1)
+        pg_cntrs.append(cntr_vals[0])
+    return pg_cntrs
+
+
+def sai_thrift_read_port_counters(client, asic_type, port):
+    counters_results = sai_thrift_read_port_stats(client, asic_type, port)
+    queue_counters_results = sai_thrift_read_queue_stat(client, port, SAI_QUEUE_STAT_PACKETS)
     return (counters_results, queue_counters_results)
 
 
@@ -895,17 +942,7 @@ def sai_thrift_read_port_watermarks(client, port):
     pg_wm_ids.append(SAI_INGRESS_PRIORITY_GROUP_STAT_XOFF_ROOM_WATERMARK_BYTES)
     pg_wm_ids.append(SAI_INGRESS_PRIORITY_GROUP_STAT_SHARED_WATERMARK_BYTES)
 
-    queue_list = []
-    pg_list = []
-    port_attr_list = client.sai_thrift_get_port_attribute(port)
-    attr_list = port_attr_list.attr_list
-    for attribute in attr_list:
-        if attribute.id == SAI_PORT_ATTR_QOS_QUEUE_LIST:
-            for queue_id in attribute.value.objlist.object_id_list:
-                queue_list.append(queue_id)
-        elif attribute.id == SAI_PORT_ATTR_INGRESS_PRIORITY_GROUP_LIST:
-            for pg_id in attribute.value.objlist.object_id_list:
-                pg_list.append(pg_id)
+    queue_list, pg_list = sai_thrift_get_port_object_ids(client, port)
 
     thrift_results = []
     queue_res = []
@@ -913,7 +950,7 @@ def sai_thrift_read_port_watermarks(client, port):
     pg_headroom_res = []
 
     # Only use the first 8 queues (unicast) - multicast queues are not used
-    for queue in queue_list[:8]:
+    for queue in queue_list[:UNICAST_QUEUE_NUM]:
         thrift_results = client.sai_thrift_get_queue_stats(
             queue, q_wm_ids, len(q_wm_ids))
         queue_res.append(thrift_results[0])
@@ -928,97 +965,19 @@ def sai_thrift_read_port_watermarks(client, port):
 
 
 def sai_thrift_read_pg_counters(client, port_id):
-    pg_cntr_ids = [
-        SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS
-    ]
-
-    # fetch pg ids under port id
-    pg_ids = []
-    port_attrs = client.sai_thrift_get_port_attribute(port_id)
-    attrs = port_attrs.attr_list
-    for attr in attrs:
-        if attr.id == SAI_PORT_ATTR_INGRESS_PRIORITY_GROUP_LIST:
-            for pg_id in attr.value.objlist.object_id_list:
-                pg_ids.append(pg_id)
-
-    # get counter values of counter ids of interest under each pg
-    pg_cntrs = []
-    for pg_id in pg_ids:
-        cntr_vals = client.sai_thrift_get_pg_stats(
-            pg_id, pg_cntr_ids, len(pg_cntr_ids))
-        pg_cntrs.append(cntr_vals[0])
-
-    return pg_cntrs
+    return sai_thrift_read_pg_stat(client, port_id, SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS)
 
 
 def sai_thrift_read_pg_occupancy(client, port_id):
-    pg_cntr_ids = [
-        SAI_INGRESS_PRIORITY_GROUP_STAT_CURR_OCCUPANCY_BYTES
-    ]
-
-    # fetch pg ids under port id
-    pg_ids = []
-    port_attrs = client.sai_thrift_get_port_attribute(port_id)
-    attrs = port_attrs.attr_list
-    for attr in attrs:
-        if attr.id == SAI_PORT_ATTR_INGRESS_PRIORITY_GROUP_LIST:
-            for pg_id in attr.value.objlist.object_id_list:
-                pg_ids.append(pg_id)
-
-    # get counter values of counter ids of interest under each pg
-    pg_cntrs = []
-    for pg_id in pg_ids:
-        cntr_vals = client.sai_thrift_get_pg_stats(
-            pg_id, pg_cntr_ids, len(pg_cntr_ids))
-        pg_cntrs.append(cntr_vals[0])
-
-    return pg_cntrs
+    return sai_thrift_read_pg_stat(client, port_id, SAI_INGRESS_PRIORITY_GROUP_STAT_CURR_OCCUPANCY_BYTES)
 
 
 def sai_thrift_read_pg_drop_counters(client, port_id):
-    pg_cntr_ids = [
-        SAI_INGRESS_PRIORITY_GROUP_STAT_DROPPED_PACKETS
-    ]
-
-    # fetch pg ids under port id
-    pg_ids = []
-    port_attrs = client.sai_thrift_get_port_attribute(port_id)
-    attrs = port_attrs.attr_list
-    for attr in attrs:
-        if attr.id == SAI_PORT_ATTR_INGRESS_PRIORITY_GROUP_LIST:
-            for pg_id in attr.value.objlist.object_id_list:
-                pg_ids.append(pg_id)
-
-    # get counter values of counter ids of interest under each pg
-    pg_cntrs = []
-    for pg_id in pg_ids:
-        cntr_vals = client.sai_thrift_get_pg_stats(
-            pg_id, pg_cntr_ids, len(pg_cntr_ids))
-        pg_cntrs.append(cntr_vals[0])
-
-    return pg_cntrs
+    return sai_thrift_read_pg_stat(client, port_id, SAI_INGRESS_PRIORITY_GROUP_STAT_DROPPED_PACKETS)
 
 
 def sai_thrift_read_pg_shared_watermark(client, asic_type, port_id):
-    pg_cntr_ids = [SAI_INGRESS_PRIORITY_GROUP_STAT_SHARED_WATERMARK_BYTES]
-
-    # fetch pg ids under port id
-    pg_ids = []
-    port_attrs = client.sai_thrift_get_port_attribute(port_id)
-    attrs = port_attrs.attr_list
-    for attr in attrs:
-        if attr.id == SAI_PORT_ATTR_INGRESS_PRIORITY_GROUP_LIST:
-            for pg_id in attr.value.objlist.object_id_list:
-                pg_ids.append(pg_id)
-
-    # get counter values of counter ids of interest under each pg
-    pg_cntrs = []
-    for pg_id in pg_ids:
-        cntr_vals = client.sai_thrift_get_pg_stats(
-            pg_id, pg_cntr_ids, len(pg_cntr_ids))
-        pg_cntrs.append(cntr_vals[0])
-
-    return pg_cntrs
+    return sai_thrift_read_pg_stat(client, port_id, SAI_INGRESS_PRIORITY_GROUP_STAT_SHARED_WATERMARK_BYTES)
 
 
 def sai_thrift_clear_buffer_pool_watermark(client, buffer_pool_id):
@@ -1058,23 +1017,89 @@ def sai_thrift_read_headroom_pool_watermark(client, buffer_pool_id):
 
 
 def sai_thrift_read_queue_occupancy(client, target, port_id):
-    queue_list = []
-    port_attr_list = client.sai_thrift_get_port_attribute(port_list[target][port_id])
-    attr_list = port_attr_list.attr_list
-    for attribute in attr_list:
-        if attribute.id == SAI_PORT_ATTR_QOS_QUEUE_LIST:
-            for queue_id in attribute.value.objlist.object_id_list:
-                queue_list.append(queue_id)
-    cnt_ids = [SAI_QUEUE_STAT_CURR_OCCUPANCY_BYTES]
-    queue_counters_results = []
-    queue1 = 0
-    for queue in queue_list:
-        if queue1 <= 7:
-            thrift_results = client.sai_thrift_get_queue_stats(
-                queue, cnt_ids, len(cnt_ids))
-            queue_counters_results.append(thrift_results[0])
-            queue1 += 1
-    return queue_counters_results
+    return sai_thrift_read_queue_stat(client, port_list[target][port_id], SAI_QUEUE_STAT_CURR_OCCUPANCY_BYTES)
+
+
+class CounterSnapshot(object):
+    """
+    Counters of a set of ports read by sai_thrift_read_counter_snapshot().
+
+    counters[family][port] is the list of values of the family for the port: the port counters in the order of
+    sai_thrift_read_port_counters(), one value per unicast queue for the queue families and one value per PG for
+    the PG families.
+    """
+
+    def __init__(self, counters, timestamp=None):
+        self.counters = counters
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def __getitem__(self, family):
+        return self.counters[family]
+
+    def get(self, family, port):
+        return self.counters[family][port]
+
+    def diff(self, base):
+        """
+        Return a CounterSnapshot of the difference between this snapshot and base, for the families and the
+        ports of both snapshots.
+        """
+        counters = {}
+        for family, ports in self.counters.items():
+            base_ports = base.counters.get(family)
+            if base_ports is None:
+                continue
+            counters[family] = {
+                port: [value - base_value for value, base_value in zip(values, base_ports[port])]
+                for port, values in ports.items() if port in base_ports
+            }
+        return CounterSnapshot(counters, self.timestamp)
+
+
+def sai_thrift_read_counter_snapshot(client, asic_type, ports, families):
+    """
+    Read the counter families of a set of ports in one pass.
+
+    The port counters are read with one RPC per port and the queue and PG families with one RPC per queue and per
+    PG, for all the requested families of the queue or the PG. The queue and PG object IDs are taken from
+    port_object_ids.
+
+    Args:
+        client: Thrift client of the switch.
+        asic_type: ASIC type, as for sai_thrift_read_port_counters().
+        ports: SAI object IDs of the ports.
+        families: PORT_STAT_FAMILY and keys of QUEUE_STAT_FAMILIES and PG_STAT_FAMILIES.
+
+    Returns:
+        CounterSnapshot of the counters.
+    """
+    unknown = [family for family in families
+               if family != PORT_STAT_FAMILY and family not in QUEUE_STAT_FAMILIES and family not in PG_STAT_FAMILIES]
+    if unknown:
+        raise ValueError("Unknown counter families {}".format(unknown))
+    queue_families = [family for family in families if family in QUEUE_STAT_FAMILIES]
+    queue_cnt_ids = [QUEUE_STAT_FAMILIES[family] for family in queue_families]
+    pg_families = [family for family in families if family in PG_STAT_FAMILIES]
+    pg_cnt_ids = [PG_STAT_FAMILIES[family] for family in pg_families]
+
+    counters = dict((family, {}) for family in families)
+    timestamp = time.time()
+    for port in ports:
+        if PORT_STAT_FAMILY in counters:
+            counters[PORT_STAT_FAMILY][port] = sai_thrift_read_port_stats(client, asic_type, port)
+        if not queue_cnt_ids and not pg_cnt_ids:
+            continue
+        queue_list, pg_list = sai_thrift_get_port_object_ids(client, port)
+        if queue_cnt_ids:
+            results = [client.sai_thrift_get_queue_stats(queue, queue_cnt_ids, len(queue_cnt_ids))
+                       for queue in queue_list[:UNICAST_QUEUE_NUM]]
+            for index, family in enumerate(queue_families):
+                counters[family][port] = [result[index] for result in results]
+        if pg_cnt_ids:
+            results = [client.sai_thrift_get_pg_stats(pg, pg_cnt_ids, len(pg_cnt_ids)) for pg in pg_list]
+            for index, family in enumerate(pg_families):
+                counters[family][port] = [result[index] for result in results]
+    return CounterSnapshot(counters, timestamp)
 
 
 def sai_thrift_create_vlan_member(client, vlan_id, port_id, tagging_mode):
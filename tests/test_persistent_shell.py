@@ -0,0 +1,52 @@
+import logging
+
+import pytest
+
+from tests.common.devices.base import AnsibleHostBase
+from tests.common.devices.ssh_channel import measure_latency
+from tests.common.helpers.assertions import pytest_assert
+
+pytestmark = [
+    pytest.mark.topology('any'),
+    pytest.mark.disable_loganalyzer
+]
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_ITERATIONS = 20
+BENCHMARK_COMMANDS = [
+    'echo hello',
+    'show version | grep "SONiC Software Version"',
+    'cat /etc/sonic/sonic_version.yml',
+    'redis-cli -n 4 hgetall "DEVICE_METADATA|localhost"'
+]
+
+
+def test_persistent_shell_benchmark(duthosts, rand_one_dut_hostname, persistent_shell_enabled):
+    """Compare per-command latency and results of duthost.shell over the persistent SSH channel and over Ansible.
+
+    Only runs with --persistent_shell, which makes duthost.shell use the persistent channel.
+    """
+    if not persistent_shell_enabled:
+        pytest.skip("Persistent shell is not enabled, run with --persistent_shell")
+    duthost = duthosts[rand_one_dut_hostname]
+    if duthost.get_persistent_shell() is None:
+        pytest.skip("{} is not reached over SSH".format(duthost.hostname))
+
+    for cmd in BENCHMARK_COMMANDS:
+        ansible_res = AnsibleHostBase._run(duthost, 'shell', cmd, verbose=False)
+        channel_res = duthost.shell(cmd, verbose=False)
+        for key in ('rc', 'stdout', 'stdout_lines', 'failed'):
+            pytest_assert(ansible_res[key] == channel_res[key],
+                          "'{}' differs for '{}': ansible={}, persistent shell={}".format(
+                              key, cmd, ansible_res[key], channel_res[key]))
+
+        ansible_latency = measure_latency(lambda: AnsibleHostBase._run(duthost, 'shell', cmd, verbose=False),
+                                          BENCHMARK_ITERATIONS)
+        channel_latency = measure_latency(lambda: duthost.shell(cmd, verbose=False), BENCHMARK_ITERATIONS)
+        logger.info("'{}': ansible avg {:.3f}s (min {:.3f}s, max {:.3f}s), "
+                    "persistent shell avg {:.3f}s (min {:.3f}s, max {:.3f}s), speedup {:.1f}x".format(
+                        cmd,
+                        ansible_latency['avg'], ansible_latency['min'], ansible_latency['max'],
+                        channel_latency['avg'], channel_latency['min'], channel_latency['max'],
+                        ansible_latency['avg'] / channel_latency['avg']))